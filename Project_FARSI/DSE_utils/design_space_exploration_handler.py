@@ -227,6 +227,8 @@ class DSEHandler:
     def explore(self):
         exploration_start_time = time.time()  # time hook (data collection)
         if config.heuristic_type in ["FARSI", "SA"]:
+            if config.resume_explore_ds and os.path.exists(config.explore_ds_state_file):
+                self.dse.load_explore_ds_state(config.explore_ds_state_file)
             self.dse.explore_ds()
         if config.heuristic_type == "moos":
             self.dse.explore_ds_with_moos()
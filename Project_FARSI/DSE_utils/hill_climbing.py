@@ -22,6 +22,9 @@ from visualization_utils import vis_sim
 #from data_collection.FB_private.verification_utils.common import *
 import dill
 import pickle
+import random
+import tempfile
+import numpy as np
 import importlib
 import gc
 import difflib
@@ -148,6 +151,7 @@ class HillClimbing:
         self.total_iteration_ctr = 0
         self.moos_tree = moosTreeModel(config.budgetted_metrics)  # only used for moos heuristic
         self.ctr_l = 0
+        self.explore_ds_resume_state = None  # explore_ds loop variables, set by load_explore_ds_state
 
     def get_total_iteration_cnt(self):
         return self.total_iteration_cnt
@@ -174,6 +178,45 @@ class HillClimbing:
                 obj = pickle.load(f)
         return obj
 
+    # ------------------------------
+    # Functionality:
+    #       snapshot everything explore_ds needs to continue (current/best designs, counters, seen_SOC_design_codes,
+    #       caches and the rng states) into one file. The file is written to a temp file first and renamed, so
+    #       a killed run always leaves the previous complete snapshot behind.
+    # Variables:
+    #       state_file: snapshot file
+    #       loop_state: explore_ds local variables (temperature, designs per iteration)
+    # ------------------------------
+    def save_explore_ds_state(self, state_file, loop_state):
+        state = {"hill_climbing": self.__dict__, "loop_state": loop_state,
+                 "random_state": random.getstate(), "np_random_state": np.random.get_state()}
+        dir_name = os.path.dirname(os.path.abspath(state_file))
+        os.makedirs(dir_name, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=dir_name, prefix="." + os.path.basename(state_file) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                dill.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, state_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    # ------------------------------
+    # Functionality:
+    #       restore a snapshot written by save_explore_ds_state. The next explore_ds call continues from it
+    #       instead of evaluating the initial design again.
+    # ------------------------------
+    def load_explore_ds_state(self, state_file):
+        with open(state_file, "rb") as f:
+            state = dill.load(f)
+        self.__dict__.update(state["hill_climbing"])
+        random.setstate(state["random_state"])
+        np.random.set_state(state["np_random_state"])
+        self.explore_ds_resume_state = state["loop_state"]
+
     def populate_counters(self, counters):
         self.counters = counters
         self.krnel_rnk_to_consider = counters.krnel_rnk_to_consider
@@ -647,7 +690,8 @@ class HillClimbing:
             found_block_to_mig_to = True
 
         # pick at random to try random scenarios. At the moment, only equal and immeidately better blocks are considered
-        random.seed(datetime.now().microsecond)
+        if config.DEBUG_FIX: random.seed(0)
+        else: random.seed(datetime.now().microsecond)
         result_block = random.choice(results_block)
 
         selection_mode = "batch"
@@ -992,7 +1036,8 @@ class HillClimbing:
                                                                     selected_krnl, sorted_metric_dir)
         if config.print_info_regularly:
             print(list(feasible_transformations))
-        random.seed(datetime.now().microsecond)
+        if config.DEBUG_FIX: random.seed(0)
+        else: random.seed(datetime.now().microsecond)
         # pick randomly at the moment.
         # TODO: possibly can do better
         transformation = random.choice(list(feasible_transformations))
@@ -1308,7 +1353,8 @@ class HillClimbing:
 
         if config.transformation_selection_mode == "random":
             krnls = sim_dp.get_dp_stats().get_kernels()
-            random.seed(datetime.now().microsecond)
+            if config.DEBUG_FIX: random.seed(0)
+            else: random.seed(datetime.now().microsecond)
             selected_krnl = random.choice(krnls)
 
         return selected_krnl, krnl_prob_dict, krnl_prob_dict_sorted
@@ -1320,7 +1366,8 @@ class HillClimbing:
 
         # randomly pick one
         if config.transformation_selection_mode =="random":
-            random.seed(datetime.now().microsecond)
+            if config.DEBUG_FIX: random.seed(0)
+            else: random.seed(datetime.now().microsecond)
             hot_blck = any_block = random.choice(ex_dp.get_hardware_graph().get_blocks())  # this is just dummmy to prevent breaking the plotting
 
         # hot_blck_synced is the same block but ensured that the block instance
@@ -2373,6 +2420,21 @@ class HillClimbing:
 
 
 
+    # ------------------------------
+    # Functionality:
+    #     drop the simulation checkpoints (delta simulation) of the designs that are not selected. The checkpoints
+    #     hold the simulator state of every step and only the neighbours of the selected design are simulated next.
+    # Variables
+    #       ex_sim_dp_dict: example_simulate_design_point_list. Designs the selected design was picked from.
+    #       selected_sim_dp: selected (simulated) design.
+    # ------------------------------
+    def drop_simulation_checkpoints(self, ex_sim_dp_dict, selected_sim_dp):
+        selected = getattr(selected_sim_dp, "design_point_list", [selected_sim_dp])
+        for sim_dp in ex_sim_dp_dict.values():
+            for sim_dp_sample in getattr(sim_dp, "design_point_list", [sim_dp]):
+                if not any(sim_dp_sample is selected_sample for selected_sample in selected):
+                    sim_dp_sample.simulation_checkpoints = None
+
     # ------------------------------
     # Functionality:
     #     select the next best design (from the sorted dp)
@@ -2417,16 +2479,17 @@ class HillClimbing:
     # Variables
     #      ex_dp: example design point. Design point to simulate.
     #      database: hardware/software data base to simulated based off of.
+    #      parent_sim_dp: simulated design point ex_dp was generated from (if any)
     # ------------------------------
-    def sim_one_design(self, ex_dp, database):
+    def sim_one_design(self, ex_dp, database, parent_sim_dp=None):
         if config.simulation_method == "power_knobs":
             sim_dp = self.dh.convert_to_sim_des_point(ex_dp)
             power_knob_sim_dp = self.dh.convert_to_sim_des_point(ex_dp)
             OSA = OSASimulator(sim_dp, database, power_knob_sim_dp)
         else:
             sim_dp = self.dh.convert_to_sim_des_point(ex_dp)
-            # Simulator initialization
-            OSA = OSASimulator(sim_dp, database)  # change
+            # Simulator initialization (delta simulation resumes from the parent's simulation)
+            OSA = OSASimulator(sim_dp, database, parent_dp=parent_sim_dp)  # change
 
         # Does the actual simulation
         t = time.time()
@@ -2554,8 +2617,10 @@ class HillClimbing:
     # Variables:
     #       ex_dp: example design point.
     #       database: database containing hardware/software modeled characteristics.
+    #       parent_sim_dp: simulated design (container) ex_dp was generated from. Its samples are the starting point
+    #                      for the delta simulation of ex_dp's samples.
     # ------------------------------
-    def eval_design(self, ex_dp:ExDesignPoint, database):
+    def eval_design(self, ex_dp:ExDesignPoint, database, parent_sim_dp=None):
         #start = time.time()
         # according to config singular runs
         if config.eval_mode == "singular":
@@ -2566,7 +2631,13 @@ class HillClimbing:
             # generate a population (geneate_sample), evaluate them and reduce to some statistical indicator
             ex_dp_pop_sample = [self.generate_sample(ex_dp, database.hw_sampling) for i in range(0, self.database.hw_sampling["population_size"])] # population sample
             ex_dp.get_tasks()[0].task_id_for_debugging_static += 1
-            sim_dp_pop_sample = list(map(lambda ex_dp_: self.sim_one_design(ex_dp_, database), ex_dp_pop_sample)) # evaluate the population sample
+            parent_sim_dps = [None]*len(ex_dp_pop_sample)
+            if parent_sim_dp is not None and database.hw_sampling["mode"] == "exact":
+                parent_pop_sample = getattr(parent_sim_dp, "design_point_list", [parent_sim_dp])
+                if len(parent_pop_sample) == len(ex_dp_pop_sample):
+                    parent_sim_dps = parent_pop_sample
+            sim_dp_pop_sample = list(map(lambda ex_dp_, parent_: self.sim_one_design(ex_dp_, database, parent_),
+                                         ex_dp_pop_sample, parent_sim_dps)) # evaluate the population sample
 
             # collect profiling information
             sim_dp_statistical = SimDesignPointContainer(sim_dp_pop_sample, database, config.statistical_reduction_mode)
@@ -2671,7 +2742,7 @@ class HillClimbing:
             sim_dp = des_tup[1]
         elif design_unique_code not in self.cached_SOC_sim.keys():
             self.population_observed_ctr += 1
-            sim_dp = self.eval_design(ex_dp, self.database)  # evaluate the designs
+            sim_dp = self.eval_design(ex_dp, self.database, des_tup[1])  # evaluate the designs
             #if config.cache_seen_designs: # this seems to be slower than just simulation, because of deepcopy
             #    self.cached_SOC_sim[design_unique_code] = (ex_dp, sim_dp)
         else:
@@ -3429,18 +3500,24 @@ class HillClimbing:
     #       it uses the config parameters that are used to instantiate the object.
     # ------------------------------
     def explore_ds(self):
-        self.so_far_best_ex_dp = self.init_ex_dp
-        self.so_far_best_sim_dp = self.eval_design(self.so_far_best_ex_dp, self.database)
-        self.init_sim_dp = self.eval_design(self.so_far_best_ex_dp, self.database)
-
-        # visualize/checkpoint/PA generation
-        vis_hardware.vis_hardware(self.so_far_best_sim_dp.get_dp_rep())
-        if config.RUN_VERIFICATION_PER_GEN or config.RUN_VERIFICATION_PER_IMPROVMENT or config.RUN_VERIFICATION_PER_NEW_CONFIG:
-            self.gen_verification_data(self.so_far_best_sim_dp, self.so_far_best_ex_dp)
-
-        des_per_iteration = [0]
+        if self.explore_ds_resume_state is None:
+            self.so_far_best_ex_dp = self.init_ex_dp
+            self.so_far_best_sim_dp = self.eval_design(self.so_far_best_ex_dp, self.database)
+            self.init_sim_dp = self.eval_design(self.so_far_best_ex_dp, self.database)
+
+            # visualize/checkpoint/PA generation
+            vis_hardware.vis_hardware(self.so_far_best_sim_dp.get_dp_rep())
+            if config.RUN_VERIFICATION_PER_GEN or config.RUN_VERIFICATION_PER_IMPROVMENT or config.RUN_VERIFICATION_PER_NEW_CONFIG:
+                self.gen_verification_data(self.so_far_best_sim_dp, self.so_far_best_ex_dp)
+
+            des_per_iteration = [0]
+            cur_temp = config.annealing_max_temp
+        else:
+            # resuming from load_explore_ds_state
+            des_per_iteration = self.explore_ds_resume_state["des_per_iteration"]
+            cur_temp = self.explore_ds_resume_state["cur_temp"]
+            self.explore_ds_resume_state = None
         start = True
-        cur_temp = config.annealing_max_temp
 
         while True:
             this_itr_ex_sim_dp_dict = self.simple_SA()   # run simple simulated annealing
@@ -3457,6 +3534,7 @@ class HillClimbing:
                                                                          self.so_far_best_sim_dp, self.so_far_best_ex_dp, cur_temp)
             t2 = time.time()
             self.neighbour_selection_time = t2-t1
+            self.drop_simulation_checkpoints(this_itr_ex_sim_dp_dict, self.cur_best_sim_dp)
             self.log_data(this_itr_ex_sim_dp_dict)
             print("-------:):):):):)----------")
             print("Best design's latency: " + str(self.cur_best_sim_dp.dp_stats.get_system_complex_metric("latency")))
@@ -3501,6 +3579,10 @@ class HillClimbing:
             cur_temp -= config.annealing_temp_dec
             self.vis_move_trail_ctr += 1
 
+            if config.explore_ds_state_file and (self.population_generation_cnt % config.explore_ds_state_every) == 0:
+                self.save_explore_ds_state(config.explore_ds_state_file,
+                                           {"cur_temp": cur_temp, "des_per_iteration": des_per_iteration})
+
     # ------------------------------
     # Functionality:
     #       generating plots for data analysis
@@ -4,13 +4,14 @@
 
 from SIM_utils.components.perf_sim import *
 from SIM_utils.components.pow_sim import *
+from SIM_utils.components.delta_sim import SimCheckpoints, DeltaSimException, compare_simulations
 #from OSSIM_utils.components.pow_knob_sim import *
 from design_utils.design import *
 from settings import config
 
 # This module is our top level simulator containing all simulators (perf, and pow simulator)
 class OSASimulator:
-    def __init__(self, dp, database, pk_dp=""):
+    def __init__(self, dp, database, pk_dp="", parent_dp=None):
         self.time_elapsed = 0  # time elapsed from the beginning of the simulation
         self.dp = dp  # design point to simulate
         self.perf_sim = PerformanceSimulator(self.dp)  # performance simulator instance
@@ -23,6 +24,8 @@ class OSASimulator:
         self.completion_time = -1   # time passed for the simulation to complete
         self.program_status = "idle"
         self.cur_tick_time = self.next_tick_time = 0  # current tick time
+        self.parent_dp = parent_dp  # (simulated) design this design was generated from. Used for delta simulation
+        self.resumed_step = -1  # checkpoint of the parent's simulation this simulation resumed from
 
     # ------------------------------
     # Functionality:
@@ -57,13 +60,35 @@ class OSASimulator:
     # ------------------------------
     def simulate(self):
         blah = time.time()
+        if config.delta_simulation_cross_check and self.resumable():
+            # simulate a copy of the design from the beginning, to verify the delta simulation against
+            full_osa = OSASimulator(cPickle.loads(cPickle.dumps(self.dp, -1)), self.database)
+        else:
+            full_osa = None
+
+        checkpoints = None
+        if config.delta_simulation:
+            checkpoints = SimCheckpoints(self)
+            if self.resumable():
+                try:
+                    self.resumed_step = self.parent_dp.simulation_checkpoints.resume(self, checkpoints)
+                except DeltaSimException:
+                    self.resumed_step = -1
+
         while not self.terminate(self.program_status):
+            if checkpoints is not None:
+                checkpoints.record(self)
             self.tick()
             self.step(self.cur_tick_time)
 
         if config.use_cacti:
             self.dp.correct_power_area_with_cacti(self.database)
 
+        # power/thermal simulation of the (performance) simulated design
+        if config.power_thermal_simulation or config.peak_power_budget is not None or \
+                config.thermal_budget is not None:
+            self.dp.set_power_thermal_stats(self.pow_sim.simulate())
+
         # collect all the stats upon completion of simulation
         self.dp.collect_dp_stats(self.database)
 
@@ -78,5 +103,23 @@ class OSASimulator:
         self.dp.set_simulation_time_phase_calculation_portion(self.perf_sim.phase_interval_calc_time)
         self.dp.set_simulation_time_task_update_portion(self.perf_sim.task_update_time)
         self.dp.set_simulation_time_phase_scheduling_portion(self.perf_sim.phase_scheduling_time)
+        self.dp.set_simulation_steps_skipped(max(self.resumed_step, 0))
+        # a neighbour (simulated) next resumes from these checkpoints
+        self.dp.simulation_checkpoints = checkpoints
+
+        if full_osa is not None:
+            full_osa.simulate()
+            differences = compare_simulations(self, full_osa)
+            if differences:
+                raise Exception("delta simulation (resumed from step " + str(self.resumed_step) +
+                                ") differs from the full simulation in: " + ", ".join(differences))
 
-        return self.dp
\ No newline at end of file
+        return self.dp
+
+    # ------------------------------
+    # Functionality:
+    #   whether the simulation can resume from the simulation of the design it was generated from
+    # ------------------------------
+    def resumable(self):
+        return config.delta_simulation and config.simulation_method == "performance" and \
+               self.parent_dp is not None and getattr(self.parent_dp, "simulation_checkpoints", None) is not None
\ No newline at end of file
@@ -0,0 +1,528 @@
+#Copyright (c) Facebook, Inc. and its affiliates.
+#This source code is licensed under the MIT license found in the
+#LICENSE file in the root directory of this source tree.
+
+# Delta simulation.
+# A neighbour (generated by a move) differs from the design it was generated from (its parent) in a few
+# blocks/mappings only, so its simulation is identical to the parent's until the first kernel the move can
+# affect is launched. While the parent is simulated, its state is checkpointed before every step (only the
+# kernels/blocks a step touches are copied; the phase keyed histories of the design are append-only and are cut
+# out of the parent's final state instead). A neighbour's simulation then resumes from the last checkpoint before
+# any affected kernel was launched, with the checkpointed state moved (by name) onto the neighbour's own
+# kernels, tasks and blocks. A kernel is affected if its task, or the view of the blocks/pipe clusters it is mapped
+# to, changed (a block shared with other kernels is only compared through the parts this kernel uses). A resumed
+# neighbour inherits the checkpoints before its resume point, so its own neighbours can resume from them as well.
+from collections import defaultdict
+import numpy as np
+from design_utils.components.hardware import Block
+from design_utils.components.krnel import Kernel, KernelStats
+from design_utils.components.workload import Task
+
+# kernel attributes that are set when the design is generated. Everything else is simulation state.
+kernel_static_attrs = ["_Kernel__task_to_blocks_map", "kernel_total_work", "max_iteration_ctr", "type",
+                       "throughput_info", "SOC_type", "SOC_id", "task_name", "power_knob_id"]
+# kernel attributes rebuilt (never updated in place) by every work rate calculation, so they are checkpointed by
+# reference
+kernel_rebuilt_attrs = ["block_num_shared_blocks_dict", "block_normalized_work_rate_unconsolidated",
+                        "block_normalized_work_rate", "block_att_work_rate_dict", "block_dir_att_work_rate_dict"]
+# phase keyed histories of a kernel/its stats. A step only adds the entries of its own phase, so they are not
+# checkpointed but cut out of the kernel's final state instead.
+kernel_phase_attrs = ["block_phase_work_dict", "block_phase_read_dict", "block_phase_write_dict",
+                      "block_phase_energy_dict", "block_phase_leakage_energy_dict", "block_phase_area_dict"]
+stats_phase_attrs = ["phase_latency_dict", "phase_energy_dict", "phase_leakage_energy_dict", "phase_area_dict",
+                     "phase_bytes_dict", "phase_block_duration_bottleneck", "block_phase_energy_dict"]
+# block/pipe cluster attributes changed by the simulation
+block_state_attrs = ["area", "area_list", "area_in_bytes_list", "area_task_dir_list"]
+pipe_cluster_state_attrs = ["pathlet_phase_work_rate", "pathlet_phase_latency"]
+# block attributes describing its connections/mapping (compared through the pipe clusters instead)
+block_topology_attrs = ["pipes", "pipe_clusters", "neighs", "_Block__task_name_dir_list",
+                        "_Block__tasks_dir_work_ratio"]
+# attributes that say nothing about how a block/task behaves (ids and debugging counters)
+signature_ignored_attrs = ["db_input", "id", "task_id_for_debugging", "updated_task_work_for_debug",
+                           "update_task_work_for_debug"] + block_state_attrs + pipe_cluster_state_attrs
+# perf simulator state
+perf_sim_list_attrs = ["scheduled_kernels", "driver_waiting_queue", "completed_kernels_for_memory_sizing",
+                       "yet_to_schedule_kernels", "task_token_queue"]
+perf_sim_scalar_attrs = ["clock_time", "old_clock_time", "program_status", "phase_num", "time_step_size"]
+
+
+class DeltaSimException(Exception):
+    pass
+
+
+def is_primitive(value):
+    return value is None or isinstance(value, (bool, int, float, str, np.generic))
+
+
+# copy the (nested) containers of a state value. Objects (blocks, pipes, tasks, ...) are kept as references.
+def copy_state(value):
+    if is_primitive(value):
+        return value
+    elif isinstance(value, defaultdict):
+        return defaultdict(value.default_factory, [(k, copy_state(v)) for k, v in value.items()])
+    elif isinstance(value, dict):
+        return type(value)([(k, copy_state(v)) for k, v in value.items()])
+    elif isinstance(value, list):
+        return [copy_state(v) for v in value]
+    elif isinstance(value, set):
+        return set(value)
+    return value
+
+
+# checkpoint a kernel: everything but its static attributes and phase keyed histories
+def copy_kernel_state(krnl):
+    state = {attr: (value if attr in kernel_rebuilt_attrs else copy_state(value)) for attr, value in vars(krnl).items()
+             if attr not in kernel_static_attrs and attr not in kernel_phase_attrs}
+    stats = KernelStats.__new__(KernelStats)
+    stats.__dict__ = {attr: copy_state(value) for attr, value in vars(krnl.stats).items()
+                      if attr not in stats_phase_attrs}
+    state["stats"] = stats
+    return state
+
+
+# ------------------------------
+# Functionality:
+#       the entries of a phase keyed history ({phase: value} or {key: {phase: value}}) before a phase.
+# ------------------------------
+def phase_history(history, phase_num):
+    if isinstance(history, defaultdict):
+        result = defaultdict(history.default_factory)
+    else:
+        result = type(history)()
+    for key, value in history.items():
+        if isinstance(value, dict):
+            value = phase_history(value, phase_num)
+            if value:
+                result[key] = value
+        elif key < phase_num:
+            result[key] = copy_state(value)
+    return result
+
+
+# ------------------------------
+# Functionality:
+#       copy a checkpointed value into the neighbour, replacing the parent's objects with their counterparts.
+# Variables:
+#       ref_map: id of a parent object -> neighbour object
+# ------------------------------
+def transplant(value, ref_map):
+    if is_primitive(value):
+        return value
+    elif id(value) in ref_map:
+        return ref_map[id(value)]
+    elif isinstance(value, defaultdict):
+        return defaultdict(value.default_factory,
+                           [(transplant(k, ref_map), transplant(v, ref_map)) for k, v in value.items()])
+    elif isinstance(value, dict):
+        return type(value)([(transplant(k, ref_map), transplant(v, ref_map)) for k, v in value.items()])
+    elif isinstance(value, list):
+        return [transplant(v, ref_map) for v in value]
+    elif isinstance(value, tuple):
+        return tuple(transplant(v, ref_map) for v in value)
+    elif isinstance(value, set):
+        return set(transplant(v, ref_map) for v in value)
+    elif isinstance(value, KernelStats):
+        stats = KernelStats.__new__(KernelStats)
+        stats.__dict__ = transplant(value.__dict__, ref_map)
+        return stats
+    raise DeltaSimException("no counterpart for " + type(value).__name__ + " in the neighbour design")
+
+
+# ------------------------------
+# Functionality:
+#       structural signature of a design object. Blocks/tasks/kernels are referred to by name.
+# ------------------------------
+def signature(value):
+    if is_primitive(value):
+        return value
+    elif isinstance(value, Block):
+        return ("block", value.instance_name)
+    elif isinstance(value, Task):
+        return ("task", value.name)
+    elif isinstance(value, Kernel):
+        return ("kernel", value.get_task_name())
+    elif isinstance(value, dict):
+        return tuple((signature(k), signature(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return tuple(signature(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return tuple(sorted((signature(v) for v in value), key=repr))
+    return object_signature(value)
+
+
+def object_signature(obj, ignored_attrs=()):
+    return (type(obj).__name__,) + tuple((attr, signature(value)) for attr, value in vars(obj).items()
+                                         if attr not in signature_ignored_attrs and attr not in ignored_attrs)
+
+
+# the traffic of the tasks on a pipe (the only thing the work rate calculation reads from it)
+def pipe_signature(pipe, tasks):
+    return tuple((pipe.is_task_present(task), pipe.get_task_work_unit(task)) for task in tasks)
+
+
+# ------------------------------
+# Functionality:
+#       signature of a pipe cluster, as seen by the given tasks. Pipes none of the tasks use are filtered out
+#       by the work rate calculation (filter_in_active_pipes), so they are left out.
+# ------------------------------
+def pipe_cluster_signature(pipe_cluster, tasks):
+    if pipe_cluster.cluster_type == "dummy":
+        dummy_tasks = [task.get_name() for task in pipe_cluster.dummy_tasks]
+        return pipe_cluster.get_dir(), tuple(task.get_name() in dummy_tasks for task in tasks)
+    no_traffic = tuple((False, 0) for _ in tasks)
+    incoming = tuple(sig for sig in (pipe_signature(pipe, tasks) for pipe in pipe_cluster.get_incoming_pipes())
+                     if sig != no_traffic)
+    outgoing = None if pipe_cluster.get_outgoing_pipe() is None else \
+        pipe_signature(pipe_cluster.get_outgoing_pipe(), tasks)
+    return pipe_cluster.get_dir(), incoming, outgoing
+
+
+# what launching a kernel waits for: its parents (and its iterations)
+def waiting_signature(krnl):
+    return tuple(task.name for task in krnl.get_task().get_parents()), krnl.max_iteration_ctr, krnl.get_type()
+
+
+# ------------------------------
+# Functionality:
+#       signature of a kernel: its static attributes, its task and the blocks (hardware and the pipe clusters it
+#       uses) it runs on. Blocks are shared, so the pipe clusters are seen through the tasks of the kernels
+#       that can run at the same time.
+# Variables:
+#       tasks: tasks of the kernels that can run at the same time
+# ------------------------------
+def kernel_signature(krnl, tasks, block_signatures):
+    static = tuple((attr, signature(getattr(krnl, attr))) for attr in kernel_static_attrs if hasattr(krnl, attr))
+    blocks = []
+    for block in krnl.get_blocks():
+        if block.instance_name not in block_signatures:
+            block_signatures[block.instance_name] = object_signature(block, block_topology_attrs)
+        blocks.append((block.instance_name, block_signatures[block.instance_name],
+                       signature(block.get_task_dir_by_task_name(krnl.get_task())),
+                       tuple(pipe_cluster_signature(pipe_cluster, tasks)
+                             for pipe_cluster in block.get_pipe_clusters_of_task(krnl.get_task()))))
+    return static, object_signature(krnl.get_task()), tuple(blocks)
+
+
+# This class checkpoints the state of one simulation (before every step), so the simulation of its
+# neighbours can resume from it.
+class SimCheckpoints:
+    def __init__(self, osa):
+        self.dp = osa.dp
+        self.perf_sim = osa.perf_sim
+        self.kernel_names = [krnl.get_task_name() for krnl in self.perf_sim.all_kernels]
+        self.kernels = {krnl.get_task_name(): krnl for krnl in self.perf_sim.all_kernels}
+        self.blocks = {block.instance_name: block for block in self.dp.get_blocks()}
+        self.task_kernel = {krnl.get_task(): krnl for krnl in self.perf_sim.all_kernels}
+        self.steps = []  # per checkpoint: osa and perf simulator state
+        self.kernel_versions = defaultdict(list)  # kernel name -> [(checkpoint, state)]
+        self.block_versions = defaultdict(list)  # block name -> [(checkpoint, state)]
+        self.first_touched = {}  # kernel name -> first checkpoint where the kernel is launched
+        self.prev_active = []
+        self.waiting_signatures = None
+
+    # ------------------------------
+    # Functionality:
+    #       checkpoint the state before the next step. The kernels running (or waiting) in the previous or in
+    #       the next step, and the blocks they (and their parents, which release memory) use, are the only
+    #       ones the previous step changed.
+    # ------------------------------
+    def record(self, osa):
+        perf_sim = self.perf_sim
+        idx = len(self.steps)
+        step = {"next_tick_time": osa.next_tick_time, "program_status": osa.program_status,
+                "time_elapsed": osa.time_elapsed}
+        for attr in perf_sim_list_attrs:
+            step[attr] = getattr(perf_sim, attr)[:]
+        for attr in perf_sim_scalar_attrs:
+            step[attr] = getattr(perf_sim, attr, 0)
+        self.steps.append(step)
+
+        active = perf_sim.scheduled_kernels + perf_sim.driver_waiting_queue
+        touched = []
+        for krnl in self.prev_active + active:
+            if krnl not in touched:
+                touched.append(krnl)
+        self.prev_active = active
+
+        touched_blocks = []
+        for krnl in touched:
+            name = krnl.get_task_name()
+            if name not in self.first_touched:
+                self.first_touched[name] = idx
+            self.kernel_versions[name].append((idx, copy_kernel_state(krnl)))
+            related = [krnl] + [self.task_kernel[task] for task in krnl.get_task().get_parents()
+                                if task in self.task_kernel]
+            for krnl_ in related:
+                for block in krnl_.get_blocks():
+                    if block not in touched_blocks:
+                        touched_blocks.append(block)
+
+        for block in touched_blocks:
+            state = {attr: copy_state(getattr(block, attr)) for attr in block_state_attrs}
+            state["pipe_clusters"] = [(pipe_cluster, {attr: copy_state(getattr(pipe_cluster, attr))
+                                                      for attr in pipe_cluster_state_attrs})
+                                      for pipe_cluster in block.get_pipe_clusters()]
+            self.block_versions[block.instance_name].append((idx, state))
+
+    # the latest version (of a kernel/block) recorded at or before the checkpoint
+    @staticmethod
+    def version_at(versions, idx):
+        found = None
+        for idx_, state in versions:
+            if idx_ > idx:
+                break
+            found = state
+        return found
+
+    # kernels launched up to the checkpoint, in the order of the simulator's kernel list
+    def kernels_launched(self, idx):
+        return [name for name in self.kernel_names if self.first_touched.get(name, len(self.steps)) <= idx]
+
+    # ------------------------------
+    # Functionality:
+    #       find the checkpoint a neighbour can resume from: the last one such that every kernel launched up to
+    #       it has the same task, mapping and blocks (as seen by the kernels launched with it) in both designs.
+    #       Seeing the (shared) blocks through fewer kernels can make more of them equal, so the checkpoint is
+    #       moved back until nothing changes. Returns -1 if the neighbour has to be simulated from the beginning.
+    # ------------------------------
+    def resume_checkpoint(self, osa):
+        neigh_kernels = {krnl.get_task_name(): krnl for krnl in osa.perf_sim.all_kernels}
+        if set(neigh_kernels.keys()) != set(self.kernel_names) or \
+                osa.dp.get_designs_SOCs() != self.dp.get_designs_SOCs():
+            return -1
+        # the kernels not launched yet are waited for through the task graph
+        if self.waiting_signatures is None:
+            self.waiting_signatures = {name: waiting_signature(krnl) for name, krnl in self.kernels.items()}
+        for name, krnl in neigh_kernels.items():
+            if waiting_signature(krnl) != self.waiting_signatures[name]:
+                return -1
+
+        neigh_kernel_names = [krnl.get_task_name() for krnl in osa.perf_sim.all_kernels]
+        parent_block_signatures, neigh_block_signatures = {}, {}
+        idx = len(self.steps) - 1
+        while idx > 0:
+            launched = self.kernels_launched(idx)
+            # kernels ready in the same step are launched (and get the PE's DMA) in the kernel list order
+            if [name for name in neigh_kernel_names if name in launched] != launched:
+                idx -= 1
+                continue
+            parent_tasks = [self.kernels[name].get_task() for name in launched]
+            neigh_tasks = [neigh_kernels[name].get_task() for name in launched]
+            changed = [name for name in launched
+                       if kernel_signature(self.kernels[name], parent_tasks, parent_block_signatures) !=
+                       kernel_signature(neigh_kernels[name], neigh_tasks, neigh_block_signatures)]
+            if not changed:
+                break
+            idx = min(self.first_touched[name] for name in changed) - 1
+        return idx
+
+    # ------------------------------
+    # Functionality:
+    #       map the parent's kernels, tasks, and the blocks/pipe clusters used up to the checkpoint to the
+    #       neighbour's. Pathlets are matched by their pipes' blocks; the ones that don't match are left out.
+    # ------------------------------
+    def reference_map(self, osa, idx):
+        ref_map = {}
+        neigh_kernels = {krnl.get_task_name(): krnl for krnl in osa.perf_sim.all_kernels}
+        for name, krnl in neigh_kernels.items():
+            ref_map[id(self.kernels[name])] = krnl
+            ref_map[id(self.kernels[name].get_task())] = krnl.get_task()
+
+        def pipe_blocks(pipe):
+            return None if pipe is None else (pipe.get_master().instance_name, pipe.get_slave().instance_name)
+
+        for name in self.kernels_launched(idx):
+            parent_krnl, krnl = self.kernels[name], neigh_kernels[name]
+            for parent_block, block in zip(parent_krnl.get_blocks(), krnl.get_blocks()):
+                ref_map[id(parent_block)] = block
+                for parent_cluster, cluster in zip(parent_block.get_pipe_clusters_of_task(parent_krnl.get_task()),
+                                                   block.get_pipe_clusters_of_task(krnl.get_task())):
+                    ref_map[id(parent_cluster)] = cluster
+                    for parent_pathlet, pathlet_ in zip(parent_cluster.get_pathlets(), cluster.get_pathlets()):
+                        if (pipe_blocks(parent_pathlet.get_in_pipe()), pipe_blocks(parent_pathlet.get_out_pipe())) == \
+                                (pipe_blocks(pathlet_.get_in_pipe()), pipe_blocks(pathlet_.get_out_pipe())):
+                            ref_map[id(parent_pathlet)] = pathlet_
+        return ref_map
+
+    # ------------------------------
+    # Functionality:
+    #       phase keyed histories of the design at a checkpoint. Phase p's latency/work/utilization/energy is
+    #       written by the step that starts in phase p, and the kernels present in phase p by the step before it.
+    # Variables:
+    #       phase_num: phase of the checkpoint
+    # ------------------------------
+    def design_state(self, osa, phase_num, ref_map):
+        dp, neigh_dp = self.dp, osa.dp
+        state = {"phase_latency_dict": {phase: latency for phase, latency in dp.phase_latency_dict.items()
+                                        if phase < phase_num}}
+        SOC_phase_energy_dict = defaultdict(dict)
+        for SOC, phase_energy in dp.SOC_phase_energy_dict.items():
+            SOC_phase_energy_dict[SOC] = {phase: energy for phase, energy in phase_energy.items() if phase < phase_num}
+        state["SOC_phase_energy_dict"] = SOC_phase_energy_dict
+
+        parent_blocks = {block.instance_name: block for block in dp.block_phase_work_dict.keys()}
+        block_phase_work_dict, block_phase_utilization_dict = {}, {}
+        for block in neigh_dp.block_phase_work_dict.keys():
+            parent_block = parent_blocks.get(block.instance_name)
+            if parent_block is not None:
+                block_phase_work_dict[block] = {phase: work for phase, work in dp.block_phase_work_dict[parent_block].items()
+                                                if phase < phase_num}
+                block_phase_utilization_dict[block] = {phase: utilization for phase, utilization in
+                                                       dp.block_phase_utilization_dict[parent_block].items()
+                                                       if phase < phase_num}
+            else:
+                # a block the parent didn't have did no work so far (same as calc_design_work/utilization)
+                block_phase_work_dict[block] = {}
+                block_phase_utilization_dict[block] = {}
+                for phase in state["phase_latency_dict"].keys():
+                    block_phase_work_dict[block][phase] = 0
+                    work_rate = 0 if state["phase_latency_dict"][phase] == 0 else 0/state["phase_latency_dict"][phase]
+                    block_phase_utilization_dict[block][phase] = work_rate/block.peak_work_rate
+        state["block_phase_work_dict"] = block_phase_work_dict
+        state["block_phase_utilization_dict"] = block_phase_utilization_dict
+
+        krnl_phase_present, krnl_phase_present_operating_state = {}, {}
+        for krnl, phases in dp.krnl_phase_present.items():
+            phases = [phase for phase in phases if phase <= phase_num]
+            if phases:
+                krnl_phase_present[ref_map[id(krnl)]] = phases
+                krnl_phase_present_operating_state[ref_map[id(krnl)]] = \
+                    [(phase, state_) for phase, state_ in dp.krnl_phase_present_operating_state[krnl] if phase <= phase_num]
+        state["krnl_phase_present"] = krnl_phase_present
+        state["krnl_phase_present_operating_state"] = krnl_phase_present_operating_state
+        state["phase_krnl_present"] = {phase: transplant(krnls, ref_map) for phase, krnls in dp.phase_krnl_present.items()
+                                       if phase <= phase_num}
+        return state
+
+    # transplant a block's checkpointed state. Pathlet work rates are only kept for the visualization, so the ones
+    # without a counterpart are dropped.
+    def transplant_block_state(self, name, state, ref_map):
+        if id(self.blocks[name]) not in ref_map:
+            raise DeltaSimException("block " + name + " was used before the resume point but has no counterpart")
+        block_state = {attr: transplant(state[attr], ref_map) for attr in block_state_attrs}
+        block_state["pipe_clusters"] = [(ref_map[id(pipe_cluster)],
+                                         {attr: {ref_map[id(pathlet_)]: transplant(value, ref_map)
+                                                 for pathlet_, value in cluster_state[attr].items()
+                                                 if id(pathlet_) in ref_map}
+                                          for attr in pipe_cluster_state_attrs})
+                                        for pipe_cluster, cluster_state in state["pipe_clusters"]
+                                        if id(pipe_cluster) in ref_map]
+        return ref_map[id(self.blocks[name])], block_state
+
+    # ------------------------------
+    # Functionality:
+    #       the checkpoints before the resume checkpoint, moved onto the neighbour. The neighbour's simulation only
+    #       records the checkpoints from the resume checkpoint on, so its own neighbours resume from both.
+    # ------------------------------
+    def checkpoints_before(self, idx, ref_map):
+        kernel_versions, block_versions = defaultdict(list), defaultdict(list)
+        for name, versions in self.kernel_versions.items():
+            for idx_, state in versions:
+                if idx_ < idx:
+                    kernel_versions[name].append((idx_, transplant(state, ref_map)))
+        for name, versions in self.block_versions.items():
+            for idx_, state in versions:
+                if idx_ < idx:
+                    block, block_state = self.transplant_block_state(name, state, ref_map)
+                    block_versions[block.instance_name].append((idx_, block_state))
+        prev_step = self.steps[idx - 1]
+        return {"steps": [transplant(step, ref_map) for step in self.steps[:idx]],
+                "kernel_versions": kernel_versions, "block_versions": block_versions,
+                "first_touched": {name: idx_ for name, idx_ in self.first_touched.items() if idx_ < idx},
+                "prev_active": transplant(prev_step["scheduled_kernels"] + prev_step["driver_waiting_queue"], ref_map)}
+
+    # ------------------------------
+    # Functionality:
+    #       move the parent's state at the resume checkpoint onto the (freshly initialized) neighbour simulator.
+    #       Everything is transplanted before anything is assigned, so a failure leaves the neighbour untouched.
+    #       Returns the checkpoint resumed from (-1 if the neighbour needs a full simulation).
+    # Variables:
+    #       checkpoints: the (still empty) checkpoints of the neighbour's simulation
+    # ------------------------------
+    def resume(self, osa, checkpoints):
+        idx = self.resume_checkpoint(osa)
+        if idx <= 0:
+            return -1
+        ref_map = self.reference_map(osa, idx)
+        step = self.steps[idx]
+        perf_state = {attr: transplant(step[attr], ref_map) for attr in perf_sim_list_attrs}
+        # only the membership of the kernels yet to be scheduled was checked, so keep the neighbour's order
+        perf_state["yet_to_schedule_kernels"] = [krnl for krnl in osa.perf_sim.all_kernels
+                                                 if krnl in perf_state["yet_to_schedule_kernels"]]
+        kernel_states = {}
+        for name, versions in self.kernel_versions.items():
+            version = self.version_at(versions, idx)
+            if version is None:
+                continue
+            parent_krnl = self.kernels[name]
+            state = dict(version)
+            for attr in kernel_phase_attrs:
+                state[attr] = phase_history(getattr(parent_krnl, attr), step["phase_num"])
+            stats = KernelStats.__new__(KernelStats)
+            stats.__dict__ = dict(version["stats"].__dict__)
+            for attr in stats_phase_attrs:
+                stats.__dict__[attr] = phase_history(getattr(parent_krnl.stats, attr), step["phase_num"])
+            state["stats"] = stats
+            kernel_states[name] = transplant(state, ref_map)
+        block_states = []
+        for name, versions in self.block_versions.items():
+            version = self.version_at(versions, idx)
+            if version is not None:
+                block_states.append(self.transplant_block_state(name, version, ref_map))
+        design_state = self.design_state(osa, step["phase_num"], ref_map)
+        inherited = self.checkpoints_before(idx, ref_map)
+
+        for attr, value in perf_state.items():
+            setattr(osa.perf_sim, attr, value)
+        for attr in perf_sim_scalar_attrs:
+            setattr(osa.perf_sim, attr, step[attr])
+        osa.next_tick_time, osa.program_status, osa.time_elapsed = \
+            step["next_tick_time"], step["program_status"], step["time_elapsed"]
+        neigh_kernels = {krnl.get_task_name(): krnl for krnl in osa.perf_sim.all_kernels}
+        for name, state in kernel_states.items():
+            neigh_kernels[name].__dict__.update(state)
+        for block, state in block_states:
+            for attr in block_state_attrs:
+                setattr(block, attr, state[attr])
+            for pipe_cluster, cluster_state in state["pipe_clusters"]:
+                for attr in pipe_cluster_state_attrs:
+                    setattr(pipe_cluster, attr, cluster_state[attr])
+        for attr, value in design_state.items():
+            setattr(osa.dp, attr, value)
+        for attr, value in inherited.items():
+            setattr(checkpoints, attr, value)
+        return idx
+
+
+# ------------------------------
+# Functionality:
+#       compare a delta simulation against a full simulation of the same design. Returns the list of
+#       differences (empty if the results are identical).
+# ------------------------------
+def compare_simulations(delta_osa, full_osa):
+    differences = []
+
+    def by_name(dict_):
+        return {(key.instance_name if isinstance(key, Block) else key.get_task_name()): value
+                for key, value in dict_.items()}
+
+    delta_dp, full_dp = delta_osa.dp, full_osa.dp
+    if delta_osa.completion_time != full_osa.completion_time:
+        differences.append("completion_time")
+    for attr in ["phase_latency_dict", "SOC_phase_energy_dict"]:
+        if dict(getattr(delta_dp, attr)) != dict(getattr(full_dp, attr)):
+            differences.append(attr)
+    for attr in ["block_phase_work_dict", "block_phase_utilization_dict", "krnl_phase_present",
+                 "krnl_phase_present_operating_state"]:
+        if by_name(getattr(delta_dp, attr)) != by_name(getattr(full_dp, attr)):
+            differences.append(attr)
+    delta_kernels = {krnl.get_task_name(): krnl for krnl in delta_osa.perf_sim.all_kernels}
+    for krnl in full_osa.perf_sim.all_kernels:
+        krnl_ = delta_kernels[krnl.get_task_name()]
+        if (krnl_.starting_time, krnl_.completion_time, krnl_.stats.latency, krnl_.stats.energy) != \
+                (krnl.starting_time, krnl.completion_time, krnl.stats.latency, krnl.stats.energy):
+            differences.append("kernel " + krnl.get_task_name())
+    for metric in ["latency", "power", "area", "energy"]:
+        if delta_dp.dp_stats.get_system_complex_metric(metric) != full_dp.dp_stats.get_system_complex_metric(metric):
+            differences.append(metric)
+    return differences
@@ -2,20 +2,161 @@
 #This source code is licensed under the MIT license found in the
 #LICENSE file in the root directory of this source tree.
 
+import numpy as np
+from settings import config
+
+
+# This module simulates the power and temperature of a (performance) simulated design.
+# Power: the energy the kernels consumed on every block within every phase (the performance simulator's
+#        block_phase_energy_dict) is turned into per block power traces, i.e., a piecewise constant power for every
+#        (non zero duration) phase. Leakage is added on top: PEs/ICs only leak while active (they can be cut off
+#        otherwise), memories leak for the whole execution.
+# Thermal: the blocks on the die form an RC network. Every block is a node with a vertical resistance (through the
+#          die) to a shared package node, which in turn connects to the ambient. The steady state is the temperature
+#          under the average power; the transient plays the power trace back, phase by phase, starting from that
+#          steady state (i.e., the workload runs back to back) or from the ambient.
 class PowerSimulator():
     def __init__(self, design):
-        return None
+        self.design = design  # (performance) simulated design
+        self.phase_start_times = np.array([])  # start time of each (non zero duration) phase
+        self.phase_durations = np.array([])
+        self.block_power_trace = {}  # block to its power (one value per phase)
+        self.thermal_blocks = []  # blocks modeled in the RC network (in the order of the network nodes)
 
-    def power_model(self):
-        print("comming soon")
-        return 0
+    # ------------------------------
+    # Functionality:
+    #       whether the block is on the die (an off chip DRAM doesn't heat the die up)
+    # ------------------------------
+    def is_on_die(self, block):
+        return not (block.type == "mem" and block.subtype == "dram" and not config.dram_stacked)
 
-    def step(self):
+    # ------------------------------
+    # Functionality:
+    #       leakage power of the block (not provided by all the databases)
+    # ------------------------------
+    def leakage_power(self, block):
+        leakage_power = block.get_leakage_power()
+        if isinstance(leakage_power, (int, float)):
+            return leakage_power
         return 0
 
-    def tick(self, clock_time):
-        return 0
+    # ------------------------------
+    # Functionality:
+    #       time weighted average of a (per phase) trace. A design that takes no time averages to zero.
+    # ------------------------------
+    def time_average(self, trace):
+        total_time = sum(self.phase_durations)
+        if total_time == 0:
+            return np.zeros(np.shape(trace)[1:])
+        return (self.phase_durations @ trace)/total_time
+
+    # ------------------------------
+    # Functionality:
+    #       build the per block power traces from the per phase energy of the kernels
+    # ------------------------------
+    def power_model(self):
+        phases = [phase for phase, latency in sorted(self.design.phase_latency_dict.items()) if latency > 0]
+        phase_idx = {phase: idx for idx, phase in enumerate(phases)}
+        self.phase_durations = np.array([self.design.phase_latency_dict[phase] for phase in phases], dtype=float)
+        self.phase_start_times = np.concatenate(([0.], np.cumsum(self.phase_durations)[:-1]))
+
+        block_phase_energy = {block: np.zeros(len(phases)) for block in self.design.get_blocks()}
+        block_phase_active = {block: np.zeros(len(phases), dtype=bool) for block in self.design.get_blocks()}
+        for krnl in self.design.get_kernels():
+            for block, phase_energy in krnl.block_phase_energy_dict.items():
+                for phase, energy in phase_energy.items():
+                    if phase in phase_idx:
+                        block_phase_energy[block][phase_idx[phase]] += energy
+                        block_phase_active[block][phase_idx[phase]] = True
+
+        self.block_power_trace = {}
+        for block, energy in block_phase_energy.items():
+            if block.type == "mem":
+                leakage = np.full(len(phases), self.leakage_power(block))
+            else:
+                leakage = np.where(block_phase_active[block], self.leakage_power(block), 0.)
+            self.block_power_trace[block] = energy/self.phase_durations + leakage
+        return self.block_power_trace
+
+    # ------------------------------
+    # Functionality:
+    #       conductance and capacitance matrices of the RC network. The last node is the package.
+    # ------------------------------
+    def thermal_network(self):
+        self.thermal_blocks = [block for block in self.block_power_trace.keys() if self.is_on_die(block)]
+        node_cnt = len(self.thermal_blocks) + 1
+        conductance = np.zeros((node_cnt, node_cnt))
+        capacitance = np.zeros(node_cnt)
+        for idx, block in enumerate(self.thermal_blocks):
+            area = max(block.get_area(), config.thermal_min_block_area)
+            block_conductance = config.silicon_thermal_conductivity*area/config.die_thickness
+            conductance[idx, idx] += block_conductance
+            conductance[-1, -1] += block_conductance
+            conductance[idx, -1] -= block_conductance
+            conductance[-1, idx] -= block_conductance
+            capacitance[idx] = config.silicon_volumetric_heat_capacity*area*config.die_thickness
+        conductance[-1, -1] += 1/config.package_thermal_resistance
+        capacitance[-1] = config.package_thermal_capacitance
+        return conductance, capacitance
+
+    # ------------------------------
+    # Functionality:
+    #       initial, steady state and transient (at the end of each phase) temperatures of the RC network. All the
+    #       temperatures are relative to the ambient.
+    # Variables:
+    #       power_trace: node power (one row per phase)
+    # ------------------------------
+    def thermal_model(self, power_trace, conductance, capacitance):
+        avg_power = self.time_average(power_trace)
+        steady_state = np.linalg.solve(conductance, avg_power)
+
+        # C dT/dt = P - G T is solved exactly for a constant (phase) power: with S = C^-1/2 G C^-1/2 = V L V^T,
+        # T(t) = T_ss + C^-1/2 V exp(-L t) V^T C^1/2 (T(0) - T_ss)
+        c_sqrt = np.sqrt(capacitance)
+        eigen_values, eigen_vectors = np.linalg.eigh(conductance/np.outer(c_sqrt, c_sqrt))
+        if config.thermal_initial_state == "steady_state":
+            initial_temperature = steady_state
+        elif config.thermal_initial_state == "ambient":
+            initial_temperature = np.zeros(len(capacitance))
+        else:
+            raise Exception("thermal_initial_state:" + config.thermal_initial_state + " is not defined")
+        temperature = initial_temperature
+        transient = []
+        for duration, power in zip(self.phase_durations, power_trace):
+            phase_steady_state = np.linalg.solve(conductance, power)
+            decay = eigen_vectors @ (np.exp(-eigen_values*duration)[:, None]*eigen_vectors.T)
+            temperature = phase_steady_state + (decay @ ((temperature - phase_steady_state)*c_sqrt))/c_sqrt
+            transient.append(temperature)
+        return initial_temperature, steady_state, np.array(transient).reshape(-1, len(capacitance))
+
+    # ------------------------------
+    # Functionality:
+    #       simulate the power and temperature of the design. Needs to be called after the performance simulation.
+    #       Returns the stats (powers in W, temperatures in C)
+    # ------------------------------
+    def simulate(self):
+        self.power_model()
+        blocks = list(self.block_power_trace.keys())
+        total_power_trace = sum(self.block_power_trace.values(), np.zeros(len(self.phase_durations)))
+        stats = {"phase_start_times": self.phase_start_times, "phase_durations": self.phase_durations,
+                 "block_power_trace": self.block_power_trace, "total_power_trace": total_power_trace,
+                 "block_peak_power": {block: max(self.block_power_trace[block], default=0.) for block in blocks},
+                 "block_avg_power": {block: self.time_average(self.block_power_trace[block]) for block in blocks},
+                 "peak_power": max(total_power_trace, default=0.), "avg_power": self.time_average(total_power_trace)}
 
-    def simulate(self, clock_time):
-        self.tick(clock_time)
-        self.step()
+        # the package node has no power of its own
+        conductance, capacitance = self.thermal_network()
+        power_trace = np.array([self.block_power_trace[block] for block in self.thermal_blocks] +
+                               [np.zeros(len(self.phase_durations))]).T
+        initial_temperature, steady_state, transient = self.thermal_model(power_trace, conductance, capacitance)
+        ambient = config.ambient_temperature
+        stats["block_steady_state_temperature"] = {block: ambient + steady_state[idx]
+                                                   for idx, block in enumerate(self.thermal_blocks)}
+        stats["block_temperature_trace"] = {block: ambient + transient[:, idx]
+                                            for idx, block in enumerate(self.thermal_blocks)}
+        stats["block_peak_temperature"] = {block: ambient + max([initial_temperature[idx], *transient[:, idx]])
+                                           for idx, block in enumerate(self.thermal_blocks)}
+        stats["package_temperature_trace"] = ambient + transient[:, -1]
+        stats["steady_state_temperature"] = ambient + max(steady_state)
+        stats["peak_temperature"] = max(stats["block_peak_temperature"].values(), default=ambient)
+        return stats
@@ -672,7 +672,7 @@ class Kernel:
                 if  in_pipe_.is_task_present(krnl.__task_to_blocks_map.task) and task_present_on_outcoming_pipe:
                     active_pipes_with_duplicates.append(in_pipe_)
 
-        active_pipes = list(set(active_pipes_with_duplicates))
+        active_pipes = list(dict.fromkeys(active_pipes_with_duplicates))
         assert(len(active_pipes) <= len(incoming_pipes))
         return active_pipes
 
@@ -975,7 +975,7 @@ class Kernel:
     def calc_block_s_bottleneck(self, block_work_rate_norm_dict):
         # only if work unit is left
         block_bottleneck = {"write": None, "read":None}
-        bottleneck_work_rate = {"write": np.Inf, "read":np.Inf}
+        bottleneck_work_rate = {"write": np.inf, "read":np.inf}
         # iterate through all the blocks/channels and ge the minimum work rate. Since
         # the data is normalized, minimum is the bottleneck
         for block, pipe_cluster_work_rate in block_work_rate_norm_dict.items():
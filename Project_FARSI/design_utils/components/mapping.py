@@ -213,7 +213,9 @@ class TaskToBlocksMap:  #which block(s) the task is  mapped to. a task is usuall
 
     # get all the blocks that a task is mapped to .
     def get_blocks(self):
-        return list(set([block_dir[0] for block_dir in (self.block_dir_workRatio_dict.keys())]))
+        # unique blocks, in a fixed order (a set's order changes with object ids, e.g., across copies of a design,
+        # and so would the order the kernels sum up their work/energy in)
+        return list(dict.fromkeys([block_dir[0] for block_dir in (self.block_dir_workRatio_dict.keys())]))
 
     def channel_blocks(self):
         self.blocks_with_channels = []
@@ -15,7 +15,7 @@ from error_handling.custom_error import  *
 import gc
 import statistics as st
 if config.use_cacti:
-    from misc.cacti_hndlr import cact_handlr
+    from misc.cacti_hndlr import cacti_model
 
 if config.simulation_method == "power_knobs":
     from specs import database_input_powerKnobs as database_input
@@ -1554,6 +1554,7 @@ class DPStatsContainer():
             self.intra_design_reduction(type, id)
             # level 2 questions for across/inter design questions
             self.inter_design_reduction(type, id)
+        self.power_thermal_reduction()
 
     # level 1 reduction for intra design questions
     def intra_design_reduction(self, SOC_type, SOC_id):
@@ -1580,6 +1581,21 @@ class DPStatsContainer():
             self.set_SOC_metric_value(metric_name, SOC_type, SOC_id)
             self.set_system_complex_metric(metric_name)  # data per System
 
+    # reduce the peak power/temperature across designs (None if the designs were not power/thermal simulated)
+    def power_thermal_reduction(self):
+        self.peak_power = self.peak_temperature = None
+        stats_list = [dp.get_power_thermal_stats() for dp in self.design_point_list]
+        if None in stats_list:
+            return
+        self.peak_power = self.reduce([stats["peak_power"] for stats in stats_list])
+        self.peak_temperature = self.reduce([stats["peak_temperature"] for stats in stats_list])
+
+    def get_peak_power(self):
+        return self.peak_power
+
+    def get_peak_temperature(self):
+        return self.peak_temperature
+
     # hot = longest latency
     def get_hot_kernel_SOC(self, SOC_type, SOC_id, metric="latency", krnel_rank=0):
         kernels_on_SOC = [kernel for kernel in self.__kernels if kernel.SOC_type == SOC_type and kernel.SOC_id == SOC_id]
@@ -1837,7 +1853,21 @@ class DPStatsContainer():
             for metric_name in self.database.get_budgetted_metric_names(type):
                 if not all(self.fits_budget_for_metric(type, id, metric_name, 1)):
                     return False
-        return True
+        return self.fits_power_thermal_budget()
+
+    # normalized distance to the (optional) peak power and thermal budgets. The temperature is normalized to the
+    # temperature rise the budget allows
+    def power_thermal_normalized_distance(self):
+        dist = []
+        if config.peak_power_budget is not None and self.peak_power is not None:
+            dist.append((self.peak_power - config.peak_power_budget)/config.peak_power_budget)
+        if config.thermal_budget is not None and self.peak_temperature is not None:
+            dist.append((self.peak_temperature - config.thermal_budget)/
+                        (config.thermal_budget - config.ambient_temperature))
+        return dist
+
+    def fits_power_thermal_budget(self):
+        return all([dist < .001 for dist in self.power_thermal_normalized_distance()])
 
     def fits_budget_for_metric_for_SOC(self, metric_name, budget_coeff):
         for type, id in self.dp_rep.get_designs_SOCs():
@@ -1989,6 +2019,10 @@ class DPStatsContainer():
         for metric_name in metrics_to_look_into:
             dist_list.append(self.dist_to_goal_per_metric(metric_name, mode))
 
+        # peak power/thermal budgets are constraints (rather than objectives), so only their violations count, whichever
+        # metrics are looked into
+        dist_list.extend([max(dist, 0) for dist in self.power_thermal_normalized_distance()])
+
         city_dist = sum(dist_list)   # we use city distance to allow for probability prioritizing
         return city_dist
 
@@ -2037,16 +2071,19 @@ class SimDesignPoint(ExDesignPoint):
         self.simulation_time = 0  # how long did it take to do the simulation
         self.serial_design_time = 0
         self.par_speedup_time = 0
-        if config.use_cacti:
-            self.cacti_hndlr = cact_handlr.CactiHndlr(config.cact_bin_addr, config.cacti_param_addr,
-                                                      config.cacti_data_log_file, config.cacti_input_col_order,
-                                                      config.cacti_output_col_order)
-
+        self.simulation_checkpoints = None  # checkpoints of the simulation (delta simulation of the neighbours)
+        self.simulation_steps_skipped = 0  # simulation steps reused from the parent design (delta simulation)
+        self.power_thermal_stats = None  # power traces and temperatures (power/thermal simulation)
         for block in self.get_blocks():
             self.block_phase_work_dict[block] = {}
             self.block_phase_utilization_dict[block] = {}
 
-
+    # the simulation checkpoints hold the simulator state of every step, so they are not copied (or pickled) along
+    # with the design. A copy is simulated from scratch if its neighbours are ever simulated.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["simulation_checkpoints"] = None
+        return state
 
     def set_serial_design_time(self, serial_design_time):
         self.serial_design_time = serial_design_time
@@ -2084,6 +2121,18 @@ class SimDesignPoint(ExDesignPoint):
     def set_simulation_time(self, simulation_time):
         self.simulation_time= simulation_time
 
+    def set_simulation_steps_skipped(self, steps):
+        self.simulation_steps_skipped = steps
+
+    def get_simulation_steps_skipped(self):
+        return self.simulation_steps_skipped
+
+    def set_power_thermal_stats(self, power_thermal_stats):
+        self.power_thermal_stats = power_thermal_stats
+
+    def get_power_thermal_stats(self):
+        return self.power_thermal_stats
+
     def get_simulation_time(self):
         return self.simulation_time
 
@@ -2194,7 +2243,14 @@ class SimDesignPoint(ExDesignPoint):
         elif mem_subtype == "sram":
             return "itrs-lop"
 
-    # run cacti to get results
+    # the (per process) CACTI memory model, shared by all the designs
+    def get_cacti_model(self):
+        return cacti_model.get_cacti_model(config.cact_bin_addr, config.cacti_param_addr,
+                                           config.cacti_data_log_file, config.cacti_grid_dir,
+                                           config.cacti_grid_sizes, config.cacti_grid_workers,
+                                           config.cacti_timeout)
+
+    # query the CACTI memory model (exact results, grid interpolation or a CACTI run) to get results
     def run_and_collect_cacti_data(self, blk, database):
         tech_node = {}
         tech_node["energy"] = 1
@@ -2209,7 +2265,6 @@ class SimDesignPoint(ExDesignPoint):
             print("Only memory blocks supported in CACTI")
             exit(0)
 
-        # prime cacti
         mem_bytes = max(blk.get_area_in_bytes(), config.cacti_min_memory_size_in_bytes)
         subtype = blk.subtype
         mem_bytes = (math.ceil(mem_bytes/config.min_mem_size[subtype]))*config.min_mem_size[subtype] # modulo calculation
@@ -2217,16 +2272,12 @@ class SimDesignPoint(ExDesignPoint):
         #subtype = "sram"  # TODO: change later to sram/dram
         mem_subtype = self.FARSI_to_cacti_mem_type_converter(subtype)
         cell_type = self.FARSI_to_cacti_cell_type_converter(subtype)
-        self.cacti_hndlr.set_cur_mem_type(mem_subtype)
-        self.cacti_hndlr.set_cur_mem_size(mem_bytes)
-        self.cacti_hndlr.set_cur_cell_type(cell_type)
 
-        # run cacti
         try:
-            cacti_area_energy_results = self.cacti_hndlr.collect_cati_data()
+            cacti_area_energy_results = self.get_cacti_model().query(mem_subtype, cell_type, mem_bytes)
         except Exception as e:
             print("Using cacti, the following memory config tried and failed")
-            print(self.cacti_hndlr.get_config())
+            print({"mem_size": mem_bytes, "mem_type": mem_subtype, "cell_type:": cell_type})
             raise e
 
         read_energy_per_byte = float(cacti_area_energy_results['Dynamic read energy (nJ)']) * (10 ** -9) / 16
@@ -2237,30 +2288,17 @@ class SimDesignPoint(ExDesignPoint):
         write_energy_per_byte *= tech_node["energy"]["non_gpp"]
         area *= tech_node["area"]["mem"]
 
-        # log values
-        self.cacti_hndlr.cacti_data_container.insert(list(zip(config.cacti_input_col_order +
-                                                              config.cacti_output_col_order,
-                                                              [mem_subtype, mem_bytes, read_energy_per_byte, write_energy_per_byte, area])))
-
         return read_energy_per_byte, write_energy_per_byte, area
 
-    # either run or look into the cached data (from CACTI) to get energy/area data
+    # get energy/area data from the CACTI memory model
     def collect_cacti_data(self, blk, database):
 
         if blk.type == "ic" :
             return 0,0,0,1
         elif blk.type == "mem":
             mem_bytes = max(blk.get_area_in_bytes(), config.cacti_min_memory_size_in_bytes) # to make sure we don't go smaller than cacti's minimum size
-            mem_subtype = self.FARSI_to_cacti_mem_type_converter(blk.subtype)
             mem_bytes = (math.ceil(mem_bytes / config.min_mem_size[blk.subtype])) * config.min_mem_size[blk.subtype]  # modulo calculation
-            #mem_subtype = "ram" #choose from ["main memory", "ram"]
-            found_results, read_energy_per_byte, write_energy_per_byte, area = \
-                self.cacti_hndlr.cacti_data_container.find(list(zip(config.cacti_input_col_order,[mem_subtype, mem_bytes])))
-            if not found_results:
-                read_energy_per_byte, write_energy_per_byte, area = self.run_and_collect_cacti_data(blk, database)
-                #read_energy_per_byte *= tech_node["energy"]
-                #write_energy_per_byte *= tech_node["energy"]
-                #area *= tech_node["area"]
+            read_energy_per_byte, write_energy_per_byte, area = self.run_and_collect_cacti_data(blk, database)
             area_per_byte = area/mem_bytes
             return read_energy_per_byte, write_energy_per_byte, area, area_per_byte
 
@@ -2454,6 +2492,10 @@ class DPStats:
             output.write("\"FARSI_predicted_energy\": "+ str(self.get_system_complex_metric("energy")) +",\n")
             output.write("\"FARSI_predicted_power\": "+ str(self.get_system_complex_metric("power")) +",\n")
             output.write("\"FARSI_predicted_area\": "+ str(self.get_system_complex_metric("area")) +",\n")
+            power_thermal_stats = self.dp.get_power_thermal_stats()
+            if power_thermal_stats is not None:
+                output.write("\"FARSI_predicted_peak_power\": "+ str(power_thermal_stats["peak_power"]) +",\n")
+                output.write("\"FARSI_predicted_peak_temperature\": "+ str(power_thermal_stats["peak_temperature"]) +",\n")
             output.write("\"parallel_task_cnt\": "+ str(self.get_parallel_task_count_analytically()) +",\n")
             output.write("\"parallel_task_cnt_experimentally\": "+ str(self.get_parallel_task_count_experimentally()) +",\n")
             output.write("\"serial_task_count\": "+ str(self.get_serial_task_count()) +",\n")
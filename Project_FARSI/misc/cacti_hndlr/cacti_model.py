@@ -0,0 +1,311 @@
+#Copyright (c) Facebook, Inc. and its affiliates.
+#This source code is licensed under the MIT license found in the
+#LICENSE file in the root directory of this source tree.
+
+# CACTI memory model service.
+# Instead of running CACTI for every memory sizing, a grid of memory sizes is run once per
+# (mem type, cell type) and kept in a versioned table; sizes in between are answered by monotone
+# (PCHIP) interpolation in log-log space. Only sizes outside the grid run CACTI, each run in its own
+# scratch directory so that parallel workers never share files, and the exact results are kept in an
+# append-only store (one json record per line).
+import os
+import csv
+import json
+import math
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# bump when the table/store layout or the way CACTI is driven changes
+MODEL_VERSION = 1
+
+# the CACTI outputs the model provides
+cacti_output_keys = ["Dynamic read energy (nJ)", "Dynamic write energy (nJ)", "Area (mm2)"]
+
+
+# ------------------------------
+# Functionality:
+#       run CACTI once for a memory config. The param file is copied (with the config appended) into a fresh
+#       scratch directory, CACTI runs with the binary directory as its working directory (it looks for its
+#       tech_params there) and writes its output next to the copied param file. The scratch directory is
+#       removed afterwards, so concurrent calls never touch each other's files.
+# Variables:
+#       bin_addr: CACTI binary
+#       param_file: CACTI param file the config is appended to
+# ------------------------------
+def run_cacti(bin_addr, param_file, mem_size, mem_type, cell_type, timeout=None):
+    scratch_dir = tempfile.mkdtemp(prefix="cacti_")
+    try:
+        input_cfg = os.path.join(scratch_dir, os.path.basename(param_file))
+        shutil.copy(param_file, input_cfg)
+        with open(input_cfg, "a") as f:
+            f.write("-size (bytes) " + str(int(mem_size)) + "\n")
+            f.write("-cache type \"" + mem_type + "\"\n")
+            f.write("-Data array cell type - \"" + cell_type + "\"\n")
+        proc = subprocess.run([bin_addr, "-infile", input_cfg], cwd=os.path.dirname(os.path.abspath(bin_addr)),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+        output_cfg = input_cfg + ".out"
+        if not os.path.isfile(output_cfg):
+            raise Exception("CACTI failed for " + str((mem_size, mem_type, cell_type)) + ":\n" +
+                            proc.stdout.decode("utf-8", "replace")[-2000:])
+        return parse_cacti_output(output_cfg)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+
+# parse the (csv) output of CACTI. The column names start with a space
+def parse_cacti_output(output_cfg):
+    with open(output_cfg) as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        raise Exception("empty CACTI output " + output_cfg)
+    results = {}
+    for key in cacti_output_keys:
+        for col, value in rows[-1].items():
+            if col is not None and col.strip() == key:
+                results[key] = float(value)
+        if key not in results:
+            raise Exception("CACTI output " + output_cfg + " has no column " + key)
+    return results
+
+
+# ------------------------------
+# Functionality:
+#       monotone piecewise cubic (Fritsch-Carlson/PCHIP) interpolation. It never overshoots the data, so
+#       the interpolated energy/area stays between the neighbouring grid points.
+# Variables:
+#       xs: increasing sample points, ys: values at the sample points
+# ------------------------------
+def pchip_interpolate(xs, ys, x):
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    if len(xs) == 1:
+        return float(ys[0])
+    h = np.diff(xs)
+    delta = np.diff(ys) / h
+
+    # slopes at the sample points
+    d = np.zeros(len(xs))
+    if len(xs) == 2:
+        d[:] = delta[0]
+    else:
+        for k in range(1, len(xs) - 1):
+            if delta[k - 1] * delta[k] > 0:
+                w1 = 2 * h[k] + h[k - 1]
+                w2 = h[k] + 2 * h[k - 1]
+                d[k] = (w1 + w2) / (w1 / delta[k - 1] + w2 / delta[k])
+        d[0] = pchip_end_slope(h[0], h[1], delta[0], delta[1])
+        d[-1] = pchip_end_slope(h[-1], h[-2], delta[-1], delta[-2])
+
+    k = int(np.clip(np.searchsorted(xs, x, side="right") - 1, 0, len(xs) - 2))
+    t = (x - xs[k]) / h[k]
+    h00 = (1 + 2 * t) * (1 - t) ** 2
+    h10 = t * (1 - t) ** 2
+    h01 = t ** 2 * (3 - 2 * t)
+    h11 = t ** 2 * (t - 1)
+    return float(h00 * ys[k] + h10 * h[k] * d[k] + h01 * ys[k + 1] + h11 * h[k] * d[k + 1])
+
+
+# one sided three point slope at the ends, limited to keep the interpolant monotone
+def pchip_end_slope(h0, h1, delta0, delta1):
+    d = ((2 * h0 + h1) * delta0 - h0 * delta1) / (h0 + h1)
+    if np.sign(d) != np.sign(delta0):
+        return 0.0
+    if np.sign(delta0) != np.sign(delta1) and abs(d) > abs(3 * delta0):
+        return 3 * delta0
+    return d
+
+
+# ------------------------------
+# Functionality:
+#       append-only store of exact CACTI results. Every record is one json line written with a single
+#       O_APPEND write, so parallel workers can share the file; a torn (partial) last line is skipped when
+#       reading. Records of other model versions (different CACTI param file) are ignored.
+# ------------------------------
+class CactiStore():
+    def __init__(self, store_file, version):
+        self.store_file = store_file
+        self.version = version
+        self.results = {}
+        self.read_offset = 0
+        self.refresh()
+
+    # read the records appended (by us or other workers) since the last read
+    def refresh(self):
+        if not os.path.exists(self.store_file):
+            return
+        with open(self.store_file, "rb") as f:
+            f.seek(self.read_offset)
+            data = f.read()
+        # only consume complete lines; a line being written is picked up next time
+        end = data.rfind(b"\n") + 1
+        self.read_offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line.decode("utf-8"))
+            except ValueError:
+                continue
+            if record.get("version") != self.version:
+                continue
+            key = (record["mem_type"], record["cell_type"], int(record["mem_size"]))
+            self.results[key] = record["results"]
+
+    def find(self, mem_type, cell_type, mem_size):
+        key = (mem_type, cell_type, int(mem_size))
+        if key not in self.results:
+            self.refresh()
+        return self.results.get(key)
+
+    def insert(self, mem_type, cell_type, mem_size, results):
+        key = (mem_type, cell_type, int(mem_size))
+        self.results[key] = results
+        record = {"version": self.version, "mem_type": mem_type, "cell_type": cell_type,
+                  "mem_size": int(mem_size), "results": results}
+        dir_name = os.path.dirname(os.path.abspath(self.store_file))
+        os.makedirs(dir_name, exist_ok=True)
+        fd = os.open(self.store_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(record, sort_keys=True) + "\n").encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+# ------------------------------
+# Functionality:
+#       the memory model FARSI queries for energy/area of a memory. Per (mem type, cell type), the grid
+#       sizes are run once (in parallel) and written to a table file whose name carries the version, i.e.,
+#       a hash of the CACTI param file, the grid sizes and MODEL_VERSION, so a changed setup never reuses
+#       stale tables. query() answers from the store (exact results), then the grid (interpolation) and
+#       only then runs CACTI.
+# Variables:
+#       grid_sizes: memory sizes (bytes) the grid is made of
+#       grid_dir: directory of the table files
+#       store_file: append-only store of the exact results
+#       workers: number of concurrent CACTI runs when building a grid
+# ------------------------------
+class CactiModel():
+    def __init__(self, bin_addr, param_file, store_file, grid_dir, grid_sizes, workers=1, timeout=None):
+        self.bin_addr = bin_addr
+        self.param_file = param_file
+        self.grid_dir = grid_dir
+        self.grid_sizes = sorted(set(int(size) for size in grid_sizes))
+        self.workers = workers
+        self.timeout = timeout
+        self.version = self.calc_version()
+        self.store = CactiStore(store_file, self.version)
+        self.grids = {}  # (mem_type, cell_type) -> (log sizes, log values per output key)
+        self.lock = threading.Lock()
+        self.stats = {"store_hits": 0, "interpolated": 0, "cacti_runs": 0}
+
+    def calc_version(self):
+        with open(self.param_file, "rb") as f:
+            param_hash = hashlib.sha1(f.read()).hexdigest()
+        key = json.dumps([MODEL_VERSION, param_hash, self.grid_sizes])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+    def get_table_file(self, mem_type, cell_type):
+        name = "_".join([mem_type, cell_type]).replace(" ", "-")
+        return os.path.join(self.grid_dir, "cacti_grid_" + name + "_" + self.version + ".json")
+
+    # run CACTI for a config and keep the result in the store
+    def run(self, mem_type, cell_type, mem_size):
+        results = run_cacti(self.bin_addr, self.param_file, mem_size, mem_type, cell_type, self.timeout)
+        with self.lock:
+            self.stats["cacti_runs"] += 1
+        self.store.insert(mem_type, cell_type, mem_size, results)
+        return results
+
+    def get_or_run(self, mem_type, cell_type, mem_size):
+        results = self.store.find(mem_type, cell_type, mem_size)
+        if results is None:
+            results = self.run(mem_type, cell_type, mem_size)
+        return results
+
+    # ------------------------------
+    # Functionality:
+    #       load the grid table of a (mem type, cell type), or build and write it. Sizes CACTI fails on
+    #       are left out of the table.
+    # ------------------------------
+    def get_grid(self, mem_type, cell_type):
+        key = (mem_type, cell_type)
+        if key in self.grids:
+            return self.grids[key]
+        table_file = self.get_table_file(mem_type, cell_type)
+        if os.path.exists(table_file):
+            with open(table_file) as f:
+                table = json.load(f)
+        else:
+            def run_point(size):
+                try:
+                    return size, self.get_or_run(mem_type, cell_type, size)
+                except Exception as e:
+                    print("CACTI grid point " + str((mem_type, cell_type, size)) + " failed: " + str(e))
+                    return size, None
+            with ThreadPoolExecutor(max_workers=max(self.workers, 1)) as pool:
+                points = list(pool.map(run_point, self.grid_sizes))
+            table = {"version": self.version, "mem_type": mem_type, "cell_type": cell_type,
+                     "points": [[size, results] for size, results in points if results is not None]}
+            write_json_atomically(table_file, table)
+
+        sizes = [size for size, _ in table["points"]]
+        values = {}
+        for out_key in cacti_output_keys:
+            values[out_key] = [results[out_key] for _, results in table["points"]]
+        self.grids[key] = (sizes, values)
+        return self.grids[key]
+
+    # ------------------------------
+    # Functionality:
+    #       energy/area (CACTI units) of a memory config, see cacti_output_keys.
+    # ------------------------------
+    def query(self, mem_type, cell_type, mem_size):
+        mem_size = int(math.ceil(mem_size))
+        results = self.store.find(mem_type, cell_type, mem_size)
+        if results is not None:
+            self.stats["store_hits"] += 1
+            return results
+
+        sizes, values = self.get_grid(mem_type, cell_type)
+        if len(sizes) > 1 and sizes[0] <= mem_size <= sizes[-1]:
+            self.stats["interpolated"] += 1
+            log_sizes = np.log(sizes)
+            results = {}
+            for out_key in cacti_output_keys:
+                # energy and area scale roughly as power laws of the size, hence log-log
+                results[out_key] = self.interpolate(log_sizes, values[out_key], math.log(mem_size))
+            return results
+        return self.run(mem_type, cell_type, mem_size)
+
+    def interpolate(self, log_sizes, ys, log_size):
+        ys = np.asarray(ys, dtype=float)
+        if np.all(ys > 0):
+            return math.exp(pchip_interpolate(log_sizes, np.log(ys), log_size))
+        return pchip_interpolate(log_sizes, ys, log_size)
+
+
+def write_json_atomically(file_addr, obj):
+    dir_name = os.path.dirname(os.path.abspath(file_addr))
+    os.makedirs(dir_name, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=dir_name, prefix="." + os.path.basename(file_addr) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(obj, f)
+        os.replace(tmp_file, file_addr)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+
+# one model per process and setup, shared by all the designs
+cacti_models = {}
+
+def get_cacti_model(bin_addr, param_file, store_file, grid_dir, grid_sizes, workers=1, timeout=None):
+    key = (bin_addr, param_file, store_file, grid_dir, tuple(grid_sizes))
+    if key not in cacti_models:
+        cacti_models[key] = CactiModel(bin_addr, param_file, store_file, grid_dir, grid_sizes, workers, timeout)
+    return cacti_models[key]
@@ -16,6 +16,10 @@ design_input_folder = "model_utils/specs"
 
 simulation_method = "performance"   # whether to performance simulator or power simulator
 #simulation_method = "power_knobs"
+# delta simulation: a neighbour's simulation resumes from the (checkpointed) simulation of the design it was generated
+# from, starting right before the first kernel its move can affect is launched
+delta_simulation = False
+delta_simulation_cross_check = False  # also simulate every resumed neighbour from the beginning and verify the results are identical
 
 # --------------------
 # DSE params
@@ -95,6 +99,20 @@ budget_dict["glass"] = {}
 budget_dict["glass"]["power"] = .05
 budget_dict["glass"]["area"] = .000005
 
+# power/thermal simulation (time resolved power traces and an RC thermal estimate of the simulated designs).
+# The peak power/temperature budgets are optional (None disables them). Setting either one turns the simulation on.
+power_thermal_simulation = False
+peak_power_budget = None  # (W) of the whole system, at the phase granularity
+thermal_budget = None  # (C) peak block temperature
+ambient_temperature = 45  # (C)
+thermal_initial_state = "steady_state"  # ["steady_state", "ambient"]. steady_state: the workload runs back to back
+die_thickness = .0005  # (m)
+silicon_thermal_conductivity = 130  # (W/(m.K))
+silicon_volumetric_heat_capacity = 1.63e6  # (J/(m^3.K))
+package_thermal_resistance = 20  # (K/W) package to ambient
+package_thermal_capacitance = 1  # (J/K)
+thermal_min_block_area = 1e-8  # (m^2) blocks (e.g., buses) smaller than this are assumed to spread their heat over it
+
 home_dir = home_settings.home_dir
 #home_dir = os.getcwd()+"/../../"
 
@@ -270,6 +288,12 @@ max_budget_coeff = 50
 latest_visualization = os.path.join(home_dir, 'data_collection/data/latest_visualization')
 check_point_folder = os.path.join(home_dir, 'data_collection/data/check_points')
 replay_folder_base = os.path.join(home_dir, 'data_collection/data/replayer')
+# explore_ds state snapshots, written every explore_ds_state_every iterations ("" disables them).
+# with resume_explore_ds, the exploration continues from explore_ds_state_file if it exists.
+# a resumed run matches the uninterrupted one only when the moves are reproducible (DEBUG_FIX)
+explore_ds_state_file = ""
+explore_ds_state_every = 1
+resume_explore_ds = False
 database_csv_folder = os.path.join(home_dir, 'specs/database_csvs/')  # where all the library input are located
 
 axis_unit = {"area": "mm2", "power": "mW", "latency": "s"}
@@ -283,8 +307,10 @@ use_cacti = True and not RUN_VERIFICATION_AT_ALL # if True, use cacti. You have
 cact_bin_addr = CC.cact_bin_addr
 cacti_param_addr = CC.cacti_param_addr
 cacti_data_log_file = CC.cacti_data_log_file
-cacti_input_col_order = ["mem_subtype", "mem_size"]
-cacti_output_col_order = ["read_energy_per_byte", "write_energy_per_byte", "area"]
+cacti_grid_dir = CC.cacti_grid_dir
+cacti_grid_sizes = [256000*2**i for i in range(13)]  # memory sizes (bytes) CACTI is precomputed for; others are interpolated
+cacti_grid_workers = 4  # concurrent CACTI runs when precomputing the grid
+cacti_timeout = 600  # (s) for a single CACTI run
 cacti_min_memory_size_in_bytes = 2048 # bellow this value cacti errors out. We can play with burst size and page size to fix this though
 
 #ACC_coeff = 128  # comparing to what we have parsed, how much to modify. This is just for some exploration purposes
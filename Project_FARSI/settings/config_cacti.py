@@ -12,7 +12,11 @@ cacti_param_addr = os.path.join(base_path, "Project_FARSI/cacti_for_FARSI/farsi_
 
 print(cacti_param_addr, os.path.exists(cacti_param_addr))
 
-cacti_data_log_file = os.path.join(base_path, "Project_FARSI/cacti_for_FARSI/data_log.csv")
+# append-only store (json lines) of the exact CACTI results
+cacti_data_log_file = os.path.join(base_path, "Project_FARSI/cacti_for_FARSI/data_log.jsonl")
 
 print(cacti_data_log_file, os.path.exists(cacti_data_log_file))
 
+# versioned tables of the precomputed (size grid) CACTI results
+cacti_grid_dir = os.path.join(base_path, "Project_FARSI/cacti_for_FARSI/grid")
+
@@ -4,6 +4,8 @@
 import math
 import random
 
+from concurrent.futures import ThreadPoolExecutor
+
 from . import cfg, left_cost_is_better
 from .log import Log
 from .nodes import Node, NeighbourNode
@@ -22,6 +24,7 @@ class ACO:
         self.current_depth = 0
         self.backend = backend
         self.storage = storage
+        self.evaluator = GenerationEvaluator(cfg['aco'].get('workers', 1), arch_gym_configs.aco_batch_mode)
 
     def search(self):
         """Performs neural architecture search using Ant colony optimization.
@@ -34,7 +37,7 @@ class ACO:
         if not self.storage.loaded_from_save:
             Log.header("STARTING ACO SEARCH", type="GREEN")
             self.best_ant = Ant(self.graph.generate_path(self.random_select))
-            self.best_ant.evaluate(self.backend, self.storage)
+            self.evaluator.evaluate([self.best_ant], self.backend, self.storage)
             Log.info(self.best_ant)
         else:
             Log.header("RESUMING ACO SEARCH", type="GREEN")
@@ -77,38 +80,21 @@ class ACO:
         """
 
         ants = []
-        if arch_gym_configs.aco_batch_mode:
-            for ant_number in range(cfg['aco']['ant_count']):
-                # 1 Generate all the ants and its path
-                Log.header("[ACO Batch Mode] GENERATING ANT %i" % (ant_number + 1))
-                ant = Ant()
-                
-                # 2 Generate all the ants and its path
-                #ant.path = self.graph.generate_path(self.aco_select)
-                ant.path = self.graph.generate_path(self.aco_select)
-                ants.append(ant)
-            
-            ant_batch = AntBatch(ants)
-            # for all ants run evaluation in parallel
-            ants = ant_batch.evaluate_parallel(self.backend, self.storage)
-            
-            # Do pheromone update for each ant
-
-            for each_ant in ants:  
-                self.update_pheromone(ant=each_ant, update_rule=self.local_update)
-        else:
-            for ant_number in range(cfg['aco']['ant_count']):
-                Log.header("GENERATING ANT %i" % (ant_number + 1))
-                ant = Ant()
-                # Generate ant's path using ACO selection rule
-                ant.path = self.graph.generate_path(self.aco_select)
-                # Evaluate how good is the new path
-                ant.evaluate(self.backend, self.storage)
-                ants.append(ant)
-                Log.info(ant)
-                # Perform local pheromone update
-                self.update_pheromone(ant=ant, update_rule=self.local_update)
-    
+        for ant_number in range(cfg['aco']['ant_count']):
+            Log.header("GENERATING ANT %i" % (ant_number + 1))
+            ant = Ant()
+            # Generate ant's path using ACO selection rule
+            ant.path = self.graph.generate_path(self.aco_select)
+            ants.append(ant)
+            # Perform local pheromone update, it doesn't depend on the ant's cost, so it
+            # is applied right away in ant order, before any ant is evaluated
+            self.update_pheromone(ant=ant, update_rule=self.local_update)
+
+        # Evaluate how good the new paths are
+        self.evaluator.evaluate(ants, self.backend, self.storage)
+
+        for ant in ants:
+            Log.info(ant)
         return ants
 
     def random_select(self, neighbours):
@@ -244,42 +230,103 @@ class ACO:
         del d['backend']
         return d
 
-class AntBatch:
-    '''Class to represent a batch of Ant objects, and operate in batch mode'''
-
-    def __init__(self, ants=[]):
-        self.ants = ants
-        self.path = []
-        self.loss = []
-        self.accuracy = []
-        self.path_description = []
-        self.path_hash = []
-
-    def evaluate_parallel(self, backend, storage):
-        " Evaluates all the ants fitness in parallel "
-
-        new_models = []
-        for each_ant in self.ants:
-            pd, ph = storage.hash_path(each_ant.path)
-            self.path.append(each_ant.path)
-            self.path_description.append(pd)
-            self.path_hash.append(ph[-1])
-
-        # generate model
-        #for each_path in self.path:
-        #    new_models.append(backend.generate_model(each_path))
-        new_models = backend.generate_model_parallel(self.path)
-        
-        # evaluate models in parallel
-        self.loss, self.accuracy = backend.evaluate_model_parallel(new_models)
-
-        for ant in range(len(self.ants)):
-            self.ants[ant].path_description = self.path_description[ant]
-            self.ants[ant].path_hash = self.path_hash[ant]
-            self.ants[ant].loss = self.loss[ant]
-            self.ants[ant].accuracy = self.accuracy[ant]
-        
-        return self.ants
+class GenerationEvaluator:
+    """Class responsible for evaluating all the ants of a generation.
+
+    Every distinct path is evaluated only once: ants whose path was already
+    evaluated (earlier in the generation or in a previous generation) reuse
+    the result. The distinct paths are evaluated by a pool of workers and
+    the results are recorded in ant order, so the search is the same for
+    any number of workers. In batch mode the distinct paths are evaluated
+    together, with one call to the backend's generate_model_parallel and
+    evaluate_model_parallel.
+    """
+
+    def __init__(self, workers=1, batch=False):
+        self.workers = workers
+        self.batch = batch
+        # path hash -> (loss, accuracy)
+        self.results = {}
+        self.evaluated_count = 0
+        self.reused_count = 0
+
+    def evaluate(self, ants, backend, storage):
+        """Evaluates how good the ants' paths are.
+
+        Args:
+            ants [Ant]: ants of the generation.
+            backend: Backend object.
+            storage: Storage object.
+        """
+
+        # Hash the paths and gather the ones which need an evaluation
+        pending = {}
+        for ant in ants:
+            ant.path_description, path_hashes = storage.hash_path(ant.path)
+            ant.path_hash = path_hashes[-1]
+            if ant.path_hash not in self.results and ant.path_hash not in pending:
+                pending[ant.path_hash] = (ant.path, path_hashes)
+
+        # Evaluate the distinct paths
+        jobs = list(pending.values())
+        if self.batch and jobs:
+            evaluations = self.evaluate_batch(backend, storage, jobs)
+        elif self.workers > 1 and len(jobs) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                evaluations = list(pool.map(lambda job: self.evaluate_path(backend, storage, *job), jobs))
+        else:
+            evaluations = [self.evaluate_path(backend, storage, *job) for job in jobs]
+        evaluations = dict(zip(pending, evaluations))
+
+        # Record the results in ant order
+        for ant in ants:
+            if ant.path_hash in evaluations:
+                model, existing_model_hash, ant.loss, ant.accuracy = evaluations.pop(ant.path_hash)
+                self.results[ant.path_hash] = (ant.loss, ant.accuracy)
+                self.evaluated_count += 1
+
+                # If the new model was created from the older model, record older model progress
+                if existing_model_hash is not None:
+                    storage.record_model_performance(existing_model_hash, ant.cost)
+
+                # Save model
+                storage.save_model(backend, model, pending[ant.path_hash][1], ant.cost)
+            else:
+                ant.loss, ant.accuracy = self.results[ant.path_hash]
+                self.reused_count += 1
+
+                # The same model was evaluated again without any improvement
+                if ant.path_hash in storage.path_lookup:
+                    storage.record_model_performance(ant.path_hash, ant.cost)
+
+    def evaluate_path(self, backend, storage, path, path_hashes):
+        """Generates (or reuses) the model of a path and evaluates it.
+
+        Returns:
+            tuple containing the model, the hash of the model it was created
+            from (or None), the loss and the accuracy.
+        """
+
+        existing_model, existing_model_hash = storage.load_model(backend, path_hashes, path)
+        model = backend.generate_model(path) if existing_model is None else existing_model
+        loss, accuracy = backend.evaluate_model(model)
+        return (model, existing_model_hash, loss, accuracy)
+
+    def evaluate_batch(self, backend, storage, jobs):
+        """Generates (or reuses) the models of the paths and evaluates them
+        as one batch.
+
+        Returns:
+            list containing a tuple like evaluate_path's for every job.
+        """
+
+        existing = [storage.load_model(backend, path_hashes, path) for path, path_hashes in jobs]
+        new_models = iter(backend.generate_model_parallel(
+            [path for (path, _), (model, _) in zip(jobs, existing) if model is None]))
+        models = [next(new_models) if model is None else model for model, _ in existing]
+        losses, accuracies = backend.evaluate_model_parallel(models)
+        return [(model, existing_model_hash, loss, accuracy) for model, (_, existing_model_hash), loss, accuracy
+                in zip(models, existing, losses, accuracies)]
 
 class Ant:
     """Class responsible for representing the ant."""
@@ -292,46 +339,6 @@ class Ant:
         self.path_description = None
         self.path_hash = None
 
-    def evaluate(self, backend, storage):
-        """Evaluates how good ant's path is.
-
-        Args:
-            backend: Backend object.
-            storage: Storage object.
-        """
-        
-        self.path_description, path_hashes = storage.hash_path(self.path)
-        self.path_hash = path_hashes[-1]
-        
-        
-        # Check if the model already exists if yes, then just re-use it
-        existing_model, existing_model_hash = storage.load_model(backend, path_hashes, self.path)
-        if existing_model is None:
-            # Generate model
-            new_model = backend.generate_model(self.path)
-        else:
-            # Re-use model
-            new_model = existing_model
-        
-        
-        # Generate model
-        new_model = backend.generate_model(self.path)
-        
-        '''
-        # Train model
-        new_model = backend.train_model(new_model)
-        '''
-
-        # Evaluate model
-        self.loss, self.accuracy = backend.evaluate_model(new_model)
-
-        # If the new model was created from the older model, record older model progress
-        if existing_model_hash is not None:
-            storage.record_model_performance(existing_model_hash, self.cost)
-
-        # Save model
-        storage.save_model(backend, new_model, path_hashes, self.cost)
-
     @property
     def cost(self):
         """Returns value which represents ant's cost."""
@@ -8,6 +8,8 @@ import time
 import csv
 import random
 
+from profiler import profiler
+
 settings_file_path = os.path.realpath(__file__)
 settings_dir_path = os.path.dirname(settings_file_path)
 proj_root_path = os.path.join(settings_dir_path, '..', '..')
@@ -75,6 +77,7 @@ class AstraSimEnv(gym.Env):
         return
 
     # parses a result csv file and stores it in a dictionary
+    @profiler.profiled('parse_output')
     def parse_result(self, file_name):
         try:
             result_dict = {}
@@ -104,6 +107,7 @@ class AstraSimEnv(gym.Env):
         pass
 
     # reward only looks at first value of fw, ig, and wg compute
+    @profiler.profiled('reward')
     def calculate_reward(self, observations):
         print("Calculating reward...")
         print(observations)
@@ -114,6 +118,7 @@ class AstraSimEnv(gym.Env):
         return 1 / (sum ** 0.5)
 
     # give it one action: one set of parameters from json file
+    @profiler.profiled('AstraSimEnv.step')
     def step(self, action_dict):
 
         # write the three config files
@@ -128,7 +133,7 @@ class AstraSimEnv(gym.Env):
         # load knobs
         print("system_config")
         print(action_dict["system"])
-        with open(self.system_config, 'w') as file:
+        with open(self.system_config, 'w') as file, profiler.span('write_config'):
             for key, value in action_dict["system"].items():
                 file.write(f'{key}: {value}\n')
 
@@ -144,14 +149,16 @@ class AstraSimEnv(gym.Env):
         # start subrpocess to run the simulation
         # $1: network, $2: system, $3: workload
         print("Running simulation...")
-        process = subprocess.Popen([self.exe_path, 
-                                    self.network_config, 
-                                    self.system_config, 
-                                    self.workload_config],
-                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with profiler.span('launch'):
+            process = subprocess.Popen([self.exe_path, 
+                                        self.network_config, 
+                                        self.system_config, 
+                                        self.workload_config],
+                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         # get the output
-        out, err = process.communicate()
+        with profiler.span('simulate', simulator='astra-sim'):
+            out, err = process.communicate()
         outstream = out.decode()
         print("------------------------------------------------------------------")
         print(outstream)
@@ -15,6 +15,7 @@ from gym.utils import seeding
 from envHelpers import helpers
 
 from loggers import write_csv
+from profiler import profiler
 import numpy as np
 
 # ToDo: Have a configuration for Arch-Gym to manipulate this methods
@@ -50,8 +51,13 @@ class DRAMEnv(gym.Env):
         self.episode = 0
         self.reward_cap = sys.float_info.epsilon
         self.helpers = helpers()
+        # DRAMSys finds the memory controller config in the mcconfigs directory of this resources dir (a per env
+        # copy with helpers.create_dramsys_workdir), the configs of the actions are rendered into it
+        self.resources_dir = self.helpers.dramsys_resources_dir()
+        self.config_dir = os.path.dirname(os.path.abspath(arch_gym_configs.dram_mem_controller_config_file))
         self.reset()
 
+    @profiler.profiled('parse_output')
     def get_observation(self,outstream):
         '''
         converts the std out from DRAMSys to observation of energy, power, latency
@@ -87,6 +93,7 @@ class DRAMEnv(gym.Env):
 
         return obs_dict
     
+    @profiler.profiled('reward')
     def calculate_reward(self, power, latency):
         target_power = arch_gym_configs.target_power
         target_latency = arch_gym_configs.target_latency
@@ -119,9 +126,11 @@ class DRAMEnv(gym.Env):
         config_name = self.sim_config
         exe_final = os.path.join(exe_path,exe_name)
 
-        process = subprocess.Popen([exe_final, config_name],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with profiler.span('launch'):
+            process = subprocess.Popen([exe_final, config_name, self.resources_dir],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-        out, err = process.communicate()
+        with profiler.span('simulate', simulator=exe_name):
+            out, err = process.communicate()
         if err.decode() == "":
             outstream = out.decode()
         else:
@@ -133,6 +142,7 @@ class DRAMEnv(gym.Env):
         
         return obs
 
+    @profiler.profiled('DRAMEnv.step')
     def step(self, action_dict):
         '''
         Step method takes action as input and outputs observation
@@ -150,8 +160,9 @@ class DRAMEnv(gym.Env):
                 print("Error in writing configs")
         elif self.cost_model == "proxy_model":
 
-            proxy_model = DRAMSysProxyModel()
-            obs = proxy_model.run_proxy_model(action_dict)
+            with profiler.span('simulate', simulator='proxy_model'):
+                proxy_model = DRAMSysProxyModel()
+                obs = proxy_model.run_proxy_model(action_dict)
         
         reward = self.calculate_reward(obs[0][1], obs[0][2])
         
@@ -169,6 +180,7 @@ class DRAMEnv(gym.Env):
         self.steps = 0
         return self.observation_space.sample()
 
+    @profiler.profiled('write_config')
     def actionToConfigs(self,action):
 
         '''
@@ -177,11 +189,12 @@ class DRAMEnv(gym.Env):
         write_ok = False
 
         if(type(action) == dict):
-            write_ok = self.helpers.read_modify_write_dramsys(action)
+            write_ok = self.helpers.read_modify_write_dramsys(action, self.config_dir)
         else:
             
-            action_decoded = self.helpers.action_decoder_rl(action)
-            write_ok = self.helpers.read_modify_write_dramsys(action_decoded)
+            with profiler.span('decode_action'):
+                action_decoded = self.helpers.action_decoder_rl(action)
+            write_ok = self.helpers.read_modify_write_dramsys(action_decoded, self.config_dir)
         return write_ok
     
 
@@ -140,6 +140,10 @@ class DRAMEnv(gym.Env):
         self.episode = 0
         self.reward_cap = 1e3
         self.helpers = helpers()
+        # DRAMSys finds the memory controller config in the mcconfigs directory of this resources dir (a per env
+        # copy with helpers.create_dramsys_workdir), the configs of the actions are rendered into it
+        self.resources_dir = self.helpers.dramsys_resources_dir()
+        self.config_dir = os.path.dirname(os.path.abspath(arch_gym_configs.dram_mem_controller_config_file))
         self.algorithm = "GA"
         self.goal_latency = 2e7
         self.prev_latency = 1e9
@@ -243,7 +247,7 @@ class DRAMEnv(gym.Env):
         config_name = self.sim_config
         exe_final = os.path.join(exe_path,exe_name)
 
-        process = subprocess.Popen([exe_final, config_name],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process = subprocess.Popen([exe_final, config_name, self.resources_dir],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
         out, err = process.communicate()
         if err.decode() == "":
@@ -305,11 +309,11 @@ class DRAMEnv(gym.Env):
         write_ok = False
 
         if(type(action) == dict):
-            write_ok = self.helpers.read_modify_write_dramsys(action)
+            write_ok = self.helpers.read_modify_write_dramsys(action, self.config_dir)
         else:
             print("[Env][Action]", action)
             action_decoded = self.helpers.action_decoder_rl(action, self.rl_form)
-            write_ok = self.helpers.read_modify_write_dramsys(action_decoded)
+            write_ok = self.helpers.read_modify_write_dramsys(action_decoded, self.config_dir)
         return write_ok
     
 
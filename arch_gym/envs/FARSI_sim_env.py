@@ -40,6 +40,7 @@ from gym.utils import seeding
 from envHelpers import helpers
 
 from loggers import write_csv
+from profiler import profiler
 import numpy as np
 
 # ToDo: Have a configuration for Arch-Gym to manipulate this methods
@@ -74,6 +75,7 @@ class DRAMEnv(gym.Env):
         self.helpers = helpers()
         self.reset()
 
+    @profiler.profiled('parse_output')
     def get_observation(self,outstream):
         '''
         converts the std out from DRAMSys to observation of energy, power, latency
@@ -109,6 +111,7 @@ class DRAMEnv(gym.Env):
 
         return obs_dict
 
+    @profiler.profiled('reward')
     def calculate_reward(self, power, latency):
         target_power = arch_gym_configs.target_power
         target_latency = arch_gym_configs.target_latency
@@ -142,9 +145,11 @@ class DRAMEnv(gym.Env):
         config_name = self.sim_config
         exe_final = os.path.join(exe_path,exe_name)
 
-        process = subprocess.Popen([exe_final, config_name],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with profiler.span('launch'):
+            process = subprocess.Popen([exe_final, config_name],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
-        out, err = process.communicate()
+        with profiler.span('simulate', simulator=exe_name):
+            out, err = process.communicate()
         if err.decode() == "":
             outstream = out.decode()
         else:
@@ -156,6 +161,7 @@ class DRAMEnv(gym.Env):
 
         return obs
 
+    @profiler.profiled('FARSISimEnv.step')
     def step(self, action_dict):
         # where does action_dict come from
 
@@ -194,6 +200,7 @@ class DRAMEnv(gym.Env):
         self.steps = 0
         return self.observation_space.sample()
 
+    @profiler.profiled('write_config')
     def actionToConfigs(self,action):
 
         '''
@@ -13,8 +13,10 @@ import gym
 import glob
 from gym.utils import seeding
 from envHelpers import helpers
+from sims.maestro_batch import MaestroBatchRunner
 
 from loggers import write_csv
+from profiler import profiler
 import numpy as np
 
 # ToDo: Have a configuration for Arch-Gym to manipulate this methods
@@ -64,7 +66,9 @@ class MasteroEnv(gym.Env):
         self.layer_id = layer_id
         self.helpers = helpers() 
 
-        self.dimension, _ = self.helpers.get_dimensions(workload=self.workload, layer_id=self.layer_id)
+        self.dimension, self.dimension_list = self.helpers.get_dimensions(workload=self.workload, layer_id=self.layer_id)
+        # every evaluation runs in its own scratch directory which is removed afterwards
+        self.maestro_runner = MaestroBatchRunner(self._executable, max_workers=1)
         print("dimension: ", self.dimension) 
         
         if self.rl_form == 'macme':
@@ -147,6 +151,7 @@ class MasteroEnv(gym.Env):
             if os.path.exists(m_files):
                 os.remove(m_files)
 
+    @profiler.profiled('MasteroEnv.step')
     def step(self, action):
         
         self.steps += 1
@@ -154,15 +159,14 @@ class MasteroEnv(gym.Env):
 
         print("action: ", action)
 
-        if self.rl_form == 'macme':
-            # TODO(Sri) implement this
-            action_decoded = self.helpers.decode_action_list_multiagent(action)
-        else:
-            action_discretized = self.helpers.decode_action_list_rl(action, self.dimension)
-            action_decoded = self.helpers.decode_action_list(action_discretized)
+        with profiler.span('decode_action'):
+            if self.rl_form == 'macme':
+                # TODO(Sri) implement this
+                action_decoded = self.helpers.decode_action_list_multiagent(action)
+            else:
+                action_discretized = self.helpers.decode_action_list_rl(action, self.dimension)
+                action_decoded = self.helpers.decode_action_list(action_discretized)
 
-        m_file = "{}".format(random.randint(0, 2**32))
-        
         arch_configs = {
             "NocBW": self.NocBW,
             "offchipBW": self.offchipBW,
@@ -170,11 +174,10 @@ class MasteroEnv(gym.Env):
             "l2_size": self.l2_size,
             "num_pe": self.num_pe
         }
-        # write the action to the file
-        m_file_path = self.helpers.write_maestro(indv = action_decoded, workload=self.workload, layer_id = self.layer_id, m_file = m_file)
-
-        # run the maestro
-        obs = self.helpers.run_maestro(self._executable, m_file, arch_configs)
+        # write the mapping and run maestro in a scratch directory
+        with profiler.span('simulate', simulator='maestro'):
+            metrics = self.maestro_runner.run([action_decoded], self.dimension_list, arch_configs, layer_id=self.layer_id)
+        obs = np.array(metrics[0].tolist())
 
         obs = obs.reshape(4,)
         print("obs: ", obs)
@@ -189,11 +192,9 @@ class MasteroEnv(gym.Env):
         if self.rl_form == "macme":
             obs = [obs.copy()] * self.num_agents
 
-        # clean the files
-        self.clean_sim_files(m_file_path)
-        
         return obs, reward, done, {}
 
+    @profiler.profiled('reward')
     def calculate_reward(self, stats):
 
         # flatten the list 
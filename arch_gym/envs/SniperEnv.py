@@ -9,17 +9,20 @@ os.sys.path.insert(0, settings_dir_path + '/../../configs/sniper')
 
 from configs import arch_gym_configs
 from sims.Sniper import simulate_benchmark
+from sims.Sniper import region_cache
 
 import gym
 from gym.utils import seeding
 from envHelpers import helpers
 from loggers import write_csv
+from profiler import profiler
 import numpy as np
 
 import sys
 import math
 
 import subprocess
+import tempfile
 import time
 import re
 import numpy
@@ -28,7 +31,7 @@ import json
 import collections
 
 class SniperEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, run_dir=None):
         
         self.action_space = gym.spaces.Discrete(128)
         # Todo: Change the values if we normalize the observation space
@@ -45,6 +48,11 @@ class SniperEnv(gym.Env):
         self.sniper_config = arch_gym_configs.sniper_config
         self.sniper_workload = arch_gym_configs.spec_workload
 
+        # the configs of the actions are rendered from sniper_config (parsed once) into run_dir,
+        # so envs sharing sniper_config don't overwrite each other's configs
+        self.run_dir = run_dir or tempfile.mkdtemp(prefix='archgym_sniper_')
+        self.run_config = os.path.join(self.run_dir, os.path.basename(self.sniper_config))
+
         # For batch mode, we will pass unique logdir for each agent
         if(arch_gym_configs.sniper_mode == 'batch'):
             self.output_dirs = []
@@ -62,6 +70,7 @@ class SniperEnv(gym.Env):
 
         self.cummulative_reward = 0
     
+    @profiler.profiled('SniperEnv.step_multiagent')
     def step_multiagent(self, actions):
         
         '''
@@ -73,28 +82,14 @@ class SniperEnv(gym.Env):
         self.steps += 1
         done = False
         agent_write_ok = []
-        # create copies of the config files
+        # render the config file of each agent into the run dir
+        self.agent_configs = []
         for agent_ids in range(len(actions)):
-            self.agent_configs.append(self.helpers.create_agent_configs(
-                                agent_ids,arch_gym_configs.sniper_config,
-                                ))
-                                
-        # check if all the config files are created
-        for each_config in self.agent_configs:
-            if not os.path.exists(each_config):
-                print("Error: Config file for agent {} does not exist.".format(each_config))
-                sys.exit()
-            else:
-                print("Config file for agent {} exists.".format(each_config))
-        
-        # write the actions to the config files for each agent
-        for each_action in range(len(self.agent_configs)):
-            id = self.agent_configs[each_action].split("/")[-1].split(".")[0].split("_")[-1]
-            agent_id = "agent_" + id        
-            agent_action = actions[agent_id]
-            
-            agent_write_ok.append(self.actionToConfigs(agent_action,
-                                  self.agent_configs[each_action]))
+            agent_config = os.path.join(self.run_dir, 'arch_gym_x86_agent_{}.cfg'.format(agent_ids))
+            self.agent_configs.append(agent_config)
+            agent_action = actions["agent_" + str(agent_ids)]
+
+            agent_write_ok.append(self.actionToConfigs(agent_action, os.path.basename(agent_config)))
         
         # if configs are updated, then launch the sniper batch jobs
         if (False in agent_write_ok):
@@ -129,12 +124,13 @@ class SniperEnv(gym.Env):
         time.sleep(60)
 
 
+    @profiler.profiled('SniperEnv.step')
     def step(self, action):
         self.steps += 1
 
         done = False
         
-        status = self.actionToConfigs(action,self.sniper_config)
+        status = self.actionToConfigs(action)
 
         if(status):
             obs = self.runSniper()
@@ -162,32 +158,21 @@ class SniperEnv(gym.Env):
         
         return self.obs
     
-    def actionToConfigs(self,action, cfg):
+    @profiler.profiled('write_config')
+    def actionToConfigs(self,action, filename=None):
 
         '''
-        Converts actions output from the agent to update the configuration files
+        Converts actions output from the agent to a configuration file in the run dir
+        (run_config by default)
 
         '''
-        write_ok = self.helpers.read_modify_write_sniper_config(action,cfg)
+        filename = filename or os.path.basename(self.run_config)
+        write_ok = self.helpers.read_modify_write_sniper_config(action, self.sniper_config, self.run_dir, filename)
 
-        # Todo: Maybe there is a cleaner way to write the config file
+        # The config renderer writes the "#include nehalem" / "#include rob" lines
+        # Sniper needs (https://groups.google.com/g/snipersim/c/bXvBb6SXZ0k)
+        # itself, so there is no sed pass over the file anymore.
 
-        # workaround: add include to the config file each time we take a new action
-        # Sniper seems to need this: https://groups.google.com/g/snipersim/c/bXvBb6SXZ0k
-
-        dir_path = os.path.dirname(cfg)
-        
-        if os.path.exists(cfg):
-            print("Adding include to config file")
-                
-            process = subprocess.Popen(["sed", "-i",'1i #include nehalem',cfg], stdout=subprocess.PIPE
-                            ,stderr=subprocess.PIPE)
-            out, err = process.communicate()
-            print("Adding Include Nehalem")
-            process = subprocess.Popen(["sed", "-i",'1i #include rob',cfg], stdout=subprocess.PIPE
-                            ,stderr=subprocess.PIPE)                
-            out, err = process.communicate()
-        
         return write_ok
     
     def runSniperBatch(self, num_agents):
@@ -196,26 +181,32 @@ class SniperEnv(gym.Env):
         '''
 
         done = False
-        launcher = simulate_benchmark.SniperLauncher(int(self.cores))
+        # ARCHGYM_SNIPER_REGION_CACHE=<dir> restores the regions of every agent from one recording
+        launcher = simulate_benchmark.SniperLauncher(int(self.cores), region_cache.from_env())
 
         jobs = [arch_gym_configs.spec_workload for _ in range(num_agents)]
         results = []
 
-        for agent_idx in range(len(jobs)):
-            output_dir = 'agent_.{}_.{}'.format(agent_idx,jobs[agent_idx])
-            self.output_dirs.append(output_dir)
+        with profiler.span('launch', agents=num_agents):
+            for agent_idx in range(len(jobs)):
+                output_dir = 'agent_.{}_.{}'.format(agent_idx,jobs[agent_idx])
+                self.output_dirs.append(output_dir)
+
+                benchmark = jobs[agent_idx]
 
-            benchmark = jobs[agent_idx]
 
+                # The callback function is optional.
+                print("configs:", self.agent_configs[agent_idx])
+                result = launcher.batch_benchmark(benchmark, 'CPU2017', output_dir, self.agent_configs[agent_idx], callback=self.create_callback(output_dir))
+                results.append(result)
+                print('Launched Agent{}_{}'.format(agent_idx,benchmark))
 
-            # The callback function is optional.
-            print("configs:", self.agent_configs[agent_idx])
-            result = launcher.batch_benchmark(benchmark, 'CPU2017', output_dir, self.agent_configs[agent_idx], callback=self.create_callback(output_dir))
-            results.append(result)
-            print('Launched Agent{}_{}'.format(agent_idx,benchmark))
+        with profiler.span('simulate', simulator='sniper', agents=num_agents):
+            for result in results:
+                result.wait()
 
-        for result in results:
-            result.wait()
+        if launcher.region_cache is not None:
+            print("Region cache:", launcher.region_cache_report())
         
         for output_dir in self.output_dirs:
             try:
@@ -272,13 +263,14 @@ class SniperEnv(gym.Env):
         output_file = os.path.join(self.logdir,"stats.json")
         
         cmd = exe_final
-        args = " -c" + " " + self.sniper_config + " -d " + self.logdir + " -n " + self.cores
+        args = " -c" + " " + self.run_config + " -d " + self.logdir + " -n " + self.cores
 
-        process = subprocess.check_output(["python", cmd, 
-                 self.sniper_workload,
-                 "-c", self.sniper_config,
-                 "-d", self.logdir,
-                 "-n", self.cores])
+        with profiler.span('simulate', simulator='sniper', workload=self.sniper_workload):
+            process = subprocess.check_output(["python", cmd, 
+                     self.sniper_workload,
+                     "-c", self.run_config,
+                     "-d", self.logdir,
+                     "-n", self.cores])
 
         #process = subprocess.Popen(["python", cmd, args],stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         #process = subprocess.check_output(["python", cmd, args])#,stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -293,7 +285,7 @@ class SniperEnv(gym.Env):
         data = {}
         # read from a json file if done
         if done:
-            with open(output_file) as json_file:
+            with open(output_file) as json_file, profiler.span('parse_output'):
                 data = json.load(json_file)
         else:
             # To do : Gracefully hanfl ethis case
@@ -320,6 +312,7 @@ class SniperEnv(gym.Env):
 
         return obs
 
+    @profiler.profiled('reward')
     def calculate_reward(self,obs):
         '''
         Calculates the reward based on the current observation
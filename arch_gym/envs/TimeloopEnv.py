@@ -4,6 +4,7 @@ import multiprocessing
 from sims.Timeloop import simulate_timeloop, process_params
 from configs import arch_gym_configs
 from envHelpers import helpers
+from profiler import profiler
 import math
 import time
 import os
@@ -26,7 +27,7 @@ MAX_STEPS = 100
 class TimeloopEnv(gym.Env):
     def __init__(self, script_dir=None, output_dir=None, arch_dir=None,
                  mapper_dir=None, workload_dir=None, target_val=None,
-                 num_cores=None, reward_formulation=None):
+                 num_cores=None, reward_formulation=None, mapping_store=None):
 
         param_obj = process_params.TimeloopConfigParams(arch_gym_configs.timeloop_parameters)
         param_sizes = param_obj.get_param_size()
@@ -50,6 +51,8 @@ class TimeloopEnv(gym.Env):
         self.target_val = target_val
         self.cores = num_cores
         self.reward_formulation = reward_formulation
+        # path of the MappingStore file, warm-starts the mapper from nearby architectures
+        self.mapping_store = mapping_store
 
         print("Reward formulation: ", self.reward_formulation)
         
@@ -82,6 +85,7 @@ class TimeloopEnv(gym.Env):
         self.timeloop_output_batch = []
         self.timeloop_arch_batch = []
 
+    @profiler.profiled('TimeloopEnv.step')
     def step(self, action_params):
         '''Take an action in a timestep'''
         # Assumes that the action here is the modified architecture parameters for now
@@ -93,18 +97,20 @@ class TimeloopEnv(gym.Env):
 
         return obs, reward, done, {}
 
+    @profiler.profiled('TimeloopEnv.step_multiagent')
     def step_multiagent(self, action_params):
         '''Take one action for multiple agents in each timestep'''
         self.steps += 1
 
         # create copies of all the directories
-        for agent_ids in range(len(action_params)):
-            s, o, a = self.helpers.create_timeloop_dirs(
-                agent_ids, self.timeloop_script, self.timeloop_output, self.timeloop_arch)
+        with profiler.span('write_config', agents=len(action_params)):
+            for agent_ids in range(len(action_params)):
+                s, o, a = self.helpers.create_timeloop_dirs(
+                    agent_ids, self.timeloop_script, self.timeloop_output, self.timeloop_arch)
 
-            self.timeloop_script_batch.append(s)
-            self.timeloop_output_batch.append(o)
-            self.timeloop_arch_batch.append(a)
+                self.timeloop_script_batch.append(s)
+                self.timeloop_output_batch.append(o)
+                self.timeloop_arch_batch.append(a)
 
         obs_batch = self.run_timeloop_batch(action_params)
 
@@ -150,8 +156,11 @@ class TimeloopEnv(gym.Env):
     def run_timeloop(self, arch_params):
         '''Invokes the timeloop scripts'''
 
-        energy, area, cycles = simulate_timeloop.simulate_timeloop(self.timeloop_script, self.timeloop_output,
-                                                                   self.timeloop_arch, self.timeloop_mapper, self.timeloop_workload, arch_params)
+        # timeloop writes the arch config, runs and parses its stats in one call
+        with profiler.span('simulate', simulator='timeloop'):
+            energy, area, cycles = simulate_timeloop.simulate_timeloop(self.timeloop_script, self.timeloop_output,
+                                                                       self.timeloop_arch, self.timeloop_mapper, self.timeloop_workload, arch_params,
+                                                                       mapping_store=self.mapping_store)
 
         obs = np.array([energy, area, cycles])
 
@@ -168,10 +177,11 @@ class TimeloopEnv(gym.Env):
         for agent in range(len(multi_arch_params)):
             params = (self.timeloop_script_batch[agent], self.timeloop_output_batch[agent],
                       self.timeloop_arch_batch[agent], self.timeloop_mapper,
-                      self.timeloop_workload, multi_arch_params[agent])
+                      self.timeloop_workload, multi_arch_params[agent], "docker", self.mapping_store)
             pool_params.append(params)
 
-        energy, area, cycles = zip(*pool.starmap(simulate_timeloop.simulate_timeloop, pool_params))
+        with profiler.span('simulate', simulator='timeloop', agents=len(pool_params)):
+            energy, area, cycles = zip(*pool.starmap(simulate_timeloop.simulate_timeloop, pool_params))
 
         for e, a, c in zip(energy, area, cycles):
             o = np.array([e, a, c])
@@ -179,6 +189,7 @@ class TimeloopEnv(gym.Env):
 
         return obs
 
+    @profiler.profiled('reward')
     def calculate_reward(self, obs):
         '''
         Calculates the reward based on the current observation
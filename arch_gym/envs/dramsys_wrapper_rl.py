@@ -27,6 +27,7 @@ import tree
 
 from DRAMEnv_RL import DRAMEnv
 from envHelpers import helpers
+from vec_env import DmVecEnv, VecEnv
 
 
 class DRAMSysEnvWrapper(dm_env.Environment):
@@ -207,3 +208,32 @@ def make_dramsys_env(seed: int = 12234,
   if(rl_form == 'sa' or rl_form == 'tdm'):
     environment = wrappers.CanonicalSpecWrapper(environment, clip=True)
   return environment
+
+
+def make_dramsys_vec_env(num_envs: int = 4,
+                         rl_form = 'sa',
+                         reward_formulation = 'power',
+                         reward_scaling = 'false',
+                         max_steps: int = 1,
+                         workdir_root: Optional[str] = None) -> DmVecEnv:
+  """Returns num_envs DRAMSys environments stepping in parallel worker processes.
+
+  Every worker simulates from its own DRAMSys resources dir (see
+  helpers.create_dramsys_workdir), the returned TimeSteps are batched over the
+  envs.
+  """
+  if rl_form == 'macme' or rl_form == 'macme_continuous':
+    raise ValueError('make_dramsys_vec_env supports the single agent forms (sa, tdm)')
+
+  def env_fn(workdir):
+    helpers().create_dramsys_workdir(workdir)
+    return DRAMEnv(rl_form=rl_form,
+                   max_steps=max_steps,
+                   num_agents=1,
+                   reward_formulation=reward_formulation,
+                   reward_scaling=reward_scaling)
+
+  vec_env = VecEnv([env_fn] * num_envs, workdir_root=workdir_root)
+  return DmVecEnv(vec_env,
+                  observation_spec=_convert_to_spec(vec_env.observation_space, name='observation'),
+                  action_spec=_convert_to_spec(vec_env.action_space, name='action'))
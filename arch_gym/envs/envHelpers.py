@@ -12,9 +12,10 @@ os.sys.path.insert(0, os.path.abspath('/../../configs'))
 from configs import arch_gym_configs
 import shutil
 from sims.Timeloop.process_params import TimeloopConfigParams
+from sims.config_renderer import DRAMSysConfigRenderer, SniperConfigRenderer, SNIPER_PARAM_KEYS
+from sims.maestro_batch import compute_area_maestro, get_CONVtypeShape, get_out_repr, render_maestro_mapping
 from subprocess import Popen, PIPE
 import pandas as pd
-from math import ceil
 
 class CustomListDumper(yaml.Dumper):
     def increase_indent(self, flow=False, *args, **kwargs):
@@ -26,6 +27,9 @@ class helpers():
         self.mem_control_basepath = arch_gym_configs.dram_mem_controller_config
         self.sniper_basepath = arch_gym_configs.sniper_config
         self.timeloop_param_obj = TimeloopConfigParams(arch_gym_configs.timeloop_parameters)
+        # base configs, parsed once (every env has its own helpers)
+        self.dramsys_renderer = None
+        self.sniper_renderers = {}
     
     def action_mapper(self, action, param):
         """
@@ -907,28 +911,26 @@ class helpers():
 
         return rand_actions
     
-    def read_modify_write_dramsys(self, action):
+    def read_modify_write_dramsys(self, action, run_dir=None):
+        '''
+        Renders the memory controller config of action into run_dir, where the
+        simulation config looks for it (the directory of
+        dram_mem_controller_config_file by default). The base config is parsed
+        once, on the first call, and never read back from run_dir.
+        '''
         print("[envHelpers][Action]", action)
         op_success = False
         mem_ctrl_file = arch_gym_configs.dram_mem_controller_config_file
-        
+        keys = ['PagePolicy', 'Scheduler', 'SchedulerBuffer', 'RequestBufferSize', 'RespQueue', 'RefreshPolicy',
+                'RefreshMaxPostponed', 'RefreshMaxPulledin', 'Arbiter', 'MaxActiveTransactions']
+
         try:
-            with open (mem_ctrl_file, "r") as JsonFile:
-                data = json.load(JsonFile)
-                data['mcconfig']['PagePolicy'] = action['PagePolicy']
-                data['mcconfig']['Scheduler'] = action['Scheduler']
-                data['mcconfig']['SchedulerBuffer'] = action['SchedulerBuffer']
-                data['mcconfig']['RequestBufferSize'] = action['RequestBufferSize']
-                data['mcconfig']['RespQueue'] = action['RespQueue']
-                data['mcconfig']['RefreshPolicy'] = action['RefreshPolicy']
-                data['mcconfig']['RefreshMaxPostponed'] = action['RefreshMaxPostponed']
-                data['mcconfig']['RefreshMaxPulledin'] = action['RefreshMaxPulledin']
-                data['mcconfig']['Arbiter'] = action['Arbiter']
-                data['mcconfig']['MaxActiveTransactions'] = action['MaxActiveTransactions']
-
-                with open (mem_ctrl_file, "w") as JsonFile:
-                    json.dump(data,JsonFile)
-                op_success = True
+            if self.dramsys_renderer is None:
+                self.dramsys_renderer = DRAMSysConfigRenderer(mem_ctrl_file)
+            if run_dir is None:
+                run_dir = os.path.dirname(os.path.abspath(mem_ctrl_file))
+            self.dramsys_renderer.write({k: action[k] for k in keys}, run_dir)
+            op_success = True
         except Exception as e:
             print(str(e))
             op_success = False
@@ -953,25 +955,23 @@ class helpers():
 
         return write_success
     
-    def read_modify_write_sniper_config(self,action_dict, cfg):
+    def read_modify_write_sniper_config(self,action_dict, cfg, run_dir=None, filename=None):
+        '''
+        Renders the sniper config of action_dict from the base config cfg
+        (parsed once per cfg) into run_dir/filename, the directory and name of
+        cfg by default
+        '''
         write_success = False
-        parser = configparser.ConfigParser()
-        parser.read(cfg)
         print(action_dict)
-        parser.set("perf_model/core/interval_timer", "dispatch_width", str(action_dict["core_dispatch_width"]))
-        parser.set("perf_model/core/interval_timer", "window_size", str(action_dict["core_window_size"]))
-        parser.set("perf_model/core/rob_timer", "outstanding_loads",str(action_dict["core_outstanding_loads"]))
-        parser.set("perf_model/core/rob_timer", "outstanding_stores", str(action_dict["core_outstanding_stores"]))
-        parser.set("perf_model/core/rob_timer", "commit_width", str(action_dict["core_commit_width"]))
-        parser.set("perf_model/core/rob_timer", "rs_entries", str(action_dict["core_rs_entries"]))
-        parser.set("perf_model/l1_icache", "cache_size", str(action_dict["l1_icache_size"]))
-        parser.set("perf_model/l1_dcache", "cache_size", str(action_dict["l1_dcache_size"]))
-        parser.set("perf_model/l2_cache", "cache_size", str(action_dict["l2_cache_size"]))
-        parser.set("perf_model/l3_cache", "cache_size", str(action_dict["l3_cache_size"]))
         try:
-            with open(cfg,'w') as configfile:
-                parser.write(configfile)
-                write_success = True
+            # the renderer keeps the "#include" lines, so no sed pass is needed afterwards
+            if cfg not in self.sniper_renderers:
+                self.sniper_renderers[cfg] = SniperConfigRenderer(cfg)
+            if run_dir is None:
+                run_dir = os.path.dirname(os.path.abspath(cfg))
+            self.sniper_renderers[cfg].write({k: action_dict[k] for k in SNIPER_PARAM_KEYS},
+                                             run_dir, filename or os.path.basename(cfg))
+            write_success = True
         except Exception as e:
             print(str(e))
             write_success = False
@@ -1030,26 +1030,89 @@ class helpers():
 
         os.makedirs(script_dir_agent, exist_ok=True)
         shutil.copy(src_script_path, script_dir_agent)
+        if os.path.exists(base_script_dir + "/run_timeloop_model.sh"):
+            shutil.copy(base_script_dir + "/run_timeloop_model.sh", script_dir_agent)
         os.makedirs(output_dir_agent, exist_ok=True)
         os.makedirs(arch_dir_agent, exist_ok=True)
         shutil.copy(arch_yaml_path, arch_dir_agent)
         shutil.copytree(arch_comp_path, arch_dest_path)
 
         return script_dir_agent, output_dir_agent, arch_dir_agent
-    
+
+    def create_timeloop_workdir(self, workdir, base_script_dir, base_arch_dir):
+        '''Copies the timeloop script and arch into workdir, the script writes its output to workdir/output'''
+        script_dir, output_dir, arch_dir = [os.path.join(workdir, d) for d in ("script", "output", "arch")]
+        os.makedirs(script_dir, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        shutil.copytree(base_arch_dir, arch_dir, dirs_exist_ok=True)
+
+        for script in ("run_timeloop.sh", "run_timeloop_model.sh"):
+            if not os.path.exists(os.path.join(base_script_dir, script)):
+                continue
+            with open(os.path.join(base_script_dir, script)) as f:
+                lines = f.read().splitlines()
+            with open(os.path.join(script_dir, script), "w") as f:
+                for line in lines:
+                    if line.strip().startswith("OUTPUT_DIR="):
+                        line = 'OUTPUT_DIR="{}"'.format(output_dir)
+                    f.write(line + "\n")
+
+        return script_dir, output_dir, arch_dir
+
+    def dramsys_resources_dir(self, mem_ctrl_file=None):
+        '''
+        DRAMSys resources dir (with the trailing slash DRAMSys needs) of the
+        memory controller config, which lives in <resources>/configs/mcconfigs.
+        DRAMSys resolves the sub-configs of the simulation config only there
+        '''
+        if mem_ctrl_file is None:
+            mem_ctrl_file = arch_gym_configs.dram_mem_controller_config_file
+        mcconfig_dir = os.path.dirname(os.path.abspath(mem_ctrl_file))
+        configs_dir = os.path.dirname(mcconfig_dir)
+        if os.path.basename(mcconfig_dir) != "mcconfigs" or os.path.basename(configs_dir) != "configs":
+            raise ValueError("{} is not in a DRAMSys resources dir (<resources>/configs/mcconfigs)".format(mem_ctrl_file))
+        return os.path.join(os.path.dirname(configs_dir), "")
+
+    def create_dramsys_workdir(self, workdir):
+        '''
+        Builds a DRAMSys resources dir in workdir, a copy of the configs (the
+        memory controller config included) and links to the rest (the traces),
+        copies the simulation config next to it and points arch_gym_configs (of
+        this process) at the copies. The envs pass the resources dir of the
+        memory controller config to DRAMSys
+        '''
+        mem_ctrl_file = arch_gym_configs.dram_mem_controller_config_file
+        base_resources_dir = self.dramsys_resources_dir(mem_ctrl_file)
+        resources_dir = os.path.join(workdir, "resources", "")
+        os.makedirs(resources_dir, exist_ok=True)
+        for entry in os.listdir(base_resources_dir):
+            if entry == "configs":
+                shutil.copytree(base_resources_dir + entry, resources_dir + entry, dirs_exist_ok=True)
+            elif not os.path.lexists(resources_dir + entry):
+                os.symlink(base_resources_dir + entry, resources_dir + entry)
+        mem_ctrl_copy = os.path.join(resources_dir, "configs", "mcconfigs", os.path.basename(mem_ctrl_file))
+
+        # DRAMSys reads the memory controller config the env renders
+        with open(arch_gym_configs.sim_config) as f:
+            sim_config = json.load(f)
+        simulation = sim_config.get("simulation", sim_config)
+        if isinstance(simulation.get("mcconfig"), str):
+            simulation["mcconfig"] = os.path.basename(mem_ctrl_copy)
+        sim_config_copy = os.path.join(workdir, os.path.basename(arch_gym_configs.sim_config))
+        with open(sim_config_copy, "w") as f:
+            json.dump(sim_config, f, indent=4)
+
+        arch_gym_configs.dram_mem_controller_config_file = mem_ctrl_copy
+        arch_gym_configs.sim_config = sim_config_copy
+        return sim_config_copy, mem_ctrl_copy
+
     def remove_dirs(self, dirs):
         '''Removes a list of paths'''
         for path in dirs:
             shutil.rmtree(path)
 
     def compute_area_maestro(self, num_pe, l1_size, l2_size):
-        MAC_AREA_MAESTRO=4470
-        L2BUF_AREA_MAESTRO = 4161.536
-        L1BUF_AREA_MAESTRO = 4505.1889
-        L2BUF_UNIT = 32768
-        L1BUF_UNIT = 64
-        area = num_pe * MAC_AREA_MAESTRO + ceil(int(l2_size)/L2BUF_UNIT)*L2BUF_AREA_MAESTRO + ceil(int(l1_size)/L1BUF_UNIT)*L1BUF_AREA_MAESTRO * num_pe
-        return area
+        return compute_area_maestro(num_pe, l1_size, l2_size)
     
     def reset(self):
         # if any csv and m files exists then remove the *.csv file and *.m files
@@ -1169,77 +1232,21 @@ class helpers():
             sys.exit()
 
     def get_CONVtypeShape(self, dimensions, CONVtype=1):
-        CONVtype_dicts = {0:"FC", 1:"CONV",2:"DSCONV", 3:"GEMM"}
-        CONVtype = CONVtype_dicts[CONVtype]
-        if CONVtype == "CONV"or CONVtype=="DSCONV":
-            pass
-        elif CONVtype == "GEMM" or CONVtype=="SGEMM":
-            SzM, SzN, SzK,*a = dimensions
-            dimensions = [SzN, SzK, SzM, 1, 1, 1]
-        elif CONVtype == "FC":
-            SzOut, SzIn, *a = dimensions
-            dimensions = [SzOut, SzIn, 1, 1, 1, 1]
-        else:
-            print("Not supported layer.")
-        return dimensions
+        return get_CONVtypeShape(dimensions, CONVtype)
     
     def write_maestro(self, indv=None, workload= None, layer_id= 0, m_file=None):
         _, dimension = self.get_dimensions(workload, layer_id)
         print("[DEBUG][write_maestro][dimension: {}]", dimension)
-        
-        m_type_dicts = {0:"CONV", 1:"CONV", 2:"DSCONV", 3:"CONV"}
-        
         print("[DEBUG][write_maestro][m_file: {}]", m_file)
-        dimensions = [dimension]
+
         with open("{}.m".format(m_file), "w") as fo:
-            fo.write("Network {} {{\n".format(layer_id))
-            for i in range(len(dimensions)):
-                dimension = dimensions[i]
-                m_type = m_type_dicts[int(dimension[-1])]
-                dimension = self.get_CONVtypeShape(dimension, int(dimension[-1]))
-                print(dimension)
-                
-                fo.write("Layer {} {{\n".format(m_type))
-                fo.write("Type: {}\n".format(m_type))
-                fo.write(
-                    "Dimensions {{ K: {:.0f}, C: {:.0f}, Y: {:.0f}, X: {:.0f}, R: {:.0f}, S: {:.0f} }}\n".format(
-                        *dimension))
-                fo.write("Dataflow {\n")
-                for k in range(0, len(indv), 7):
-                    for i in range(k, k + 7):
-                        if len(indv[i]) == 2:
-                            d, d_sz = indv[i]
-                        else:
-                            d, d_sz, _ = indv[i]
-                        if i % 7 == 0:
-                            if k != 0:
-                                fo.write("Cluster({},P);\n".format(d_sz))
-                        else:
-                            sp = "SpatialMap" if d == indv[k][0] or (
-                                        len(indv[k]) > 2 and d == indv[k][2]) else "TemporalMap"
-                            # MAESTRO cannot take K dimension as dataflow file
-                            if not (m_type == "DSCONV"):
-                                fo.write("{}({},{}) {};\n".format(sp, d_sz, d_sz, self.get_out_repr(d)))
-                            else:
-                                if self.get_out_repr(d) == "C" and self.get_out_repr(indv[k][0]) == "K":
-                                    fo.write("{}({},{}) {};\n".format("SpatialMap", d_sz, d_sz, "C"))
-                                else:
-                                    if not (self.get_out_repr(d) == "K"):
-                                        fo.write("{}({},{}) {};\n".format(sp, d_sz, d_sz, self.get_out_repr(d)))
-
-                fo.write("}\n")
-                fo.write("}\n")
-            fo.write("}")
-
-            # return the full path of the m_file
-            return os.path.join(os.getcwd(), "{}.m".format(m_file))
+            fo.write(render_maestro_mapping(indv, dimension, layer_id))
+
+        # return the full path of the m_file
+        return os.path.join(os.getcwd(), "{}.m".format(m_file))
 
     def get_out_repr(self, x):
-        out_repr = set(["K", "C", "R", "S"])
-        if x in out_repr:
-            return x
-        else:
-            return x + "'"
+        return get_out_repr(x)
 
     def run_maestro(self, exe, m_file, arch_configs):
 
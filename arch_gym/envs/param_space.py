@@ -0,0 +1,394 @@
+import copy
+import functools
+import math
+import numpy as np
+
+
+class Param():
+    '''
+    Declarative description of a single simulator parameter.
+
+    type is one of 'categorical', 'int' or 'float'. Categorical parameters take
+    their values from `choices`, numeric ones from [low, high]. With log=True an
+    int parameter only takes powers of `base` inside [low, high] and a float
+    parameter is sampled uniformly in log space.
+
+    In the native (population) encoding a categorical parameter is stored as its
+    choice index, numeric parameters are stored as their value.
+    '''
+    def __init__(self, name, type='categorical', choices=None, low=None, high=None, log=False, base=2):
+        assert type in ('categorical', 'int', 'float'), 'type should be categorical, int or float'
+        self.name = name
+        self.type = type
+        self.log = log
+        self.base = base
+
+        if type == 'categorical':
+            assert choices is not None and len(choices) > 0, '{}: choices must not be empty'.format(name)
+            self.choices = list(choices)
+            self._choices_arr = np.empty(len(self.choices), dtype=object)
+            self._choices_arr[:] = self.choices
+            self._choice_index = {c: i for i, c in enumerate(self.choices)}
+            self.low, self.high = 0, len(self.choices) - 1
+        else:
+            assert low is not None and high is not None and high >= low, '{}: need low <= high'.format(name)
+            self.low, self.high = low, high
+            if log:
+                assert low > 0, '{}: log scale needs low > 0'.format(name)
+
+        if type == 'int' and log:
+            exp_lo = math.ceil(math.log(low, base) - 1e-9)
+            exp_hi = math.floor(math.log(high, base) + 1e-9)
+            self.values = np.array([base ** k for k in range(exp_lo, exp_hi + 1)], dtype=np.int64)
+            if len(self.values) == 0:
+                raise ValueError('{}: no power of {} in [{}, {}]'.format(name, base, low, high))
+            self._log_values = np.log(self.values)
+
+    @property
+    def cardinality(self):
+        '''number of distinct values, None for float parameters'''
+        if self.type == 'categorical':
+            return len(self.choices)
+        if self.type == 'int':
+            return len(self.values) if self.log else int(self.high - self.low + 1)
+        return None
+
+    def decode(self, col, index_base=0):
+        '''native encoded column -> numpy array of parameter values'''
+        col = np.asarray(col, dtype=float)
+        if self.type == 'categorical':
+            idx = np.clip(np.rint(col).astype(np.int64) - index_base, 0, len(self.choices) - 1)
+            return self._choices_arr[idx]
+        if self.type == 'int':
+            col = np.clip(col, self.low, self.high)
+            if self.log:
+                idx = np.abs(np.log(col)[:, None] - self._log_values[None, :]).argmin(axis=1)
+                return self.values[idx]
+            return np.rint(col).astype(np.int64)
+        return np.clip(col, self.low, self.high)
+
+    def encode(self, values, index_base=0):
+        '''parameter values -> native encoded column'''
+        if self.type == 'categorical':
+            try:
+                return np.array([self._choice_index[v] for v in values], dtype=float) + index_base
+            except KeyError as e:
+                raise ValueError('{}: {} is not a valid choice'.format(self.name, e))
+        return np.asarray(values, dtype=float)
+
+    def from_unit(self, u, index_base=0):
+        '''
+        u in [0, 1] -> native encoded column
+        discrete parameters split [0, 1] into equal bins, same as helpers.map_to_discrete
+        '''
+        u = np.clip(np.asarray(u, dtype=float), 0, 1)
+        if self.type == 'float':
+            if self.log:
+                return np.exp(np.log(self.low) + u * (np.log(self.high) - np.log(self.low)))
+            return self.low + u * (self.high - self.low)
+        idx = np.minimum((u * self.cardinality).astype(np.int64), self.cardinality - 1)
+        if self.type == 'categorical':
+            return (idx + index_base).astype(float)
+        if self.log:
+            return self.values[idx].astype(float)
+        return (self.low + idx).astype(float)
+
+    def to_unit(self, col, index_base=0):
+        '''native encoded column -> u in [0, 1], discrete values land on the bin centre'''
+        col = np.asarray(col, dtype=float)
+        if self.type == 'float':
+            col = np.clip(col, self.low, self.high)
+            if self.high == self.low:
+                return np.zeros_like(col)
+            if self.log:
+                return (np.log(col) - np.log(self.low)) / (np.log(self.high) - np.log(self.low))
+            return (col - self.low) / (self.high - self.low)
+        if self.type == 'categorical':
+            idx = np.clip(np.rint(col) - index_base, 0, self.cardinality - 1)
+        elif self.log:
+            idx = np.abs(np.log(np.clip(col, self.low, self.high))[:, None]
+                         - self._log_values[None, :]).argmin(axis=1)
+        else:
+            idx = np.clip(np.rint(col), self.low, self.high) - self.low
+        return (idx + 0.5) / self.cardinality
+
+
+class ParamSpace():
+    '''
+    Ordered collection of Param that compiles to vectorized encode/decode.
+
+    A population is an array of shape (size_pop, n_dim) in the native encoding,
+    which is what GA/PSO/DE see through lb/ub. decode() turns it into a list of
+    config dicts and encode() goes back. decode_unit()/encode_unit() do the same
+    for actions in [0, 1] as produced by RL agents.
+
+    index_base shifts categorical indexes, e.g. Timeloop agents use 1-based indexes.
+
+    to_config turns a flat config into the action dict the env takes (decode()
+    returns those), from_config goes back to a flat config (flatten by default,
+    keys the space doesn't know are ignored).
+    '''
+    def __init__(self, params, index_base=0, to_config=None, from_config=None):
+        self.params = list(params)
+        self.index_base = index_base
+        self.to_config = to_config
+        self.from_config = from_config or flatten
+        self.names = [p.name for p in self.params]
+        assert len(set(self.names)) == len(self.names), 'parameter names must be unique'
+        self.n_dim = len(self.params)
+
+        self.lb = np.array([p.low + (index_base if p.type == 'categorical' else 0) for p in self.params], dtype=float)
+        self.ub = np.array([p.high + (index_base if p.type == 'categorical' else 0) for p in self.params], dtype=float)
+        self.precision = np.array([1e-7 if p.type == 'float' else 1.0 for p in self.params])
+
+    def __len__(self):
+        return self.n_dim
+
+    def __getitem__(self, name):
+        return self.params[self.names.index(name)]
+
+    @property
+    def cardinalities(self):
+        return [p.cardinality for p in self.params]
+
+    def _as_population(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        assert X.shape[1] == self.n_dim, 'expected {} columns, got {}'.format(self.n_dim, X.shape[1])
+        return X
+
+    def _columns_to_dicts(self, columns, nested):
+        configs = [dict(zip(self.names, row)) for row in zip(*[c.tolist() for c in columns])]
+        if nested:
+            configs = [unflatten(c) for c in configs]
+        return configs
+
+    def decode(self, X, nested=False):
+        '''population (size_pop, n_dim) -> list of config dicts (env action dicts with to_config)'''
+        X = self._as_population(X)
+        columns = [p.decode(X[:, i], self.index_base) for i, p in enumerate(self.params)]
+        if self.to_config is not None:
+            return [self.to_config(c) for c in self._columns_to_dicts(columns, False)]
+        return self._columns_to_dicts(columns, nested)
+
+    def encode(self, configs):
+        '''list of (flat or nested) config dicts -> population (size_pop, n_dim)'''
+        configs = [self.from_config(c) for c in configs]
+        X = np.empty((len(configs), self.n_dim))
+        for i, p in enumerate(self.params):
+            X[:, i] = p.encode([c[p.name] for c in configs], self.index_base)
+        return X
+
+    def decode_unit(self, U, nested=False):
+        '''actions in [0, 1], shape (size_pop, n_dim) -> list of config dicts'''
+        return self.decode(self.from_unit(U), nested)
+
+    def encode_unit(self, configs):
+        '''list of config dicts -> actions in [0, 1]'''
+        return self.to_unit(self.encode(configs))
+
+    def from_unit(self, U):
+        U = self._as_population(U)
+        return np.stack([p.from_unit(U[:, i], self.index_base) for i, p in enumerate(self.params)], axis=1)
+
+    def to_unit(self, X):
+        X = self._as_population(X)
+        return np.stack([p.to_unit(X[:, i], self.index_base) for i, p in enumerate(self.params)], axis=1)
+
+    def sample(self, size_pop, seed=None):
+        '''uniformly sample a population in the native encoding'''
+        rng = np.random.RandomState(seed)
+        return self.from_unit(rng.rand(size_pop, self.n_dim))
+
+
+def flatten(config, sep='.'):
+    '''{'a': {'b': 1}, 'c': [2, 3]} -> {'a.b': 1, 'c.0': 2, 'c.1': 3}'''
+    flat = {}
+    for key, value in config.items():
+        if isinstance(value, dict):
+            for key2, value2 in flatten(value, sep).items():
+                flat[key + sep + key2] = value2
+        elif isinstance(value, (list, tuple)):
+            for idx, value2 in enumerate(value):
+                flat[key + sep + str(idx)] = value2
+        else:
+            flat[key] = value
+    return flat
+
+
+def unflatten(config, sep='.'):
+    '''inverse of flatten, levels whose keys are all digits become lists'''
+    nested = {}
+    for key, value in config.items():
+        parts = key.split(sep)
+        node = nested
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def to_lists(node):
+        if not isinstance(node, dict):
+            return node
+        node = {k: to_lists(v) for k, v in node.items()}
+        if node and all(k.isdigit() for k in node):
+            return [node[k] for k in sorted(node, key=int)]
+        return node
+
+    return to_lists(nested)
+
+
+# ---------------------------------------------------------------------------
+# per simulator parameter spaces
+# ---------------------------------------------------------------------------
+
+def dramsys_param_space():
+    '''DRAMSys memory controller, same encoding as helpers.action_decoder_ga'''
+    return ParamSpace([
+        Param('PagePolicy', choices=['Open', 'OpenAdaptive', 'Closed', 'ClosedAdaptive']),
+        Param('Scheduler', choices=['Fifo', 'FrFcfsGrp', 'FrFcfs']),
+        Param('SchedulerBuffer', choices=['Bankwise', 'ReadWrite', 'Shared']),
+        Param('RequestBufferSize', 'int', low=1, high=8),
+        Param('RespQueue', choices=['Fifo', 'Reorder']),
+        Param('RefreshPolicy', choices=['NoRefresh', 'AllBank']),
+        Param('RefreshMaxPostponed', 'int', low=1, high=8),
+        Param('RefreshMaxPulledin', 'int', low=1, high=8),
+        Param('Arbiter', choices=['Simple', 'Fifo', 'Reorder']),
+        Param('MaxActiveTransactions', 'int', low=1, high=128),
+    ])
+
+
+def sniper_param_space():
+    '''Sniper core and cache parameters, powers of two as in sims/Sniper/train_ga_Sniper.py'''
+    return ParamSpace([
+        Param('core_dispatch_width', 'int', low=2, high=8, log=True),
+        Param('core_window_size', 'int', low=16, high=512, log=True),
+        Param('core_outstanding_loads', 'int', low=32, high=96, log=True),
+        Param('core_outstanding_stores', 'int', low=24, high=64, log=True),
+        Param('core_commit_width', 'int', low=32, high=192, log=True),
+        Param('core_rs_entries', 'int', low=18, high=72, log=True),
+        Param('l1_icache_size', 'int', low=16, high=128, log=True),
+        Param('l1_dcache_size', 'int', low=16, high=128, log=True),
+        Param('l2_cache_size', 'int', low=128, high=2048, log=True),
+        Param('l3_cache_size', 'int', low=4096, high=16384, log=True),
+    ])
+
+
+def timeloop_to_config(timeloop_params, flat):
+    '''
+    flat config -> arch params dict, same order and memory_width/width fixes
+    as helpers.decode_timeloop_action
+    '''
+    arch_params = copy.deepcopy(timeloop_params.get_arch_param_template())
+    for param, value in timeloop_params.get_all_params().items():
+        if not isinstance(value, dict):
+            arch_params[param] = flat[param]
+            continue
+        attributes = arch_params[param]
+        for subparam in value:
+            attributes[subparam] = flat[param + '.' + subparam]
+            if subparam == 'block-size':
+                width = int(attributes['block-size']) * int(attributes['word-bits'])
+                if 'memory_width' in attributes:
+                    attributes['memory_width'] = width
+                elif 'width' in attributes:
+                    attributes['width'] = width
+    return arch_params
+
+
+def timeloop_param_space(timeloop_params):
+    '''
+    Timeloop architecture parameters from a TimeloopConfigParams object.
+    Names follow get_all_params_flattened() and indexes are 1-based; decode()
+    gives the arch params dict of helpers.decode_timeloop_action.
+    '''
+    return ParamSpace([Param(name, choices=choices)
+                       for name, choices in timeloop_params.get_all_params_flattened().items()],
+                      index_base=1, to_config=functools.partial(timeloop_to_config, timeloop_params))
+
+
+def maestro_param_space(dimensions):
+    '''
+    17-dim Maestro mapping of a layer, same order and ranges as
+    helpers.generate_maestro_parameter_set
+    '''
+    def dim_range(name, dim):
+        return Param(name, 'int', low=1, high=max(1, dimensions[dim] - 1))
+
+    def fixed(name, dim):
+        return Param(name, 'int', low=dimensions[dim] - 1, high=dimensions[dim] - 1)
+
+    return ParamSpace([
+        Param('seed_l2', 'int', low=0, high=719),
+        Param('ckxy_l2', 'int', low=0, high=3),
+        fixed('s_l2', 'S'), fixed('r_l2', 'R'),
+        dim_range('k_l2', 'K'), dim_range('c_l2', 'C'), dim_range('x_l2', 'X'), dim_range('y_l2', 'Y'),
+        Param('ckxy_l1', 'int', low=0, high=3),
+        fixed('s_l1', 'S'), fixed('r_l1', 'R'),
+        dim_range('k_l1', 'K'), dim_range('c_l1', 'C'), dim_range('x_l1', 'X'), dim_range('y_l1', 'Y'),
+        Param('seed_l1', 'int', low=0, high=719),
+        Param('num_pe', 'int', low=1, high=1023),
+    ])
+
+
+ASTRASIM_LINKS_COUNT = {'Ring': 2, 'FullyConnected': 7, 'Switch': 1}
+ASTRASIM_COLLECTIVES = ['all-reduce', 'all-gather', 'reduce-scatter', 'all-to-all']
+
+
+def astrasim_to_config(flat, num_dims=3):
+    '''
+    flat config -> AstraSimEnv action dict, as helpers.action_decoder_ga_astraSim builds it:
+    per dimension lists, the fixed network and system values, links-count from the
+    topologies and the per dimension implementations joined with '_'
+    '''
+    nested = unflatten(flat)
+    network = {'topology-name': 'Hierarchical', 'nic-latency': [0] * num_dims, 'dimensions-count': num_dims}
+    network.update(nested['network'])
+    network['links-count'] = [ASTRASIM_LINKS_COUNT[t] for t in network['topologies-per-dim']]
+    system = {'active-chunks-per-dimension': 1}
+    for key, value in nested['system'].items():
+        system[key] = '_'.join(value) if isinstance(value, list) else value
+    return {'network': network, 'system': system, 'workload': {}}
+
+
+def astrasim_from_config(config):
+    '''AstraSimEnv action dict -> flat config, splits the joined implementations'''
+    flat = flatten(config)
+    for collective in ASTRASIM_COLLECTIVES:
+        key = 'system.{}-implementation'.format(collective)
+        if key in flat:
+            for d, implementation in enumerate(flat.pop(key).split('_')):
+                flat['{}.{}'.format(key, d)] = implementation
+    return flat
+
+
+def astrasim_param_space(num_dims=3):
+    '''
+    AstraSim network and system parameters, same order and bounds as
+    helpers.action_decoder_ga_astraSim. decode() gives the action dict
+    AstraSimEnv.step takes (see astrasim_to_config).
+    '''
+    implementations = ['Ring', 'direct', 'doubleBinaryTree', 'oneRing', 'oneDirect']
+
+    def per_dim(name, **kwargs):
+        return [Param('{}.{}'.format(name, d), **kwargs) for d in range(num_dims)]
+
+    params = []
+    params += per_dim('network.topologies-per-dim', choices=['Ring', 'FullyConnected', 'Switch'])
+    params += per_dim('network.dimension-type', choices=['N', 'P', 'T'])
+    params += per_dim('network.units-count', type='int', low=0, high=8)
+    params += per_dim('network.link-latency', type='int', low=0, high=500)
+    params += per_dim('network.link-bandwidth', type='int', low=0, high=250)
+    params += per_dim('network.router-latency', type='int', low=0, high=10)
+    params += per_dim('network.hbm-latency', type='int', low=0, high=500)
+    params += per_dim('network.hbm-bandwidth', type='int', low=0, high=500)
+    params += per_dim('network.hbm-scale', type='int', low=0, high=1)
+    params.append(Param('system.scheduling-policy', choices=['LIFO', 'FIFO']))
+    params.append(Param('system.endpoint-delay', 'int', low=1, high=10))
+    params.append(Param('system.preferred-dataset-splits', 'int', low=1, high=32))
+    params.append(Param('system.boost-mode', 'int', low=0, high=1))
+    for collective in ASTRASIM_COLLECTIVES:
+        params += per_dim('system.{}-implementation'.format(collective), choices=implementations)
+    params.append(Param('system.collective-optimization', choices=['baseline', 'localBWAware']))
+    return ParamSpace(params, to_config=functools.partial(astrasim_to_config, num_dims=num_dims),
+                      from_config=astrasim_from_config)
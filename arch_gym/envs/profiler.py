@@ -0,0 +1,280 @@
+'''
+Span based profiler for the simulation loop.
+
+The envs and agents time their phases (action decoding, config writing,
+simulator launch and runtime, output parsing, reward, logging) with nested
+spans:
+
+    from profiler import profiler
+
+    @profiler.profiled('reward')
+    def calculate_reward(self, obs):
+        ...
+
+    with profiler.span('simulate', workload=name):
+        out, err = process.communicate()
+
+Profiling is off by default and a disabled span costs one attribute check.
+Set ARCHGYM_PROFILE=<dir> (or call profiler.enable(<dir>)) to record spans;
+at exit the per-phase histograms and a Chrome trace (chrome://tracing,
+https://ui.perfetto.dev) are written to <dir>/archgym_phases_<pid>.json and
+<dir>/archgym_trace_<pid>.json.
+'''
+import atexit
+import functools
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# log2 buckets of the span durations in ns, bucket i holds [2**(i-1), 2**i)
+NUM_BUCKETS = 64
+# spans kept for the Chrome trace, the histograms keep counting past it
+MAX_TRACE_EVENTS = 1000000
+
+
+class _NullSpan():
+    '''returned by span() while profiling is off'''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span():
+    __slots__ = ('profiler', 'name', 'args', 'start', 'child_ns')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.child_ns = 0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        stack = self.profiler._stack()
+        stack.pop()
+        dur = end - self.start
+        if stack:
+            stack[-1].child_ns += dur
+        self.profiler._record(self.name, self.start, dur, dur - self.child_ns, len(stack), self.args)
+        return False
+
+
+class PhaseStats():
+    '''duration histogram of one phase'''
+    __slots__ = ('count', 'total_ns', 'self_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.self_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, dur, self_dur):
+        self.count += 1
+        self.total_ns += dur
+        self.self_ns += self_dur
+        self.min_ns = dur if self.min_ns is None else min(self.min_ns, dur)
+        self.max_ns = max(self.max_ns, dur)
+        self.buckets[min(dur.bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        '''estimate from the log2 buckets (geometric middle of the bucket), clipped to [min, max]'''
+        if not self.count:
+            return 0
+        if q >= 100:
+            return self.max_ns
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                value = 0 if i == 0 else 2 ** (i - 1) * math.sqrt(2)
+                return int(min(max(value, self.min_ns), self.max_ns))
+        return self.max_ns
+
+    def to_dict(self):
+        return {'count': self.count,
+                'total_ns': self.total_ns,
+                'self_ns': self.self_ns,
+                'mean_ns': self.total_ns // self.count if self.count else 0,
+                'min_ns': self.min_ns or 0,
+                'max_ns': self.max_ns,
+                'p50_ns': self.percentile(50),
+                'p90_ns': self.percentile(90),
+                'p99_ns': self.percentile(99),
+                # upper bound (ns) of the bucket -> count, empty buckets left out
+                'histogram': {str(2 ** i): n for i, n in enumerate(self.buckets) if n}}
+
+
+class Profiler():
+    '''
+    Collects nested spans per thread. Each finished span updates the histogram
+    of its phase (total and self time, i.e. minus the time spent in nested
+    spans) and is kept as a Chrome trace event.
+    '''
+    def __init__(self):
+        self.enabled = False
+        self.output_dir = None
+        self.max_trace_events = MAX_TRACE_EVENTS
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._exit_registered = False
+        self.reset()
+
+    def reset(self):
+        '''drops everything recorded so far'''
+        with self._lock:
+            self.phases = {}
+            self.events = []
+            self.dropped_events = 0
+            self.origin_ns = time.perf_counter_ns()
+
+    def enable(self, output_dir=None):
+        '''
+        Starts recording. With an output_dir the histograms and the trace are
+        exported there when the process exits.
+        '''
+        self.enabled = True
+        if output_dir is not None:
+            self.output_dir = output_dir
+            if not self._exit_registered:
+                atexit.register(self._export_at_exit)
+                self._exit_registered = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        '''context manager timing the phase `name`, args end up in the trace event'''
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def profiled(self, name=None):
+        '''decorator timing every call of a function as the phase `name` (default: its qualified name)'''
+        def decorator(fn):
+            phase = name or fn.__qualname__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, phase, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, start, dur, self_dur, depth, args):
+        with self._lock:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.add(dur, self_dur)
+            if len(self.events) < self.max_trace_events:
+                self.events.append((name, start, dur, threading.get_ident(), depth, args))
+            else:
+                self.dropped_events += 1
+
+    # ---------------------------------------------------------------- export
+
+    def histograms(self):
+        '''{phase: stats dict}'''
+        with self._lock:
+            return {name: stats.to_dict() for name, stats in self.phases.items()}
+
+    def chrome_trace(self):
+        '''the recorded spans in the Chrome trace event format (complete events, times in us)'''
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            dropped = self.dropped_events
+        trace = []
+        for name, start, dur, tid, depth, args in events:
+            trace.append({'name': name, 'ph': 'X', 'pid': pid, 'tid': tid,
+                          'ts': (start - self.origin_ns) / 1000.0, 'dur': dur / 1000.0,
+                          'args': dict(args, depth=depth) if args else {'depth': depth}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ns',
+                'otherData': {'dropped_events': dropped, 'argv': ' '.join(sys.argv)}}
+
+    def export_histograms(self, path):
+        write_json_atomically(path, self.histograms())
+
+    def export_chrome_trace(self, path):
+        write_json_atomically(path, self.chrome_trace())
+
+    def export(self, output_dir):
+        '''writes archgym_phases_<pid>.json and archgym_trace_<pid>.json, returns their paths'''
+        os.makedirs(output_dir, exist_ok=True)
+        pid = os.getpid()
+        phases = os.path.join(output_dir, 'archgym_phases_{}.json'.format(pid))
+        trace = os.path.join(output_dir, 'archgym_trace_{}.json'.format(pid))
+        self.export_histograms(phases)
+        self.export_chrome_trace(trace)
+        return phases, trace
+
+    def report(self, file=None):
+        '''prints one line per phase, slowest (total time) first'''
+        file = file or sys.stdout
+        rows = sorted(self.histograms().items(), key=lambda kv: -kv[1]['total_ns'])
+        print('{:<24} {:>8} {:>12} {:>12} {:>12} {:>12} {:>12}'.format(
+            'phase', 'count', 'total ms', 'self ms', 'mean ms', 'p50 ms', 'p99 ms'), file=file)
+        for name, s in rows:
+            print('{:<24} {:>8} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f} {:>12.3f}'.format(
+                name, s['count'], s['total_ns'] / 1e6, s['self_ns'] / 1e6, s['mean_ns'] / 1e6,
+                s['p50_ns'] / 1e6, s['p99_ns'] / 1e6), file=file)
+
+    def _export_at_exit(self):
+        if self.output_dir is not None and self.phases:
+            phases, trace = self.export(self.output_dir)
+            print('[profiler] phases: {} trace: {}'.format(phases, trace))
+
+
+def write_json_atomically(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# The envs import this module as `profiler` (their directory is on sys.path),
+# the agents as `arch_gym.envs.profiler`; both names share one profiler.
+for _name in ('profiler', 'arch_gym.envs.profiler'):
+    _other = getattr(sys.modules.get(_name), 'profiler', None)
+    if _name != __name__ and type(_other).__name__ == 'Profiler':
+        profiler = _other
+        break
+else:
+    profiler = Profiler()
+    if os.environ.get('ARCHGYM_PROFILE'):
+        profiler.enable(os.environ['ARCHGYM_PROFILE'])
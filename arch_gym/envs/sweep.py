@@ -0,0 +1,330 @@
+'''
+Sharded, resumable exhaustive sweeps over a ParamSpace.
+
+Sweep enumerates the Cartesian product of the parameter values lazily: point
+i is decoded from its index (mixed radix, the last parameter varies fastest,
+like nested for loops), so nothing of size len(sweep) is ever built.
+
+    sweep = Sweep(dramsys_param_space(), values={'RequestBufferSize': [1, 2, 4, 8]})
+    run_sweep(sweep, evaluate, 'sweep_out', shard=k, num_shards=n, workers=4)
+    df = load_results('sweep_out')
+
+evaluate(config) returns a number (stored as 'reward') or a dict of metrics.
+
+Shards are block-cyclic: block b (block_size consecutive indices) belongs to
+shard b % num_shards, every host runs the same command with its own shard and
+they can share the output directory.
+
+Completed indices are appended to a per-shard ledger after their results are
+written, a restarted sweep (with any shard count) skips everything in the
+ledgers of the output directory. Results are written in parts of flush_every
+points, one .npz file of columns (index, parameters, metrics) per part.
+'''
+import glob
+import json
+import multiprocessing
+import os
+import tempfile
+
+import numpy as np
+
+LEDGER_END = '.'
+SWEEP_FILE = 'sweep.json'
+
+
+class Sweep():
+    '''
+    Grid of a ParamSpace.
+
+    Parameters
+    ----------------
+    space : ParamSpace
+    values : dict
+        values of some parameters to use instead of all their values, e.g. a coarser grid
+    float_levels : int
+        points per float parameter without values (evenly spaced, in log space with log=True)
+    '''
+    def __init__(self, space, values=None, float_levels=None):
+        values = dict(values or {})
+        unknown = set(values) - set(space.names)
+        if unknown:
+            raise ValueError('unknown parameters {}'.format(sorted(unknown)))
+        self.space = space
+        self.names = space.names
+        self.axes = []
+        for p in space.params:
+            if p.name in values:
+                axis = list(values[p.name])
+                if p.type == 'categorical':
+                    p.encode(axis)
+            elif p.type == 'categorical':
+                axis = list(p.choices)
+            elif p.type == 'int':
+                axis = p.values.tolist() if p.log else list(range(int(p.low), int(p.high) + 1))
+            else:
+                if float_levels is None:
+                    raise ValueError('{}: float parameters need values or float_levels'.format(p.name))
+                grid = np.geomspace if p.log else np.linspace
+                axis = grid(p.low, p.high, float_levels).tolist()
+            if len(axis) == 0:
+                raise ValueError('{}: no values to sweep'.format(p.name))
+            self.axes.append(axis)
+        self.radices = [len(axis) for axis in self.axes]
+        self.size = int(np.prod(self.radices, dtype=object))
+        assert self.size < 2 ** 63, 'the sweep has {} points, too many to index'.format(self.size)
+        self._axes_arr = []
+        for axis in self.axes:
+            arr = np.empty(len(axis), dtype=object)
+            arr[:] = axis
+            self._axes_arr.append(arr)
+
+    def __len__(self):
+        return self.size
+
+    def positions(self, indices):
+        '''indices (n,) -> per-parameter value positions (n, n_dim)'''
+        rest = np.asarray(indices, dtype=np.int64).copy()
+        if np.any((rest < 0) | (rest >= self.size)):
+            raise IndexError('sweep indices must be in [0, {})'.format(self.size))
+        pos = np.empty((len(rest), len(self.radices)), dtype=np.int64)
+        for d in range(len(self.radices) - 1, -1, -1):
+            rest, pos[:, d] = np.divmod(rest, self.radices[d])
+        return pos
+
+    def columns(self, indices):
+        '''parameter name -> values of the points at indices'''
+        pos = self.positions(indices)
+        return {name: self._axes_arr[d][pos[:, d]] for d, name in enumerate(self.names)}
+
+    def configs(self, indices, nested=False):
+        '''indices -> list of config dicts'''
+        columns = [self.columns(indices)[name].tolist() for name in self.names]
+        configs = [dict(zip(self.names, row)) for row in zip(*columns)]
+        if nested:
+            from param_space import unflatten
+            configs = [unflatten(c) for c in configs]
+        return configs
+
+    def __getitem__(self, index):
+        return self.configs([index])[0]
+
+    def shard(self, shard=0, num_shards=1, block_size=1024):
+        '''lazily yields the indices of a shard in increasing order'''
+        assert 0 <= shard < num_shards, 'shard must be in [0, num_shards)'
+        for start in range(shard * block_size, self.size, num_shards * block_size):
+            yield from range(start, min(start + block_size, self.size))
+
+    def description(self):
+        return {'names': self.names, 'axes': self.axes, 'size': self.size}
+
+
+class SweepLedger():
+    '''
+    Append-only record of the completed indices of one shard. Every record is
+    one line "<index> <index> ... ." written by a single O_APPEND write; lines
+    without the end marker (a crash during the write) are ignored.
+    '''
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # a torn last line would merge with the next record
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b'\n'
+            if torn:
+                self._append('\n')
+
+    def _append(self, text):
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, text.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def record(self, indices):
+        if len(indices):
+            self._append(' '.join(str(int(i)) for i in indices) + ' ' + LEDGER_END + '\n')
+
+    @staticmethod
+    def read(path):
+        done = set()
+        with open(path, 'r') as f:
+            for line in f:
+                fields = line.split()
+                if line.endswith('\n') and fields and fields[-1] == LEDGER_END:
+                    done.update(int(i) for i in fields[:-1])
+        return done
+
+
+def completed_indices(out_dir):
+    '''indices recorded in any ledger of out_dir'''
+    done = set()
+    for path in glob.glob(os.path.join(out_dir, 'ledger', '*.txt')):
+        done |= SweepLedger.read(path)
+    return done
+
+
+def _check_sweep_file(sweep, out_dir):
+    '''a directory belongs to one sweep, resuming with another grid would mix results'''
+    path = os.path.join(out_dir, SWEEP_FILE)
+    description = json.loads(json.dumps(sweep.description()))
+    if os.path.exists(path):
+        with open(path) as f:
+            if json.load(f) != description:
+                raise ValueError('{} holds results of another sweep'.format(out_dir))
+        return
+    _write_atomically(path, lambda f: json.dump(description, f), mode='w')
+
+
+def _write_atomically(path, write, mode='wb'):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+_EVALUATE = None
+
+
+def _evaluate(item):
+    index, config = item
+    result = _EVALUATE(config)
+    if not isinstance(result, dict):
+        result = {'reward': result}
+    return index, result
+
+
+class _PartWriter():
+    '''buffers results and writes them as column parts, then records them in the ledger'''
+    def __init__(self, sweep, out_dir, ledger, shard):
+        self.sweep = sweep
+        self.parts_dir = os.path.join(out_dir, 'results')
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.ledger = ledger
+        self.shard = shard
+        self.indices = []
+        self.metrics = []
+
+    def add(self, index, metrics):
+        self.indices.append(index)
+        self.metrics.append(metrics)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def flush(self):
+        if not self.indices:
+            return
+        columns = {'index': np.asarray(self.indices, dtype=np.int64)}
+        for name, values in self.sweep.columns(self.indices).items():
+            columns['param:' + name] = np.asarray(values.tolist())
+        for name in sorted(set().union(*self.metrics)):
+            columns['metric:' + name] = np.asarray([m.get(name, np.nan) for m in self.metrics], dtype=float)
+        path = os.path.join(self.parts_dir, 'part-{}-{:012d}-{}.npz'.format(self.shard, self.indices[0],
+                                                                          len(self.indices)))
+        _write_atomically(path, lambda f: np.savez_compressed(f, **columns))
+        self.ledger.record(self.indices)
+        self.indices, self.metrics = [], []
+
+
+def run_sweep(sweep, evaluate, out_dir, shard=0, num_shards=1, block_size=1024, workers=1, flush_every=256,
+              max_points=None, on_result=None, verbose=True):
+    '''
+    Evaluates the points of a shard that are not in the ledgers of out_dir.
+
+    Parameters
+    ----------------
+    evaluate : callable
+        evaluate(config dict) -> number or dict of metrics, runs in forked workers when workers > 1
+    block_size : int
+        consecutive indices per shard block, all hosts must use the same value
+    flush_every : int
+        points per result part, at most this many evaluations are redone after a crash
+    max_points : int
+        stop after evaluating this many points (the rest is done by the next run)
+    on_result : callable
+        on_result(index, config dict, metrics dict), called in this process for every result in index order
+
+    Returns the number of points evaluated by this call.
+    '''
+    global _EVALUATE
+    os.makedirs(out_dir, exist_ok=True)
+    _check_sweep_file(sweep, out_dir)
+    done = completed_indices(out_dir)
+    ledger = SweepLedger(os.path.join(out_dir, 'ledger', 'shard-{}-of-{}.txt'.format(shard, num_shards)))
+    writer = _PartWriter(sweep, out_dir, ledger, shard)
+
+    def pending():
+        count = 0
+        batch = []
+        for index in sweep.shard(shard, num_shards, block_size):
+            if max_points is not None and count >= max_points:
+                break
+            if index in done:
+                continue
+            batch.append(index)
+            count += 1
+            if len(batch) == flush_every:
+                yield from zip(batch, sweep.configs(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, sweep.configs(batch))
+
+    _EVALUATE = evaluate
+    pool = None
+    evaluated = 0
+    finished = False
+    try:
+        if workers > 1:
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            results = pool.imap(_evaluate, pending(), chunksize=1)
+        else:
+            results = map(_evaluate, pending())
+        for index, metrics in results:
+            writer.add(index, metrics)
+            if on_result is not None:
+                on_result(index, sweep[index], metrics)
+            evaluated += 1
+            if len(writer) >= flush_every:
+                writer.flush()
+                if verbose:
+                    print('[sweep] shard {}/{}: {} points evaluated, {} of {} done'.format(
+                        shard, num_shards, evaluated, len(done) + evaluated, sweep.size))
+        finished = True
+    finally:
+        # whatever finished before an error or interrupt is kept
+        writer.flush()
+        if pool is not None:
+            # workers that finished exit normally, so their multiprocessing.util.Finalize callbacks run
+            if finished:
+                pool.close()
+            else:
+                pool.terminate()
+            pool.join()
+        _EVALUATE = None
+    return evaluated
+
+
+def load_results(out_dir):
+    '''
+    pandas DataFrame of all the results in out_dir, one row per index (sorted),
+    columns are the parameter names and the metric names
+    '''
+    import pandas as pd
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(out_dir, 'results', 'part-*.npz'))):
+        with np.load(path) as part:
+            frames.append(pd.DataFrame({key.split(':', 1)[-1]: part[key] for key in part.files}))
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    # a part written right before a crash can be evaluated again on resume
+    df = df.drop_duplicates('index', keep='last').sort_values('index')
+    return df.set_index('index')
@@ -27,6 +27,7 @@ import tree
 
 from TimeloopEnv_RL import TimeloopEnv
 from envHelpers import helpers
+from vec_env import DmVecEnv, VecEnv
 
 
 class TimeloopEnvWrapper(dm_env.Environment):
@@ -289,3 +290,49 @@ def make_timeloop_env(seed: int = 12234,
         env, maximize_action, convert_multi_discrete, multi_agent)
     environment = wrappers.SinglePrecisionWrapper(environment)
     return environment
+
+
+def make_timeloop_vec_env(num_envs: int = 4,
+                          max_steps: int = 100,
+                          script_dir: str = None,
+                          arch_dir: str = None,
+                          mapper_dir: str = None,
+                          workload_dir: str = None,
+                          target_val: list = None,
+                          reward_formulation: str = None,
+                          reward_scaling: str = 'false',
+                          rl_form: str = 'sa',
+                          traj_dir: str = None,
+                          workdir_root: str = None,
+                          ) -> DmVecEnv:
+    """Returns num_envs Timeloop environments stepping in parallel worker processes.
+
+    Every worker runs timeloop from its own copy of the script and arch
+    directories and writes to its own output directory, the returned
+    TimeSteps are batched over the envs.
+    """
+    def env_fn(workdir):
+        worker_script_dir, worker_output_dir, worker_arch_dir = helpers().create_timeloop_workdir(
+            workdir, script_dir, arch_dir)
+        return TimeloopEnv(
+            script_dir=worker_script_dir,
+            arch_dir=worker_arch_dir,
+            mapper_dir=mapper_dir,
+            workload_dir=workload_dir,
+            output_dir=worker_output_dir,
+            target_val=target_val,
+            reward_formulation=reward_formulation,
+            rl_form=rl_form,
+            max_steps=max_steps,
+            reward_scaling=reward_scaling,
+            traj_dir=traj_dir,
+        )
+
+    def box_spec(space, name):
+        return specs.BoundedArray(shape=space.shape, dtype=space.dtype,
+                                  minimum=space.low, maximum=space.high, name=name)
+
+    vec_env = VecEnv([env_fn] * num_envs, workdir_root=workdir_root)
+    return DmVecEnv(vec_env,
+                    observation_spec=box_spec(vec_env.observation_space, 'observation'),
+                    action_spec=box_spec(vec_env.action_space, 'action'))
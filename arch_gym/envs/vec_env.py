@@ -0,0 +1,366 @@
+'''
+Vectorized environments for RL training.
+
+VecEnv runs N copies of an environment in worker processes and steps them
+together, so an agent waits on N simulators at once instead of one:
+
+    def make_env(workdir):
+        return DRAMEnv(rl_form='sa', ...)
+
+    envs = VecEnv([make_env] * 8)
+    obs = envs.reset()                              # (8, obs_dim)
+    obs, rewards, dones, infos = envs.step(actions)  # actions: one per env
+
+Every worker runs in its own working directory (<workdir_root>/env_<i>, also
+its cwd), env_fn(workdir) gets that path so it can copy the config files the
+env rewrites there and point arch_gym_configs at the copies; arch_gym_configs
+is per process, so the changes stay inside the worker.
+
+Finished episodes are reset in the worker (auto_reset): the returned
+observation is the first one of the next episode and the last one is in
+info['terminal_observation'].
+
+An exception in a worker (the envs also sys.exit() on simulator errors) or a
+dead worker does not take the training down: the worker is restarted in a
+clean working directory and its slot returns done=True, crash_reward and
+info['worker_error'] with the traceback. After max_restarts restarts of the
+same worker VecEnvError is raised.
+
+DmVecEnv gives the same envs as a batched dm_env: every TimeStep field has a
+leading num_envs dimension.
+'''
+import multiprocessing
+import os
+import shutil
+import tempfile
+import traceback
+
+import numpy as np
+
+# dm_env is only needed for DmVecEnv
+try:
+    import dm_env
+except ImportError:
+    dm_env = None
+
+
+class VecEnvError(Exception):
+    pass
+
+
+def _worker(remote, parent_remote, env_fn, workdir):
+    parent_remote.close()
+    try:
+        os.makedirs(workdir, exist_ok=True)
+        os.chdir(workdir)
+        env = env_fn(workdir)
+    except BaseException:
+        remote.send(('error', traceback.format_exc()))
+        remote.close()
+        return
+    remote.send(('ok', None))
+
+    while True:
+        try:
+            cmd, data = remote.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        try:
+            if cmd == 'step':
+                action, auto_reset = data
+                obs, reward, done, info = env.step(action)
+                if done and auto_reset:
+                    info = dict(info, terminal_observation=obs)
+                    obs = env.reset()
+                result = (obs, reward, done, info)
+            elif cmd == 'reset':
+                result = env.reset()
+            elif cmd == 'getattr':
+                result = getattr(env, data)
+            elif cmd == 'call':
+                name, args, kwargs = data
+                result = getattr(env, name)(*args, **kwargs)
+            elif cmd == 'close':
+                if hasattr(env, 'close'):
+                    env.close()
+                remote.send(('ok', None))
+                break
+            else:
+                raise ValueError('unknown command {}'.format(cmd))
+            remote.send(('ok', result))
+        except BaseException:
+            # the env state is unknown after a failed call, the parent restarts the worker
+            remote.send(('error', traceback.format_exc()))
+            break
+    remote.close()
+
+
+class VecEnv():
+    '''
+    N environments in worker processes with batched reset/step.
+
+    Parameters
+    ----------------
+    env_fns : list of callables
+        env_fns[i](workdir) builds the i-th env inside its worker
+    workdir_root : str
+        where the per-worker working directories are created, default is a new temp dir
+    auto_reset : bool
+        reset finished episodes in the worker
+    max_restarts : int
+        restarts allowed per worker before VecEnvError is raised
+    crash_reward : float
+        reward of the step that crashed a worker
+    start_method : str
+        multiprocessing start method, fork by default so env_fns can be closures
+    '''
+    def __init__(self, env_fns, workdir_root=None, auto_reset=True, max_restarts=3, crash_reward=0.0,
+                 start_method='fork', keep_workdirs=False):
+        self.env_fns = list(env_fns)
+        self.num_envs = len(self.env_fns)
+        self.own_workdir_root = workdir_root is None
+        self.workdir_root = workdir_root or tempfile.mkdtemp(prefix='archgym_vec_env_')
+        self.auto_reset = auto_reset
+        self.max_restarts = max_restarts
+        self.crash_reward = crash_reward
+        self.keep_workdirs = keep_workdirs
+        self.ctx = multiprocessing.get_context(start_method)
+        self.restarts = [0] * self.num_envs
+        self.processes = [None] * self.num_envs
+        self.remotes = [None] * self.num_envs
+        self.pending = None
+        self.closed = False
+        for idx in range(self.num_envs):
+            self._start(idx)
+
+    def workdir(self, idx):
+        return os.path.join(self.workdir_root, 'env_{}'.format(idx))
+
+    def _start(self, idx):
+        shutil.rmtree(self.workdir(idx), ignore_errors=True)
+        remote, work_remote = self.ctx.Pipe()
+        process = self.ctx.Process(target=_worker, args=(work_remote, remote, self.env_fns[idx], self.workdir(idx)),
+                                   daemon=True)
+        process.start()
+        work_remote.close()
+        self.processes[idx] = process
+        self.remotes[idx] = remote
+        status, payload = self._recv(idx)
+        if status != 'ok':
+            raise VecEnvError('env {} failed to start:\n{}'.format(idx, payload))
+
+    def _stop(self, idx):
+        try:
+            self.remotes[idx].close()
+        except OSError:
+            pass
+        self.processes[idx].join(timeout=1)
+        if self.processes[idx].is_alive():
+            self.processes[idx].terminate()
+            self.processes[idx].join()
+
+    def _restart(self, idx, error):
+        self.restarts[idx] += 1
+        self._stop(idx)
+        if self.restarts[idx] > self.max_restarts:
+            raise VecEnvError('env {} crashed {} times, last error:\n{}'.format(idx, self.restarts[idx], error))
+        print('[VecEnv] env {} crashed, restarting ({}/{}):\n{}'.format(idx, self.restarts[idx], self.max_restarts,
+                                                                       error))
+        self._start(idx)
+
+    def _send(self, idx, cmd, data=None):
+        try:
+            self.remotes[idx].send((cmd, data))
+        except (BrokenPipeError, EOFError, OSError):
+            # the worker died, _recv reports it
+            pass
+
+    def _recv(self, idx):
+        try:
+            return self.remotes[idx].recv()
+        except (EOFError, ConnectionResetError, OSError):
+            return 'error', 'worker process exited with code {}'.format(self.processes[idx].exitcode)
+
+    def _reset_one(self, idx):
+        '''reset after a restart, a worker that cannot even reset is restarted again'''
+        while True:
+            self._send(idx, 'reset')
+            status, payload = self._recv(idx)
+            if status == 'ok':
+                return payload
+            self._restart(idx, payload)
+
+    def _indices(self, indices):
+        if indices is None:
+            return list(range(self.num_envs))
+        if np.isscalar(indices):
+            return [int(indices)]
+        return [int(i) for i in indices]
+
+    def reset(self, indices=None):
+        '''resets the envs (all by default), returns the batched first observations'''
+        indices = self._indices(indices)
+        for idx in indices:
+            self._send(idx, 'reset')
+        obs = []
+        for idx in indices:
+            status, payload = self._recv(idx)
+            if status != 'ok':
+                self._restart(idx, payload)
+                payload = self._reset_one(idx)
+            obs.append(payload)
+        return _stack(obs)
+
+    def step_async(self, actions, indices=None):
+        '''sends one action per env in indices (all by default) without waiting for the results'''
+        assert self.pending is None, 'step_wait() was not called after the last step_async()'
+        indices = self._indices(indices)
+        assert len(actions) == len(indices), 'expected {} actions, got {}'.format(len(indices), len(actions))
+        for idx, action in zip(indices, actions):
+            self._send(idx, 'step', (action, self.auto_reset))
+        self.pending = indices
+
+    def step_wait(self):
+        '''(observations, rewards, dones, infos) of the last step_async()'''
+        indices, self.pending = self.pending, None
+        obs, rewards, dones, infos = [], [], [], []
+        for idx in indices:
+            status, payload = self._recv(idx)
+            if status == 'ok':
+                o, r, d, info = payload
+            else:
+                self._restart(idx, payload)
+                o, r, d, info = self._reset_one(idx), self.crash_reward, True, {'worker_error': payload}
+            obs.append(o)
+            rewards.append(r)
+            dones.append(d)
+            infos.append(info)
+        return _stack(obs), np.asarray(rewards), np.asarray(dones, dtype=bool), infos
+
+    def step(self, actions, indices=None):
+        self.step_async(actions, indices)
+        return self.step_wait()
+
+    def get_attr(self, name, indices=None):
+        '''attribute of the envs, e.g. get_attr('action_space', 0)'''
+        single = indices is not None and np.isscalar(indices)
+        values = [self._call(idx, 'getattr', name) for idx in self._indices(indices)]
+        return values[0] if single else values
+
+    def env_method(self, name, *args, indices=None, **kwargs):
+        '''calls env.<name>(*args, **kwargs) in the workers'''
+        return [self._call(idx, 'call', (name, args, kwargs)) for idx in self._indices(indices)]
+
+    def _call(self, idx, cmd, data):
+        self._send(idx, cmd, data)
+        status, payload = self._recv(idx)
+        if status != 'ok':
+            self._restart(idx, payload)
+            raise VecEnvError('env {} failed on {} {}:\n{}'.format(idx, cmd, data, payload))
+        return payload
+
+    @property
+    def observation_space(self):
+        return self.get_attr('observation_space', 0)
+
+    @property
+    def action_space(self):
+        return self.get_attr('action_space', 0)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for idx in range(self.num_envs):
+            self._send(idx, 'close')
+        for idx in range(self.num_envs):
+            self._recv(idx)
+            self._stop(idx)
+        if self.own_workdir_root and not self.keep_workdirs:
+            shutil.rmtree(self.workdir_root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.num_envs
+
+
+def _stack(values):
+    '''batch of per-env values, kept as a list when the shapes differ'''
+    try:
+        return np.stack([np.asarray(v) for v in values])
+    except ValueError:
+        return values
+
+
+class DmVecEnv():
+    '''
+    Batched dm_env view of a VecEnv.
+
+    reset() and step() return one dm_env.TimeStep whose step_type, reward,
+    discount and observation have a leading num_envs dimension. Like a single
+    dm_env, an env whose last step was LAST ignores its next action and
+    returns FIRST with the observation of its new episode.
+    '''
+    def __init__(self, vec_env, observation_spec=None, action_spec=None, discount=1.0):
+        if dm_env is None:
+            raise Exception("DmVecEnv requires dm_env")
+        self.vec_env = vec_env
+        self.num_envs = vec_env.num_envs
+        self._observation_spec = observation_spec
+        self._action_spec = action_spec
+        self.discount = discount
+        # first observation of the next episode of the envs that just returned LAST
+        self._restart_obs = {}
+        vec_env.auto_reset = True
+
+    def reset(self):
+        self._restart_obs = {}
+        obs = self.vec_env.reset()
+        return dm_env.TimeStep(step_type=np.full(self.num_envs, dm_env.StepType.FIRST),
+                               reward=np.zeros(self.num_envs), discount=np.ones(self.num_envs),
+                               observation=obs)
+
+    def step(self, actions):
+        step_type = np.full(self.num_envs, dm_env.StepType.MID)
+        reward = np.zeros(self.num_envs)
+        discount = np.full(self.num_envs, self.discount)
+        observation = [None] * self.num_envs
+        self.last_infos = [{} for _ in range(self.num_envs)]
+
+        restarted = dict(self._restart_obs)
+        self._restart_obs = {}
+        for idx, obs in restarted.items():
+            step_type[idx] = dm_env.StepType.FIRST
+            discount[idx] = 1.0
+            observation[idx] = obs
+
+        indices = [idx for idx in range(self.num_envs) if idx not in restarted]
+        if indices:
+            obs, rewards, dones, infos = self.vec_env.step([actions[idx] for idx in indices], indices)
+            for k, idx in enumerate(indices):
+                reward[idx] = rewards[k]
+                self.last_infos[idx] = infos[k]
+                if dones[k]:
+                    step_type[idx] = dm_env.StepType.LAST
+                    if not infos[k].get('TimeLimit.truncated', False):
+                        discount[idx] = 0.0
+                    observation[idx] = infos[k].get('terminal_observation', obs[k])
+                    self._restart_obs[idx] = obs[k]
+                else:
+                    observation[idx] = obs[k]
+        return dm_env.TimeStep(step_type=step_type, reward=reward, discount=discount, observation=_stack(observation))
+
+    def observation_spec(self):
+        return self._observation_spec
+
+    def action_spec(self):
+        return self._action_spec
+
+    def close(self):
+        self.vec_env.close()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+'''
+Analytical (alpha-beta) model of the collective communication time AstraSim
+simulates, for the hierarchical networks of general_network.json and the
+collective implementations and chunking of general_system.txt.
+
+Every dimension d of the network has units-count[d] units connected by its
+topology (Ring, FullyConnected or Switch) with links-count[d] links per unit of
+link-bandwidth[d] GB/s (bytes/ns) each. A step of an algorithm on it costs
+
+    alpha_d = link-latency + nic-latency + router-latency (+ the second hop through a Switch) + endpoint-delay
+    beta_d  = bytes sent / (links-count * link-bandwidth)
+
+and the implementation of a collective on a dimension (the '_'-separated
+entry of e.g. all-reduce-implementation: direct_ring_halvingDoubling) gives the
+number of steps and bytes:
+
+    ring              (n - 1) steps of m / n
+    direct            ceil((n - 1) / links) steps, (n - 1) m / n bytes
+    halvingDoubling   log2(n) steps, (n - 1) m / n bytes
+    doubleBinaryTree  2 log2(n) steps, m bytes
+
+for reduce-scatter and all-gather, twice that for all-reduce. A multi-dimension
+all-reduce is a reduce-scatter through the dimensions (the message shrinking by
+units-count on every one) followed by the all-gathers back, as AstraSim's
+baseline collective does. The message is split in preferred-dataset-splits
+chunks that pipeline through the dimensions, so the time is the sum of the
+per-chunk times of the dimensions plus (chunks - 1) times the slowest one
+(both halves of an all-reduce count for the dimension they run on).
+
+Scheduling policies, boost-mode and localBWAware are not modeled, the
+correction factors (time = alpha * latency term + beta * bandwidth term +
+overhead) fitted by calibrate() to recorded AstraSim runs absorb what they do
+on average. Times are in ns.
+
+    model = AnalyticalAstraSim()
+    model.collective_time(network, system, 'all-reduce', 64 * 2 ** 20)
+    model.evaluate(network, system, 'workload.txt')['CommsTime']
+
+    python analytical_model.py calibrate astrasim_runs.jsonl --out factors.json
+'''
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from scipy import optimize
+
+COLLECTIVES = ('all-reduce', 'all-gather', 'reduce-scatter', 'all-to-all')
+# comm types of the AstraSim workload files
+WORKLOAD_COLLECTIVES = {'ALLREDUCE': 'all-reduce', 'ALLGATHER': 'all-gather', 'REDUCESCATTER': 'reduce-scatter',
+                        'ALLTOALL': 'all-to-all'}
+DEFAULT_FACTORS = {'alpha': 1.0, 'beta': 1.0, 'overhead': 0.0}
+
+
+def load_network(network):
+    '''network config (dict) from a path or a dict'''
+    if isinstance(network, dict):
+        return network
+    with open(network) as f:
+        return json.load(f)
+
+
+def load_system(system):
+    '''system config (dict of str) from a general_system.txt path or a dict'''
+    if isinstance(system, dict):
+        return {key: str(value) for key, value in system.items()}
+    config = {}
+    with open(system) as f:
+        for line in f:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                config[key.strip()] = value.strip()
+    return config
+
+
+def load_workload(workload):
+    '''
+    layers of an AstraSim workload file, as (name, [(phase, compute, collective, bytes)])
+    for the forward, input gradient and weight gradient phases
+    '''
+    with open(workload) as f:
+        lines = [line.split() for line in f if line.strip()]
+    layers = []
+    for fields in lines[2:2 + int(lines[1][0])]:
+        phases = []
+        for phase, start in (('fwd', 2), ('ig', 5), ('wg', 8)):
+            compute, comm_type, size = fields[start:start + 3]
+            phases.append((phase, float(compute), WORKLOAD_COLLECTIVES.get(comm_type), float(size)))
+        layers.append((fields[0], phases))
+    return layers
+
+
+def _per_dim(network, key, dims, default=0.0):
+    values = network.get(key, [default] * dims)
+    return [float(values[d]) if d < len(values) else default for d in range(dims)]
+
+
+def dimension_costs(network, system):
+    '''per dimension: units, links, alpha (ns per step) and bandwidth (bytes/ns per unit)'''
+    dims = int(network.get('dimensions-count', len(network['units-count'])))
+    units = _per_dim(network, 'units-count', dims, 1)
+    links = _per_dim(network, 'links-count', dims, 1)
+    latency = _per_dim(network, 'link-latency', dims)
+    nic = _per_dim(network, 'nic-latency', dims)
+    router = _per_dim(network, 'router-latency', dims)
+    bandwidth = _per_dim(network, 'link-bandwidth', dims, 1)
+    topologies = network.get('topologies-per-dim', ['Ring'] * dims)
+    endpoint_delay = float(system.get('endpoint-delay', 0))
+    costs = []
+    for d in range(dims):
+        hops = 2 if topologies[d] == 'Switch' else 1
+        costs.append({'units': max(int(units[d]), 1), 'links': max(links[d], 1),
+                      'alpha': hops * latency[d] + nic[d] + router[d] * hops + endpoint_delay,
+                      'bandwidth': max(links[d], 1) * max(bandwidth[d], 1e-9)})
+    return costs
+
+
+def implementations(system, collective, dims):
+    '''the algorithm of the collective on every dimension'''
+    names = system.get(collective + '-implementation', 'ring').split('_')
+    if len(names) < dims:
+        names = names + [names[-1]] * (dims - len(names))
+    return [name.lower() for name in names[:dims]]
+
+
+def _step_terms(algorithm, n, links, size):
+    '''(steps, bytes per unit) of one reduce-scatter/all-gather (or all-to-all) pass on n units'''
+    if n <= 1:
+        return 0.0, 0.0
+    if algorithm in ('ring', 'onering'):
+        return n - 1, (n - 1) * size / n
+    if algorithm in ('direct', 'onedirect'):
+        return math.ceil((n - 1) / links), (n - 1) * size / n
+    if algorithm == 'halvingdoubling':
+        return math.ceil(math.log2(n)), (n - 1) * size / n
+    if algorithm == 'doublebinarytree':
+        return 2 * math.ceil(math.log2(n)), float(size)
+    raise ValueError('unknown collective implementation {}'.format(algorithm))
+
+
+def collective_terms(network, system, collective, size):
+    '''
+    (latency term, bandwidth term) of a collective of size bytes over all the
+    dimensions, the uncorrected time is their sum
+    '''
+    if collective not in COLLECTIVES:
+        raise ValueError('collective should be one of {}'.format(COLLECTIVES))
+    network, system = load_network(network), load_system(system)
+    costs = dimension_costs(network, system)
+    algorithms = implementations(system, collective, len(costs))
+    chunks = max(int(system.get('preferred-dataset-splits', 1)), 1)
+    chunk = float(size) / chunks
+
+    # the passes one chunk makes through the dimensions, with the size it has there
+    passes = []
+    if collective == 'all-to-all':
+        for cost, algorithm in zip(costs, algorithms):
+            steps, sent = _step_terms(algorithm, cost['units'], cost['links'], chunk)
+            if algorithm in ('ring', 'onering'):
+                # the chunks travel n / 4 hops on average on a bidirectional ring
+                sent *= max(1.0, cost['units'] / 4.0)
+            passes.append((cost, steps, sent))
+    else:
+        remaining = chunk
+        for cost, algorithm in zip(costs, algorithms):
+            steps, sent = _step_terms(algorithm, cost['units'], cost['links'], remaining)
+            passes.append((cost, steps, sent))
+            remaining /= cost['units']
+        if collective == 'all-gather':
+            # the mirror of the reduce-scatter, growing back from the shard
+            passes = passes[::-1]
+        if collective == 'all-reduce':
+            passes = passes + passes[::-1]
+
+    if not passes:
+        return 0.0, 0.0
+    # the passes of a dimension (both halves of an all-reduce) share its links
+    per_dim = {}
+    for cost, steps, sent in passes:
+        latency, bandwidth = per_dim.get(id(cost), (0.0, 0.0))
+        per_dim[id(cost)] = (latency + cost['alpha'] * steps, bandwidth + sent / cost['bandwidth'])
+    slowest = max(per_dim.values(), key=sum)
+    latency = sum(t[0] for t in per_dim.values()) + (chunks - 1) * slowest[0]
+    bandwidth = sum(t[1] for t in per_dim.values()) + (chunks - 1) * slowest[1]
+    return latency, bandwidth
+
+
+class AnalyticalAstraSim():
+    '''
+    Parameters
+    ----------------
+    factors : dict or str
+        correction factors alpha, beta and overhead, or the json file calibrate() wrote
+    '''
+    def __init__(self, factors=None):
+        if isinstance(factors, str):
+            with open(factors) as f:
+                factors = json.load(f)['factors']
+        self.factors = dict(DEFAULT_FACTORS, **(factors or {}))
+
+    def corrected(self, latency, bandwidth):
+        return self.factors['alpha'] * latency + self.factors['beta'] * bandwidth + self.factors['overhead']
+
+    def collective_time(self, network, system, collective, size):
+        '''completion time (ns) of one collective of size bytes'''
+        if size <= 0:
+            return 0.0
+        return self.corrected(*collective_terms(network, system, collective, size))
+
+    def workload_terms(self, network, system, workload, comm_scale=1.0):
+        '''summed (latency, bandwidth) terms and count of the collectives of a workload file'''
+        network, system = load_network(network), load_system(system)
+        latency, bandwidth, count = 0.0, 0.0, 0
+        for name, phases in load_workload(workload):
+            for phase, compute, collective, size in phases:
+                if collective is None or size <= 0:
+                    continue
+                l, b = collective_terms(network, system, collective, size * comm_scale)
+                latency, bandwidth, count = latency + l, bandwidth + b, count + 1
+        return latency, bandwidth, count
+
+    def evaluate(self, network, system, workload, comm_scale=1.0):
+        '''
+        in-process estimate for a workload file: CommsTime (ns, all the
+        collectives of one pass), compute time and the time of every layer
+        '''
+        network, system = load_network(network), load_system(system)
+        layers, comms, compute = [], 0.0, 0.0
+        for name, phases in load_workload(workload):
+            layer = {'layer': name}
+            for phase, phase_compute, collective, size in phases:
+                time = 0.0
+                if collective is not None and size > 0:
+                    time = self.collective_time(network, system, collective, size * comm_scale)
+                layer[phase + ' comm'] = time
+                layer[phase + ' compute'] = phase_compute
+                comms += time
+                compute += phase_compute
+            layers.append(layer)
+        return {'CommsTime': comms, 'ComputeTime': compute, 'layers': layers}
+
+
+def _record_terms(record):
+    '''(latency, bandwidth, collectives) terms of a recorded run'''
+    model = AnalyticalAstraSim()
+    if 'workload' in record:
+        return model.workload_terms(record['network'], record['system'], record['workload'],
+                                    record.get('comm_scale', 1.0))
+    latency, bandwidth = collective_terms(record['network'], record['system'], record['collective'], record['size'])
+    return latency, bandwidth, 1
+
+
+def calibrate(records):
+    '''
+    fits the correction factors (non-negative least squares on the relative
+    error) to recorded AstraSim runs. A record has the network and system
+    (configs or paths), either collective and size (bytes) or workload (path,
+    and comm_scale), and time, the measured time.
+
+    returns (factors, report) with the mean and max relative error of the fit
+    and the leave-one-out mean relative error
+    '''
+    if len(records) < 3:
+        raise ValueError('calibration needs at least 3 records')
+    terms = np.array([_record_terms(record) for record in records], dtype=float)
+    measured = np.array([float(record['time']) for record in records])
+    # rows scaled by 1 / measured: the fit minimizes the relative error
+    A = terms / measured[:, None]
+    b = np.ones(len(records))
+    coefficients, _ = optimize.nnls(A, b)
+    predicted = terms @ coefficients
+    error = np.abs(predicted - measured) / measured
+
+    loo = []
+    for i in range(len(records)):
+        keep = np.arange(len(records)) != i
+        c, _ = optimize.nnls(A[keep], b[keep])
+        loo.append(abs(terms[i] @ c - measured[i]) / measured[i])
+    uncalibrated = np.abs(terms[:, 0] + terms[:, 1] - measured) / measured
+
+    factors = {'alpha': float(coefficients[0]), 'beta': float(coefficients[1]),
+               # the overhead is per collective, the third column counts them
+               'overhead': float(coefficients[2])}
+    report = {'records': len(records), 'mean_relative_error': float(error.mean()),
+              'max_relative_error': float(error.max()), 'loo_mean_relative_error': float(np.mean(loo)),
+              'uncalibrated_mean_relative_error': float(uncalibrated.mean())}
+    return factors, report
+
+
+def load_records(path):
+    '''recorded runs, one json object per line, relative config and workload paths are relative to the file'''
+    base = os.path.dirname(os.path.abspath(path))
+    records = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            for key in ('network', 'system', 'workload'):
+                if isinstance(record.get(key), str):
+                    record[key] = os.path.join(base, record[key])
+            records.append(record)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    cal = subparsers.add_parser('calibrate', help='fit the correction factors to recorded AstraSim runs')
+    cal.add_argument('records', help='jsonl of recorded runs')
+    cal.add_argument('--out', help='json file for the factors and the fit report')
+    est = subparsers.add_parser('estimate', help='estimate the communication time of a workload')
+    est.add_argument('network')
+    est.add_argument('system')
+    est.add_argument('workload')
+    est.add_argument('--factors', help='json file written by calibrate')
+    est.add_argument('--comm-scale', type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'calibrate':
+        factors, report = calibrate(load_records(args.records))
+        print(json.dumps({'factors': factors, 'report': report}, indent=4))
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump({'factors': factors, 'report': report}, f, indent=4)
+    else:
+        result = AnalyticalAstraSim(args.factors).evaluate(args.network, args.system, args.workload, args.comm_scale)
+        print('CommsTime: {}'.format(result['CommsTime']))
+        print('ComputeTime: {}'.format(result['ComputeTime']))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
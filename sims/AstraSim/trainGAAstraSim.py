@@ -12,6 +12,8 @@ os.sys.path.insert(0, os.path.abspath('../../arch_gym'))
 from sko.GA import GA
 from configs import arch_gym_configs
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.param_space import astrasim_param_space
+from arch_gym.envs.profiler import profiler
 from arch_gym.envs import AstraSimWrapper
 import envlogger
 
@@ -32,6 +34,9 @@ flags.DEFINE_bool('use_envlogger', True, 'Whether to use envlogger.')
 
 FLAGS = flags.FLAGS
 
+# decodes the GA population to the action dicts of AstraSimEnv
+ASTRASIM_SPACE = astrasim_param_space()
+
 def generate_run_directories():
     # Construct the exp name from seed and num_iter
     exp_name = FLAGS.workload + "_num_iter_" + str(FLAGS.num_steps) + "_num_agents_" + str(FLAGS.num_agents) + "_prob_mut_" + str(FLAGS.prob_mutation)
@@ -44,6 +49,7 @@ def generate_run_directories():
     return traject_dir, exp_log_dir
 
 
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
         df = pd.DataFrame([fitness_dict['reward']])
         csvfile = os.path.join(filename, "fitness.csv")
@@ -75,7 +81,6 @@ def AstraSim_optimization_function(p):
     
     env = AstraSimWrapper.make_astraSim_env(rl_form='random_walker')
     fitness_hist = {}
-    astraSim_helper = helpers()
 
     traject_dir, exp_log_dir = generate_run_directories()
     
@@ -93,7 +98,7 @@ def AstraSim_optimization_function(p):
     env.reset()
 
     # decode the actions
-    action_dict = astraSim_helper.action_decoder_ga_astraSim(p)
+    action_dict = ASTRASIM_SPACE.decode(p)[0]
 
     # take a step
     step_type, reward, discount, info = env.step(action_dict)
@@ -126,13 +131,13 @@ def main(_):
     # hard code dimension count to 3
     ga = GA(
         func=AstraSim_optimization_function,
-        n_dim=44, 
+        n_dim=ASTRASIM_SPACE.n_dim, 
         size_pop=FLAGS.num_agents,
         max_iter=FLAGS.num_steps,
         prob_mut=FLAGS.prob_mutation,
-        lb=[0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-        ub=[2, 2, 2, 2, 2, 2, 8, 8, 8, 500, 500, 500, 250, 250, 250, 10, 10, 10, 500, 500, 500, 500, 500, 500, 1, 1, 1, 1, 10, 32, 1, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 1],
-        precision=[1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
+        lb=ASTRASIM_SPACE.lb,
+        ub=ASTRASIM_SPACE.ub,
+        precision=ASTRASIM_SPACE.precision
     )
     
     best_x, best_y = ga.run()
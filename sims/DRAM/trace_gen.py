@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+
+'''
+Synthetic DRAMSys trace (.stl) generation.
+
+A trace line is "<cycle>:\t<read|write>\t<hex address>". Generators produce
+requests in chunks of numpy arrays (is_write, address) and compose:
+
+    Stream      sequential lines through [start, end), wrapping around
+    Strided     same with a fixed stride
+    Random      uniform aligned addresses in [start, end)
+    PointerChase  dependent walk visiting every line of [start, end) once per
+                round in a pseudo random order, O(1) memory
+    Replay      requests of an existing .stl file (looped)
+    Mixture     phases of phase_length requests, each taken from a component
+                picked by weight; components keep their position
+
+Every generator has its own seed, so a trace is a deterministic function of the
+spec. write_trace() streams chunk by chunk to disk, memory does not grow with
+the trace length. subsample_trace() shortens a long trace by keeping a window
+of every period lines.
+
+    python sims/DRAM/trace_gen.py generate spec.json out.stl --length 1000000
+    python sims/DRAM/trace_gen.py subsample long.stl short.stl --window 1000 --period 10000
+
+with a spec like
+
+    {"type": "mixture", "phase_length": 500, "seed": 1, "components": [
+        {"type": "stream", "weight": 3, "write_ratio": 0.3},
+        {"type": "random", "weight": 1, "start": 0, "end": 1073741824}]}
+'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
+
+import numpy as np
+
+LINE_SIZE = 64
+DEFAULT_END = 1 << 30
+CHUNK_SIZE = 1 << 16
+
+
+class TraceGenerator():
+    '''
+    Base class, subclasses implement _addresses(n). write_ratio is the fraction
+    of write requests, drawn independently per request.
+    '''
+    def __init__(self, write_ratio=0.0, seed=0):
+        assert 0.0 <= write_ratio <= 1.0, 'write_ratio must be in [0, 1]'
+        self.write_ratio = write_ratio
+        # separate streams for the addresses and the commands so the trace does not depend on the chunk sizes
+        address_seed, command_seed = np.random.SeedSequence(seed).spawn(2)
+        self.rng = np.random.default_rng(address_seed)
+        self.command_rng = np.random.default_rng(command_seed)
+
+    def chunk(self, n):
+        '''(is_write bool array, address uint64 array) of the next n requests'''
+        addresses = self._addresses(n)
+        if self.write_ratio == 0.0:
+            writes = np.zeros(n, dtype=bool)
+        else:
+            writes = self.command_rng.random(n) < self.write_ratio
+        return writes, addresses
+
+    def _addresses(self, n):
+        raise NotImplementedError
+
+
+class Strided(TraceGenerator):
+    '''addresses start, start + stride, ... wrapping around at end'''
+    def __init__(self, start=0, end=DEFAULT_END, stride=LINE_SIZE, write_ratio=0.0, seed=0):
+        super().__init__(write_ratio, seed)
+        assert end > start and stride > 0, 'need start < end and stride > 0'
+        self.start = start
+        self.span = end - start
+        self.stride = stride
+        self.position = 0
+
+    def _addresses(self, n):
+        offsets = (self.position + self.stride * np.arange(n, dtype=np.uint64)) % np.uint64(self.span)
+        self.position = int((self.position + self.stride * n) % self.span)
+        return offsets + np.uint64(self.start)
+
+
+class Stream(Strided):
+    '''sequential cache lines'''
+    def __init__(self, start=0, end=DEFAULT_END, write_ratio=0.0, seed=0, line_size=LINE_SIZE):
+        super().__init__(start, end, line_size, write_ratio, seed)
+
+
+class Random(TraceGenerator):
+    '''uniform addresses in [start, end) aligned to align bytes'''
+    def __init__(self, start=0, end=DEFAULT_END, align=LINE_SIZE, write_ratio=0.0, seed=0):
+        super().__init__(write_ratio, seed)
+        assert end - start >= align, 'the range must hold at least one aligned address'
+        self.start = start
+        self.align = align
+        self.num_lines = (end - start) // align
+
+    def _addresses(self, n):
+        lines = self.rng.integers(0, self.num_lines, size=n, dtype=np.uint64)
+        return lines * np.uint64(self.align) + np.uint64(self.start)
+
+
+class PointerChase(TraceGenerator):
+    '''
+    Linked list traversal: each address depends on the previous one and every
+    line of the range is visited once per round. The order is a full period
+    LCG over the next power of two (values outside the range are skipped), so
+    no permutation table is kept.
+    '''
+    def __init__(self, start=0, end=DEFAULT_END, align=LINE_SIZE, write_ratio=0.0, seed=0):
+        super().__init__(write_ratio, seed)
+        self.start = start
+        self.align = align
+        self.num_lines = (end - start) // align
+        assert self.num_lines > 0, 'the range must hold at least one aligned address'
+        self.modulus = 1 << max(2, (self.num_lines - 1).bit_length())
+        # Hull-Dobell: c odd and a = 1 (mod 4) give a full period for a power of two modulus
+        self.multiplier = 4 * int(self.rng.integers(1, self.modulus // 4 + 1)) + 1
+        self.increment = 2 * int(self.rng.integers(0, self.modulus // 2)) + 1
+        self.current = int(self.rng.integers(0, self.num_lines))
+
+    def _addresses(self, n):
+        lines = np.empty(n, dtype=np.uint64)
+        x, a, c, m, limit = self.current, self.multiplier, self.increment, self.modulus, self.num_lines
+        for i in range(n):
+            x = (a * x + c) % m
+            while x >= limit:
+                x = (a * x + c) % m
+            lines[i] = x
+        self.current = x
+        return lines * np.uint64(self.align) + np.uint64(self.start)
+
+
+class Replay(TraceGenerator):
+    '''requests (command and address) of an existing .stl trace, starting over at its end'''
+    def __init__(self, path, loop=True):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.file = open(path, 'r')
+
+    def chunk(self, n):
+        writes = np.empty(n, dtype=bool)
+        addresses = np.empty(n, dtype=np.uint64)
+        i = 0
+        while i < n:
+            line = self.file.readline()
+            if not line:
+                if not self.loop or i == 0 and self.file.tell() == 0:
+                    raise EOFError('{} has no more requests'.format(self.path))
+                self.file.seek(0)
+                continue
+            request = parse_line(line)
+            if request is None:
+                continue
+            _, command, address = request
+            writes[i] = command == 'write'
+            addresses[i] = address
+            i += 1
+        return writes, addresses
+
+    def close(self):
+        self.file.close()
+
+
+class Mixture(TraceGenerator):
+    '''
+    Phases of phase_length requests, the component of each phase is drawn by
+    weight (uniformly without weights). The components continue where their
+    previous phase stopped.
+    '''
+    def __init__(self, components, weights=None, phase_length=1000, seed=0):
+        super().__init__()
+        assert len(components) > 0, 'need at least one component'
+        assert weights is None or len(weights) == len(components), 'one weight per component'
+        self.components = list(components)
+        self.weights = weights
+        self.phase_length = phase_length
+        self.chooser = random.Random(seed)
+        self.current = None
+        self.remaining = 0
+
+    def _next_component(self):
+        idx = range(len(self.components))
+        if self.weights is None:
+            return self.components[self.chooser.choice(idx)]
+        return self.components[self.chooser.choices(idx, weights=self.weights)[0]]
+
+    def chunk(self, n):
+        writes, addresses = [], []
+        while n > 0:
+            if self.remaining == 0:
+                self.current = self._next_component()
+                self.remaining = self.phase_length
+            take = min(n, self.remaining)
+            w, a = self.current.chunk(take)
+            writes.append(w)
+            addresses.append(a)
+            self.remaining -= take
+            n -= take
+        return np.concatenate(writes), np.concatenate(addresses)
+
+
+GENERATORS = {
+    'stream': Stream,
+    'strided': Strided,
+    'random': Random,
+    'pointer_chase': PointerChase,
+    'replay': Replay,
+}
+
+
+def build_generator(spec, seed=0):
+    '''
+    Generator from a dict spec ({"type": ..., params}). Mixtures take
+    "components" (with an optional "weight" each) and "phase_length"; components
+    without a seed get seed + their index so they draw different streams.
+    '''
+    spec = dict(spec)
+    kind = spec.pop('type')
+    spec.setdefault('seed', seed)
+    if kind == 'mixture':
+        components = spec.pop('components')
+        weights = [c.get('weight', 1.0) for c in components]
+        built = [build_generator({k: v for k, v in c.items() if k != 'weight'}, spec['seed'] + 1 + i)
+                 for i, c in enumerate(components)]
+        return Mixture(built, weights=weights, **spec)
+    if kind not in GENERATORS:
+        raise ValueError('unknown generator {}, expected mixture or one of {}'.format(kind, sorted(GENERATORS)))
+    if kind == 'replay':
+        spec.pop('seed')
+    return GENERATORS[kind](**spec)
+
+
+def format_lines(cycles, writes, addresses):
+    commands = np.where(writes, 'write', 'read')
+    return ''.join('{}:\t{}\t0x{:X}\n'.format(c, cmd, a)
+                   for c, cmd, a in zip(cycles.tolist(), commands.tolist(), addresses.tolist()))
+
+
+def parse_line(line):
+    '''(cycle, command, address) of a trace line, None for blank and comment lines'''
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    cycle, rest = line.split(':', 1)
+    fields = rest.split()
+    # lines may carry a "(<length>)" burst field before the command
+    if fields[0].startswith('('):
+        fields = fields[1:]
+    return int(cycle), fields[0], int(fields[1], 16)
+
+
+@contextmanager
+def _atomic_output(path):
+    '''file object writing to a temp file that replaces path when the block completes'''
+    dir_name = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+        # mkstemp creates the file private
+        os.chmod(tmp_path, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_trace(path, generator, length, interval=1, chunk_size=CHUNK_SIZE):
+    '''
+    Streams length requests of generator to path, one every interval cycles.
+    The file is replaced atomically once complete.
+    '''
+    with _atomic_output(path) as f:
+        for first in range(0, length, chunk_size):
+            n = min(chunk_size, length - first)
+            writes, addresses = generator.chunk(n)
+            cycles = np.arange(first, first + n, dtype=np.int64) * interval
+            f.write(format_lines(cycles, writes, addresses))
+    return path
+
+
+def subsample_trace(src, dst, window=1000, period=10000, offset=0, max_lines=None, chunk_size=CHUNK_SIZE):
+    '''
+    Keeps lines [offset + k * period, offset + k * period + window) of src.
+    Cycles are shifted so the skipped parts take no time: the gap in front of
+    a kept line is the one it had in src. Returns the number of lines written.
+    '''
+    assert 0 < window <= period, 'need 0 < window <= period'
+    kept = 0
+    index = 0
+    prev_cycle = None
+    out_cycle = 0
+    with open(src, 'r') as fin, _atomic_output(dst) as fout:
+        while max_lines is None or kept < max_lines:
+            lines = list(islice(fin, chunk_size))
+            if not lines:
+                break
+            out = []
+            for line in lines:
+                stripped = line.strip()
+                if not stripped or stripped.startswith('#'):
+                    continue
+                cycle_text, rest = stripped.split(':', 1)
+                cycle = int(cycle_text)
+                if index >= offset and (index - offset) % period < window:
+                    if kept > 0:
+                        out_cycle += cycle - prev_cycle
+                    out.append('{}:{}\n'.format(out_cycle, rest))
+                    kept += 1
+                    if max_lines is not None and kept >= max_lines:
+                        break
+                prev_cycle = cycle
+                index += 1
+            fout.write(''.join(out))
+    return kept
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DRAMSys .stl trace generation')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    gen = sub.add_parser('generate', help='write a synthetic trace')
+    gen.add_argument('spec', help='json file or inline json with the generator spec')
+    gen.add_argument('output')
+    gen.add_argument('--length', type=int, default=10000)
+    gen.add_argument('--interval', type=int, default=1, help='cycles between requests')
+    gen.add_argument('--seed', type=int, default=0)
+    sample = sub.add_parser('subsample', help='keep a window of every period lines of a trace')
+    sample.add_argument('input')
+    sample.add_argument('output')
+    sample.add_argument('--window', type=int, default=1000)
+    sample.add_argument('--period', type=int, default=10000)
+    sample.add_argument('--offset', type=int, default=0)
+    sample.add_argument('--max_lines', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'generate':
+        if os.path.isfile(args.spec):
+            with open(args.spec) as f:
+                spec = json.load(f)
+        else:
+            spec = json.loads(args.spec)
+        write_trace(args.output, build_generator(spec, args.seed), args.length, args.interval)
+        print('wrote {} requests to {}'.format(args.length, args.output))
+    else:
+        kept = subsample_trace(args.input, args.output, args.window, args.period, args.offset, args.max_lines)
+        print('kept {} lines of {} in {}'.format(kept, args.input, args.output))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
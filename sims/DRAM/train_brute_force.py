@@ -1,26 +1,46 @@
 import os
+import shutil
 import sys
+import tempfile
+from multiprocessing import util
 
 from absl import flags
 from absl import app
 from absl import logging
 
 os.sys.path.insert(0, os.path.abspath('../../'))
+os.sys.path.insert(0, os.path.abspath('../../arch_gym/envs'))
 from configs import arch_gym_configs
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.profiler import profiler
 from arch_gym.envs import dramsys_wrapper
+from param_space import dramsys_param_space
+from sweep import Sweep, run_sweep
 import envlogger
-import numpy as np
 import pandas as pd
 
 flags.DEFINE_string('workload', 'stream.stl', 'Which DRAMSys workload to run?')
-flags.DEFINE_integer('num_steps', 10000, 'Number of training steps.')
-flags.DEFINE_integer('num_episodes', 1, 'Number of training episodes.')
-flags.DEFINE_string('traject_dir', 
-                    'random_walker_trajectories', 
+flags.DEFINE_integer('shard', 0, 'Shard of the sweep to run on this host.')
+flags.DEFINE_integer('num_shards', 1, 'Number of shards (hosts) the sweep is split into.')
+flags.DEFINE_integer('workers', 1, 'Parallel DRAMSys runs.')
+flags.DEFINE_integer('max_points', None, 'Stop after this many points, the next run resumes.')
+flags.DEFINE_string('out_dir', 'brute_force_sweeps', 'Directory to save the results.')
+flags.DEFINE_string('traject_dir',
+                    'random_walker_trajectories',
             'Directory to save the dataset.')
 FLAGS = flags.FLAGS
 
+# values of the parameters that are not swept over their whole range
+SWEEP_VALUES = {
+    'RequestBufferSize': [1, 2, 3, 5, 6, 7, 8],
+    'MaxActiveTransactions': [1, 2, 4, 8, 16, 32, 48, 64, 96, 128],
+}
+
+_env = None
+_traject_dir = None
+
+
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
         df = pd.DataFrame([fitness_dict['reward']])
         csvfile = os.path.join(filename, "fitness.csv")
@@ -30,89 +50,76 @@ def log_fitness_to_csv(filename, fitness_dict):
         csvfile = os.path.join(filename, "actions.csv")
         df.to_csv(csvfile, index=False, header=False, mode='a')
 
-def main(_):
+
+def make_env():
+    '''
+    env of this (worker) process. It simulates from its own copy of the DRAMSys configs, so the workers
+    don't overwrite each other's memory controller config, and logs its trajectories into its own directory
+    '''
+    workdir = tempfile.mkdtemp(prefix='dramsys_')
+    helpers().create_dramsys_workdir(workdir)
     env = dramsys_wrapper.make_dramsys_env()
-    dram_helper = helpers()
-    
-    fitness_hist = {}
 
-    # experiment name 
-    exp_name = str(FLAGS.workload)+"_num_steps_" + str(FLAGS.num_steps) + "_num_episodes_" + str(FLAGS.num_episodes)
+    traject_dir = _traject_dir
+    if FLAGS.workers > 1:
+        traject_dir = os.path.join(_traject_dir, 'worker_{}'.format(os.getpid()))
+    os.makedirs(traject_dir, exist_ok=True)
+    logging.info('Wrapping environment with EnvironmentLogger...')
+    env = envlogger.EnvLogger(env,
+                 data_directory=traject_dir,
+                 max_episodes_per_file=1000,
+                 metadata={
+                'agent_type': 'brute_force',
+                'env_type': type(env).__name__,
+                'shard': FLAGS.shard,
+                'num_shards': FLAGS.num_shards,
+                })
+    # the trajectories are written out when the env is closed, at the end of the sweep or of the worker
+    util.Finalize(None, close_env, args=(env, workdir), exitpriority=10)
+    return env
+
+
+def close_env(env, workdir):
+    env.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+def evaluate(action_dict):
+    # one env per worker process
+    global _env
+    if _env is None:
+        _env = make_env()
+    _, reward, _, _ = _env.step(action_dict)
+    return float(reward)
+
+
+def main(_):
+    global _traject_dir
+    sweep = Sweep(dramsys_param_space(), values=SWEEP_VALUES)
+    print("Total combinations: ", len(sweep))
+
+    # experiment name
+    exp_name = str(FLAGS.workload) + "_brute_force"
+    out_dir = os.path.join(os.getcwd(), FLAGS.out_dir, exp_name)
 
     # append logs to base path
     log_path = os.path.join(os.getcwd(), 'random_walker_logs', exp_name)
 
     # get the current working directory and append the exp name
-    traject_dir = os.path.join(os.getcwd(), FLAGS.traject_dir, exp_name)
+    _traject_dir = os.path.join(os.getcwd(), FLAGS.traject_dir, exp_name)
 
     # check if log_path exists else create it
     if not os.path.exists(log_path):
         os.makedirs(log_path)
 
-    if not os.path.exists(traject_dir):
-        os.makedirs(traject_dir)
+    def log_result(index, action_dict, metrics):
+        # the results come back to this process in index order, so the rows of fitness.csv and actions.csv match
+        log_fitness_to_csv(log_path, {'reward': metrics['reward'], 'action': action_dict})
+
+    evaluated = run_sweep(sweep, evaluate, out_dir, shard=FLAGS.shard, num_shards=FLAGS.num_shards,
+                          workers=FLAGS.workers, max_points=FLAGS.max_points, on_result=log_result)
+    print("Evaluated {} points, results in {}".format(evaluated, out_dir))
+
 
-    logging.info('Wrapping environment with EnvironmentLogger...')
-    with envlogger.EnvLogger(env,
-                 data_directory=traject_dir,
-                 max_episodes_per_file=1000,
-                 metadata={
-                'agent_type': 'random',
-                'env_type': type(env).__name__,
-                'num_episodes': FLAGS.num_episodes,
-                }) as env:
-        
-        logging.info('Done wrapping environment with EnvironmentLogger.')
-
-        pagepolicy = [0, 1, 2, 3]
-        scheduler = [0, 1, 2] #random.randint(0,2)
-        schedulerbuffer = [0, 1, 2] #random.randint(0,2)
-        reqest_buffer_size = [1, 2, 3, 5, 6, 7, 8] #random.randint(1,8)
-        respqueue = [0, 1] #random.randint(0,1)
-        refreshpolicy = [0, 1] #random.randint(0,1)
-        refreshmaxpostponed = [1, 2, 3, 4, 5, 6, 7, 8] #random.randint(1,8)
-        refreshmaxpulledin = [1, 2, 3, 4, 5, 6, 7, 8] #random.randint(1,8)
-        powerdownpolicy = [0, 1, 2] #random.randint(0,2)
-        arbiter = [0, 1, 2] #random.randint(0,2)
-        maxactivetransactions = [1, 2, 4, 8, 16, 32, 48, 64, 96, 128]  #random.randint(1,128)
-
-        total_combinations = len(pagepolicy) * len(scheduler) * len(schedulerbuffer) * len(reqest_buffer_size) * len(respqueue) * len(refreshpolicy) * len(refreshmaxpostponed) * len(refreshmaxpulledin) * len(powerdownpolicy) * len(arbiter) * len(maxactivetransactions)
-
-        print("Total combinations: ", total_combinations)
-
-        for each_pagepolicy in pagepolicy:
-            for each_scheduler in scheduler:
-                for each_schedulerbuffer in schedulerbuffer:
-                    for each_reqest_buffer_size in reqest_buffer_size:
-                        for each_respqueue in respqueue:
-                            for each_refreshpolicy in refreshpolicy:
-                                for each_refreshmaxpostponed in refreshmaxpostponed:
-                                    for each_refreshmaxpulledin in refreshmaxpulledin:
-                                        for each_powerdownpolicy in powerdownpolicy:
-                                            for each_arbiter in arbiter:
-                                                for each_maxactivetransactions in maxactivetransactions:
-                                                    action = np.asarray([each_pagepolicy, 
-                                                            each_scheduler,
-                                                            each_schedulerbuffer,
-                                                            each_reqest_buffer_size,
-                                                            each_respqueue,
-                                                            each_refreshpolicy,
-                                                            each_refreshmaxpostponed,
-                                                            each_refreshmaxpulledin,
-                                                            each_powerdownpolicy,
-                                                            each_arbiter, 
-                                                            each_maxactivetransactions])
-        
-                                                    # decode the actions
-                                                    action_dict = dram_helper.action_decoder_ga(action)
-
-                                                    _, reward, _, _ = env.step(action_dict)
-                                                    fitness_hist['reward'] = reward
-                                                    fitness_hist['action'] = action_dict
-        
-                                                    # log fitness to csv
-                                                    log_fitness_to_csv(log_path, fitness_hist)
- 
 if __name__ == '__main__':
    app.run(main)
-
@@ -6,6 +6,7 @@ from configs import arch_gym_configs
 from arch_gym.envs.DRAMEnv import DRAMEnv
 from arch_gym.envs import dramsys_wrapper
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.param_space import dramsys_param_space
 import envlogger
 from sko.GA import GA
 import json
@@ -29,6 +30,9 @@ flags.DEFINE_string('summary_dir', '.', 'Directory to save the summary.')
 
 FLAGS = flags.FLAGS
 
+# decodes the GA population to memory controller configs
+DRAMSYS_SPACE = dramsys_param_space()
+
 def wrap_in_envlogger(env, envlogger_dir):
     metadata = {
         'agent_type': 'RandomWalker',
@@ -65,9 +69,8 @@ def dram_optimization_function(p):
     '''
     rewards = []
     print("Agents Action", p)
-    # instantiate the environment and the helpers
+    # instantiate the environment
     env = dramsys_wrapper.make_dramsys_env(reward_formulation = FLAGS.reward_formulation)
-    dram_helper = helpers()
 
     traject_dir, exp_log_dir = generate_run_directories()
     
@@ -79,7 +82,7 @@ def dram_optimization_function(p):
     env.reset()
 
     # decode the actions
-    action_dict = dram_helper.action_decoder_ga(p)
+    action_dict = DRAMSYS_SPACE.decode(p)[0]
             
     # take a step in the environment
     _, reward, done, info = env.step(action_dict)
@@ -107,13 +110,13 @@ def main(_):
 
     ga = GA(
         func=dram_optimization_function, 
-        n_dim=10, 
+        n_dim=DRAMSYS_SPACE.n_dim, 
         size_pop=FLAGS.num_agents,
         max_iter=FLAGS.num_iter,
         prob_mut=FLAGS.prob_mutation,
-        lb=[0, 0, 0, 1, 0, 0, 1, 1, 0, 1], 
-        ub=[3, 2, 2, 8, 1, 1, 8, 8, 2, 128], 
-        precision=[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0] 
+        lb=DRAMSYS_SPACE.lb, 
+        ub=DRAMSYS_SPACE.ub, 
+        precision=DRAMSYS_SPACE.precision 
     )
 
     best_x, best_y = ga.run()
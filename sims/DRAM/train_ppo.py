@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 
 os.sys.path.insert(0, os.path.abspath('../../'))
@@ -22,6 +23,7 @@ from acme.utils.loggers import aggregators
 from acme.utils.loggers import base
 
 from arch_gym.envs import dramsys_wrapper
+from arch_gym.envs.envHelpers import helpers as env_helpers
 
 print("Import Successful")
 
@@ -39,6 +41,8 @@ flags.DEFINE_string('summarydir', './logs', 'Directory to save summaries.')
 flags.DEFINE_bool(
     'run_distributed', False, 'Should an agent be executed in a '
     'distributed way (the default is a single-threaded agent)')
+flags.DEFINE_integer('num_actors', 4, 'Actors collecting rollouts in parallel, each one with its own DRAMSys '
+                     'workdir (distributed only).')
 
 
 def _logger_factory(logger_label: str) -> base.Logger:
@@ -72,6 +76,12 @@ def _logger_factory(logger_label: str) -> base.Logger:
     raise ValueError(
         f'Improper value for logger label. Logger_label is {logger_label}')
 
+def make_distributed_environment(seed):
+    """DRAMSys env of a distributed actor, it simulates from its own DRAMSys workdir."""
+    env_helpers().create_dramsys_workdir(tempfile.mkdtemp(prefix='dramsys_'))
+    return dramsys_wrapper.make_dramsys_env()
+
+
 def build_experiment_config():
     """Builds the experiment configuration."""
     env = dramsys_wrapper.make_dramsys_env()
@@ -88,7 +98,7 @@ def build_experiment_config():
 
     return experiments.ExperimentConfig(
         builder=ppo_builder,
-        environment_factory=lambda seed: env,
+        environment_factory=(make_distributed_environment if FLAGS.run_distributed else lambda seed: env),
         network_factory=lambda spec: ppo.make_networks(env_spec, layer_sizes),
         policy_network_factory = ppo.make_inference_fn,
         eval_policy_network_factory = make_eval_policy,
@@ -99,8 +109,9 @@ def build_experiment_config():
 def main(_):
   config = build_experiment_config()
   if FLAGS.run_distributed:
+    import launchpad as lp
     program = experiments.make_distributed_experiment(
-        experiment=config, num_actors=4)
+        experiment=config, num_actors=FLAGS.num_actors)
     lp.launch(program, xm_resources=lp_utils.make_xm_docker_resources(program))
   else:
     experiments.run_experiment(
@@ -8,6 +8,7 @@ from absl import logging
 os.sys.path.insert(0, os.path.abspath('../../'))
 from configs import arch_gym_configs
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.profiler import profiler
 from arch_gym.envs import dramsys_wrapper
 import envlogger
 import numpy as np
@@ -24,6 +25,7 @@ flags.DEFINE_string('summary_dir', '.', 'Directory to save the summary.')
 flags.DEFINE_string('reward_formulation', 'power', 'Which reward formulation to use?')
 FLAGS = flags.FLAGS
 
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
         df = pd.DataFrame([fitness_dict['reward']])
         csvfile = os.path.join(filename, "fitness.csv")
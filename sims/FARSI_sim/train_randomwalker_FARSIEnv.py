@@ -45,6 +45,7 @@ from absl import logging
 os.sys.path.insert(0, os.path.abspath('../../'))
 from configs import arch_gym_configs
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.profiler import profiler
 from arch_gym.envs import FARSI_sim_wrapper
 import envlogger
 import numpy as np
@@ -59,6 +60,7 @@ flags.DEFINE_string('reward_formulation', 'power', 'Which reward formulation to
 flags.DEFINE_bool('use_envlogger', False, 'Whether to use envlogger.')
 FLAGS = flags.FLAGS
 
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
 
         # create filename directory if it doesn't exist
@@ -0,0 +1,120 @@
+"""
+ flow_validation.py :- compares the flow-level network model with the
+ packet-level one on the bundled apps for small interconnect configurations.
+
+ Every (app, topology) case is run twice in a subprocess, once with
+ "network_model": "packet" and once with "network_model": "flow"; the
+ predicted application time, the number of simulated events and the
+ wall-clock time are reported, together with the relative error of the
+ flow-level prediction.
+
+ Usage: python flow_validation.py [--apps snapsim,stream] [--topologies torus,dragonfly,fattree]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+apps_dir = os.path.dirname(os.path.abspath(__file__))
+ppt_dir = os.path.dirname(apps_dir)
+
+# app name: (directory, script, arguments, regex of the predicted time)
+APPS = {
+    "snapsim": ("snapsim", "snapsim-mpi.py", ["in"], r"Total time \(sec\):\s*([0-9.eE+-]+)"),
+    "stream": ("STREAMsim", "stream_sim.py", ["bb_mystreamM10K_sd_prof.dat"],
+               r"predicted runtime \(s\):\s*([0-9.eE+-]+)"),
+}
+
+# small configurations: interconnect type, topology key, base config from
+# interconnect/configs and the (numeric) parameters overriding it
+TOPOLOGIES = {
+    "torus": ("Gemini", "torus", "cielo_intercon", {"dimx": 2, "dimy": 2, "dimz": 2}),
+    "dragonfly": ("Dragonfly", "dragonfly", "dragonfly_intercon",
+                  {"num_groups": 3, "num_switches_per_group": 2, "num_hosts_per_switch": 2,
+                   "num_inter_links_per_switch": 1, "num_intra_links_per_switch": 1}),
+    "fattree": ("Fattree", "fattree", "mustang_intercon", {"num_levels": 2}),
+}
+
+# runs inside the app directory; patches Cluster so that the app builds the
+# requested interconnect, then runs the app script as __main__
+DRIVER = r'''
+import json, runpy, sys
+sys.path.insert(0, %(ppt_dir)r)
+spec = json.loads(%(spec)r)
+sys.argv = [spec["script"]] + spec["args"]
+import ppt, interconnect
+from cluster import Cluster
+topo = dict(getattr(interconnect, spec["base"]))
+topo.update(spec["params"])
+init = Cluster.__init__
+def patched_init(self, hpcsim_dict=None, **kargs):
+    hpcsim_dict.pop("torus", None)
+    hpcsim_dict["intercon_type"] = str(spec["intercon_type"])
+    hpcsim_dict[str(spec["topology"])] = topo
+    hpcsim_dict["network_model"] = str(spec["network_model"])
+    hpcsim_dict["debug_options"] = set()
+    init(self, hpcsim_dict, **kargs)
+Cluster.__init__ = patched_init
+start_mpi = Cluster.start_mpi
+def patched_start_mpi(self, hostmap, main_process, *args):
+    # one rank per host, so that the ranks talk over the network
+    nhosts = self.intercon.num_hosts()
+    start_mpi(self, [i %% nhosts for i in range(len(hostmap))], main_process, *args)
+Cluster.start_mpi = patched_start_mpi
+runpy.run_path(spec["script"], run_name="__main__")
+'''
+
+def run_case(python, app, topology, network_model):
+    """Runs one app on one topology; returns (predicted time, events, wall-clock time)."""
+
+    app_dir, script, args, time_re = APPS[app]
+    intercon_type, key, base, params = TOPOLOGIES[topology]
+    spec = {"script": script, "args": args, "intercon_type": intercon_type,
+            "topology": key, "base": base, "params": params, "network_model": network_model}
+    code = DRIVER % {"ppt_dir": ppt_dir, "spec": json.dumps(spec)}
+    start = time.time()
+    proc = subprocess.Popen([python, "-c", code], cwd=os.path.join(apps_dir, app_dir),
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    out = proc.communicate()[0].decode("utf-8", "replace")
+    wall = time.time()-start
+    m = re.findall(time_re, out)
+    if proc.returncode != 0 or not m:
+        raise Exception("%s on %s (%s) failed:\n%s" % (app, topology, network_model, out[-2000:]))
+    events = re.findall(r"SIMULATED EVENTS:\s*([0-9]+)", out)
+    return float(m[-1]), int(events[-1]) if events else -1, wall
+
+def main():
+    parser = argparse.ArgumentParser(description="flow-level vs packet-level network model")
+    parser.add_argument("--apps", default=",".join(sorted(APPS)))
+    parser.add_argument("--topologies", default=",".join(sorted(TOPOLOGIES)))
+    parser.add_argument("--python", default=sys.executable, help="interpreter that runs PPT")
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    opts = parser.parse_args()
+
+    results = []
+    print("%-8s %-10s %14s %14s %9s %10s %10s %8s" %
+          ("app", "topology", "packet (s)", "flow (s)", "error", "events", "flow evts", "speedup"))
+    for app in opts.apps.split(","):
+        for topology in opts.topologies.split(","):
+            t_pkt, ev_pkt, wall_pkt = run_case(opts.python, app, topology, "packet")
+            t_flow, ev_flow, wall_flow = run_case(opts.python, app, topology, "flow")
+            error = abs(t_flow-t_pkt)/t_pkt if t_pkt > 0 else 0.0
+            speedup = wall_pkt/wall_flow if wall_flow > 0 else float("inf")
+            print("%-8s %-10s %14.9g %14.9g %8.3f%% %10d %10d %7.2fx" %
+                  (app, topology, t_pkt, t_flow, 100*error, ev_pkt, ev_flow, speedup))
+            results.append({"app": app, "topology": topology,
+                            "packet_time": t_pkt, "flow_time": t_flow, "rel_error": error,
+                            "packet_events": ev_pkt, "flow_events": ev_flow,
+                            "packet_wall": wall_pkt, "flow_wall": wall_flow})
+    if results:
+        print("max relative error: %.3f%%" % (100*max(r["rel_error"] for r in results)))
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
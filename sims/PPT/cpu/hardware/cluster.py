@@ -110,6 +110,11 @@ class Cluster(object):
         if "fattree_route_method" not in hpcsim_dict["default_configs"]:
             hpcsim_dict["default_configs"]["fattree_route_method"] = "multiple_lid_nca"
 
+        # routing tables enabled with "routing_tables" in the topology config are cached here
+        if "routing_table_cache" not in hpcsim_dict["default_configs"]:
+            hpcsim_dict["default_configs"]["routing_table_cache"] = \
+                os.path.join(os.path.expanduser("~"), ".ppt", "routing_tables")
+
         # default mpi resend interval is 1e-3 seconds, i.e., 1 millisecond
         if "mpi_resend_intv" not in hpcsim_dict["default_configs"]:
             hpcsim_dict["default_configs"]["mpi_resend_intv"] = 1e-3
@@ -160,6 +165,13 @@ class Cluster(object):
         if "mpi_path" not in hpcsim_dict:
             hpcsim_dict['mpi_path'] = os.environ.get('SIMIAN_MPILIB', '/usr/lib/libmpi.so')
 
+        # the network is simulated either packet by packet ("packet") or
+        # as max-min fair sharing flows ("flow", see flowmodel.py)
+        if "network_model" not in hpcsim_dict:
+            hpcsim_dict["network_model"] = "packet"
+        if hpcsim_dict["network_model"] not in ("packet", "flow"):
+            raise Exception("network model %s not implemented" % hpcsim_dict["network_model"])
+
         # calculate min_delay from interconnect model (before it has
         # been instantiated)
         intercontype = self.get_intercon_typename(hpcsim_dict)
@@ -210,6 +222,8 @@ class Cluster(object):
         #intercontype = self.get_intercon_typename(hpcsim_dict)
         self.intercon = intercontype(self, hpcsim_dict)
         hpcsim_dict["intercon"] = self.intercon
+        if hpcsim_dict["network_model"] == "flow":
+            self.intercon.flow_network = FlowNetwork(self.intercon, hpcsim_dict)
 
     def num_hosts(self):
         """Returns the total number of hosts (compute nodes)."""
@@ -305,6 +319,12 @@ class Cluster(object):
             mpiopt["resend_trials"] = 10 # no need actually
             mpiopt["call_time"]  = 0
             mpiopt["max_injection"] = 1e38 # no limit
+        elif self.hpcsim_dict["network_model"] == "flow":
+            # with the flow-level model, an mpi message is sent as one
+            # flow, which is never lost (but may take long to complete
+            # when the links are shared)
+            mpiopt["max_pktsz"] = 1e38 # big enough
+            mpiopt["resend_intv"] = 1e38 # no more retransmissions
 
         # output mpiopt if hpcsim/mpi debug flags are set
         if self.simian.rank == 0 and \
@@ -5,3 +5,4 @@ from configs import *
 from dragonfly import *
 from fattree import *
 from bypass import *
+from flowmodel import *
@@ -3,6 +3,7 @@
 #
 
 from intercon import *
+from routing_table import *
 import random
 
 # block decomposition for both hosts and switches
@@ -667,12 +668,15 @@ class DragonflySwitch(Switch):
         src_gid = int(pkt.srchost/h)
         src_sid = (pkt.srchost%h)/k
         
+        # precomputed tables give the same interfaces as min_forward/non_min_forward
+        router = self.dragonfly.routing_table or self
+
         if route_method is "minimal" and intra_grp_topo is "all_to_all":
             if self.gid == dest_gid and self.swid == dest_sid:# packet reached dest switch
                 port = self.dragonfly.hid_to_port(pkt.dsthost)
                 return "h", port 
             else: 
-                md = self.min_forward(self.gid, self.swid, dest_gid, dest_sid) 
+                md = router.min_forward(self.gid, self.swid, dest_gid, dest_sid) 
                 m = self.interfaces[md].get_num_ports()
                 port = random.randint(0, m-1)
                 return md, port
@@ -688,12 +692,12 @@ class DragonflySwitch(Switch):
             else: 
                 if pkt.type[:4] == 'data':
                     int_gid = pkt.nonreturn_data["int_gid"]
-                    md = self.non_min_forward(self.gid, self.swid, int_gid, dest_gid, dest_sid) 
+                    md = router.non_min_forward(self.gid, self.swid, int_gid, dest_gid, dest_sid) 
                     m = self.interfaces[md].get_num_ports()
                     port = random.randint(0, m-1) 
                     return md, port
                 else:   # ACK
-                    md = self.min_forward(self.gid, self.swid, dest_gid, dest_sid) 
+                    md = router.min_forward(self.gid, self.swid, dest_gid, dest_sid) 
                     m = self.interfaces[md].get_num_ports()
                     port = random.randint(0, m-1)
                     return md, port
@@ -998,6 +1002,13 @@ class Dragonfly(Interconnect):
         self.nswitches = self.num_groups*self.num_switches_per_group
         self.nhosts = self.nswitches*self.num_hosts_per_switch
         self.num_hosts_per_group = self.num_hosts_per_switch*self.num_switches_per_group
+
+        # precomputed next-hop tables (only for the all_to_all intra-group topology;
+        # cascade routing keeps per-packet state and is computed hop by hop)
+        self.routing_table = None
+        if hpcsim_dict["dragonfly"].get("routing_tables", False) and \
+           self.intra_group_topology == "all_to_all":
+            self.routing_table = DragonflyRoutingTable(self, hpcsim_dict)
         
         # add switches and hosts as entities
         simian = hpcsim_dict["simian"]
@@ -3,6 +3,7 @@
 #
 
 from intercon import *
+from routing_table import *
 import random
 import itertools
 import math
@@ -241,7 +242,10 @@ class InfinibandSwitch(Switch):
                 if dest_switch["level"] == self.lid and dest_switch["s_id"] == self.swid:
                     return "h", dest_switch["port"]
                 # next, find the port to send packet through
-                lid = self.path_selection(src_host_list, dst_host_list)
+                if self.fattree.routing_table is not None:
+                    lid = self.fattree.routing_table.path_selection(pkt.srchost, pkt.dsthost)
+                else:
+                    lid = self.path_selection(src_host_list, dst_host_list)
                 port = self.find_port(self.swid, self.lid, 
                         dst_host_list, lid, pkt.dsthost) # pkt.dsthost denotes PID
                 self.map_src_dest[key_idx] = port
@@ -371,6 +375,11 @@ class Fattree(Interconnect):
         self.nhosts = 2*(m/2)**n
         self.nswitches = (2*n-1)*(m/2)**(n-1)
 
+        # precomputed LIDs for multiple_lid_nca routing
+        self.routing_table = None
+        if hpcsim_dict["fattree"].get("routing_tables", False):
+            self.routing_table = FattreeRoutingTable(self, hpcsim_dict)
+
         swid = 0 
         for level_idx in xrange(n):
             if level_idx == 0:
@@ -0,0 +1,255 @@
+#
+# flowmodel.py :- flow-level (fluid) network model
+#
+# Selected with hpcsim_dict["network_model"] = "flow". Every message sent
+# by a host becomes a flow over the path the switches of the configured
+# interconnect (torus, dragonfly, fat-tree, ...) would route it along; the
+# path is found once per host pair by calling the switches' calc_route
+# directly, so no packet ever travels through the switch entities. Active
+# flows share the link bandwidth max-min fairly; the rates are recomputed
+# whenever a flow starts or completes and there is only one pending timer
+# event (for the earliest completion) at any time. A completed flow arrives
+# at the destination host after the propagation and processing delays along
+# its path. Buffers are considered infinite: the model never drops messages.
+#
+# The model requires all entities to be on the same rank (sequential run).
+#
+
+from pickle import dumps
+
+def max_min_fair_rates(flow_links, capacity):
+    """Returns the max-min fair rate of each flow (progressive filling).
+
+    flow_links maps a flow id to the list of links it traverses;
+    capacity maps a link to its bandwidth.
+    """
+
+    # Local variables:
+    #   residual: capacity of a link not yet given to frozen flows
+    #   unfrozen: for each link, the flows on it whose rate is not yet fixed
+    residual = dict()
+    unfrozen = dict()
+    for fid, links in flow_links.items():
+        for l in links:
+            if l not in unfrozen:
+                unfrozen[l] = set()
+                residual[l] = float(capacity[l])
+            unfrozen[l].add(fid)
+
+    rates = dict()
+    while unfrozen:
+        # the bottleneck link gives the smallest fair share
+        bottleneck = None
+        share = None
+        for l, fids in unfrozen.items():
+            s = residual[l]/len(fids)
+            if share is None or s < share:
+                share = s
+                bottleneck = l
+        for fid in list(unfrozen[bottleneck]):
+            rates[fid] = share
+            for l in flow_links[fid]:
+                residual[l] -= share
+                unfrozen[l].discard(fid)
+                if not unfrozen[l]:
+                    del unfrozen[l]
+
+    # flows without links (should not happen) are not limited
+    for fid in flow_links:
+        if fid not in rates:
+            rates[fid] = float('inf')
+    return rates
+
+class Flow(object):
+    """A message in transit under the flow-level model."""
+
+    # local variables:
+    #   fid: flow id (in the order flows are started)
+    #   pkt: the packet delivered when the flow completes
+    #   src_host: the sending host entity
+    #   path: the FlowPath of the flow
+    #   remaining: bits left to send
+    #   rate: current rate (in bits per second)
+
+    def __init__(self, fid, pkt, src_host, path):
+        self.fid = fid
+        self.pkt = pkt
+        self.src_host = src_host
+        self.path = path
+        self.remaining = pkt.size()*8.0
+        self.rate = 0.0
+
+class FlowPath(object):
+    """The links traversed from a source host to a destination host."""
+
+    # local variables:
+    #   outports: list of outports (links) from the source host on
+    #   latency: total propagation and nodal processing delay
+    #   switches: names of the switches traversed (for blazing the trail)
+    #   last_outport: the outport connected to the destination host
+
+    def __init__(self, outports, latency, switches):
+        self.outports = outports
+        self.latency = latency
+        self.switches = switches
+        self.last_outport = outports[-1]
+
+class FlowNetwork(object):
+    """Flow-level model of an interconnect for the hosts to send messages."""
+
+    # local variables:
+    #   intercon: the interconnect model (whose switches give the routes)
+    #   simian: the simian engine (used to look up host and switch entities)
+    #   paths: cache of FlowPath for each (src, dst) host pair
+    #   flows: active flows, indexed by flow id
+    #   last_update: time the remaining bits of the active flows were last updated
+    #   timer_version: only the timer event with the latest version is valid
+    #   time_eps: flows within this time of completion are considered completed
+    #   stats: "flows", "completed_flows", "timer_events", "rate_updates"
+
+    def __init__(self, intercon, hpcsim_dict):
+        self.intercon = intercon
+        self.simian = hpcsim_dict["simian"]
+        if self.simian.size > 1:
+            raise Exception("flow-level network model requires a sequential run")
+        self.paths = dict()
+        self.flows = dict()
+        self.next_fid = 0
+        self.last_update = 0
+        self.timer_version = 0
+        self.time_eps = 1e-12
+        self.stats = dict()
+        self.stats["flows"] = 0
+        self.stats["completed_flows"] = 0
+        self.stats["timer_events"] = 0
+        self.stats["rate_updates"] = 0
+
+    def get_now(self):
+        return self.simian.now
+
+    def get_path(self, src, dst):
+        """Returns the (cached) FlowPath from host src to host dst."""
+
+        key = (src, dst)
+        if key not in self.paths:
+            self.paths[key] = self.trace_path(src, dst)
+        return self.paths[key]
+
+    def trace_path(self, src, dst):
+        """Follows calc_route of the switches from host src to host dst."""
+
+        from intercon import Packet
+        probe = Packet(src, dst, "data_flow", 0, 0, nonreturn_data=dict(), blaze_trail=False)
+        host = self.simian.getEntity("Host", src)
+        outport = host.interfaces['r'].outports[0]
+        outports = [outport]
+        latency = outport.link_delay
+        switches = []
+        max_hops = 2*int(self.intercon.network_diameter())+2
+        for _ in range(max_hops):
+            if outport.peer_node_name == "Host" or \
+               outport.peer_node_id is None or outport.peer_node_id < 0:
+                break
+            sw = self.simian.getEntity(outport.peer_node_name, outport.peer_node_id)
+            probe.set_nexthop(outport.peer_iface_name, outport.peer_iface_port)
+            iface, port = sw.calc_route(probe)
+            if port < 0:
+                # any port would do (adaptive); spread host pairs over them
+                port = (src+dst)%sw.interfaces[iface].get_num_ports()
+            outport = sw.interfaces[iface].outports[port]
+            outports.append(outport)
+            latency += sw.proc_delay+outport.link_delay
+            switches.append(str(sw))
+        else:
+            raise Exception("flow model: no route from host %d to host %d in %d hops" %
+                            (src, dst, max_hops))
+        if outport.peer_node_id is not None and outport.peer_node_id >= 0 and \
+           outport.peer_node_id != dst:
+            raise Exception("flow model: route from host %d ends at host %d instead of %d" %
+                            (src, outport.peer_node_id, dst))
+        return FlowPath(outports, latency, switches)
+
+    def send(self, host, pkt):
+        """Starts a flow for the packet sent by the host."""
+
+        now = self.get_now()
+        self.advance(now)
+        path = self.get_path(pkt.srchost, pkt.dsthost)
+        for op in path.outports:
+            op.stats["sent_bytes"] += pkt.size()
+            op.stats["sent_pkts"] += 1
+        flow = Flow(self.next_fid, pkt, host, path)
+        self.next_fid += 1
+        self.stats["flows"] += 1
+        if "interface" in host.hpcsim_dict["debug_options"]:
+            print("%f: %s starts flow %d for %s over %d links" %
+                  (now, host, flow.fid, pkt, len(path.outports)))
+        if flow.remaining <= 0:
+            self.deliver(flow)
+        else:
+            self.flows[flow.fid] = flow
+            self.update_rates()
+
+    def advance(self, now):
+        """Drains the active flows at their current rates up to now."""
+
+        dt = now-self.last_update
+        if dt > 0:
+            for flow in self.flows.values():
+                flow.remaining -= flow.rate*dt
+        self.last_update = now
+
+    def update_rates(self):
+        """Recomputes the max-min fair rates and sets the timer for the next completion."""
+
+        self.stats["rate_updates"] += 1
+        self.timer_version += 1
+        if not self.flows:
+            return
+        flow_links = dict()
+        capacity = dict()
+        for fid, flow in self.flows.items():
+            links = []
+            for op in flow.path.outports:
+                l = id(op)
+                capacity[l] = op.bdw
+                links.append(l)
+            flow_links[fid] = links
+        rates = max_min_fair_rates(flow_links, capacity)
+
+        first = None
+        for fid in sorted(self.flows):
+            flow = self.flows[fid]
+            flow.rate = rates[fid]
+            t = max(flow.remaining, 0)/flow.rate
+            if first is None or t < first_t:
+                first = flow
+                first_t = t
+        # a timer is a self-scheduled event, which is not bound by min_delay
+        first.src_host.reqService(first_t, "flow_timer", self.timer_version)
+
+    def handle_timer(self, version):
+        """Completes the flows that are due (when the timer is still valid)."""
+
+        if version != self.timer_version:
+            return # outdated by a rate update
+        self.stats["timer_events"] += 1
+        self.advance(self.get_now())
+        done = [fid for fid, flow in self.flows.items()
+                if flow.remaining <= flow.rate*self.time_eps]
+        for fid in sorted(done):
+            self.deliver(self.flows.pop(fid))
+        self.update_rates()
+
+    def deliver(self, flow):
+        """Schedules the arrival of the flow's packet at the destination host."""
+
+        self.stats["completed_flows"] += 1
+        pkt = flow.pkt
+        path = flow.path
+        if pkt.path is not None:
+            for sw in path.switches:
+                pkt.add_to_path(sw)
+        pkt.set_nexthop(path.last_outport.peer_iface_name, path.last_outport.peer_iface_port)
+        delay = max(path.latency, self.simian.minDelay)
+        flow.src_host.reqService(delay, "handle_packet_arrival", dumps(pkt), "Host", pkt.dsthost)
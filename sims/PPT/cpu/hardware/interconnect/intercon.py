@@ -12,11 +12,13 @@ class Interconnect(object):
     # local variables:
     #   nswitches: number of switch nodes of the interconnection network
     #   nhosts: number of compute nodes connected by the interconnection network
+    #   flow_network: the flow-level network model (None for the packet-level model)
 
     def __init__(self, hpcsim_dict):
         self.hpcsim_dict = hpcsim_dict
         self.nswitches = 0
         self.nhosts = 0
+        self.flow_network = None
 
     def num_switchs(self):
         return self.nswitches
@@ -418,6 +420,19 @@ class Interface(object):
         return sum
 
 
+class FlowInterface(Interface):
+    """Host network interface under the flow-level network model.
+
+    Messages are handed to the flow network of the interconnect
+    (see flowmodel.py) instead of being sent packet by packet.
+    """
+
+    def send_pkt(self, pkt, port):
+        assert pkt.dsthost != pkt.srchost
+        self.node.intercon.flow_network.send(self.node, pkt)
+        return 0
+
+
 class Switch(Node):
     """Base class for an interconnect switch/router."""
 
@@ -564,8 +579,12 @@ class Host(Node):
         # 0) host has only one interface, named 'r', and only one port
         # 1) switch's entity name is "Switch"; it's id is given as 'swid'
         # 2) switch's network interface connecting to the hosts has name 'swiface' and port 'swport'
-        self.interfaces['r'] = Interface(self, "r",  1, ("Switch",), (swid,),
-                                         (swiface,), (swport,), bdw, bufsz, dly)
+        if hpcsim_dict.get("network_model", "packet") == "flow":
+            iface_type = FlowInterface
+        else:
+            iface_type = Interface
+        self.interfaces['r'] = iface_type(self, "r",  1, ("Switch",), (swid,),
+                                          (swiface,), (swport,), bdw, bufsz, dly)
         if "host.connect" in hpcsim_dict["debug_options"]:
             print("%s %s[0] connects to switch[%d] iface(%s)[%d]" % 
                   (self, self.interfaces['r'], swid, swiface, swport))
@@ -621,6 +640,10 @@ class Host(Node):
         #    if path is not None: 
         #        for h in path: print("  =>%s" % h)
 
+    def flow_timer(self, *args):
+        """A service for the timer of the flow-level network model."""
+        self.intercon.flow_network.handle_timer(args[0])
+
     def test_raw_xfer(self, *args):
         """A test service for sending messages.
 
@@ -0,0 +1,255 @@
+#
+# routing_table.py :- precomputed next-hop tables for the dragonfly, torus
+#                     and fat-tree interconnects
+#
+# The tables are computed once per topology with numpy and give the same
+# interface (and thus the same path) as the per-hop routing functions of the
+# switches, which stay the reference implementation. They are enabled with
+# "routing_tables": True in the topology config (e.g., hpcsim_dict["dragonfly"])
+# and are cached on disk (as .npz files) in the directory given by
+# hpcsim_dict["default_configs"]["routing_table_cache"], keyed by the topology
+# parameters the tables depend on.
+#
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+
+# numpy is only needed when the tables are enabled
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# table entry for "packet is at the destination switch"
+NO_HOP = -1
+
+def check_numpy():
+    if np is None:
+        raise Exception("routing_tables requires numpy")
+
+def table_dtype(num_values):
+    """Returns the smallest signed integer type holding [NO_HOP, num_values)."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_values <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def routing_table_key(name, params):
+    """Returns the cache key of the tables of a topology."""
+    s = json.dumps([name, params], sort_keys=True)
+    return "%s_%s" % (name, hashlib.sha1(s.encode("utf-8")).hexdigest()[:16])
+
+def load_or_build_tables(hpcsim_dict, name, params, build):
+    """Returns the tables (dict of arrays) from the disk cache, or builds and caches them."""
+
+    # Local variables:
+    #   name: topology name, params: dict of the parameters the tables depend on
+    #   build: function returning a dict of numpy arrays
+    check_numpy()
+    cache_dir = hpcsim_dict.get("default_configs", {}).get("routing_table_cache")
+    if not cache_dir:
+        return build()
+    path = os.path.join(cache_dir, routing_table_key(name, params) + ".npz")
+    if os.path.exists(path):
+        f = np.load(path)
+        try:
+            return dict((k, f[k]) for k in f.files)
+        finally:
+            f.close()
+    tables = build()
+    if not os.path.isdir(cache_dir):
+        try:
+            os.makedirs(cache_dir)
+        except OSError:
+            pass # created by another rank in the meantime
+    # write to a temp file and rename, so concurrent ranks never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".npz.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **tables)
+        os.rename(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return tables
+
+#
+# dragonfly (all_to_all intra-group topology)
+#
+
+def dragonfly_iface_names(num_switches_per_group, num_inter_links_per_switch):
+    """Returns the interface names the dragonfly table entries index into."""
+    return ['l%d'%p for p in range(num_switches_per_group-1)] + \
+           ['g%d'%p for p in range(num_inter_links_per_switch)]
+
+def build_dragonfly_tables(num_groups, num_switches_per_group, num_inter_links_per_switch):
+    """Returns the minimal routing tables of an all_to_all dragonfly.
+
+    local[a, b]: interface from switch a to switch b of the same group
+    group[s, g]: interface from switch s (global id) towards group g
+    min[s, d]: interface from switch s to switch d (global ids)
+    Valiant (non_minimal) routing is minimal routing towards the
+    intermediate group followed by minimal routing to the destination,
+    so it is served from the group and min tables."""
+
+    G = num_groups
+    P = num_switches_per_group
+    k = num_inter_links_per_switch
+    dtype = table_dtype(P-1+k)
+    n_local = P-1
+
+    # same as step 1 of DragonflySwitch.min_forward
+    sid = np.arange(P)
+    local = np.where(sid[:, None] < sid[None, :], sid[None, :]-1, sid[None, :])
+    local[sid, sid] = NO_HOP
+
+    # steps 2 and 3 of DragonflySwitch.min_forward
+    cur_gid = np.repeat(np.arange(G), P)[:, None]   # (S, 1)
+    cur_sid = np.tile(np.arange(P), G)[:, None]     # (S, 1)
+    dest_gid = np.arange(G)[None, :]                # (1, G)
+    grp_output = np.where(cur_gid > dest_gid, dest_gid, dest_gid-1)
+    grp_rid = grp_output//k
+    to_rid = local[cur_sid, np.clip(grp_rid, 0, P-1)]
+    group = np.where(grp_rid == cur_sid, n_local+grp_output%k, to_rid)
+    group[np.arange(G*P), cur_gid[:, 0]] = NO_HOP
+
+    # whole switch-to-switch table
+    dest_swid = np.arange(G*P)
+    same_grp = cur_gid == (dest_swid//P)[None, :]
+    min_table = np.where(same_grp, local[cur_sid, (dest_swid%P)[None, :]], group[:, dest_swid//P])
+
+    return {"local": local.astype(dtype), "group": group.astype(dtype), "min": min_table.astype(dtype)}
+
+class DragonflyRoutingTable(object):
+    """Table-driven min_forward/non_min_forward for an all_to_all dragonfly."""
+
+    def __init__(self, dragonfly, hpcsim_dict):
+        self.num_switches_per_group = dragonfly.num_switches_per_group
+        params = {"num_groups": dragonfly.num_groups,
+                  "num_switches_per_group": dragonfly.num_switches_per_group,
+                  "num_inter_links_per_switch": dragonfly.num_inter_links_per_switch}
+        tables = load_or_build_tables(hpcsim_dict, "dragonfly", params,
+                                      lambda: build_dragonfly_tables(**params))
+        self.group = tables["group"]
+        self.min = tables["min"]
+        self.iface_names = dragonfly_iface_names(dragonfly.num_switches_per_group,
+                                                 dragonfly.num_inter_links_per_switch)
+
+    def min_forward(self, src_gid, src_sid, dest_gid, dest_sid):
+        """Returns interface for minimal (MIN) routing"""
+        P = self.num_switches_per_group
+        return self.iface_names[self.min[src_gid*P+src_sid, dest_gid*P+dest_sid]]
+
+    def non_min_forward(self, src_gid, src_sid, int_gid, dest_gid, dest_sid):
+        """Returns interface for non_minimal (VAL) routing"""
+        P = self.num_switches_per_group
+        if src_gid == dest_gid or src_gid == int_gid:
+            return self.min_forward(src_gid, src_sid, dest_gid, dest_sid)
+        return self.iface_names[self.group[src_gid*P+src_sid, int_gid]]
+
+#
+# torus (dimension order routing)
+#
+
+def torus_iface_names(ndims):
+    """Returns the interface names the torus table entries index into."""
+    names = []
+    for d in range(ndims):
+        names += ['+%d'%d, '-%d'%d]
+    return names
+
+def build_torus_tables(dims):
+    """Returns next_dir[s, d]: the interface switch s uses to reach switch d
+    under dimension order routing (same as TorusSwitch.calc_route)."""
+
+    dims = np.array(dims)
+    nswitches = int(np.prod(dims))
+    cm = np.concatenate([[1], np.cumprod(dims)[:-1]])
+    swid = np.arange(nswitches)
+    coords = (swid[:, None]//cm[None, :])%dims[None, :]     # (S, ndims)
+
+    diff = (coords[None, :, :]-coords[:, None, :])%dims       # (S, S, ndims)
+    differs = diff != 0
+    first_dim = np.argmax(differs, axis=2)                    # first dimension to correct
+    arrived = ~differs.any(axis=2)
+    first_diff = np.take_along_axis(diff, first_dim[:, :, None], axis=2)[:, :, 0]
+    minus = first_diff > dims[first_dim]//2
+    next_dir = np.where(arrived, NO_HOP, 2*first_dim+minus)
+    return {"next_dir": next_dir.astype(table_dtype(2*len(dims)))}
+
+class TorusRoutingTable(object):
+    """Table-driven dimension order routing for a torus."""
+
+    def __init__(self, torus, hpcsim_dict):
+        params = {"dims": list(torus.dims)}
+        tables = load_or_build_tables(hpcsim_dict, "torus", params,
+                                      lambda: build_torus_tables(torus.dims))
+        self.next_dir = tables["next_dir"]
+        self.iface_names = torus_iface_names(len(torus.dims))
+        # host to (switch, port), which also covers a user specified hostmap
+        self.host_switch = np.zeros(torus.nhosts, dtype=np.int64)
+        self.host_port = np.zeros(torus.nhosts, dtype=np.int64)
+        for h in range(torus.nhosts):
+            c, p = torus.hid_to_coords(h)
+            self.host_switch[h] = torus.coords_to_swid(c)
+            self.host_port[h] = p
+
+    def next_hop(self, swid, dsthost):
+        """Returns the interface name (None at the destination switch) and the host port."""
+        code = self.next_dir[swid, self.host_switch[dsthost]]
+        if code == NO_HOP:
+            return None, int(self.host_port[dsthost])
+        return self.iface_names[code], None
+
+#
+# fat-tree (multiple LID nearest common ancestor)
+#
+
+def build_fattree_tables(num_ports_per_switch, num_levels):
+    """Returns lid[src, dst]: the LID InfinibandSwitch.path_selection picks
+    for a pair of hosts of an m-port n-tree."""
+
+    m = num_ports_per_switch
+    n = num_levels
+    half = m//2
+    # host labels in host id order: {0,...,m-1}X{0,...,m/2-1}^n-1
+    nhosts = 2*half**n
+    weights = half**np.arange(n-1, -1, -1)                    # (m/2)**(n-(i+1))
+    hid = np.arange(nhosts)
+    labels = (hid[:, None]//weights[None, :])
+    labels[:, 1:] %= half
+
+    # alpha: length of the greatest common prefix of the two labels
+    same = labels[:, None, :] == labels[None, :, :]
+    alpha = np.cumprod(same, axis=2).sum(axis=2)
+
+    # BaseLID(P(p')), computed exactly like path_selection (incl. the float lmc)
+    lmc = math.log(half**(n-1), 2)
+    base_sum = (labels*weights[None, :]).sum(axis=1)
+    base_lid = (2**lmc*base_sum+1).astype(np.int64)
+
+    # rank of the source inside gcpg(x, alpha): sum over alpha+1 <= i < n
+    suffix = np.zeros((nhosts, n+2), dtype=np.int64)
+    suffix[:, :n] = np.cumsum((labels*weights[None, :])[:, ::-1], axis=1)[:, ::-1]
+    rank = suffix[hid[:, None], alpha+1]
+
+    lid = base_lid[None, :]+rank
+    return {"lid": lid.astype(table_dtype(int(lid.max())+1))}
+
+class FattreeRoutingTable(object):
+    """Precomputed LIDs for the multiple_lid_nca routing of a fat-tree."""
+
+    def __init__(self, fattree, hpcsim_dict):
+        params = {"num_ports_per_switch": fattree.num_ports_per_switch,
+                  "num_levels": fattree.num_levels}
+        tables = load_or_build_tables(hpcsim_dict, "fattree", params,
+                                      lambda: build_fattree_tables(**params))
+        self.lid = tables["lid"]
+
+    def path_selection(self, srchost, dsthost):
+        """Returns the LID for a pair of host ids"""
+        return int(self.lid[srchost, dsthost])
@@ -3,6 +3,7 @@
 #
 
 from intercon import *
+from routing_table import *
 
 # block decomposition for both hosts and switches
 def torus_partition(entname, entid, nranks, torus):
@@ -93,17 +94,22 @@ class TorusSwitch(Switch):
             #     - hashed_dimension_order: dimension-order routing with flexibility in selecting links
             #     - adaptive_dimension_order (default): dimension-order routing but select lightly loaded links
 
-            c,p = self.torus.hid_to_coords(pkt.dsthost)
-
-            # first, dimension order routing
-            dirs = []
-            for d in xrange(len(self.torus.dims)):
-                if self.coords[d] != c[d]:
-                    diff = c[d]-self.coords[d]
-                    if diff < 0: diff = diff + self.torus.dims[d]
-                    if diff <= self.torus.dims[d]/2: dirs.append("+%d"%d)
-                    else: dirs.append("-%d"%d)
-                    break # stop when early dimension is found
+            if self.torus.routing_table is not None:
+                # precomputed dimension order routing
+                dir, p = self.torus.routing_table.next_hop(self.node_id, pkt.dsthost)
+                dirs = [dir] if dir is not None else []
+            else:
+                c,p = self.torus.hid_to_coords(pkt.dsthost)
+
+                # first, dimension order routing
+                dirs = []
+                for d in xrange(len(self.torus.dims)):
+                    if self.coords[d] != c[d]:
+                        diff = c[d]-self.coords[d]
+                        if diff < 0: diff = diff + self.torus.dims[d]
+                        if diff <= self.torus.dims[d]/2: dirs.append("+%d"%d)
+                        else: dirs.append("-%d"%d)
+                        break # stop when early dimension is found
 
             if len(dirs) == 0:
                 # the packet arrived at the destination switch; send out to host
@@ -262,6 +268,11 @@ class Torus(Interconnect):
             print("torus: mem_delay=%f (seconds)" % mem_delay)
             print("torus: route_method=%s" % route_method)
 
+        # precomputed next-hop tables
+        self.routing_table = None
+        if hpcsim_dict["torus"].get("routing_tables", False):
+            self.routing_table = TorusRoutingTable(self, hpcsim_dict)
+
         # add switches as entities
         simian = hpcsim_dict["simian"]
         allcoords = [(i,) for i in range(self.dims[-1])]
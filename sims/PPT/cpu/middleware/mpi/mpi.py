@@ -365,9 +365,16 @@ def mpi_reduce(root, data, mpi_comm, data_size=4, op="sum"):
     """MPI reduction.
 
     Available reduction operators include "sum", "prod", "min", and
-    "max".  As expected, only root rank gets the reduction result.
+    "max".  As expected, only root rank gets the reduction result. The
+    algorithm is selected by data_size from the communicator's
+    collectives table (see mpi_comm_set_collectives).
     """
 
+    return mpi_coll_select(mpi_comm, "reduce", data_size)(root, data, mpi_comm, data_size, op)
+
+def mpi_reduce_binomial(root, data, mpi_comm, data_size=4, op="sum"):
+    """Reduction with a binomial tree."""
+
     n = len(mpi_comm['hostmap'])
     p = mpi_comm['rank']
     if not (0 <= root < n):
@@ -473,15 +480,31 @@ def mpi_gather(root, data, mpi_comm, data_size=4):
 def mpi_allgather(data, mpi_comm, data_size=4):
     """All gather.
 
-    It is implemented by first gathering at rank 0 then bcast.
+    Returns the list of data from all ranks; data_size is the size of
+    the data of one rank. The algorithm is selected by data_size from
+    the communicator's collectives table.
     """
 
+    return mpi_coll_select(mpi_comm, "allgather", data_size)(data, mpi_comm, data_size)
+
+def mpi_allgather_gather_bcast(data, mpi_comm, data_size=4):
+    """All gather, implemented by first gathering at rank 0 then bcast."""
+
     r = mpi_gather(0, data, mpi_comm, data_size)
     if r is None: return None
     else: return mpi_bcast(0, r, mpi_comm, data_size*len(mpi_comm['hostmap']))
 
 def mpi_bcast(root, data, mpi_comm, data_size=4):
-    """Returns the data provided only by the root."""
+    """Returns the data provided only by the root.
+
+    The algorithm is selected by data_size from the communicator's
+    collectives table.
+    """
+
+    return mpi_coll_select(mpi_comm, "bcast", data_size)(root, data, mpi_comm, data_size)
+
+def mpi_bcast_binomial(root, data, mpi_comm, data_size=4):
+    """Broadcast with a binomial tree."""
 
     n = len(mpi_comm['hostmap'])
     p = mpi_comm['rank']
@@ -582,6 +605,15 @@ def mpi_barrier(mpi_comm):
     mpi_bcast(0, 0, mpi_comm)
 
 def mpi_allreduce(data, mpi_comm, data_size=4, op="sum"):
+    """All ranks get the reduction result.
+
+    The algorithm is selected by data_size from the communicator's
+    collectives table.
+    """
+
+    return mpi_coll_select(mpi_comm, "allreduce", data_size)(data, mpi_comm, data_size, op)
+
+def mpi_allreduce_reduce_bcast(data, mpi_comm, data_size=4, op="sum"):
     """Implemented as reduce and then bcast."""
 
     #print("%d before reduce" % mpi_comm['rank'])
@@ -596,9 +628,16 @@ def mpi_alltoall(data, mpi_comm, data_size=4):
 
     Each rank sends a different message to other ranks. Data must be a
     list of n elements, where n is the total of processes; data_size
-    is the size of data to be sent to each of the processes.
+    is the size of data to be sent to each of the processes. The
+    algorithm is selected by data_size from the communicator's
+    collectives table.
     """
 
+    return mpi_coll_select(mpi_comm, "alltoall", data_size)(data, mpi_comm, data_size)
+
+def mpi_alltoall_hypercube(data, mpi_comm, data_size=4):
+    """All-to-all by hypercube exchange (point to point if n is not a power of two)."""
+
     n = len(mpi_comm['hostmap'])
     p = mpi_comm['rank']
 
@@ -667,6 +706,402 @@ def mpi_alltoallv(data, mpi_comm, data_sizes=None):
                 data[i] = r['data']
     return data
 
+#
+# collective algorithms: the collectives above select one of the
+# algorithms below according to a table, which can be set per
+# communicator; sub-communicators inherit the table of their parent
+#
+
+def mpi_reduce_op(a, b, op):
+    """Combines two values (elementwise for lists) with a reduction operator."""
+
+    if isinstance(a, list):
+        return [mpi_reduce_op(x, y, op) for x, y in zip(a, b)]
+    if op == 'sum': return a + b
+    elif op == 'prod': return a * b
+    elif op == 'max': return a if a > b else b
+    elif op == 'min': return a if a < b else b
+    else: raise Exception("reduce operator %s not implemented" % op)
+
+def mpi_coll_split(data, nsegs):
+    """Splits data into nsegs lists of consecutive elements (a scalar is one element)."""
+
+    elems = data if isinstance(data, list) else [data]
+    m = len(elems)
+    return [elems[k*m//nsegs:(k+1)*m//nsegs] for k in range(nsegs)]
+
+def mpi_coll_join(segs, like):
+    """Concatenates segments; the inverse of mpi_coll_split for data like 'like'."""
+
+    elems = []
+    for seg in segs: elems.extend(seg)
+    return elems if isinstance(like, list) else elems[0]
+
+def mpi_coll_bytes(data_size, nsegs, lo, hi):
+    """Bytes of segments lo to hi-1 when data_size bytes are split into nsegs."""
+    return data_size*hi//nsegs - data_size*lo//nsegs
+
+def mpi_coll_fold(data, mpi_comm, data_size, op, type):
+    """Folds the extra ranks of a non-power-of-two communicator.
+
+    The first 2*rem ranks are paired up (rem = n - pof2); the even rank
+    of each pair hands its data to the odd one and sits out. Returns
+    (pof2, rem, newrank, data), where newrank is -1 for the ranks that
+    sit out, or None if the receive fails.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    pof2 = 1
+    while pof2*2 <= n: pof2 *= 2
+    rem = n - pof2
+    if p < 2*rem:
+        if p % 2 == 0:
+            if not mpi_send(p+1, data, data_size, mpi_comm, type=type): return None
+            return pof2, rem, -1, data
+        x = mpi_recv(mpi_comm, p-1, type=type)
+        if x is None: return None
+        return pof2, rem, p//2, mpi_reduce_op(x["data"], data, op)
+    return pof2, rem, p-rem, data
+
+def mpi_coll_unfold_rank(newrank, rem):
+    """Returns the rank in the communicator of a rank among the pof2 ranks."""
+    return newrank*2+1 if newrank < rem else newrank+rem
+
+def mpi_coll_unfold(data, mpi_comm, data_size, rem, type):
+    """Returns the result to the ranks that sat out in mpi_coll_fold."""
+
+    p = mpi_comm['rank']
+    if p < 2*rem:
+        if p % 2 == 1:
+            if not mpi_send(p-1, data, data_size, mpi_comm, type=type): return None
+        else:
+            x = mpi_recv(mpi_comm, p+1, type=type)
+            if x is None: return None
+            data = x["data"]
+    return data
+
+def mpi_allreduce_recursive_doubling(data, mpi_comm, data_size=4, op="sum"):
+    """Allreduce by recursive doubling: log2(n) exchanges of the whole data.
+
+    For n not a power of two, 2*(n-pof2) extra messages fold the extra
+    ranks in and out.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    if n <= 1: return data
+    r = mpi_coll_fold(data, mpi_comm, data_size, op, "__allreduce_rd_fold__")
+    if r is None: return None
+    pof2, rem, newrank, data = r
+    if newrank >= 0:
+        mask = 1
+        while mask < pof2:
+            q = mpi_coll_unfold_rank(newrank ^ mask, rem)
+            x = mpi_sendrecv(q, data, data_size, q, mpi_comm,
+                             send_type="__allreduce_rd__", recv_type="__allreduce_rd__")
+            if x is None: return None
+            data = mpi_reduce_op(data, x["data"], op)
+            mask *= 2
+    return mpi_coll_unfold(data, mpi_comm, data_size, rem, "__allreduce_rd_unfold__")
+
+def mpi_allreduce_ring(data, mpi_comm, data_size=4, op="sum"):
+    """Ring allreduce: a ring reduce-scatter followed by a ring allgather.
+
+    Each rank sends 2*(n-1) messages of data_size/n bytes.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    if n <= 1: return data
+    segs = mpi_coll_split(data, n)
+    left = (p-1) % n
+    right = (p+1) % n
+    for s in range(n-1):
+        send_idx = (p-s) % n
+        recv_idx = (p-s-1) % n
+        x = mpi_sendrecv(right, segs[send_idx], mpi_coll_bytes(data_size, n, send_idx, send_idx+1),
+                         left, mpi_comm, send_type="__allreduce_ring__", recv_type="__allreduce_ring__")
+        if x is None: return None
+        segs[recv_idx] = mpi_reduce_op(segs[recv_idx], x["data"], op)
+    # rank p now has the reduced segment p+1
+    for s in range(n-1):
+        send_idx = (p+1-s) % n
+        recv_idx = (p-s) % n
+        x = mpi_sendrecv(right, segs[send_idx], mpi_coll_bytes(data_size, n, send_idx, send_idx+1),
+                         left, mpi_comm, send_type="__allgather_ring__", recv_type="__allgather_ring__")
+        if x is None: return None
+        segs[recv_idx] = x["data"]
+    return mpi_coll_join(segs, data)
+
+def mpi_coll_reduce_scatter_halving(segs, mpi_comm, data_size, op, pof2, rem, newrank):
+    """Reduce-scatter by recursive halving among the pof2 ranks.
+
+    Returns the segments, of which [newrank, newrank+1) is fully
+    reduced, or None if it fails.
+    """
+
+    lo, hi = 0, pof2
+    mask = pof2//2
+    while mask >= 1:
+        q = mpi_coll_unfold_rank(newrank ^ mask, rem)
+        mid = (lo+hi)//2
+        if newrank & mask: keep, give = (mid, hi), (lo, mid)
+        else: keep, give = (lo, mid), (mid, hi)
+        x = mpi_sendrecv(q, segs[give[0]:give[1]], mpi_coll_bytes(data_size, pof2, give[0], give[1]),
+                         q, mpi_comm, send_type="__reduce_scatter__", recv_type="__reduce_scatter__")
+        if x is None: return None
+        for i in range(keep[0], keep[1]):
+            segs[i] = mpi_reduce_op(segs[i], x["data"][i-keep[0]], op)
+        lo, hi = keep
+        mask //= 2
+    return segs
+
+def mpi_allreduce_rabenseifner(data, mpi_comm, data_size=4, op="sum"):
+    """Rabenseifner's allreduce: recursive halving reduce-scatter
+    followed by recursive doubling allgather.
+
+    Each of the pof2 ranks sends 2*log2(pof2) messages, halving in size
+    from data_size/2 (and back); 2*(n-pof2) extra messages fold the
+    extra ranks in and out.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    if n <= 1: return data
+    r = mpi_coll_fold(data, mpi_comm, data_size, op, "__allreduce_rab_fold__")
+    if r is None: return None
+    pof2, rem, newrank, folded = r
+    if newrank >= 0:
+        segs = mpi_coll_reduce_scatter_halving(mpi_coll_split(folded, pof2), mpi_comm,
+                                               data_size, op, pof2, rem, newrank)
+        if segs is None: return None
+        # allgather by recursive doubling
+        lo, hi = newrank, newrank+1
+        mask = 1
+        while mask < pof2:
+            q = mpi_coll_unfold_rank(newrank ^ mask, rem)
+            x = mpi_sendrecv(q, segs[lo:hi], mpi_coll_bytes(data_size, pof2, lo, hi), q, mpi_comm,
+                             send_type="__allgather_rd__", recv_type="__allgather_rd__")
+            if x is None: return None
+            if newrank & mask: lo -= mask
+            else: hi += mask
+            other = lo if newrank & mask else hi-mask
+            segs[other:other+mask] = x["data"]
+            mask *= 2
+        folded = mpi_coll_join(segs, data)
+    return mpi_coll_unfold(folded, mpi_comm, data_size, rem, "__allreduce_rab_unfold__")
+
+def mpi_reduce_rabenseifner(root, data, mpi_comm, data_size=4, op="sum"):
+    """Rabenseifner's reduce: recursive halving reduce-scatter followed
+    by a binomial gather of the reduced segments at the root.
+
+    As with mpi_reduce_binomial, only root rank gets the reduction result.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    if not (0 <= root < n):
+        raise Exception("mpi_reduce root (%d) out of range (comm=%d, size=%d)" %
+                        (root, mpi_comm['commid'], n))
+    if n <= 1: return data
+    r = mpi_coll_fold(data, mpi_comm, data_size, op, "__reduce_rab_fold__")
+    if r is None: return None
+    pof2, rem, newrank, folded = r
+
+    # the root may have sat out; its odd partner gathers for it
+    if root < 2*rem: newroot = root//2
+    else: newroot = root-rem
+    gather_rank = mpi_coll_unfold_rank(newroot, rem)
+
+    result = data
+    if newrank >= 0:
+        segs = mpi_coll_reduce_scatter_halving(mpi_coll_split(folded, pof2), mpi_comm,
+                                               data_size, op, pof2, rem, newrank)
+        if segs is None: return None
+        # binomial gather towards newroot (ranks relative to newroot)
+        rel = newrank ^ newroot
+        lo, hi = newrank, newrank+1
+        mask = 1
+        while mask < pof2:
+            q = mpi_coll_unfold_rank(newrank ^ mask, rem)
+            if rel & mask:
+                if not mpi_send(q, segs[lo:hi], mpi_coll_bytes(data_size, pof2, lo, hi),
+                                mpi_comm, type="__reduce_gather__"): return None
+                break
+            x = mpi_recv(mpi_comm, q, type="__reduce_gather__")
+            if x is None: return None
+            base = newrank & ~(2*mask-1)
+            other = base if lo > base else hi
+            segs[other:other+mask] = x["data"]
+            lo, hi = base, base+2*mask
+            mask *= 2
+        else:
+            result = mpi_coll_join(segs, data)
+    if gather_rank != root:
+        if p == gather_rank:
+            if not mpi_send(root, result, data_size, mpi_comm, type="__reduce_rab_root__"): return None
+            result = data
+        elif p == root:
+            x = mpi_recv(mpi_comm, gather_rank, type="__reduce_rab_root__")
+            if x is None: return None
+            result = x["data"]
+    return result
+
+def mpi_allgather_ring(data, mpi_comm, data_size=4):
+    """Ring allgather: each rank sends n-1 messages of data_size bytes."""
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    res = [None]*n
+    res[p] = data
+    left = (p-1) % n
+    right = (p+1) % n
+    for s in range(n-1):
+        send_idx = (p-s) % n
+        recv_idx = (p-s-1) % n
+        x = mpi_sendrecv(right, res[send_idx], data_size, left, mpi_comm,
+                         send_type="__allgather_ring__", recv_type="__allgather_ring__")
+        if x is None: return None
+        res[recv_idx] = x["data"]
+    return res
+
+def mpi_allgather_recursive_doubling(data, mpi_comm, data_size=4):
+    """Allgather by recursive doubling: log2(n) exchanges, doubling in size.
+
+    Falls back to the ring algorithm if n is not a power of two.
+    """
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    if n & (n-1): return mpi_allgather_ring(data, mpi_comm, data_size)
+    res = {p: data}
+    mask = 1
+    while mask < n:
+        q = p ^ mask
+        x = mpi_sendrecv(q, dict(res), data_size*mask, q, mpi_comm,
+                         send_type="__allgather_rd__", recv_type="__allgather_rd__")
+        if x is None: return None
+        res.update(x["data"])
+        mask *= 2
+    return [res[i] for i in range(n)]
+
+def mpi_bcast_scatter_allgather(root, data, mpi_comm, data_size=4):
+    """Van de Geijn's broadcast: the root scatters n segments of the
+    data (binomial tree), followed by a ring allgather."""
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    if not (0 <= root < n):
+        raise Exception("mpi_bcast root (%d) out of range (comm=%d, size=%d)" %
+                        (root, mpi_comm['commid'], n))
+    if n <= 1: return data
+    segsz = (data_size+n-1)//n
+    if p == root: segs = mpi_coll_split(data, n) + [isinstance(data, list)]
+    else: segs = [None]*(n+1)
+    # the last element tells whether data is a list (scattered along with segment 0)
+    seg = mpi_scatter(root, [(segs[i], segs[n]) for i in range(n)], mpi_comm, segsz)
+    if seg is None: return None
+    segs = mpi_allgather_ring(seg, mpi_comm, segsz)
+    if segs is None: return None
+    return mpi_coll_join([s for s, _ in segs], [] if segs[0][1] else None)
+
+def mpi_alltoall_pairwise(data, mpi_comm, data_size=4):
+    """Pairwise exchange all-to-all: in step k (1 <= k < n), rank p sends
+    to rank p+k and receives from rank p-k."""
+
+    n = len(mpi_comm['hostmap'])
+    p = mpi_comm['rank']
+    res = [None]*n
+    res[p] = data[p]
+    for k in range(1, n):
+        dst = (p+k) % n
+        src = (p-k) % n
+        x = mpi_sendrecv(dst, data[dst], data_size, src, mpi_comm,
+                         send_type="__alltoall_pairwise__", recv_type="__alltoall_pairwise__")
+        if x is None: return None
+        res[src] = x["data"]
+    return res
+
+# algorithms by collective; the first one is the default
+mpi_coll_algorithms = {
+    "reduce": {"binomial": mpi_reduce_binomial,
+               "rabenseifner": mpi_reduce_rabenseifner},
+    "bcast": {"binomial": mpi_bcast_binomial,
+              "scatter_allgather": mpi_bcast_scatter_allgather},
+    "allreduce": {"reduce_bcast": mpi_allreduce_reduce_bcast,
+                  "recursive_doubling": mpi_allreduce_recursive_doubling,
+                  "ring": mpi_allreduce_ring,
+                  "rabenseifner": mpi_allreduce_rabenseifner},
+    "allgather": {"gather_bcast": mpi_allgather_gather_bcast,
+                  "ring": mpi_allgather_ring,
+                  "recursive_doubling": mpi_allgather_recursive_doubling},
+    "alltoall": {"hypercube": mpi_alltoall_hypercube,
+                 "pairwise": mpi_alltoall_pairwise},
+}
+
+# used for the collectives missing from a communicator's table
+mpi_coll_defaults = {
+    "reduce": "binomial",
+    "bcast": "binomial",
+    "allreduce": "reduce_bcast",
+    "allgather": "gather_bcast",
+    "alltoall": "hypercube",
+}
+
+# a table with size thresholds (in bytes) similar to MPICH's defaults;
+# each entry is a list of (max data_size, algorithm), None means no limit
+mpi_collectives_mpich = {
+    "reduce": [(2048, "binomial"), (None, "rabenseifner")],
+    "bcast": [(12288, "binomial"), (None, "scatter_allgather")],
+    "allreduce": [(2048, "recursive_doubling"), (None, "rabenseifner")],
+    "allgather": [(81920, "recursive_doubling"), (None, "ring")],
+    "alltoall": [(256, "hypercube"), (None, "pairwise")],
+}
+
+def get_mpi_collectives(mpi_comm):
+    """Returns the collectives table of the communicator (or of its closest ancestor with one)."""
+
+    if "collectives" in mpi_comm:
+        return mpi_comm["collectives"]
+    elif "parent_comm" in mpi_comm:
+        return get_mpi_collectives(mpi_comm["parent_comm"])
+    else:
+        return dict()
+
+def mpi_comm_set_collectives(mpi_comm, table):
+    """Sets the collective algorithms of a communicator; this is an extension.
+
+    The table maps a collective ("reduce", "bcast", "allreduce",
+    "allgather", "alltoall") to either an algorithm name or a list of
+    (max data_size, algorithm) in increasing order of size, where the
+    last max data_size may be None (no limit). Communicators created
+    from this one inherit the table. All ranks of the communicator
+    must set the same table.
+    """
+
+    for coll, choice in table.items():
+        if coll not in mpi_coll_algorithms:
+            raise Exception("unknown mpi collective %s" % coll)
+        names = [name for _, name in choice] if isinstance(choice, (list, tuple)) else [choice]
+        for name in names:
+            if name not in mpi_coll_algorithms[coll]:
+                raise Exception("mpi %s algorithm %s not implemented" % (coll, name))
+    mpi_comm["collectives"] = table
+
+def mpi_coll_select(mpi_comm, coll, data_size):
+    """Returns the algorithm of a collective for the given data size."""
+
+    choice = get_mpi_collectives(mpi_comm).get(coll, mpi_coll_defaults[coll])
+    if isinstance(choice, (list, tuple)):
+        for max_size, name in choice:
+            if max_size is None or data_size <= max_size:
+                choice = name
+                break
+        else:
+            raise Exception("no mpi %s algorithm for data_size %r" % (coll, data_size))
+    if choice not in mpi_coll_algorithms[coll]:
+        raise Exception("mpi %s algorithm %s not implemented" % (coll, choice))
+    return mpi_coll_algorithms[coll][choice]
+
 def mpi_comm_split(mpi_comm, color, key):
     """Split the mpi communicator.
 
@@ -1086,6 +1521,7 @@ class MPIHost(Host):
         mpi_comm_world['comms'][1] = mpi_comm_null
         mpi_comm_world['comms'][2] = mpi_comm_world
         mpi_comm_world['next_commid'] = 3
+        mpi_comm_set_collectives(mpi_comm_world, data["mpiopt"].get("collectives", dict()))
 
         # run the mpi main function
         self.startProcess(proc_name, data["main_proc"], mpi_comm_world, *data["args"])
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+'''
+Functional state of the pinpoint regions, recorded once per (benchmark, region)
+and restored by the Sniper runs of every configuration after it.
+
+A pinball run replays the region functionally (Pin + PinPlay, warmup included)
+and feeds it to the timing model. The replay only depends on the pinball, not
+on the cache sizes or core parameters of the Sniper config, so it is recorded
+once into a SIFT trace (record-trace --pinball) and every run restores from it
+(run-sniper --traces). Entries are keyed by region_key(), which hashes the
+pinball and nothing of the config. That a run from the trace reports the same
+stats as the pinball run (warmup included) has not been checked against a real
+Sniper install yet; check one region before relying on the cache.
+
+The cache is a directory that any number of workers (and sweeps) can share:
+
+    <cache_dir>/entries/<key>/   recorded functional state of a region
+    <cache_dir>/index.json       size, record time and last use of the entries
+    <cache_dir>/events.jsonl     one record per region run (hit, miss, bypass) or eviction
+    <cache_dir>/locks/<key>.lock held shared while an entry is used, exclusive while it is recorded
+
+Entries are evicted least recently used first once they take more than
+quota_bytes (or there are more than max_entries), entries in use are never
+evicted. report() sums the events of a sweep into the simulation time spent and
+an estimate of the time saved: every hit is credited with the time its entry
+took to record.
+
+    cache = RegionCache('/scratch/sniper_regions', quota_bytes='50G', sweep='ga_run_3')
+    with cache.acquire(region_key(pinball), record, benchmark='602.gcc_s', region='005') as lease:
+        run_sniper(lease.path)  # lease.path is None if recording failed, run from the pinball then
+
+ARCHGYM_SNIPER_REGION_CACHE=<dir> turns the cache on for the launcher
+(ARCHGYM_SNIPER_REGION_CACHE_QUOTA, ARCHGYM_SNIPER_SWEEP set the quota and the
+sweep label), `python region_cache.py <dir>` prints the report.
+'''
+
+import argparse
+import contextlib
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+CACHE_ENV = 'ARCHGYM_SNIPER_REGION_CACHE'
+QUOTA_ENV = 'ARCHGYM_SNIPER_REGION_CACHE_QUOTA'
+SWEEP_ENV = 'ARCHGYM_SNIPER_SWEEP'
+
+DEFAULT_QUOTA = 50 * 2 ** 30
+DEFAULT_SWEEP = 'default'
+# bumped when the recorded state (or how it is restored) changes, old entries then miss
+FORMAT_VERSION = 'sift-1'
+# pinball files up to this size are hashed, larger ones (the memory images) only by size
+HASHED_FILE_BYTES = 2 ** 20
+SIZE_UNITS = {'K': 2 ** 10, 'M': 2 ** 20, 'G': 2 ** 30, 'T': 2 ** 40}
+
+
+def parse_size(size):
+    '''bytes of 1073741824, '1073741824', '1G' or '1.5T' (None for no limit)'''
+    if size is None or isinstance(size, (int, float)):
+        return size
+    size = str(size).strip().upper().rstrip('B')
+    if size and size[-1] in SIZE_UNITS:
+        return int(float(size[:-1]) * SIZE_UNITS[size[-1]])
+    return int(size)
+
+
+def region_key(pinpoint_path, version=FORMAT_VERSION):
+    '''
+    key of the functional state of a region: the pinball name (which carries the
+    warmup, prolog, region and epilog instruction counts), the size of every
+    pinball file, the content of the small ones and the record format
+    '''
+    digest = hashlib.sha256()
+    digest.update('{}\n{}\n'.format(version, os.path.basename(pinpoint_path)).encode())
+    for path in sorted(glob.glob(glob.escape(pinpoint_path) + '.*')):
+        size = os.path.getsize(path)
+        digest.update('{} {}\n'.format(os.path.basename(path), size).encode())
+        if size <= HASHED_FILE_BYTES:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:32]
+
+
+def dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class RegionLease():
+    '''an entry in use: path of the recorded state (None if recording failed), hit or miss'''
+    def __init__(self, key, path, hit, record_seconds):
+        self.key = key
+        self.path = path
+        self.hit = hit
+        self.record_seconds = record_seconds
+
+
+class RegionCache():
+    def __init__(self, cache_dir, quota_bytes=DEFAULT_QUOTA, max_entries=None, sweep=None):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.quota_bytes = parse_size(quota_bytes)
+        self.max_entries = max_entries
+        self.sweep = sweep or DEFAULT_SWEEP
+        for sub_dir in ('entries', 'staging', 'locks'):
+            os.makedirs(os.path.join(self.cache_dir, sub_dir), exist_ok=True)
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, 'entries', key)
+
+    def staging_dir(self, key):
+        '''where the state of the region is recorded, only one worker records a key at a time'''
+        return os.path.join(self.cache_dir, 'staging', key)
+
+    def lock_path(self, key):
+        return os.path.join(self.cache_dir, 'locks', key + '.lock')
+
+    @contextlib.contextmanager
+    def index(self):
+        '''the index, locked for the duration of the block and written back at its end'''
+        index_path = os.path.join(self.cache_dir, 'index.json')
+        with open(os.path.join(self.cache_dir, 'index.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                index = {}
+                if os.path.exists(index_path):
+                    with open(index_path) as f:
+                        index = json.load(f)
+                yield index
+                fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix='.index.')
+                try:
+                    with os.fdopen(fd, 'w') as f:
+                        json.dump(index, f, indent=1, sort_keys=True)
+                    os.replace(tmp, index_path)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def entries(self):
+        with self.index() as index:
+            return dict(index)
+
+    def log(self, event):
+        event = dict(event, sweep=self.sweep, time=time.time())
+        fd = os.open(os.path.join(self.cache_dir, 'events.jsonl'), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(event, sort_keys=True) + '\n').encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def _use(self, key):
+        '''record the use of an entry, its (record) seconds, None if it is not (completely) in the cache'''
+        with self.index() as index:
+            entry = index.get(key)
+            if entry is None or not os.path.isdir(self.entry_dir(key)):
+                index.pop(key, None)
+                return None
+            entry['last_used'] = time.time()
+            entry['hits'] += 1
+            return entry['record_seconds']
+
+    def _record(self, key, record, benchmark, region):
+        '''record the state of a region with record(staging_dir), True if it worked, and index it'''
+        staging = self.staging_dir(key)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        start = time.time()
+        try:
+            ok = record(staging)
+        except Exception as e:
+            print('Recording region {} of {} failed: {}'.format(region, benchmark, e))
+            ok = False
+        record_seconds = time.time() - start
+        if not ok:
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+        os.replace(staging, self.entry_dir(key))
+        now = time.time()
+        with self.index() as index:
+            index[key] = {'benchmark': benchmark, 'region': region, 'bytes': dir_bytes(self.entry_dir(key)),
+                          'record_seconds': record_seconds, 'created': now, 'last_used': now, 'hits': 0}
+        return record_seconds
+
+    @contextlib.contextmanager
+    def acquire(self, key, record, benchmark=None, region=None):
+        '''
+        Yields a RegionLease of the recorded state of the region, calling
+        record(staging_dir) to record it on a miss (it returns True once the
+        state is in staging_dir). The entry can't be evicted within the block.
+        The run (hit, miss or bypass when recording failed) and the time spent
+        in the block are logged.
+        '''
+        with open(self.lock_path(key), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            record_seconds = self._use(key)
+            hit = record_seconds is not None
+            if not hit:
+                # someone else may record it meanwhile, check again once we are the only one
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                record_seconds = self._use(key)
+                hit = record_seconds is not None
+                if not hit:
+                    record_seconds = self._record(key, record, benchmark, region)
+                    if record_seconds is not None:
+                        self.enforce_quota()
+                fcntl.flock(lock, fcntl.LOCK_SH)
+            recorded = record_seconds is not None
+            lease = RegionLease(key, self.entry_dir(key) if recorded else None, hit, record_seconds)
+            start = time.time()
+            try:
+                yield lease
+            finally:
+                simulate_seconds = time.time() - start
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                self.log({'event': 'hit' if hit else ('miss' if recorded else 'bypass'), 'key': key,
+                          'benchmark': benchmark, 'region': region, 'simulate_seconds': simulate_seconds,
+                          'record_seconds': 0.0 if hit or not recorded else record_seconds,
+                          'saved_seconds': record_seconds if hit else 0.0})
+        self.enforce_quota()
+
+    def enforce_quota(self):
+        '''evict the least recently used entries not in use until the rest fit the quota, returns the evicted keys'''
+        evicted = []
+        with self.index() as index:
+            total = sum(entry['bytes'] for entry in index.values())
+            for key in sorted(index, key=lambda k: index[k]['last_used']):
+                over_quota = self.quota_bytes is not None and total > self.quota_bytes
+                over_count = self.max_entries is not None and len(index) > self.max_entries
+                if not (over_quota or over_count):
+                    break
+                with open(self.lock_path(key), 'a') as lock:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue
+                    shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+                entry = index.pop(key)
+                total -= entry['bytes']
+                evicted.append(key)
+                self.log({'event': 'evict', 'key': key, 'benchmark': entry['benchmark'], 'region': entry['region'],
+                          'bytes': entry['bytes']})
+        return evicted
+
+    def events(self):
+        path = os.path.join(self.cache_dir, 'events.jsonl')
+        if not os.path.exists(path):
+            return []
+        events = []
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line.decode('utf-8')))
+                except ValueError:
+                    continue
+        return events
+
+    def report(self, sweep=None):
+        '''
+        per sweep (or for the given one): region runs, hits, misses, bypasses,
+        evictions and the seconds spent recording and simulating. The seconds
+        the hits saved, the uncached time and the fraction saved are estimates
+        (estimated_*): every hit is credited with the record time of its entry,
+        whatever the restored run itself took
+        '''
+        sweeps = {}
+        for event in self.events():
+            if sweep is not None and event['sweep'] != sweep:
+                continue
+            stats = sweeps.setdefault(event['sweep'], {'runs': 0, 'hit': 0, 'miss': 0, 'bypass': 0, 'evict': 0,
+                                                       'record_seconds': 0.0, 'simulate_seconds': 0.0,
+                                                       'estimated_saved_seconds': 0.0})
+            stats[event['event']] += 1
+            if event['event'] == 'evict':
+                continue
+            stats['runs'] += 1
+            for name in ('record_seconds', 'simulate_seconds'):
+                stats[name] += event[name]
+            stats['estimated_saved_seconds'] += event['saved_seconds']
+        for stats in sweeps.values():
+            spent = stats['record_seconds'] + stats['simulate_seconds']
+            stats['hit_rate'] = stats['hit'] / stats['runs'] if stats['runs'] else None
+            stats['estimated_uncached_seconds'] = spent + stats['estimated_saved_seconds']
+            stats['estimated_saved_fraction'] = (stats['estimated_saved_seconds'] / stats['estimated_uncached_seconds']
+                                                 if spent > 0 else None)
+        entries = self.entries()
+        return {'entries': len(entries), 'bytes': sum(entry['bytes'] for entry in entries.values()),
+                'quota_bytes': self.quota_bytes, 'sweeps': sweeps}
+
+
+def from_env(sweep=None):
+    '''the RegionCache ARCHGYM_SNIPER_REGION_CACHE points to, None if it is not set'''
+    cache_dir = os.environ.get(CACHE_ENV)
+    if not cache_dir:
+        return None
+    return RegionCache(cache_dir, quota_bytes=os.environ.get(QUOTA_ENV) or DEFAULT_QUOTA,
+                       sweep=sweep or os.environ.get(SWEEP_ENV))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report of a Sniper region cache')
+    parser.add_argument('cache_dir')
+    parser.add_argument('--sweep', help='Only this sweep', default=None)
+    args = parser.parse_args()
+    print(json.dumps(RegionCache(args.cache_dir, quota_bytes=None).report(args.sweep), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,9 @@ from multiprocessing import dummy
 import os
 import traceback
 os.sys.path.insert(0, os.path.abspath('../../'))
+os.sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../'))
 from configs import arch_gym_configs
+from sims.Sniper import region_cache as region_cache_module
 
 import pathlib
 import re
@@ -107,10 +109,10 @@ class ConfigurationError(Exception):
     def __str__(self):
         return repr(self.value)
 
-def launch_benchmark(cmd):
-    # Extract the output directory.
-    output_arg = cmd[6]
-    output_dir = output_arg.split(':')[0]
+def launch_benchmark(cmd, output_dir=None):
+    # Extract the output directory (the second mount of prepare_cmd) unless given.
+    if output_dir is None:
+        output_dir = cmd[6].split(':')[0]
     print("Launching Batch job for {}".format(output_dir))
     completed = subprocess.run(cmd,
                 stdout=subprocess.PIPE,
@@ -122,9 +124,32 @@ def launch_benchmark(cmd):
     with open(os.path.join(output_dir, 'stderr'), 'w') as f:
         f.write(completed.stderr.decode('utf-8'))
 
+def record_region(cmd, output_dir, staging_dir):
+    # Record the functional state of the region, keep the logs next to the ones of the run.
+    completed = subprocess.run(cmd,
+                 stdout=subprocess.PIPE,
+                 stderr=subprocess.PIPE,
+                 timeout=43200
+                 )
+    with open(os.path.join(output_dir, 'record.stdout'), 'w') as f:
+        f.write(completed.stdout.decode('utf-8'))
+    with open(os.path.join(output_dir, 'record.stderr'), 'w') as f:
+        f.write(completed.stderr.decode('utf-8'))
+    return completed.returncode == 0 and os.path.exists(os.path.join(staging_dir, 'trace.sift'))
+
+def launch_cached_benchmark(job):
+    # Restore the region from the cache (recording it first on a miss), run from the pinball if recording fails.
+    cache = job['cache']
+    record = lambda staging_dir: record_region(job['record_cmd'], job['output_dir'], staging_dir)
+    with cache.acquire(job['key'], record, benchmark=job['benchmark'], region=job['region']) as lease:
+        launch_benchmark(job['cmd'] if lease.path is None else job['restore_cmd'], job['output_dir'])
+
 class SniperLauncher:
-    def __init__(self, simultaneity):
+    # With a region_cache (sims/Sniper/region_cache.py), the functional state of every region is recorded
+    # once and the runs of all the configurations restore from it.
+    def __init__(self, simultaneity, region_cache=None):
         self.simultaneity = simultaneity
+        self.region_cache = region_cache
         self.pool = multiprocessing.Pool(self.simultaneity, maxtasksperchild=4)
 
     def prepare_cmd(self, pinpoint_path, output_path, config_path):
@@ -174,6 +199,50 @@ class SniperLauncher:
                 '--pinballs', '/root/pinpoints/{}'.format(pinpoint_name)]
         return cmd
 
+    def prepare_record_cmd(self, pinpoint_path, staging_dir):
+        # Record the functional state of the region (Pin replaying the pinball) into staging_dir/trace.sift.
+        pinpoint_dir = os.path.dirname(pinpoint_path)
+        pinpoint_name = os.path.basename(pinpoint_path)
+
+        cmd = ['docker', 'run', '--rm',
+                '-v', '{}:/root/pinpoints'.format(pinpoint_dir),    # PinPoints root directory.
+                '-v', '{}:/root/region'.format(staging_dir),        # Region being recorded.
+                'sniper',
+                'record-trace',
+                '-o', '/root/region/trace',
+                '--pinball=/root/pinpoints/{}'.format(pinpoint_name)]
+        return cmd
+
+    def prepare_restore_cmd(self, region_dir, output_dir, config_path):
+        # Run the configuration from the recorded region (region_dir/trace.sift) instead of the pinball.
+        config_dir = os.path.dirname(config_path)
+        config_file = os.path.basename(config_path)
+
+        cmd = ['docker', 'run', '--rm',
+                '-v', '{}:/root/region:ro'.format(region_dir),      # Recorded region.
+                '-v', '{}:/root/output'.format(output_dir),         # Output directory.
+                '-v', '{}:/root/configs'.format(config_dir),        # Configuration directory.
+                'sniper',
+                'run-sniper',
+                '--power',
+                '-d', '/root/output',
+                '-c', '/root/configs/{}'.format(config_file),
+                '--traces=/root/region/trace.sift']
+        return cmd
+
+    def prepare_cached_job(self, pinpoint_path, output_path, config_path):
+        # The pinball run, plus the commands recording the region into the cache and running from the recording.
+        cmd = self.prepare_cmd(pinpoint_path, output_path, config_path)
+        name_parts = details_re.match(os.path.basename(pinpoint_path))
+        output_dir = os.path.join(output_path, name_parts.group(10))  # Created by prepare_cmd.
+        key = region_cache_module.region_key(pinpoint_path)
+
+        record_cmd = self.prepare_record_cmd(pinpoint_path, self.region_cache.staging_dir(key))
+        restore_cmd = self.prepare_restore_cmd(self.region_cache.entry_dir(key), output_dir, config_path)
+        return {'cache': self.region_cache, 'key': key, 'benchmark': name_parts.group(1),
+                'region': name_parts.group(10), 'output_dir': output_dir,
+                'cmd': cmd, 'record_cmd': record_cmd, 'restore_cmd': restore_cmd}
+
     def prepare_all_commands(self, benchmark, pinpoints, output, config, simultaneity):
         pinpoints_path = os.path.abspath(pinpoints)
         output_path = os.path.abspath(output)
@@ -190,15 +259,25 @@ class SniperLauncher:
 
         cmds = []
         for bp in benchmark_points:
-            cmd = self.prepare_cmd(bp, output_path, config_path)
+            if self.region_cache is not None:
+                cmd = self.prepare_cached_job(bp, output_path, config_path)
+            else:
+                cmd = self.prepare_cmd(bp, output_path, config_path)
             cmds.append(cmd)
         return cmds
 
     def batch_benchmark(self, benchmark, pinpoints, output, config, callback=None):
         cmds = self.prepare_all_commands(benchmark, pinpoints, output, config, None)
-        async_result = self.pool.map_async(launch_benchmark, cmds, callback=callback)
+        launch = launch_benchmark if self.region_cache is None else launch_cached_benchmark
+        async_result = self.pool.map_async(launch, cmds, callback=callback)
         return async_result
 
+    def region_cache_report(self):
+        # Hits, misses and the time the region cache saved in this sweep.
+        if self.region_cache is None:
+            return None
+        return self.region_cache.report(self.region_cache.sweep)['sweeps'].get(self.region_cache.sweep)
+
 def error_check(benchmark_dir):
     output_path = os.path.abspath(benchmark_dir)
     assert os.path.exists(output_path)
@@ -446,12 +525,28 @@ def main():
     parser.add_argument('-c', help='Sniper configuration path', default='./config/gainestown.cfg')
     parser.add_argument('-d', help='Output directory', required=True)
     parser.add_argument('-n', help='Number of simultaneous jobs to launch', type=int, default=1)
+    parser.add_argument('--region-cache', help='Region state cache directory',
+                        default=os.environ.get(region_cache_module.CACHE_ENV))
+    parser.add_argument('--region-cache-quota', help='Region state cache disk quota, e.g. 50G',
+                        default=os.environ.get(region_cache_module.QUOTA_ENV) or region_cache_module.DEFAULT_QUOTA)
+    parser.add_argument('--sweep', help='Sweep the runs are reported under',
+                        default=os.environ.get(region_cache_module.SWEEP_ENV))
     args = parser.parse_args()
 
-    launcher = SniperLauncher(args.n)
+    region_cache = None
+    if args.region_cache:
+        region_cache = region_cache_module.RegionCache(args.region_cache, args.region_cache_quota, sweep=args.sweep)
+    launcher = SniperLauncher(args.n, region_cache)
     async_result = launcher.batch_benchmark(args.benchmark, args.s, args.d, args.c)
     async_result.wait()
     combine_stats(args.d)
+    if region_cache is not None:
+        report = launcher.region_cache_report() or {'hit': 0, 'miss': 0, 'estimated_saved_seconds': 0.0}
+        with open(os.path.join(args.d, 'region_cache.json'), 'w') as f:
+            json.dump(report, f, sort_keys=True, indent=2)
+        # every hit is credited with the time its region took to record
+        print('Region cache: {hit} hits, {miss} misses, ~{estimated_saved_seconds:.0f}s saved in sweep '
+              '(estimate)'.format(**report))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+'''
+Mappings found by timeloop-mapper, kept per (layer shape, architecture) and
+reused to warm-start the search on nearby architectures.
+
+Nearby architectures in a DSE run mostly differ in buffer sizes and PE counts,
+so the best mapping of a layer on one of them is usually a few tiling moves
+away from a good mapping on the next one. MappingStore keeps every mapping
+found (append-only jsonl, safe to share between workers), nearest() returns the
+best mappings of the closest stored architectures and legalize() adapts a
+mapping to the new buffer capacities and fanouts by moving prime tiling
+factors outwards. The result is only legal as far as this model of the
+architecture goes (sum of the kept tiles within each buffer, spatial factors
+within the fanout), timeloop-model re-validates it.
+
+    store = MappingStore('timeloop_mappings.jsonl')
+    seeds = store.nearest(layer_key(instance), arch_features(arch), k=3)
+    legal = [m for m in (legalize(s['mapping'], instance, arch) for s in seeds) if m is not None]
+'''
+
+import copy
+import json
+import math
+import os
+
+import yaml
+
+LAYER_DIMS = ('C', 'M', 'R', 'S', 'N', 'P', 'Q')
+DATA_SPACES = ('Weights', 'Inputs', 'Outputs')
+DATA_SPACE_DIMS = {'Weights': ('C', 'M', 'R', 'S'),
+                   'Inputs': ('N', 'C', 'R', 'S', 'P', 'Q'),
+                   'Outputs': ('N', 'M', 'P', 'Q')}
+COMPUTE_CLASSES = ('intmac', 'fpmac', 'mac', 'compute')
+MISSING_FEATURE_DISTANCE = 4.0
+
+
+def load_yaml(path):
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+def layer_instance(layer_file):
+    '''problem instance (C, M, R, S, N, P, Q, strides, dilations) of a layer shape yaml'''
+    return load_yaml(layer_file)['problem']['instance']
+
+
+def layer_key(instance):
+    '''canonical text of a layer instance, the key mappings are stored under'''
+    return ','.join('{}={}'.format(k, int(instance[k])) for k in sorted(instance))
+
+
+def instance_count(name):
+    '''number of instances of an arch node, 168 for PE[0..167]'''
+    if '[' not in name:
+        return 1
+    first, last = name[name.index('[') + 1:name.rindex(']')].split('..')
+    return int(last) - int(first) + 1
+
+
+def base_name(name):
+    return name.split('[')[0]
+
+
+def storage_levels(arch):
+    '''
+    storage levels of a timeloop architecture, outermost first, followed by the
+    compute level: dicts with name, instances, capacity (words, inf for DRAM or
+    when the size is unknown), compute and the attributes
+    '''
+    if 'architecture' in arch:
+        arch = arch['architecture']
+    levels = []
+
+    def walk(node, instances):
+        instances *= instance_count(node.get('name', ''))
+        for local in node.get('local', []):
+            attributes = local.get('attributes', {}) or {}
+            depth = attributes.get('memory_depth', attributes.get('depth'))
+            width = attributes.get('memory_width', attributes.get('width'))
+            word_bits = attributes.get('word-bits', attributes.get('datawidth', 16))
+            capacity = math.inf
+            if local.get('class') != 'DRAM' and depth is not None and width is not None:
+                capacity = int(depth) * int(width) // int(word_bits)
+            levels.append({'name': base_name(local['name']), 'instances': instances * instance_count(local['name']),
+                           'capacity': capacity, 'compute': local.get('class') in COMPUTE_CLASSES,
+                           'attributes': attributes})
+        for subtree in node.get('subtree', []):
+            walk(subtree, instances)
+
+    walk(arch, 1)
+    storage = [level for level in levels if not level['compute']]
+    return storage + [level for level in levels if level['compute']][:1]
+
+
+def arch_features(arch):
+    '''the numeric parameters of an architecture, flattened, the space nearest() measures distance in'''
+    features = {}
+    for level in storage_levels(arch):
+        features[level['name'] + '.instances'] = level['instances']
+        for attribute, value in level['attributes'].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                features[level['name'] + '.' + attribute] = value
+    return features
+
+
+def arch_distance(a, b):
+    '''mean absolute log2 difference of the features, MISSING_FEATURE_DISTANCE for the ones only one has'''
+    keys = set(a) | set(b)
+    if not keys:
+        return 0.0
+    total = 0.0
+    for key in keys:
+        if key in a and key in b:
+            total += abs(math.log2(1 + abs(a[key])) - math.log2(1 + abs(b[key])))
+        else:
+            total += MISSING_FEATURE_DISTANCE
+    return total / len(keys)
+
+
+def parse_factors(text):
+    '''"C1 M8 R3" (mapper output) or "C=1 M=8 R=3" (constraints) -> {dim: factor}'''
+    factors = {}
+    for item in str(text or '').split():
+        dim, value = (item.split('=') if '=' in item else (item[0], item[1:]))
+        factors[dim] = int(value)
+    return factors
+
+
+def format_factors(factors):
+    return ' '.join('{}{}'.format(dim, factors.get(dim, 1)) for dim in LAYER_DIMS)
+
+
+def load_mapping(path):
+    '''the mapping (list of entries) of a timeloop map.yaml, None if there is none'''
+    try:
+        data = load_yaml(path)
+    except (OSError, yaml.YAMLError):
+        return None
+    mapping = data.get('mapping') if isinstance(data, dict) else None
+    return mapping if isinstance(mapping, list) and mapping else None
+
+
+def dump_mapping(mapping, path):
+    with open(path, 'w') as f:
+        yaml.safe_dump({'mapping': mapping}, f, default_flow_style=False, sort_keys=False)
+
+
+def smallest_prime_factor(n):
+    for p in range(2, int(math.isqrt(n)) + 1):
+        if n % p == 0:
+            return p
+    return n
+
+
+class _Tiling():
+    '''the loop entries of a mapping, with their level index, in a form the tiles can be computed from'''
+    def __init__(self, mapping, levels):
+        self.levels = levels
+        index = {level['name']: i for i, level in enumerate(levels) if not level['compute']}
+        self.loops, self.keep, self.others = [], {}, []
+        for entry in mapping:
+            target = base_name(str(entry.get('target', '')))
+            if target not in index:
+                raise KeyError(target)
+            kind = entry.get('type')
+            if kind in ('temporal', 'spatial'):
+                self.loops.append({'level': index[target], 'type': kind, 'factors': parse_factors(entry.get('factors')),
+                                   'entry': dict(entry)})
+            elif kind in ('datatype', 'bypass'):
+                self.keep[index[target]] = set(entry.get('keep', []) or [])
+                self.others.append(dict(entry))
+            else:
+                self.others.append(dict(entry))
+
+    def tile(self, level):
+        '''size per dimension of the tile one instance of level holds'''
+        tile = {dim: 1 for dim in LAYER_DIMS}
+        for loop in self.loops:
+            if loop['level'] >= level:
+                for dim, factor in loop['factors'].items():
+                    tile[dim] = tile.get(dim, 1) * factor
+        return tile
+
+    def totals(self):
+        return self.tile(0)
+
+    def fanout(self, level):
+        instances = self.levels[level]['instances']
+        for inner in self.levels[level + 1:]:
+            if inner['instances'] != instances:
+                return inner['instances'] // instances
+        return 1
+
+    def temporal(self, level):
+        '''the temporal loop entry of level, created if the mapping has none'''
+        for loop in self.loops:
+            if loop['level'] == level and loop['type'] == 'temporal':
+                return loop
+        loop = {'level': level, 'type': 'temporal', 'factors': {},
+                'entry': {'target': self.levels[level]['name'], 'type': 'temporal'}}
+        self.loops.append(loop)
+        return loop
+
+    def mapping(self):
+        mapping = []
+        for loop in sorted(self.loops, key=lambda loop: (loop['level'], loop['type'] != 'temporal')):
+            entry = loop['entry']
+            entry['factors'] = format_factors(loop['factors'])
+            if 'permutation' in entry:
+                permutation = str(entry['permutation'])
+                entry['permutation'] = permutation + ''.join(d for d in LAYER_DIMS if d not in permutation)
+            mapping.append(entry)
+        return mapping + self.others
+
+
+def data_space_words(tile, instance):
+    '''words of each data space in a tile'''
+    width = (tile['P'] - 1) * int(instance.get('Wstride', 1)) + (tile['R'] - 1) * int(instance.get('Wdilation', 1)) + 1
+    height = (tile['Q'] - 1) * int(instance.get('Hstride', 1)) + (tile['S'] - 1) * int(instance.get('Hdilation', 1)) + 1
+    return {'Weights': tile['C'] * tile['M'] * tile['R'] * tile['S'],
+            'Inputs': tile['N'] * tile['C'] * width * height,
+            'Outputs': tile['N'] * tile['M'] * tile['P'] * tile['Q']}
+
+
+def _violation(tiling, instance):
+    '''the first (kind, level, data spaces) the mapping violates, None if it fits'''
+    for loop in tiling.loops:
+        if loop['type'] == 'spatial':
+            if math.prod(loop['factors'].values()) > tiling.fanout(loop['level']):
+                return 'fanout', loop['level'], ()
+    for level, storage in enumerate(tiling.levels):
+        if storage['compute'] or storage['capacity'] == math.inf:
+            continue
+        kept = tiling.keep.get(level, set(DATA_SPACES))
+        words = data_space_words(tiling.tile(level), instance)
+        if sum(words[space] for space in kept) > storage['capacity']:
+            return 'capacity', level, tuple(space for space in DATA_SPACES if space in kept)
+    return None
+
+
+def violations(mapping, instance, arch):
+    '''(kind, level name, data spaces) of the first violation of mapping on arch, None if it is legal'''
+    levels = storage_levels(arch)
+    try:
+        tiling = _Tiling(mapping, levels)
+    except KeyError as e:
+        return 'target', str(e.args[0]), ()
+    if any(tiling.totals()[dim] != int(instance.get(dim, 1)) for dim in LAYER_DIMS):
+        return 'factors', None, ()
+    violation = _violation(tiling, instance)
+    if violation is None:
+        return None
+    return violation[0], levels[violation[1]]['name'], violation[2]
+
+
+def legalize(mapping, instance, arch, max_moves=512):
+    '''
+    adapts mapping (of the same layer on another architecture) to arch,
+    returns the new mapping or None if it targets levels arch does not have or
+    can not be made to fit
+
+    Spatial factors beyond the fanout of a level move to its temporal loop and
+    tiles that overflow a buffer give a prime factor of the relevant dimension
+    (own temporal loop first, then inner temporal loops, then spatial ones) to
+    the temporal loop of the next outer level.
+    '''
+    levels = storage_levels(arch)
+    try:
+        tiling = _Tiling(copy.deepcopy(mapping), levels)
+    except KeyError:
+        return None
+    if any(tiling.totals()[dim] != int(instance.get(dim, 1)) for dim in LAYER_DIMS):
+        return None
+    for _ in range(max_moves):
+        violation = _violation(tiling, instance)
+        if violation is None:
+            return tiling.mapping()
+        kind, level, spaces = violation
+        if kind == 'fanout':
+            source = next(loop for loop in tiling.loops
+                          if loop['level'] == level and loop['type'] == 'spatial'
+                          and math.prod(loop['factors'].values()) > tiling.fanout(level))
+            dim = max(source['factors'], key=lambda d: source['factors'][d])
+            destination = tiling.temporal(level)
+        else:
+            if level == 0:
+                return None
+            dims = set(d for space in spaces for d in DATA_SPACE_DIMS[space])
+            candidates = [loop for loop in tiling.loops if loop['level'] >= level
+                          and any(loop['factors'].get(d, 1) > 1 for d in dims)]
+            if not candidates:
+                return None
+            source = min(candidates, key=lambda loop: (loop['type'] != 'temporal', loop['level'] != level, -loop['level']))
+            dim = max((d for d in dims if source['factors'].get(d, 1) > 1), key=lambda d: source['factors'][d])
+            outer = max(i for i in range(level) if not levels[i]['compute'])
+            destination = tiling.temporal(outer)
+        p = smallest_prime_factor(source['factors'][dim])
+        source['factors'][dim] //= p
+        destination['factors'][dim] = destination['factors'].get(dim, 1) * p
+    return None
+
+
+class MappingStore():
+    '''
+    Append-only store of the mappings found, one json record per line:
+    layer key, arch features, mapping, energy, cycles, seconds to find it and
+    source ('cold' mapper run, 'warm' start or 'cold-reference' comparison run).
+    Every record is a single O_APPEND write, so concurrent workers can share
+    the file, a torn last line is skipped.
+    '''
+    def __init__(self, store_file):
+        self.store_file = store_file
+        self.records = []
+        self.read_offset = 0
+        self.refresh()
+
+    def refresh(self):
+        if not os.path.exists(self.store_file):
+            return
+        with open(self.store_file, 'rb') as f:
+            f.seek(self.read_offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        self.read_offset += end
+        for line in data[:end].splitlines():
+            try:
+                self.records.append(json.loads(line.decode('utf-8')))
+            except ValueError:
+                continue
+
+    def insert(self, layer, features, mapping, energy, cycles, seconds, source):
+        record = {'layer': layer, 'features': features, 'mapping': mapping, 'energy': float(energy),
+                  'cycles': float(cycles), 'seconds': float(seconds), 'source': source}
+        dir_name = os.path.dirname(os.path.abspath(self.store_file))
+        os.makedirs(dir_name, exist_ok=True)
+        fd = os.open(self.store_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(record, sort_keys=True) + '\n').encode('utf-8'))
+        finally:
+            os.close(fd)
+        return record
+
+    def nearest(self, layer, features, k=3):
+        '''the best mapping (fewest cycles, then energy) of the layer on each of the k closest stored architectures'''
+        self.refresh()
+        best = {}
+        for record in self.records:
+            if record['layer'] != layer or record['mapping'] is None:
+                continue
+            arch = json.dumps(record['features'], sort_keys=True)
+            if arch not in best or (record['cycles'], record['energy']) < (best[arch]['cycles'], best[arch]['energy']):
+                best[arch] = record
+        ranked = sorted(best.values(), key=lambda r: (arch_distance(features, r['features']), r['cycles'], r['energy']))
+        return ranked[:k]
+
+    def report(self):
+        '''
+        time to mapping of warm starts and cold runs and, for the layers and
+        architectures searched both ways, the warm/cold ratios of the seconds,
+        cycles and energy found
+        '''
+        self.refresh()
+        report = {}
+        for source in ('cold', 'warm'):
+            seconds = [r['seconds'] for r in self.records if r['source'] == source]
+            report[source] = {'count': len(seconds), 'mean_seconds': sum(seconds) / len(seconds) if seconds else None}
+        warm, reference = {}, {}
+        for record in self.records:
+            key = (record['layer'], json.dumps(record['features'], sort_keys=True))
+            if record['source'] == 'warm':
+                warm[key] = record
+            elif record['source'] == 'cold-reference':
+                reference[key] = record
+        pairs = [(warm[key], reference[key]) for key in warm if key in reference]
+        ratios = {}
+        for metric in ('seconds', 'cycles', 'energy'):
+            values = [w[metric] / c[metric] for w, c in pairs if c[metric] > 0]
+            ratios[metric] = math.exp(sum(math.log(v) for v in values) / len(values)) if values else None
+        report['paired'] = {'count': len(pairs), 'warm_over_cold': ratios}
+        return report
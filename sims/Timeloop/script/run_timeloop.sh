@@ -5,11 +5,13 @@ cd /home/workspace/src/timeloop-examples/workspace/final-project/example_designs
 
 OUTPUT_DIR="./arch-gym/sims/Timeloop/output"
 LAYER_SHAPE="AlexNet/AlexNet_layer5.yaml"
+MAPPER="./arch-gym/sims/Timeloop/mapper/mapper.yaml"
 
 # Invoke timeloop
 echo " " | timeloop-mapper ./arch-gym/sims/Timeloop/arch/eyeriss_like.yaml \
   ./arch-gym/sims/Timeloop/arch/components/*.yaml \
-  ./arch-gym/sims/Timeloop/mapper/mapper.yaml constraints/*.yaml \
+  $MAPPER constraints/*.yaml \
   ../../layer_shapes/$LAYER_SHAPE >$OUTPUT_DIR/timeloop_simulation_output.txt
 
 mv timeloop-mapper.stats.txt ./arch-gym/sims/Timeloop/output
+mv timeloop-mapper.map.yaml ./arch-gym/sims/Timeloop/output
@@ -0,0 +1,15 @@
+#!/usr/bin/sh
+HOME="/home/workspace"
+
+cd /home/workspace/src/timeloop-examples/workspace/final-project/example_designs/eyeriss_like
+
+OUTPUT_DIR="./arch-gym/sims/Timeloop/output"
+LAYER_SHAPE="AlexNet/AlexNet_layer5.yaml"
+
+# Evaluate the seed mapping TimeloopWrapper.run_model writes to $OUTPUT_DIR/seed_mapping.yaml
+echo " " | timeloop-model ./arch-gym/sims/Timeloop/arch/eyeriss_like.yaml \
+  ./arch-gym/sims/Timeloop/arch/components/*.yaml \
+  $OUTPUT_DIR/seed_mapping.yaml \
+  ../../layer_shapes/$LAYER_SHAPE >$OUTPUT_DIR/timeloop_model_output.txt
+
+mv timeloop-model.stats.txt ./arch-gym/sims/Timeloop/output
@@ -13,7 +13,7 @@ from absl import logging
 
 
 def simulate_timeloop(script_dir=None, output_dir=None, arch_dir=None, mapper_dir=None, workload_dir=None,
-                      arch_params=None, runtime="docker"):
+                      arch_params=None, runtime="docker", mapping_store=None):
     if runtime == "docker":
         from sims.Timeloop.timeloop_wrapper import TimeloopWrapper
 
@@ -23,7 +23,14 @@ def simulate_timeloop(script_dir=None, output_dir=None, arch_dir=None, mapper_di
     else:
         raise ValueError("Runtime should be either docker or singularity")
 
-    timeloop = TimeloopWrapper(script_dir, output_dir, arch_dir, mapper_dir, workload_dir)
+    if mapping_store is None:
+        timeloop = TimeloopWrapper(script_dir, output_dir, arch_dir, mapper_dir, workload_dir)
+    elif runtime == "docker":
+        # warm-started mapping from the mappings stored for nearby architectures
+        timeloop = TimeloopWrapper(script_dir, output_dir, arch_dir, mapper_dir, workload_dir,
+                                   mapping_store=mapping_store)
+    else:
+        raise ValueError("Warm-started mapping needs the docker runtime")
     if arch_params is not None:
         timeloop.update_arch(arch_params)
     energy, area, cycles = timeloop.launch_timeloop()
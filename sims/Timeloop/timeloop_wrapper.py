@@ -2,17 +2,46 @@
 
 import subprocess
 import os
+import time
 import numpy as np
 import yaml
 
+settings_file_path = os.path.realpath(__file__)
+settings_dir_path = os.path.dirname(settings_file_path)
+os.sys.path.insert(0, settings_dir_path + '/../../')
+
+from sims.config_renderer import TimeloopArchRenderer
+from sims.Timeloop.mapping_cache import (MappingStore, arch_features, dump_mapping, layer_instance, layer_key,
+                                         legalize, load_mapping, load_yaml)
+
 
 class TimeloopWrapper:
-    def __init__(self, script_dir=None, output_dir=None, arch_dir=None, mapper_dir=None, workload_dir=None):
+    '''
+    mapping_store (a MappingStore or the path of its file) turns on warm-started
+    mapping: the best mappings of the layer on the warm_start_k closest stored
+    architectures are legalized for the current one and evaluated with
+    timeloop-model (script/run_timeloop_model.sh), timeloop-mapper runs with
+    warm_budget times its timeout and victory-condition, and the best of these
+    is the mapping of the layer. Without a legal seed the full mapper runs
+    (cold start). Every compare_cold_every-th warm start is also searched cold,
+    for MappingStore.report() to compare time to mapping and mapping quality.
+    '''
+    def __init__(self, script_dir=None, output_dir=None, arch_dir=None, mapper_dir=None, workload_dir=None,
+                 mapping_store=None, warm_start_k=3, warm_budget=0.2, compare_cold_every=0):
         self.script_dir = script_dir
         self.output_dir = output_dir
         self.arch_dir = arch_dir
         self.mapper_dir = mapper_dir
         self.workload_dir = workload_dir
+        self.arch_renderer = None
+        if isinstance(mapping_store, str):
+            mapping_store = MappingStore(mapping_store)
+        self.mapping_store = mapping_store
+        self.warm_start_k = warm_start_k
+        self.warm_budget = warm_budget
+        self.compare_cold_every = compare_cold_every
+        self.warm_starts = 0
+        self.mapping_stats = []
         return
 
     def prepare_cmd(self):
@@ -25,23 +54,30 @@ class TimeloopWrapper:
         area = np.float64()
         cycles = np.float64()
         for layer in os.listdir(self.workload_dir):
-            self.modify_script(self.output_dir, layer)
-            cmd = self.prepare_cmd()
-            completed = subprocess.run(cmd)
-            mapping_exists = self.valid_mapping()
-            if not mapping_exists:
-                energy, area, cycles = (-1.0, -1.0, -1.0)
-                break
-            metrics = self.obtain_metrics()
+            if self.mapping_store is not None:
+                metrics = self.map_layer(layer)
+                if metrics is None:
+                    energy, area, cycles = (-1.0, -1.0, -1.0)
+                    break
+            else:
+                self.modify_script(self.output_dir, layer)
+                cmd = self.prepare_cmd()
+                completed = subprocess.run(cmd)
+                mapping_exists = self.valid_mapping()
+                if not mapping_exists:
+                    energy, area, cycles = (-1.0, -1.0, -1.0)
+                    break
+                metrics = self.obtain_metrics()
             energy += metrics[0]
             area = metrics[1]  # Area does not change based on layer
             cycles += metrics[2]
 
         return energy, area, cycles
 
-    def modify_script(self, output_dir, layer):
-        # Update layer and output dir in run_timeloop script
-        script = "run_timeloop.sh"
+    def modify_script(self, output_dir, layer, script="run_timeloop.sh", variables=None):
+        # Update layer (and the given variables) in a timeloop script
+        variables = dict(variables or {})
+        variables['LAYER_SHAPE'] = self.workload_dir.split('/')[-1] + '/' + layer
         file = open(self.script_dir + "/" + script, "r")
         replacement = ""
         for line in file:
@@ -49,8 +85,9 @@ class TimeloopWrapper:
             # if 'OUTPUT_DIR=' in line:
             #     changes = 'OUTPUT_DIR=' + '"./' + output_dir.split('/')[-1] + '"'
             #     replacement = replacement + changes + "\n"
-            if 'LAYER_SHAPE=' in line:
-                changes = 'LAYER_SHAPE=' + '"' + self.workload_dir.split('/')[-1] + '/' + layer + '"'
+            name = line.split('=')[0]
+            if '=' in line and name in variables:
+                changes = name + '=' + '"' + variables[name] + '"'
                 replacement = replacement + changes + "\n"
             else:
                 replacement = replacement + line + "\n"
@@ -62,6 +99,89 @@ class TimeloopWrapper:
         print(layer)
         return
 
+    def run_mapper(self, layer, budget=1.0):
+        '''
+        runs timeloop-mapper on layer with budget times the timeout and
+        victory-condition of mapper.yaml (through the MAPPER variable of the
+        script, scripts without it run the full mapper)
+        returns ((energy, area, cycles), mapping) or None
+        '''
+        mapper = load_yaml(os.path.join(self.mapper_dir, "mapper.yaml"))
+        for option in ('timeout', 'victory-condition'):
+            if option in mapper.get('mapper', {}):
+                mapper['mapper'][option] = max(1, int(round(mapper['mapper'][option] * budget)))
+        with open(os.path.join(self.output_dir, "mapper.yaml"), "w") as f:
+            yaml.safe_dump(mapper, f, default_flow_style=False)
+        for stale in ("timeloop_simulation_output.txt", "timeloop-mapper.stats.txt", "timeloop-mapper.map.yaml"):
+            if os.path.exists(os.path.join(self.output_dir, stale)):
+                os.remove(os.path.join(self.output_dir, stale))
+        self.modify_script(self.output_dir, layer, variables={'MAPPER': '$OUTPUT_DIR/mapper.yaml'})
+        subprocess.run(self.prepare_cmd())
+        if not os.path.exists(os.path.join(self.output_dir, "timeloop_simulation_output.txt")) \
+                or not self.valid_mapping():
+            return None
+        mapping = load_mapping(os.path.join(self.output_dir, "timeloop-mapper.map.yaml"))
+        return self.obtain_metrics(), mapping
+
+    def run_model(self, layer, mapping):
+        '''evaluates mapping on layer with timeloop-model, returns ((energy, area, cycles), mapping) or None'''
+        script = "run_timeloop_model.sh"
+        stats_file = os.path.join(self.output_dir, "timeloop-model.stats.txt")
+        if not os.path.exists(os.path.join(self.script_dir, script)):
+            return None
+        if os.path.exists(stats_file):
+            os.remove(stats_file)
+        dump_mapping(mapping, os.path.join(self.output_dir, "seed_mapping.yaml"))
+        self.modify_script(self.output_dir, layer, script=script)
+        subprocess.run(['bash', os.path.join(self.script_dir, script)])
+        if not os.path.exists(stats_file):
+            # timeloop-model rejected the mapping
+            return None
+        return self.obtain_metrics("timeloop-model.stats.txt"), mapping
+
+    def map_layer(self, layer):
+        '''mapping of layer, warm-started from the mapping store when it has legal seeds, returns the metrics or None'''
+        instance = layer_instance(os.path.join(self.workload_dir, layer))
+        arch = load_yaml(os.path.join(self.arch_dir, "eyeriss_like.yaml"))
+        key, features = layer_key(instance), arch_features(arch)
+
+        start = time.time()
+        seeds = []
+        for record in self.mapping_store.nearest(key, features, self.warm_start_k):
+            mapping = legalize(record['mapping'], instance, arch)
+            if mapping is not None and mapping not in seeds:
+                seeds.append(mapping)
+        result, source = None, 'cold'
+        if seeds:
+            candidates = [self.run_model(layer, mapping) for mapping in seeds]
+            candidates.append(self.run_mapper(layer, self.warm_budget))
+            candidates = [c for c in candidates if c is not None]
+            if candidates:
+                result = min(candidates, key=lambda c: (c[0][2], c[0][0]))
+                source = 'warm'
+        if result is None:
+            result = self.run_mapper(layer)
+        seconds = time.time() - start
+        if result is None:
+            return None
+        self.record_mapping(layer, key, features, result, seconds, source)
+
+        if source == 'warm':
+            self.warm_starts += 1
+            if self.compare_cold_every and self.warm_starts % self.compare_cold_every == 0:
+                start = time.time()
+                reference = self.run_mapper(layer)
+                if reference is not None:
+                    self.record_mapping(layer, key, features, reference, time.time() - start, 'cold-reference')
+        return result[0]
+
+    def record_mapping(self, layer, key, features, result, seconds, source):
+        (energy, area, cycles), mapping = result
+        self.mapping_stats.append({'layer': layer, 'source': source, 'seconds': seconds,
+                                   'energy': energy, 'cycles': cycles})
+        if mapping is not None:
+            self.mapping_store.insert(key, features, mapping, energy, cycles, seconds, source)
+
     def valid_mapping(self):
         output_path = os.path.join(self.output_dir, "timeloop_simulation_output.txt")
         file = open(output_path, "r")
@@ -71,8 +191,8 @@ class TimeloopWrapper:
                 return True
         return False
 
-    def obtain_metrics(self):
-        file = open(self.output_dir + "/timeloop-mapper.stats.txt", "r")
+    def obtain_metrics(self, stats_file="timeloop-mapper.stats.txt"):
+        file = open(self.output_dir + "/" + stats_file, "r")
         energy = np.float64()
         area = np.float64()
         cycles = np.float64()
@@ -88,74 +208,11 @@ class TimeloopWrapper:
         return energy, area, cycles
 
     def update_arch(self, arch_params):
-        eyeriss_like_path = os.path.join(self.arch_dir, "eyeriss_like.yaml")
-        file = open(eyeriss_like_path, 'r')
-        eyeriss_arch = yaml.safe_load(file)
-
-        # CONSTANT POINTERS TO ARCH PARAMS
-        PTRS = {
-            'SHARED_GLB_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 0, 'class'],
-            'SHARED_GLB_ATTRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 0, 'attributes'],
-            'DUMMY_BUFFER_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 1, 'class'],
-            'DUMMY_BUFFER_ATTRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 1, 'attributes'],
-            'NUM_PEs': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'name'],
-            'IFMAP_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 0, 'class'],
-            'IFMAP_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 0,
-                                     'attributes'],
-            'WEIGHTS_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 1, 'class'],
-            'WEIGHTS_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 1,
-                                       'attributes'],
-            'PSUM_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 2, 'class'],
-            'PSUM_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 2, 'attributes'],
-            'MAC_MESH_X': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 3, 'attributes', 'meshX']
-        }
-
-        # Update arch params passed and replace eyeriss_like.yaml
-        new_data = eyeriss_arch
-
-        meshx = 0 
-        # store the meshx value from MAC
-        for k,v in arch_params.items():
-            if k == 'MAC_MESH_X':
-                meshx = v
-        
-        for k, v in arch_params.items():
-            if k == "SHARED_GLB_CLASS":
-                new_data['architecture']['subtree'][0]['subtree'][0]['local'][0]['class'] = v
-            elif k == "SHARED_GLB_ATTRIBUTES":
-                new_data['architecture']['subtree'][0]['subtree'][0]['local'][0]['attributes'] = v
-            elif k == "DUMMY_BUFFER_CLASS":
-                new_data['architecture']['subtree'][0]['subtree'][0]['local'][1]['class'] = v
-            elif k == "DUMMY_BUFFER_ATTRIBUTES":
-                v['meshX'] = meshx
-                new_data['architecture']['subtree'][0]['subtree'][0]['local'][1]['attributes'] = v
-            elif k == "NUM_PEs":
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['name'] = v
-            elif k == "IFMAP_SPAD_CLASS":
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][0]['class'] = v
-            elif k == "IFMAP_SPAD_ATRIBUTES":
-                v['meshX'] = meshx
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][0]['attributes'] = v
-            elif k == "WEIGHTS_SPAD_CLASS":
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][1]['class'] = v
-            elif k == "WEIGHTS_SPAD_ATRIBUTES":
-                v['meshX'] = meshx
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][1]['attributes'] = v
-            elif k == "PSUM_SPAD_CLASS":
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][2]['class'] = v
-            elif k == "PSUM_SPAD_ATRIBUTES":
-                v['meshX'] = meshx
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][2]['attributes'] = v
-            elif k == "MAC_MESH_X":
-                new_data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['local'][3]['attributes']['meshX'] = v
-            else:
-                raise Exception("Unknown key: {}".format(k))
-        
-        # Write out updated eyeriss_like.yaml
-        file.close()
-        fout = open(eyeriss_like_path, 'w')
-        fout.write(yaml.dump(new_data))
-        fout.close()
+        # The base eyeriss_like.yaml is parsed once and kept in memory, every
+        # candidate is rendered from it and replaces the file atomically
+        if self.arch_renderer is None:
+            self.arch_renderer = TimeloopArchRenderer(os.path.join(self.arch_dir, "eyeriss_like.yaml"))
+        self.arch_renderer.write(arch_params, self.arch_dir)
         return
 
     def get_arch_param_template(self):
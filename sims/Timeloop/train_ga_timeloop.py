@@ -14,6 +14,7 @@ os.sys.path.insert(0, os.path.abspath('../../'))
 from arch_gym.envs.TimeloopEnv import TimeloopEnv
 from arch_gym.envs.timeloop_acme_wrapper import make_timeloop_env
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.profiler import profiler
 from process_params import TimeloopConfigParams
 from sko.GA import GA
 import configs.arch_gym_configs as arch_gym_configs
@@ -50,6 +51,7 @@ flags.DEFINE_float('target_cycles', 6308563, 'Target cycles value.')
 
 FLAGS = flags.FLAGS
 
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
         df = pd.DataFrame([fitness_dict['reward']])
         csvfile = os.path.join(filename, "fitness.csv")
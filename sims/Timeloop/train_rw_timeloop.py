@@ -17,6 +17,7 @@ os.sys.path.insert(0, os.path.abspath('../../'))
 from arch_gym.envs.TimeloopEnv import TimeloopEnv
 from arch_gym.envs.timeloop_acme_wrapper import make_timeloop_env
 from arch_gym.envs.envHelpers import helpers
+from arch_gym.envs.profiler import profiler
 
 
 from absl import app
@@ -92,6 +93,7 @@ def wrap_in_envlogger(env, envlogger_dir):
         return env
     else:
         return env
+@profiler.profiled('log')
 def log_fitness_to_csv(filename, fitness_dict):
         df = pd.DataFrame([fitness_dict['reward']])
         csvfile = os.path.join(filename, "fitness.csv")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+'''
+In-memory config rendering for the simulators.
+
+Each renderer parses its base config once and keeps it in memory. render()
+applies a parameter overlay and returns the config as bytes, write() puts it
+atomically (temp file + rename) into a caller-specified run directory, so
+several agents can share a base config without racing on the same file.
+
+The output only depends on the base config and the parameters, so the
+digest() of two candidates is equal iff the simulator sees the same config.
+'''
+
+import copy
+import hashlib
+import json
+import os
+import tempfile
+
+import yaml
+
+
+def atomic_write(path, data):
+    '''write bytes to path through a temp file in the same directory and a rename'''
+    dir_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class ConfigRenderer():
+    '''
+    Base class, subclasses implement _load(text) and render(params).
+    filename is the default name used by write().
+    '''
+    filename = None
+
+    def __init__(self, base_path=None, base_text=None, filename=None):
+        assert (base_path is None) != (base_text is None), 'give exactly one of base_path or base_text'
+        if base_path is not None:
+            with open(base_path, 'r') as f:
+                base_text = f.read()
+            self.filename = filename or self.filename or os.path.basename(base_path)
+        else:
+            self.filename = filename or self.filename
+        self.base = self._load(base_text)
+
+    def _load(self, text):
+        raise NotImplementedError
+
+    def render(self, params):
+        raise NotImplementedError
+
+    def digest(self, params):
+        '''sha256 of the rendered config, usable as a dedup key'''
+        return hashlib.sha256(self.render(params)).hexdigest()
+
+    def write(self, params, run_dir, filename=None):
+        '''render params and write them atomically to run_dir, returns the full path'''
+        path = os.path.join(run_dir, filename or self.filename)
+        return atomic_write(path, self.render(params))
+
+
+class DRAMSysConfigRenderer(ConfigRenderer):
+    '''DRAMSys memory controller json, params overlay the "mcconfig" section'''
+    filename = 'policy.json'
+
+    def _load(self, text):
+        return json.loads(text)
+
+    def render(self, params):
+        data = copy.deepcopy(self.base)
+        data.setdefault('mcconfig', {}).update(params)
+        return (json.dumps(data, indent=4, sort_keys=True) + '\n').encode()
+
+
+# action dict keys -> (section, key) in the sniper config
+SNIPER_PARAM_KEYS = {
+    'core_dispatch_width': ('perf_model/core/interval_timer', 'dispatch_width'),
+    'core_window_size': ('perf_model/core/interval_timer', 'window_size'),
+    'core_outstanding_loads': ('perf_model/core/rob_timer', 'outstanding_loads'),
+    'core_outstanding_stores': ('perf_model/core/rob_timer', 'outstanding_stores'),
+    'core_commit_width': ('perf_model/core/rob_timer', 'commit_width'),
+    'core_rs_entries': ('perf_model/core/rob_timer', 'rs_entries'),
+    'l1_icache_size': ('perf_model/l1_icache', 'cache_size'),
+    'l1_dcache_size': ('perf_model/l1_dcache', 'cache_size'),
+    'l2_cache_size': ('perf_model/l2_cache', 'cache_size'),
+    'l3_cache_size': ('perf_model/l3_cache', 'cache_size'),
+}
+
+
+class SniperConfigRenderer(ConfigRenderer):
+    '''
+    Sniper .cfg file. Unlike configparser this keeps the "#include" lines
+    Sniper needs (see https://groups.google.com/g/snipersim/c/bXvBb6SXZ0k),
+    so no sed pass is required afterwards. Params are either action dict keys
+    from SNIPER_PARAM_KEYS or "section/key" style full names.
+    '''
+    filename = 'arch_gym_x86.cfg'
+    default_includes = ('rob', 'nehalem')
+
+    def _load(self, text):
+        includes = []
+        sections = {}
+        current = None
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith('#include'):
+                name = line[len('#include'):].strip()
+                if name not in includes:
+                    includes.append(name)
+            elif not line or line.startswith('#'):
+                continue
+            elif line.startswith('[') and line.endswith(']'):
+                current = line[1:-1]
+                sections.setdefault(current, {})
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                sections.setdefault(current, {})[key.strip()] = value.strip()
+        for name in self.default_includes:
+            if name not in includes:
+                includes.append(name)
+        return {'includes': includes, 'sections': sections}
+
+    def resolve(self, name):
+        if name in SNIPER_PARAM_KEYS:
+            return SNIPER_PARAM_KEYS[name]
+        section, _, key = name.rpartition('/')
+        if not section:
+            raise KeyError('Unknown sniper parameter: {}'.format(name))
+        return section, key
+
+    def render(self, params):
+        sections = {k: dict(v) for k, v in self.base['sections'].items()}
+        # sorted so that new sections/keys always land in the same order
+        for name, value in sorted(params.items()):
+            section, key = self.resolve(name)
+            sections.setdefault(section, {})[key] = str(value)
+
+        lines = ['#include {}'.format(name) for name in self.base['includes']]
+        lines += ['{} = {}'.format(k, v) for k, v in sections.pop(None, {}).items()]
+        for section in sections:
+            lines.append('[{}]'.format(section))
+            lines += ['{} = {}'.format(k, v) for k, v in sections[section].items()]
+            lines.append('')
+        return ('\n'.join(lines) + '\n').encode()
+
+
+# Pointers into eyeriss_like.yaml, shared with TimeloopWrapper.update_arch
+TIMELOOP_ARCH_PTRS = {
+    'SHARED_GLB_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 0, 'class'],
+    'SHARED_GLB_ATTRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 0, 'attributes'],
+    'DUMMY_BUFFER_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 1, 'class'],
+    'DUMMY_BUFFER_ATTRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'local', 1, 'attributes'],
+    'NUM_PEs': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'name'],
+    'IFMAP_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 0, 'class'],
+    'IFMAP_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 0, 'attributes'],
+    'WEIGHTS_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 1, 'class'],
+    'WEIGHTS_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 1, 'attributes'],
+    'PSUM_SPAD_CLASS': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 2, 'class'],
+    'PSUM_SPAD_ATRIBUTES': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 2, 'attributes'],
+    'MAC_MESH_X': ['architecture', 'subtree', 0, 'subtree', 0, 'subtree', 0, 'local', 3, 'attributes', 'meshX'],
+}
+
+# attribute blocks that carry the MAC meshX
+TIMELOOP_MESHX_KEYS = ('DUMMY_BUFFER_ATTRIBUTES', 'IFMAP_SPAD_ATRIBUTES', 'WEIGHTS_SPAD_ATRIBUTES',
+                       'PSUM_SPAD_ATRIBUTES')
+
+
+class TimeloopArchRenderer(ConfigRenderer):
+    '''Timeloop architecture yaml, params are the dict of helpers.decode_timeloop_action'''
+    filename = 'eyeriss_like.yaml'
+
+    def _load(self, text):
+        return yaml.safe_load(text)
+
+    def render(self, params):
+        data = copy.deepcopy(self.base)
+        meshx = params.get('MAC_MESH_X', 0)
+        for k, v in params.items():
+            if k not in TIMELOOP_ARCH_PTRS:
+                raise Exception("Unknown key: {}".format(k))
+            if k in TIMELOOP_MESHX_KEYS:
+                v = dict(v, meshX=meshx)
+            node = data
+            ptr = TIMELOOP_ARCH_PTRS[k]
+            for p in ptr[:-1]:
+                node = node[p]
+            node[ptr[-1]] = v
+        return yaml.safe_dump(data, sort_keys=True).encode()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+
+'''
+End-to-end benchmark of archgym's own overhead.
+
+Every env runs against its fake simulator (see common.py) in a scratch
+directory, so the measurement does not need DRAMSys, Timeloop, Sniper, AstraSim
+or Maestro and is reproducible on any Linux box. For each env x agent x
+simulator latency x number of workers the benchmark reports
+
+    steps/s         aggregate over all workers
+    step (ms)       mean wall time of env.step as seen by the agent
+    overhead (ms)   step time minus the time spent waiting on the simulator
+                    (the profiler "simulate" span), i.e. what archgym itself costs
+
+Every case runs in fresh worker processes, each one with its own scratch
+directory and arch_gym_configs settings.
+
+    python sims/fake_sims/benchmark.py --envs dram,maestro --agents rw,ga \\
+        --steps 64 --latency 0,0.01 --workers 1,4 --output bench.json
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+import numpy as np
+
+settings_file_path = os.path.realpath(__file__)
+settings_dir_path = os.path.dirname(settings_file_path)
+proj_root_path = os.path.abspath(os.path.join(settings_dir_path, '..', '..'))
+
+sys.path.insert(0, settings_dir_path)
+sys.path.insert(0, proj_root_path)
+sys.path.insert(0, os.path.join(proj_root_path, 'arch_gym', 'envs'))
+
+from common import LATENCY_ENV
+# sko sets the multiprocessing start method on import, which fails inside a pool worker
+from sko.GA import GA
+
+
+def load_arch_gym_configs():
+    '''
+    arch_gym_configs is a per-user file, when it is missing the benchmark
+    provides an empty one: every attribute the envs read is set below.
+    '''
+    try:
+        from configs import arch_gym_configs
+    except ImportError:
+        arch_gym_configs = types.ModuleType('configs.arch_gym_configs')
+        sys.modules['configs.arch_gym_configs'] = arch_gym_configs
+    # read by envHelpers.helpers() in every env, the backends override what they use
+    arch_gym_configs.timeloop_parameters = os.path.join(proj_root_path, 'sims', 'Timeloop', 'parameters.ini')
+    arch_gym_configs.dram_mem_controller_config = os.path.join(proj_root_path, 'sims', 'DRAM', 'DRAMSys', 'library',
+                                                               'resources', 'configs', 'mcconfigs')
+    arch_gym_configs.sniper_config = os.path.join(proj_root_path, 'sims', 'Sniper', 'arch_gym_x86.cfg')
+    arch_gym_configs.rl_agent = False
+    return arch_gym_configs
+
+
+def link_fake(fake, path):
+    '''the envs launch their simulator by path, point that path at the fake'''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.symlink(os.path.join(settings_dir_path, fake), path)
+    return path
+
+
+class Backend():
+    '''an env wired to its fake simulator plus the parameter space agents sample from'''
+    def __init__(self, env, space, to_action, objective):
+        self.env = env
+        self.space = space
+        self.to_action = to_action
+        self.objective = objective
+
+    def step(self, x):
+        '''x is one row of the native encoding of space, returns the value GA minimizes'''
+        result = self.env.step(self.to_action(x))
+        return self.objective(result)
+
+
+def setup_dram(scratch, configs):
+    from param_space import dramsys_param_space
+
+    # laid out like a DRAMSys install: the binary finds the sub-configs in ../../DRAMSys/library/resources/configs
+    resources_dir = os.path.join(scratch, 'DRAMSys', 'library', 'resources')
+    mcconfig_dir = os.path.join(resources_dir, 'configs', 'mcconfigs')
+    os.makedirs(mcconfig_dir)
+    os.makedirs(os.path.join(resources_dir, 'traces'))
+    shutil.copy(os.path.join(proj_root_path, 'sims', 'DRAM', 'DRAMSys', 'library', 'resources', 'configs',
+                             'mcconfigs', 'policy.json'), mcconfig_dir)
+    open(os.path.join(resources_dir, 'traces', 'benchmark.stl'), 'w').close()
+    sim_config = os.path.join(scratch, 'DRAMSys', 'library', 'simulations', 'simulation.json')
+    os.makedirs(os.path.dirname(sim_config))
+    with open(sim_config, 'w') as f:
+        json.dump({'simulation': {'simulationid': 'benchmark', 'mcconfig': 'policy.json',
+                                  'tracesetup': [{'clkMhz': 2000, 'name': 'benchmark.stl'}]}}, f)
+
+    configs.exe_path = os.path.dirname(link_fake('fake_dramsys.py',
+                                                 os.path.join(scratch, 'binary', 'DRAMSys', 'DRAMSys')))
+    configs.binary_name = 'DRAMSys'
+    configs.sim_config = sim_config
+    configs.dram_mem_controller_config_file = os.path.join(mcconfig_dir, 'policy.json')
+    configs.experiment_name = 'benchmark'
+    configs.logdir = os.path.join(scratch, 'logs')
+    configs.target_power = 1.0
+    configs.target_latency = 0.1
+
+    from DRAMEnv import DRAMEnv
+    env = DRAMEnv(reward_formulation='both', cost_model='simulator')
+    space = dramsys_param_space()
+    return Backend(env, space, lambda x: space.decode(x)[0], lambda result: -result[1])
+
+
+def setup_timeloop(scratch, configs):
+    from param_space import timeloop_param_space
+    from sims.Timeloop.process_params import TimeloopConfigParams
+
+    timeloop_dir = os.path.join(proj_root_path, 'sims', 'Timeloop')
+    arch_dir = os.path.join(scratch, 'arch')
+    shutil.copytree(os.path.join(timeloop_dir, 'arch'), arch_dir)
+    workload_dir = os.path.join(scratch, 'layer_shapes', 'AlexNet')
+    shutil.copytree(os.path.join(timeloop_dir, 'layer_shapes', 'AlexNet'), workload_dir)
+    mapper_dir = os.path.join(timeloop_dir, 'mapper')
+    output_dir = os.path.join(scratch, 'output')
+    script_dir = os.path.join(scratch, 'script')
+    os.makedirs(output_dir)
+    os.makedirs(script_dir)
+    # same structure as sims/Timeloop/script/run_timeloop.sh, TimeloopWrapper rewrites LAYER_SHAPE per layer
+    with open(os.path.join(script_dir, 'run_timeloop.sh'), 'w') as f:
+        f.write('#!/bin/sh\n'
+                'OUTPUT_DIR="{output}"\n'
+                'LAYER_SHAPE="AlexNet/AlexNet_layer1.yaml"\n'
+                'cd "$OUTPUT_DIR"\n'
+                '"{python}" "{fake}" {arch}/eyeriss_like.yaml {arch}/components/*.yaml {mapper}/mapper.yaml '
+                '{layers}/$LAYER_SHAPE >$OUTPUT_DIR/timeloop_simulation_output.txt\n'.format(
+                    output=output_dir, python=sys.executable,
+                    fake=os.path.join(settings_dir_path, 'fake_timeloop_mapper.py'),
+                    arch=arch_dir, mapper=mapper_dir, layers=os.path.dirname(workload_dir)))
+
+    from TimeloopEnv import TimeloopEnv
+    env = TimeloopEnv(script_dir=script_dir, output_dir=output_dir, arch_dir=arch_dir, mapper_dir=mapper_dir,
+                      workload_dir=workload_dir, target_val=np.array([1e2, 2.0, 1e6]), num_cores=8,
+                      reward_formulation='joint')
+    space = timeloop_param_space(TimeloopConfigParams(configs.timeloop_parameters))
+    return Backend(env, space, lambda x: space.decode(x)[0], lambda result: -result[1])
+
+
+def setup_sniper(scratch, configs):
+    from param_space import sniper_param_space
+
+    sniper_config = os.path.join(scratch, 'arch_gym_x86.cfg')
+    shutil.copy(os.path.join(proj_root_path, 'sims', 'Sniper', 'arch_gym_x86.cfg'), sniper_config)
+    configs.sniper_binary_path = settings_dir_path
+    configs.sniper_binary_name = 'fake_sniper.py'
+    configs.sniper_config = sniper_config
+    configs.spec_workload = '600.perlbench_s'
+    configs.sniper_mode = 'single'
+    configs.sniper_logdir = os.path.join(scratch, 'logs')
+    configs.sniper_numcores = '1'
+    configs.target_latency = 1e11
+    configs.target_power = 20.0
+    configs.target_area = 150.0
+
+    from SniperEnv import SniperEnv
+    env = SniperEnv()
+    space = sniper_param_space()
+    return Backend(env, space, lambda x: space.decode(x)[0], lambda result: -result[1])
+
+
+def setup_astrasim(scratch, configs):
+    from param_space import astrasim_param_space
+    import AstraSimEnv as astrasim_module
+
+    # AstraSimEnv keeps its simulator, configs and results under the module level sim_path
+    astrasim_module.sim_path = scratch
+    os.makedirs(os.path.join(scratch, 'results', 'run_general'))
+    link_fake('fake_astrasim.py', os.path.join(scratch, 'run_general.sh'))
+    workload = os.path.join(scratch, 'realworld_workloads', 'transformer_1t_fused_only_t.txt')
+    os.makedirs(os.path.dirname(workload))
+    with open(workload, 'w') as f:
+        f.write('HYBRID_TRANSFORMER_FWD_IN_BCKWD model_parallel_NPU_group: 8\n4\n')
+    network_config = os.path.join(scratch, 'network.json')
+
+    def to_action(x):
+        action = space.decode(x)[0]
+        with open(network_config, 'w') as f:
+            json.dump(action['network'], f)
+        return dict(action, network={'path': network_config})
+
+    env = astrasim_module.AstraSimEnv(max_steps=1 << 30)
+    space = astrasim_param_space()
+    return Backend(env, space, to_action, lambda result: -result[1])
+
+
+def setup_maestro(scratch, configs):
+    from param_space import maestro_param_space
+
+    configs.exe_file = link_fake('fake_maestro.py', os.path.join(scratch, 'bin', 'maestro'))
+    configs.mastero_model_path = os.path.join(proj_root_path, 'sims', 'gamma', 'data', 'model')
+
+    from MasteroEnv import MasteroEnv
+    env = MasteroEnv(workload='resnet18', layer_id=2, max_steps=1 << 30)
+    space = maestro_param_space(env.dimension)
+    # the env takes the [0, 1] actions of the RL agents
+    return Backend(env, space, lambda x: space.to_unit(x)[0], lambda result: -result[1])
+
+
+BACKENDS = {
+    'dram': setup_dram,
+    'timeloop': setup_timeloop,
+    'sniper': setup_sniper,
+    'astrasim': setup_astrasim,
+    'maestro': setup_maestro,
+}
+
+
+def run_rw(backend, num_steps, seed, timed_step):
+    for x in backend.space.sample(num_steps, seed):
+        timed_step(x)
+
+
+def run_ga(backend, num_steps, seed, timed_step):
+    np.random.seed(seed)
+    size_pop = max(2, min(16, num_steps) // 2 * 2)
+    space = backend.space
+    ga = GA(timed_step, n_dim=space.n_dim, size_pop=size_pop, max_iter=max(1, math.ceil(num_steps / size_pop)),
+            lb=space.lb, ub=np.maximum(space.ub, space.lb + space.precision), precision=space.precision)
+    ga.run()
+
+
+AGENTS = {
+    'rw': run_rw,
+    'ga': run_ga,
+}
+
+
+def run_worker(args):
+    '''one worker of a case, runs in its own process'''
+    env_name, agent_name, num_steps, seed, latency, verbose = args
+    os.environ[LATENCY_ENV] = str(latency)
+    scratch = tempfile.mkdtemp(prefix='archgym_bench_{}_'.format(env_name))
+    sink = sys.stdout if verbose else io.StringIO()
+    from profiler import profiler
+    try:
+        # the envs are chatty, printing to a terminal would dominate the measurement
+        with contextlib.redirect_stdout(sink):
+            backend = BACKENDS[env_name](scratch, load_arch_gym_configs())
+            step_times = []
+
+            def timed_step(x):
+                start = time.perf_counter()
+                value = backend.step(x)
+                step_times.append(time.perf_counter() - start)
+                if not verbose:
+                    sink.seek(0)
+                    sink.truncate()
+                return value
+
+            profiler.reset()
+            profiler.enable()
+            start = time.perf_counter()
+            AGENTS[agent_name](backend, num_steps, seed, timed_step)
+            wall = time.perf_counter() - start
+            profiler.disable()
+        simulate = profiler.histograms().get('simulate', {})
+        return {'steps': len(step_times), 'wall_s': wall, 'step_s': float(np.sum(step_times)),
+                'simulate_s': simulate.get('total_ns', 0) / 1e9}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_case(env_name, agent_name, num_steps, seed, latency, workers, verbose=False):
+    jobs = [(env_name, agent_name, num_steps, seed + w, latency, verbose) for w in range(workers)]
+    start = time.perf_counter()
+    # a fresh pool per case so no env or arch_gym_configs state leaks between cases
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        results = pool.map(run_worker, jobs)
+    wall = time.perf_counter() - start
+    steps = sum(r['steps'] for r in results)
+    step_s = sum(r['step_s'] for r in results)
+    simulate_s = sum(r['simulate_s'] for r in results)
+    return {'env': env_name, 'agent': agent_name, 'latency_s': latency, 'workers': workers, 'steps': steps,
+            'steps_per_s': steps / max(sum(r['wall_s'] for r in results) / workers, 1e-12),
+            'steps_per_s_with_setup': steps / wall,
+            'step_ms': 1e3 * step_s / max(steps, 1),
+            'overhead_ms': 1e3 * (step_s - simulate_s) / max(steps, 1)}
+
+
+def report(results, file=None):
+    file = file or sys.stdout
+    header = '{:<10} {:<6} {:>9} {:>8} {:>7} {:>10} {:>10} {:>13}'
+    print(header.format('env', 'agent', 'latency', 'workers', 'steps', 'steps/s', 'step (ms)', 'overhead (ms)'),
+          file=file)
+    for r in results:
+        print(header.format(r['env'], r['agent'], r['latency_s'], r['workers'], r['steps'],
+                            '{:.1f}'.format(r['steps_per_s']), '{:.2f}'.format(r['step_ms']),
+                            '{:.2f}'.format(r['overhead_ms'])), file=file)
+
+
+def parse_list(text, cast=str):
+    return [cast(v) for v in text.split(',') if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='archgym overhead benchmark on fake simulators')
+    parser.add_argument('--envs', default=','.join(BACKENDS), help='comma separated, from ' + ','.join(BACKENDS))
+    parser.add_argument('--agents', default=','.join(AGENTS), help='comma separated, from ' + ','.join(AGENTS))
+    parser.add_argument('--steps', type=int, default=32, help='env steps per worker')
+    parser.add_argument('--latency', default='0', help='comma separated simulator latencies in seconds')
+    parser.add_argument('--workers', default='1', help='comma separated worker counts')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='write the results as json')
+    parser.add_argument('--verbose', action='store_true', help='keep the env output')
+    args = parser.parse_args(argv)
+
+    results = []
+    for env_name in parse_list(args.envs):
+        for agent_name in parse_list(args.agents):
+            for latency in parse_list(args.latency, float):
+                for workers in parse_list(args.workers, int):
+                    print('running {} / {}, latency {}s, {} worker(s)'.format(env_name, agent_name, latency, workers),
+                          file=sys.stderr)
+                    results.append(run_case(env_name, agent_name, args.steps, args.seed, latency, workers,
+                                            args.verbose))
+    report(results)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
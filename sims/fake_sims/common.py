@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+'''
+Shared pieces of the fake simulators.
+
+A fake simulator reads the same config files as the real one and prints or
+writes its results in the exact format the environment parses. The numbers are
+deterministic functions of the parsed config (not of its formatting), so the
+same candidate always gets the same observation, and different candidates get
+different ones.
+
+ARCHGYM_FAKE_SIM_LATENCY (seconds, default 0) makes every run take that long,
+to stand in for the runtime of the real simulator.
+'''
+
+import hashlib
+import json
+import os
+import time
+
+LATENCY_ENV = 'ARCHGYM_FAKE_SIM_LATENCY'
+
+
+def canonical(config):
+    '''stable text of a (nested) config, independent of key order and number formatting'''
+    if isinstance(config, dict):
+        return '{' + ','.join('{}:{}'.format(k, canonical(config[k])) for k in sorted(config, key=str)) + '}'
+    if isinstance(config, (list, tuple)):
+        return '[' + ','.join(canonical(v) for v in config) + ']'
+    if isinstance(config, bool):
+        return str(config)
+    try:
+        value = float(config)
+        return repr(int(value)) if value.is_integer() else repr(value)
+    except (TypeError, ValueError):
+        return str(config).strip()
+
+
+def unit(config, salt=''):
+    '''deterministic value in [0, 1) for a config'''
+    digest = hashlib.sha256((salt + '|' + canonical(config)).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2.0 ** 64
+
+
+def factor(config, salt='', spread=0.5):
+    '''
+    Deterministic multiplier in [1 - spread, 1 + spread): the product of one
+    term per (flattened) parameter, so changing any parameter changes it.
+    '''
+    items = sorted(flatten(config).items()) if isinstance(config, dict) else [('', config)]
+    value = 1.0
+    for key, v in items:
+        value *= 1.0 + spread / max(len(items), 1) * (2 * unit((key, v), salt) - 1)
+    return value
+
+
+def flatten(config, prefix=''):
+    flat = {}
+    for key, value in config.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        else:
+            flat[name] = value
+    return flat
+
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def simulate_latency(scale=1.0):
+    '''sleep for the configured simulator runtime (times scale)'''
+    latency = float(os.environ.get(LATENCY_ENV, '0') or 0) * scale
+    if latency > 0:
+        time.sleep(latency)
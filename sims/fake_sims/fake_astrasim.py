@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+'''
+Fake AstraSim run script: `fake_astrasim.py <network json> <system txt> <workload txt>`
+
+Same arguments as sims/AstraSim/run_general.sh. Like that script it writes
+its stats to results/run_general next to the system config, with the csv
+files and columns AstraSimEnv.parse_result reads.
+'''
+
+import csv
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from common import factor, load_json, simulate_latency
+
+NUM_LAYERS = 4
+
+
+def load_system(path):
+    system = {}
+    with open(path) as f:
+        for line in f:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                system[key.strip()] = value.strip()
+    return system
+
+
+def load_workload(path):
+    if not os.path.isfile(path):
+        return os.path.basename(path)
+    with open(path) as f:
+        return [line.split() for line in f if line.strip()]
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def simulate(network, system, workload, results_dir):
+    config = {'network': network, 'system': system}
+    comms = 1.0e6 * factor(config, 'comms') * factor(workload, 'comms.workload', 0.2)
+    compute = [1.0e5 * factor(workload, 'compute.' + phase, 0.2) for phase in ('fwd', 'wg', 'ig')]
+    exposed = comms * 0.3 * factor(config, 'exposed')
+
+    shutil.rmtree(results_dir, ignore_errors=True)
+    os.makedirs(results_dir)
+    write_csv(os.path.join(results_dir, 'backend_dim_info.csv'),
+              ['DimID', 'Bandwidth', 'Latency'], [[d, 100 * factor(config, 'bw{}'.format(d)), 500] for d in range(3)])
+    write_csv(os.path.join(results_dir, 'backend_end_to_end.csv'),
+              ['RunName', 'CommsTime', 'ComputeTime', 'ExposedCommsTime'],
+              [['sample_all_reduce', comms, sum(compute), exposed]])
+    write_csv(os.path.join(results_dir, 'detailed.csv'),
+              ['layer', 'fwd compute', 'wg compute', 'ig compute'],
+              [[l] + [c / NUM_LAYERS for c in compute] for l in range(NUM_LAYERS)])
+    write_csv(os.path.join(results_dir, 'EndToEnd.csv'),
+              ['layer_name', 'fwd compute', 'wg compute', 'ig compute', 'total exposed comm'],
+              [['total'] + compute + [exposed]])
+    write_csv(os.path.join(results_dir, 'sample_all_reduce_dimension_utilization.csv'),
+              ['time (us)', 'dim0 util', 'dim1 util', 'dim2 util'],
+              [[t * 100, 0.5, 0.4 * factor(config, 'util'), 0.3] for t in range(4)])
+
+
+def main(argv):
+    if len(argv) < 4:
+        print('usage: fake_astrasim.py <network json> <system txt> <workload txt>')
+        return 1
+    network = load_json(argv[1]) if os.path.isfile(argv[1]) else os.path.basename(argv[1])
+    system_file = os.path.abspath(argv[2])
+    results_dir = os.path.join(os.path.dirname(system_file), 'results', 'run_general')
+    simulate(network, load_system(system_file), load_workload(argv[3]), results_dir)
+    simulate_latency()
+    print('AstraSim (fake) stats in {}'.format(results_dir))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+'''
+Fake DRAMSys: `fake_dramsys.py <simulation json> [<resources dir>/]`
+
+Resolves the sub-configs of the simulation config like DRAMSys does, through
+<resources dir>/configs/<kind>/ (never next to the simulation json), and the
+traces through <resources dir>/traces/. Like DRAMSys, the resources dir
+defaults to <exe dir>/../../DRAMSys/library/resources/ and is prefixed as is,
+so it needs its trailing slash. It reads the "mcconfig" and prints the power
+summary lines DRAMEnv.get_observation parses:
+
+    Total Energy: <pJ> pJ
+    Average Power: <mW> mW
+    Total Time: <ns> ns
+
+Nothing goes to stderr on success, DRAMEnv exits on any stderr output.
+'''
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from common import factor, load_json, simulate_latency
+
+
+# the sub-config references of the simulation config and where DRAMSys looks them up
+SUBCONFIG_DIRS = {'addressmapping': 'configs/amconfigs/', 'mcconfig': 'configs/mcconfigs/',
+                  'memspec': 'configs/memspecs/', 'simconfig': 'configs/simulator/'}
+
+
+def default_resources_dir(exe):
+    return os.path.join(os.path.dirname(os.path.abspath(exe)), '..', '..', 'DRAMSys', 'library', 'resources', '')
+
+
+def find_config(ref, resources_dir, subdir):
+    '''DRAMSys resolves sub-configs (and traces) only through the resources dir'''
+    path = resources_dir + subdir + ref
+    if not os.path.isfile(path):
+        raise FileNotFoundError('{} not found in {}'.format(ref, resources_dir + subdir))
+    return path
+
+
+def load_simulation(sim_file, resources_dir):
+    data = load_json(sim_file)
+    sim = data.get('simulation', data)
+    configs = {}
+    for key, subdir in SUBCONFIG_DIRS.items():
+        config = sim.get(key, {})
+        if isinstance(config, str):
+            config = load_json(find_config(config, resources_dir, subdir))
+        configs[key] = config
+    mcconfig = configs['mcconfig'].get('mcconfig', configs['mcconfig'])
+    traces = [t.get('name', t) if isinstance(t, dict) else t for t in sim.get('tracesetup', [])]
+    for trace in traces:
+        find_config(trace, resources_dir, 'traces/')
+    return mcconfig, traces
+
+
+def simulate(mcconfig, traces):
+    '''(energy pJ, average power mW, total time ns)'''
+    total_time = 1.0e8 * factor(mcconfig, 'time') * factor(traces, 'trace', 0.2)
+    power = 1.0e3 * factor(mcconfig, 'power')
+    energy = power * 1e-3 * total_time * 1e-9 * 1e12
+    return energy, power, total_time
+
+
+def main(argv):
+    if len(argv) < 2:
+        print('usage: fake_dramsys.py <simulation json> [<resources dir>/]')
+        return 1
+    resources_dir = argv[2] if len(argv) > 2 else default_resources_dir(argv[0])
+    energy, power, total_time = simulate(*load_simulation(argv[1], resources_dir))
+    simulate_latency()
+    print('DRAMSys (fake) simulating {}'.format(argv[1]))
+    print('   Total Energy: {:.2f} pJ'.format(energy))
+    print('   Average Power: {:.4f} mW'.format(power))
+    print('Total Time: {:.0f} ns'.format(total_time))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
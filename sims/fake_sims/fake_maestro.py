@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+'''
+Fake Maestro: takes the same flags as helpers.run_maestro passes to Maestro
+(--Mapping_file=<name>.m, --num_pes, --l1_size_cstr, ...) and writes
+<name>.csv with the header names (leading spaces included) helpers.run_maestro
+and sims/maestro_batch.read_maestro_csv read. One row per layer of the mapping.
+'''
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from common import factor, simulate_latency
+
+HEADER = [" Layer Number", " Runtime (Cycles)", " Throughput (MACs/Cycle)", " Activity count-based Energy (nJ)",
+          " Area", " Power", " L1 SRAM Size Req (Bytes)", "  L2 SRAM Size Req (Bytes)",
+          " input l1 read", " input l1 write", "filter l1 read", " filter l1 write",
+          "output l1 read", " output l1 write", " input l2 read", " input l2 write",
+          " filter l2 read", " filter l2 write", " output l2 read", " output l2 write", " Num MACs"]
+
+
+def parse_flags(argv):
+    flags = {}
+    for arg in argv:
+        if arg.startswith('--') and '=' in arg:
+            key, value = arg[2:].split('=', 1)
+            flags[key] = value
+    return flags
+
+
+def load_mapping(path):
+    '''list of (dimensions, dataflow lines), one per layer'''
+    with open(path) as f:
+        text = f.read()
+    layers = []
+    for block in re.split(r'\bLayer\b', text)[1:]:
+        dims = re.search(r'Dimensions\s*\{([^}]*)\}', block)
+        dims = dict((k.strip(), int(float(v))) for k, v in
+                    (item.split(':') for item in dims.group(1).split(',') if ':' in item)) if dims else {}
+        dataflow = re.findall(r'(?:SpatialMap|TemporalMap|Cluster)\([^)]*\)\s*[^;]*;', block)
+        layers.append((dims, dataflow))
+    if not layers:
+        raise ValueError('no layer in {}'.format(path))
+    return layers
+
+
+def simulate(layer, arch):
+    dims, dataflow = layer
+    macs = 1
+    for value in dims.values():
+        macs *= max(value, 1)
+    mapping = {'dims': dims, 'dataflow': dataflow}
+    num_pe = max(int(float(arch.get('num_pes', 1))), 1)
+    utilization = 0.3 + 0.7 * factor(mapping, 'utilization', 0.4) / 1.4
+    runtime = int(macs / (num_pe * utilization) * factor(arch, 'runtime', 0.2)) + 1
+    l1_size = int(64 * factor(mapping, 'l1'))
+    l2_size = int(32768 * factor(mapping, 'l2'))
+    counts = [int(macs * factor(mapping, 'count{}'.format(i), 0.8)) for i in range(12)]
+    energy = (sum(counts) * 1e-3 + macs * 2e-3) * factor(arch, 'energy', 0.2)
+    power = energy / runtime * 1e3
+    return [runtime, macs / float(runtime), energy, num_pe * 4470.0, power, l1_size, l2_size] + counts + [macs]
+
+
+def main(argv):
+    flags = parse_flags(argv[1:])
+    if 'Mapping_file' not in flags:
+        print('usage: fake_maestro.py --Mapping_file=<name>.m [maestro flags]')
+        return 1
+    mapping_file = flags.pop('Mapping_file')
+    rows = [[i] + simulate(layer, flags) for i, layer in enumerate(load_mapping(mapping_file))]
+    simulate_latency()
+    with open(os.path.splitext(mapping_file)[0] + '.csv', 'w') as f:
+        f.write(','.join(HEADER) + '\n')
+        for row in rows:
+            f.write(', '.join(str(v) for v in row) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+'''
+Fake Sniper run script: `python fake_sniper.py <workload> -c <cfg> -d <outdir> -n <cores>`
+
+Same command line as the launcher SniperEnv.runSniper calls. Reads the Sniper
+config (sections, key = value, "#include" lines) and writes <outdir>/stats.json
+with the keys SniperEnv reads.
+'''
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from common import factor, simulate_latency
+
+
+def load_sniper_config(path):
+    config = {}
+    section = ''
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = line[1:-1].strip()
+            elif '=' in line:
+                key, value = line.split('=', 1)
+                config[section + '/' + key.strip()] = value.strip()
+    return config
+
+
+def simulate(config, workload, cores):
+    def rate(salt, scale):
+        return scale * factor(config, salt) * factor(workload, salt + '.workload', 0.2)
+
+    return {
+        'Time': rate('time', 2.0e12) / max(cores, 1) ** 0.5,
+        'Branch Prediction': {'MPKI': rate('bp.mpki', 5.0), 'misprediction rate': rate('bp.rate', 0.05)},
+        'Cache': {
+            'Cache L1-D': {'MPKI': rate('l1d.mpki', 20.0), 'miss rate': rate('l1d.rate', 0.05)},
+            'Cache L1-I': {'MPKI': rate('l1i.mpki', 2.0), 'miss rate': rate('l1i.rate', 0.01)},
+            'Cache L2': {'MPKI': rate('l2.mpki', 8.0), 'miss rate': rate('l2.rate', 0.3)},
+            'Cache L3': {'MPKI': rate('l3.mpki', 2.0), 'miss rate': rate('l3.rate', 0.4)},
+        },
+        'Power': {'Processor': {'Runtime Dynamic': rate('power.dynamic', 20.0),
+                                'Peak Power': rate('power.peak', 60.0),
+                                'Area': rate('area', 150.0)}},
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Fake Sniper')
+    parser.add_argument('workload')
+    parser.add_argument('-c', dest='config', required=True)
+    parser.add_argument('-d', dest='output_dir', required=True)
+    parser.add_argument('-n', dest='cores', type=int, default=1)
+    args = parser.parse_args(argv[1:])
+
+    stats = simulate(load_sniper_config(args.config), args.workload, args.cores)
+    simulate_latency()
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(os.path.join(args.output_dir, 'stats.json'), 'w') as f:
+        json.dump(stats, f, indent=2)
+    print('[SNIPER] (fake) {} done'.format(args.workload))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
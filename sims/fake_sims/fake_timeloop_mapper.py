@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+'''
+Fake timeloop-mapper: `fake_timeloop_mapper.py <yaml files...>`
+
+Takes the same yaml files as timeloop-mapper (architecture, components,
+mapper, constraints, layer shape; unmatched globs are ignored), prints the
+line TimeloopWrapper.valid_mapping looks for and writes
+timeloop-mapper.stats.txt to the working directory with the
+Energy/Area/Cycles lines TimeloopWrapper.obtain_metrics parses, and
+timeloop-mapper.map.yaml with the mapping found. The mapping is a fixed
+spread of the layer over the PE array, legalized for the architecture, the
+run takes victory-condition / 10 times the configured latency.
+
+Given a mapping yaml (the inputs of timeloop-model) it evaluates that mapping
+instead and writes timeloop-model.stats.txt, or nothing if the mapping does not
+fit the architecture.
+'''
+
+import math
+import os
+import sys
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)) + '/../../')
+from common import factor, simulate_latency
+from sims.Timeloop.mapping_cache import dump_mapping, legalize, storage_levels, violations
+
+STATS_FILE = 'timeloop-mapper.stats.txt'
+MAP_FILE = 'timeloop-mapper.map.yaml'
+MODEL_STATS_FILE = 'timeloop-model.stats.txt'
+LAYER_DIMS = ('C', 'M', 'R', 'S', 'N', 'P', 'Q')
+SPATIAL_DIMS = ('M', 'C', 'P', 'Q')
+
+
+def load_inputs(paths):
+    '''(architecture, layer instance, mapper options, mapping) from the yaml files'''
+    arch, instance, mapper, mapping = {}, None, {}, None
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        with open(path) as f:
+            data = yaml.safe_load(f) or {}
+        if 'architecture' in data:
+            arch = data['architecture']
+        if 'problem' in data:
+            instance = data['problem'].get('instance', {})
+        if 'mapper' in data:
+            mapper = data['mapper']
+        if 'mapping' in data:
+            mapping = data['mapping']
+    if instance is None:
+        raise ValueError('no layer shape (problem) among the inputs')
+    return arch, instance, mapper, mapping
+
+
+def keeps(name):
+    '''the data spaces a level of the eyeriss-like architectures keeps'''
+    if 'ifmap' in name:
+        return ['Inputs']
+    if 'weights' in name:
+        return ['Weights']
+    if 'psum' in name:
+        return ['Outputs']
+    if 'Dummy' in name:
+        return []
+    return ['Weights', 'Inputs', 'Outputs']
+
+
+def find_mapping(arch, instance):
+    '''the whole layer in the innermost temporal loop, one dimension spread over each fanout, legalized'''
+    levels = [level for level in storage_levels(arch) if not level['compute']]
+    mapping, spatial = [], list(SPATIAL_DIMS)
+    for i, level in enumerate(levels):
+        factors = {dim: int(instance.get(dim, 1)) for dim in LAYER_DIMS} if i == len(levels) - 1 else {}
+        mapping.append({'target': level['name'], 'type': 'temporal',
+                        'factors': ' '.join('{}{}'.format(d, factors.get(d, 1)) for d in LAYER_DIMS),
+                        'permutation': ''.join(LAYER_DIMS)})
+        mapping.append({'target': level['name'], 'type': 'datatype', 'keep': keeps(level['name']),
+                        'bypass': [s for s in ('Weights', 'Inputs', 'Outputs') if s not in keeps(level['name'])]})
+    # move a dimension from the innermost loop into a spatial loop at each level with a fanout
+    for i, level in enumerate(levels[:-1]):
+        if levels[i + 1]['instances'] != level['instances'] and spatial:
+            dim = spatial.pop(0)
+            mapping.append({'target': level['name'], 'type': 'spatial',
+                            'factors': ' '.join('{}{}'.format(d, int(instance.get(d, 1)) if d == dim else 1)
+                                                for d in LAYER_DIMS),
+                            'permutation': ''.join(LAYER_DIMS)})
+            inner = mapping[2 * (len(levels) - 1)]
+            inner['factors'] = inner['factors'].replace('{}{}'.format(dim, int(instance.get(dim, 1))), dim + '1')
+    return legalize(mapping, instance, arch)
+
+
+def simulate(arch, instance, mapping=None):
+    '''(energy uJ, area mm^2, cycles), of the mapping if given'''
+    macs = 1
+    for dim in LAYER_DIMS:
+        macs *= int(instance.get(dim, 1))
+    parallel, dram_iterations = 168.0, 1
+    if mapping is not None:
+        parallel, dram_iterations = 1.0, 1
+        levels = storage_levels(arch)
+        for entry in mapping:
+            product = 1
+            for item in str(entry.get('factors', '')).split():
+                product *= int(item.split('=')[-1] if '=' in item else item[1:])
+            if entry.get('type') == 'spatial':
+                parallel *= product
+            elif entry.get('type') == 'temporal' and entry.get('target') == levels[0]['name']:
+                dram_iterations *= product
+    cycles = int(macs / parallel * factor(arch, 'cycles') * factor(instance, 'layer', 0.1)) + 1
+    energy = macs * 2.0e-6 * factor(arch, 'energy') * (1 + 0.5 * math.log2(dram_iterations + 1) / math.log2(macs + 1))
+    area = 1.5 * factor(arch, 'area')
+    return energy, area, cycles
+
+
+def write_stats(path, energy, area, cycles):
+    with open(path, 'w') as f:
+        f.write('Summary Stats\n-------------\n')
+        f.write('Utilization: 0.50\n')
+        f.write('Cycles: {}\n'.format(cycles))
+        f.write('Energy: {:.5f} uJ\n'.format(energy))
+        f.write('Area: {:.5f} mm^2\n'.format(area))
+
+
+def main(argv):
+    arch, instance, mapper, mapping = load_inputs(argv[1:])
+    if mapping is not None:
+        # timeloop-model
+        simulate_latency(0.1)
+        if arch and violations(mapping, instance, arch) is not None:
+            print('ERROR: mapping does not fit the architecture')
+            return 1
+        write_stats(MODEL_STATS_FILE, *simulate(arch, instance, mapping))
+        return 0
+
+    mapping = find_mapping(arch, instance) if arch else None
+    energy, area, cycles = simulate(arch, instance, mapping)
+    simulate_latency(float(mapper.get('victory-condition', 10)) / 10)
+    print('Summary stats for best mapping found by mapper:')
+    print('  Utilization = 0.50 | pJ/MACC = {:.3f} | Cycles = {}'.format(energy * 1e6 / max(cycles, 1), cycles))
+    write_stats(STATS_FILE, energy, area, cycles)
+    if mapping is not None:
+        dump_mapping(mapping, MAP_FILE)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
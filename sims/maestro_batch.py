@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+'''
+Batch Maestro evaluation.
+
+MaestroBatchRunner takes N mappings (as produced by helpers.decode_action_list),
+gives each one its own scratch directory, runs up to max_workers Maestro
+processes at a time and reads back only the columns it needs from the result
+csv. Scratch directories are removed as soon as a mapping is parsed.
+'''
+
+import csv
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+
+import numpy as np
+
+MAESTRO_METRICS_DTYPE = np.dtype([('runtime', 'f8'), ('throughput', 'f8'), ('energy', 'f8'), ('area', 'f8')])
+
+# header names in the Maestro result csv (compared after stripping spaces)
+MAESTRO_COLUMNS = {
+    'runtime': 'Runtime (Cycles)',
+    'throughput': 'Throughput (MACs/Cycle)',
+    'energy': 'Activity count-based Energy (nJ)',
+    'l1_size': 'L1 SRAM Size Req (Bytes)',
+    'l2_size': 'L2 SRAM Size Req (Bytes)',
+}
+
+# same values helpers.run_maestro reports when the csv cannot be read
+MAESTRO_FAILED = (1e20, -1, -1, -1)
+
+
+def compute_area_maestro(num_pe, l1_size, l2_size):
+    MAC_AREA_MAESTRO=4470
+    L2BUF_AREA_MAESTRO = 4161.536
+    L1BUF_AREA_MAESTRO = 4505.1889
+    L2BUF_UNIT = 32768
+    L1BUF_UNIT = 64
+    area = num_pe * MAC_AREA_MAESTRO + ceil(int(l2_size)/L2BUF_UNIT)*L2BUF_AREA_MAESTRO + ceil(int(l1_size)/L1BUF_UNIT)*L1BUF_AREA_MAESTRO * num_pe
+    return area
+
+
+def get_out_repr(x):
+    out_repr = set(["K", "C", "R", "S"])
+    if x in out_repr:
+        return x
+    else:
+        return x + "'"
+
+
+def get_CONVtypeShape(dimensions, CONVtype=1):
+    CONVtype_dicts = {0:"FC", 1:"CONV",2:"DSCONV", 3:"GEMM"}
+    CONVtype = CONVtype_dicts[CONVtype]
+    if CONVtype == "CONV"or CONVtype=="DSCONV":
+        pass
+    elif CONVtype == "GEMM" or CONVtype=="SGEMM":
+        SzM, SzN, SzK,*a = dimensions
+        dimensions = [SzN, SzK, SzM, 1, 1, 1]
+    elif CONVtype == "FC":
+        SzOut, SzIn, *a = dimensions
+        dimensions = [SzOut, SzIn, 1, 1, 1, 1]
+    else:
+        print("Not supported layer.")
+    return dimensions
+
+
+def render_maestro_mapping(indv, dimension, layer_id=0):
+    '''
+    Maestro .m file content for one mapping
+    :param indv: mapping from helpers.decode_action_list
+    :param dimension: layer row [K, C, Y, X, R, S, T] of the workload csv
+    '''
+    m_type_dicts = {0:"CONV", 1:"CONV", 2:"DSCONV", 3:"CONV"}
+    m_type = m_type_dicts[int(dimension[-1])]
+    dimension = get_CONVtypeShape(dimension, int(dimension[-1]))
+
+    lines = ["Network {} {{".format(layer_id),
+             "Layer {} {{".format(m_type),
+             "Type: {}".format(m_type),
+             "Dimensions {{ K: {:.0f}, C: {:.0f}, Y: {:.0f}, X: {:.0f}, R: {:.0f}, S: {:.0f} }}".format(*dimension),
+             "Dataflow {"]
+    for k in range(0, len(indv), 7):
+        for i in range(k, k + 7):
+            if len(indv[i]) == 2:
+                d, d_sz = indv[i]
+            else:
+                d, d_sz, _ = indv[i]
+            if i % 7 == 0:
+                if k != 0:
+                    lines.append("Cluster({},P);".format(d_sz))
+            else:
+                sp = "SpatialMap" if d == indv[k][0] or (
+                            len(indv[k]) > 2 and d == indv[k][2]) else "TemporalMap"
+                # MAESTRO cannot take K dimension as dataflow file
+                if not (m_type == "DSCONV"):
+                    lines.append("{}({},{}) {};".format(sp, d_sz, d_sz, get_out_repr(d)))
+                else:
+                    if get_out_repr(d) == "C" and get_out_repr(indv[k][0]) == "K":
+                        lines.append("{}({},{}) {};".format("SpatialMap", d_sz, d_sz, "C"))
+                    else:
+                        if not (get_out_repr(d) == "K"):
+                            lines.append("{}({},{}) {};".format(sp, d_sz, d_sz, get_out_repr(d)))
+    lines += ["}", "}"]
+    return "\n".join(lines) + "\n}"
+
+
+def read_maestro_csv(path, columns=MAESTRO_COLUMNS):
+    '''
+    Parse only the requested columns of a Maestro result csv.
+    :param columns: dict of output name -> csv header name
+    :return: dict of output name -> float array (one value per layer)
+    '''
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        idx = {name: header.index(col) for name, col in columns.items()}
+        values = {name: [] for name in columns}
+        for row in reader:
+            if not row:
+                continue
+            for name, i in idx.items():
+                values[name].append(float(row[i]))
+    return {name: np.array(v) for name, v in values.items()}
+
+
+def maestro_command(exe, m_file, arch_configs):
+    '''same Maestro flags as helpers.run_maestro'''
+    return [exe,
+            "--Mapping_file={}".format(m_file),
+            "--full_buffer=false",
+            "--noc_bw_cstr={}".format(arch_configs["NocBW"]),
+            "--noc_hops=1",
+            "--noc_hop_latency=1",
+            "--offchip_bw_cstr={}".format(arch_configs["offchipBW"]),
+            "--noc_mc_support=true",
+            "--num_pes={}".format(int(arch_configs["num_pe"])),
+            "--num_simd_lanes=1",
+            "--l1_size_cstr={}".format(arch_configs["l1_size"]),
+            "--l2_size_cstr={}".format(arch_configs["l2_size"]),
+            "--print_res=false",
+            "--print_res_csv_file=true",
+            "--print_log_file=false",
+            "--print_design_space=false",
+            "--msg_print_lv=0"]
+
+
+class MaestroBatchRunner():
+    '''
+    Run many Maestro mappings with bounded concurrency.
+
+    Parameters
+    ----------------
+    exe : str
+        path to the maestro binary
+    max_workers : int
+        max number of Maestro processes running at the same time
+    scratch_root : str
+        where the per-mapping scratch directories are created, default is the system temp dir
+    keep_scratch : bool
+        keep the scratch directories around for debugging
+    '''
+    def __init__(self, exe, max_workers=None, scratch_root=None, keep_scratch=False, timeout=None):
+        self.exe = os.path.abspath(exe)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.scratch_root = scratch_root
+        self.keep_scratch = keep_scratch
+        self.timeout = timeout
+        if scratch_root is not None:
+            os.makedirs(scratch_root, exist_ok=True)
+
+    def run_one(self, idx, mapping, dimension, layer_id, arch_configs):
+        scratch_dir = tempfile.mkdtemp(prefix='maestro_{}_'.format(idx), dir=self.scratch_root)
+        try:
+            m_file = "mapping"
+            with open(os.path.join(scratch_dir, m_file + ".m"), "w") as fo:
+                fo.write(render_maestro_mapping(mapping, dimension, layer_id))
+            subprocess.run(maestro_command(self.exe, m_file + ".m", arch_configs), cwd=scratch_dir,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout)
+            metrics = read_maestro_csv(os.path.join(scratch_dir, m_file + ".csv"))
+            area = np.mean([compute_area_maestro(arch_configs["num_pe"], l1, l2)
+                            for l1, l2 in zip(metrics['l1_size'], metrics['l2_size'])])
+            return (np.mean(metrics['runtime']), np.mean(metrics['throughput']), np.mean(metrics['energy']), area)
+        except Exception as e:
+            print("[MaestroBatchRunner] mapping {} failed: {}".format(idx, e))
+            return MAESTRO_FAILED
+        finally:
+            if not self.keep_scratch:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def run(self, mappings, dimension, arch_configs, layer_id=0):
+        '''
+        :param mappings: list of mappings from helpers.decode_action_list
+        :param dimension: layer row [K, C, Y, X, R, S, T] of the workload csv
+        :param arch_configs: dict with NocBW, offchipBW, l1_size, l2_size, num_pe
+        :return: structured array of shape (len(mappings),) with MAESTRO_METRICS_DTYPE
+        '''
+        dimension = list(dimension)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(lambda args: self.run_one(args[0], args[1], dimension, layer_id, arch_configs),
+                                    enumerate(mappings)))
+        return np.array(results, dtype=MAESTRO_METRICS_DTYPE)
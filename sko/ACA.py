@@ -4,9 +4,12 @@
 # @Author  : github.com/guofei9987
 
 import numpy as np
+from .checkpoint import CheckpointMixin
 
 
-class ACA_TSP:
+class ACA_TSP(CheckpointMixin):
+    checkpoint_attrs = ('Tau', 'Table', 'y', 'generation_best_X', 'generation_best_Y')
+
     def __init__(self, func, n_dim,
                  size_pop=10, max_iter=20,
                  distance_matrix=None,
@@ -23,7 +26,7 @@ class ACA_TSP:
         self.prob_matrix_distance = 1 / (distance_matrix + 1e-10 * np.eye(n_dim, n_dim))  # 避免除零错误
 
         self.Tau = np.ones((n_dim, n_dim))  # 信息素矩阵，每次迭代都会更新
-        self.Table = np.zeros((size_pop, n_dim)).astype(np.int)  # 某一代每个蚂蚁的爬行路径
+        self.Table = np.zeros((size_pop, n_dim)).astype(int)  # 某一代每个蚂蚁的爬行路径
         self.y = None  # 某一代每个蚂蚁的爬行总距离
         self.generation_best_X, self.generation_best_Y = [], []  # 记录各代的最佳情况
         self.x_best_history, self.y_best_history = self.generation_best_X, self.generation_best_Y  # 历史原因，为了保持统一
@@ -31,7 +34,8 @@ class ACA_TSP:
 
     def run(self, max_iter=None):
         self.max_iter = max_iter or self.max_iter
-        for i in range(self.max_iter):  # 对每次迭代
+        start_iter, _ = self.pop_resume_point()
+        for i in range(start_iter, self.max_iter):  # 对每次迭代
             prob_matrix = (self.Tau ** self.alpha) * (self.prob_matrix_distance) ** self.beta  # 转移概率，无须归一化。
             for j in range(self.size_pop):  # 对每个蚂蚁
                 self.Table[j, 0] = 0  # start point，其实可以随机，但没什么区别
@@ -63,10 +67,16 @@ class ACA_TSP:
 
             # 信息素飘散+信息素涂抹
             self.Tau = (1 - self.rho) * self.Tau + delta_tau
+            self.y = y
+            self.checkpoint(i + 1)
 
         best_generation = np.array(self.generation_best_Y).argmin()
         self.best_x = self.generation_best_X[best_generation]
         self.best_y = self.generation_best_Y[best_generation]
         return self.best_x, self.best_y
 
+    def set_state(self, state):
+        super().set_state(state)
+        self.x_best_history, self.y_best_history = self.generation_best_X, self.generation_best_Y
+
     fit = run
@@ -6,6 +6,7 @@
 
 import numpy as np
 from scipy import spatial
+from sko.tools import func_transformer
 
 
 # class ASFA_raw:
@@ -97,10 +98,26 @@ from scipy import spatial
 
 # %%
 class AFSA:
+    '''
+    Artificial fish swarm algorithm, minimizes func.
+
+    Every iteration all fish swarm, then all fish follow. The behaviours are
+    applied to the whole population at once: the fish in vision of each fish
+    come from a (blockwise) pairwise distance matrix and the candidate points
+    of all fish are evaluated in one call of func, so func can be vectorized
+    with set_run_mode. A fish whose swarm/follow move is not good enough preys:
+    up to max_try_num rounds of random points in its vision, each round only
+    for the fish that have not found a better point yet, the rest move randomly.
+
+    Parameters
+    --------------------
+    block_size : int
+        rows of the distance matrix computed at once, bounds the memory to block_size * size_pop
+    '''
     def __init__(self, func, n_dim, size_pop=50, max_iter=300,
                  max_try_num=100, step=0.5, visual=0.3,
-                 q=0.98, delta=0.5):
-        self.func = func
+                 q=0.98, delta=0.5, block_size=1024):
+        self.func = func_transformer(func)
         self.n_dim = n_dim
         self.size_pop = size_pop
         self.max_iter = max_iter
@@ -109,102 +126,106 @@ class AFSA:
         self.visual = visual  # 鱼的最大感知范围
         self.q = q  # 鱼的感知范围衰减系数
         self.delta = delta  # 拥挤度阈值，越大越容易聚群和追尾
+        self.block_size = block_size
 
         self.X = np.random.rand(self.size_pop, self.n_dim)
-        self.Y = np.array([self.func(x) for x in self.X])
+        self.Y = self.evaluate(self.X)
 
         best_idx = self.Y.argmin()
-        self.best_x, self.best_y = self.X[best_idx, :], self.Y[best_idx]
+        self.best_x, self.best_y = self.X[best_idx, :].copy(), self.Y[best_idx]
         self.best_X, self.best_Y = self.best_x, self.best_y  # will be deprecated, use lowercase
 
-    def move_to_target(self, idx_individual, x_target):
+    def evaluate(self, X):
+        if len(X) == 0:
+            return np.empty(0)
+        return np.asarray(self.func(X), dtype=float).reshape(-1)
+
+    def update(self, idx, X_new, Y_new=None):
+        '''
+        moves fish idx to X_new and keeps track of the best fish
+        '''
+        if len(idx) == 0:
+            return
+        if Y_new is None:
+            Y_new = self.evaluate(X_new)
+        self.X[idx, :] = X_new
+        self.Y[idx] = Y_new
+        best = Y_new.argmin()
+        if Y_new[best] < self.best_y:
+            self.best_x, self.best_y = X_new[best, :].copy(), Y_new[best]
+
+    def move_to_target(self, idx, X_target):
         '''
-        move to target
+        moves fish idx a random fraction of step towards X_target
         called by prey(), swarm(), follow()
+        '''
+        X = self.X[idx, :]
+        X_new = X + self.step * np.random.rand(len(idx), 1) * (X_target - X)
+        self.update(idx, X_new)
 
-        :param idx_individual:
-        :param x_target:
-        :return:
+    def move(self, idx):
         '''
-        x = self.X[idx_individual, :]
-        x_new = x + self.step * np.random.rand() * (x_target - x)
-        # x_new = x_target
-        self.X[idx_individual, :] = x_new
-        self.Y[idx_individual] = self.func(x_new)
-        if self.Y[idx_individual] < self.best_Y:
-            self.best_x = self.X[idx_individual, :].copy()
-            self.best_y = self.Y[idx_individual].copy()
-
-    def move(self, idx_individual):
+        randomly moves fish idx inside their vision
         '''
-        randomly move to a point
+        r = 2 * np.random.rand(len(idx), self.n_dim) - 1
+        self.update(idx, self.X[idx, :] + self.visual * r)
 
-        :param idx_individual:
-        :return:
-        '''
-        r = 2 * np.random.rand(self.n_dim) - 1
-        x_new = self.X[idx_individual, :] + self.visual * r
-        self.X[idx_individual, :] = x_new
-        self.Y[idx_individual] = self.func(x_new)
-        if self.Y[idx_individual] < self.best_Y:
-            self.best_X = self.X[idx_individual, :].copy()
-            self.best_Y = self.Y[idx_individual].copy()
-
-    def prey(self, idx_individual):
+    def prey(self, idx):
         '''
-        prey
-        :param idx_individual:
-        :return:
+        fish idx move towards the first random point of their vision better than them
         '''
+        active = np.asarray(idx, dtype=int)
         for try_num in range(self.max_try_num):
-            r = 2 * np.random.rand(self.n_dim) - 1
-            x_target = self.X[idx_individual, :] + self.visual * r
-            if self.func(x_target) < self.Y[idx_individual]:  # 捕食成功
-                self.move_to_target(idx_individual, x_target)
+            if len(active) == 0:
                 return None
+            r = 2 * np.random.rand(len(active), self.n_dim) - 1
+            X_target = self.X[active, :] + self.visual * r
+            success = self.evaluate(X_target) < self.Y[active]  # 捕食成功
+            self.move_to_target(active[success], X_target[success])
+            active = active[~success]
         # 捕食 max_try_num 次后仍不成功，就调用 move 算子
-        self.move(idx_individual)
-
-    def find_individual_in_vision(self, idx_individual):
-        # 找出 idx_individual 这条鱼视线范围内的所有鱼
-        distances = spatial.distance.cdist(self.X[[idx_individual], :], self.X, metric='euclidean').reshape(-1)
-        idx_individual_in_vision = np.argwhere((distances > 0) & (distances < self.visual))[:, 0]
-        return idx_individual_in_vision
+        self.move(active)
 
-    def swarm(self, idx_individual):
+    def find_individual_in_vision(self):
+        '''
+        for every fish: number of fish in vision, their centre and the best of them (-1 without any)
+        '''
+        num_in_vision = np.zeros(self.size_pop, dtype=int)
+        center = np.zeros((self.size_pop, self.n_dim))
+        best_in_vision = np.full(self.size_pop, -1)
+        for start in range(0, self.size_pop, self.block_size):
+            block = slice(start, start + self.block_size)
+            distances = spatial.distance.cdist(self.X[block, :], self.X, metric='sqeuclidean')
+            in_vision = (distances > 0) & (distances < self.visual ** 2)
+            num_in_vision[block] = in_vision.sum(axis=1)
+            center[block] = in_vision @ self.X / np.maximum(num_in_vision[block], 1)[:, None]
+            y_in_vision = np.where(in_vision, self.Y[None, :], np.inf)
+            best_in_vision[block] = np.where(num_in_vision[block] > 0, y_in_vision.argmin(axis=1), -1)
+        return num_in_vision, center, best_in_vision
+
+    def swarm(self):
         # 聚群行为
-        idx_individual_in_vision = self.find_individual_in_vision(idx_individual)
-        num_idx_individual_in_vision = len(idx_individual_in_vision)
-        if num_idx_individual_in_vision > 0:
-            individual_in_vision = self.X[idx_individual_in_vision, :]
-            center_individual_in_vision = individual_in_vision.mean(axis=0)
-            center_y_in_vision = self.func(center_individual_in_vision)
-            if center_y_in_vision * num_idx_individual_in_vision < self.delta * self.Y[idx_individual]:
-                self.move_to_target(idx_individual, center_individual_in_vision)
-                return None
-        self.prey(idx_individual)
-
-    def follow(self, idx_individual):
+        num_in_vision, center, _ = self.find_individual_in_vision()
+        idx = np.flatnonzero(num_in_vision > 0)
+        center_y = self.evaluate(center[idx])
+        success = center_y * num_in_vision[idx] < self.delta * self.Y[idx]
+        self.move_to_target(idx[success], center[idx[success]])
+        self.prey(np.setdiff1d(np.arange(self.size_pop), idx[success]))
+
+    def follow(self):
         # 追尾行为
-        idx_individual_in_vision = self.find_individual_in_vision(idx_individual)
-        num_idx_individual_in_vision = len(idx_individual_in_vision)
-        if num_idx_individual_in_vision > 0:
-            individual_in_vision = self.X[idx_individual_in_vision, :]
-            y_in_vision = np.array([self.func(x) for x in individual_in_vision])
-            idx_target = y_in_vision.argmin()
-            x_target = individual_in_vision[idx_target]
-            y_target = y_in_vision[idx_target]
-            if y_target * num_idx_individual_in_vision < self.delta * self.Y[idx_individual]:
-                self.move_to_target(idx_individual, x_target)
-                return None
-        self.prey(idx_individual)
+        num_in_vision, _, best_in_vision = self.find_individual_in_vision()
+        idx = np.flatnonzero(num_in_vision > 0)
+        target = best_in_vision[idx]
+        success = self.Y[target] * num_in_vision[idx] < self.delta * self.Y[idx]
+        self.move_to_target(idx[success], self.X[target[success], :])
+        self.prey(np.setdiff1d(np.arange(self.size_pop), idx[success]))
 
     def run(self, max_iter=None):
         self.max_iter = max_iter or self.max_iter
         for epoch in range(self.max_iter):
-            for idx_individual in range(self.size_pop):
-                self.swarm(idx_individual)
-                self.follow(idx_individual)
+            self.swarm()
+            self.follow()
             self.visual *= self.q
         self.best_X, self.best_Y = self.best_x, self.best_y  # will be deprecated, use lowercase
         return self.best_x, self.best_y
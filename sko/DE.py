@@ -15,10 +15,11 @@ class DE(GeneticAlgorithmBase):
     def __init__(self, func, n_dim, F=0.5,
                  size_pop=50, max_iter=200, prob_mut=0.3,
                  lb=-1, ub=1,
-                 constraint_eq=tuple(), constraint_ueq=tuple()):
+                 constraint_eq=tuple(), constraint_ueq=tuple(), constraints=None):
         super().__init__(func, n_dim, size_pop, max_iter, prob_mut,
-                         constraint_eq=constraint_eq, constraint_ueq=constraint_ueq)
+                         constraint_eq=constraint_eq, constraint_ueq=constraint_ueq, constraints=constraints)
 
+        self.checkpoint_attrs = self.checkpoint_attrs + ('V', 'U')
         self.F = F
         self.V, self.U = None, None
         self.lb, self.ub = np.array(lb) * np.ones(self.n_dim), np.array(ub) * np.ones(self.n_dim)
@@ -68,17 +69,22 @@ class DE(GeneticAlgorithmBase):
         '''
         greedy selection
         '''
-        X = self.X.copy()
         f_X = self.x2y().copy()
-        self.X = U = self.U
+        X, CV_X = self.X.copy(), self.CV  # x2y may have repaired X
+        self.X = self.U
         f_U = self.x2y()
+        U = self.X
 
-        self.X = np.where((f_X < f_U).reshape(-1, 1), X, U)
+        keep_X = f_X < f_U
+        self.X = np.where(keep_X.reshape(-1, 1), X, U)
+        self.Y = np.where(keep_X, f_X, f_U)
+        self.CV = np.where(keep_X, CV_X, self.CV)
         return self.X
 
     def run(self, max_iter=None):
         self.max_iter = max_iter or self.max_iter
-        for i in range(self.max_iter):
+        start_iter, _ = self.pop_resume_point()
+        for i in range(start_iter, self.max_iter):
             self.mutation()
             self.crossover()
             self.selection()
@@ -87,9 +93,11 @@ class DE(GeneticAlgorithmBase):
             generation_best_index = self.Y.argmin()
             self.generation_best_X.append(self.X[generation_best_index, :].copy())
             self.generation_best_Y.append(self.Y[generation_best_index])
+            self.generation_best_CV.append(self.CV[generation_best_index])
             self.all_history_Y.append(self.Y)
+            self.checkpoint(i + 1)
 
-        global_best_index = np.array(self.generation_best_Y).argmin()
+        global_best_index = self.global_best_index()
         self.best_x = self.generation_best_X[global_best_index]
         self.best_y = self.func(np.array([self.best_x]))
         return self.best_x, self.best_y
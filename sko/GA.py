@@ -7,14 +7,19 @@
 import numpy as np
 from .base import SkoBase
 from sko.tools import func_transformer
+from sko.checkpoint import CheckpointMixin
+from sko.constraints import make_constraints
 from abc import ABCMeta, abstractmethod
-from .operators import crossover, mutation, ranking, selection
+from .operators import crossover, mutation, ranking, selection, vectorized
 
 
-class GeneticAlgorithmBase(SkoBase, metaclass=ABCMeta):
+class GeneticAlgorithmBase(SkoBase, CheckpointMixin, metaclass=ABCMeta):
+    checkpoint_attrs = ('Chrom', 'X', 'Y_raw', 'Y', 'CV', 'FitV', 'generation_best_X', 'generation_best_Y',
+                        'generation_best_CV', 'all_history_Y', 'all_history_FitV')
+
     def __init__(self, func, n_dim,
                  size_pop=50, max_iter=200, prob_mut=0.001,
-                 constraint_eq=tuple(), constraint_ueq=tuple()):
+                 constraint_eq=tuple(), constraint_ueq=tuple(), constraints=None):
         self.func = func_transformer(func)
         assert size_pop % 2 == 0, 'size_pop must be even integer'
         self.size_pop = size_pop  # size of population
@@ -22,20 +27,23 @@ class GeneticAlgorithmBase(SkoBase, metaclass=ABCMeta):
         self.prob_mut = prob_mut  # probability of mutation
         self.n_dim = n_dim
 
-        # constraint:
-        self.has_constraint = len(constraint_eq) > 0 or len(constraint_ueq) > 0
-        self.constraint_eq = list(constraint_eq)  # a list of equal functions with ceq[i] = 0
-        self.constraint_ueq = list(constraint_ueq)  # a list of unequal constraint functions with c[i] <= 0
+        # constraint, see sko.constraints
+        self.constraints = make_constraints(constraint_eq, constraint_ueq, constraints)
+        self.has_constraint = bool(self.constraints)
+        self.constraint_eq = self.constraints.constraint_eq  # a list of equal functions with ceq[i] = 0
+        self.constraint_ueq = self.constraints.constraint_ueq  # a list of unequal constraint functions with c[i] <= 0
 
         self.Chrom = None
         self.X = None  # shape = (size_pop, n_dim)
         self.Y_raw = None  # shape = (size_pop,) , value is f(x)
-        self.Y = None  # shape = (size_pop,) , value is f(x) + penalty for constraint
+        self.Y = None  # shape = (size_pop,) , value is f(x) or its constrained value (see sko.constraints)
+        self.CV = None  # shape = (size_pop,) , constraint violation, 0 for feasible points
         self.FitV = None  # shape = (size_pop,)
 
         # self.FitV_history = []
         self.generation_best_X = []
         self.generation_best_Y = []
+        self.generation_best_CV = []
 
         self.all_history_Y = []
         self.all_history_FitV = []
@@ -46,15 +54,22 @@ class GeneticAlgorithmBase(SkoBase, metaclass=ABCMeta):
     def chrom2x(self, Chrom):
         pass
 
+    def x2chrom(self, X):
+        raise NotImplementedError('{} can not encode repaired points'.format(type(self).__name__))
+
     def x2y(self):
-        self.Y_raw = self.func(self.X)
         if not self.has_constraint:
+            self.Y_raw = self.func(self.X)
             self.Y = self.Y_raw
+            self.CV = np.zeros(len(self.X))
         else:
-            # constraint
-            penalty_eq = np.array([np.sum(np.abs([c_i(x) for c_i in self.constraint_eq])) for x in self.X])
-            penalty_ueq = np.array([np.sum(np.abs([max(0, c_i(x)) for c_i in self.constraint_ueq])) for x in self.X])
-            self.Y = self.Y_raw + 1e5 * penalty_eq + 1e5 * penalty_ueq
+            # infeasible X are repaired or not evaluated, Y follows constraints.handling
+            X, self.Y_raw, self.Y, self.CV = self.constraints.evaluate(self.func, self.X)
+            # the repaired points replace their chromosomes (Lamarckian repair), DE has no chromosomes
+            repaired = np.any(X != self.X, axis=1)
+            if repaired.any() and self.Chrom is not None:
+                self.Chrom[repaired] = self.x2chrom(X[repaired])
+            self.X = X
         return self.Y
 
     @abstractmethod
@@ -75,7 +90,8 @@ class GeneticAlgorithmBase(SkoBase, metaclass=ABCMeta):
 
     def run(self, max_iter=None):
         self.max_iter = max_iter or self.max_iter
-        for i in range(self.max_iter):
+        start_iter, _ = self.pop_resume_point()
+        for i in range(start_iter, self.max_iter):
             print("iter:", i)
             self.X = self.chrom2x(self.Chrom)
             self.Y = self.x2y()
@@ -88,14 +104,23 @@ class GeneticAlgorithmBase(SkoBase, metaclass=ABCMeta):
             generation_best_index = self.FitV.argmax()
             self.generation_best_X.append(self.X[generation_best_index, :])
             self.generation_best_Y.append(self.Y[generation_best_index])
+            self.generation_best_CV.append(self.CV[generation_best_index])
             self.all_history_Y.append(self.Y)
             self.all_history_FitV.append(self.FitV)
+            self.checkpoint(i + 1)
 
-        global_best_index = np.array(self.generation_best_Y).argmin()
+        global_best_index = self.global_best_index()
         self.best_x = self.generation_best_X[global_best_index]
         self.best_y = self.func(np.array([self.best_x]))
         return self.best_x, self.best_y
 
+    def global_best_index(self):
+        '''
+        the best generation: the least violation, then the least Y. The constrained Y of an infeasible point
+        depends on the feasible points seen before it, so Y alone doesn't compare across generations
+        '''
+        return np.lexsort((self.generation_best_Y, self.generation_best_CV))[0]
+
     fit = run
 
 
@@ -116,6 +141,8 @@ class GA(GeneticAlgorithmBase):
         equal constraint
     constraint_ueq : tuple
         unequal constraint
+    constraints : sko.constraints.Constraints
+        constraint handling (vectorized, repair, penalty...) instead of constraint_eq/constraint_ueq
     precision : array_like
         The precision of every variables of func
     size_pop : int
@@ -142,8 +169,8 @@ class GA(GeneticAlgorithmBase):
                  prob_mut=0.001,
                  lb=-1, ub=1,
                  constraint_eq=tuple(), constraint_ueq=tuple(),
-                 precision=1e-7):
-        super().__init__(func, n_dim, size_pop, max_iter, prob_mut, constraint_eq, constraint_ueq)
+                 precision=1e-7, constraints=None):
+        super().__init__(func, n_dim, size_pop, max_iter, prob_mut, constraint_eq, constraint_ueq, constraints)
 
         self.lb, self.ub = np.array(lb) * np.ones(self.n_dim), np.array(ub) * np.ones(self.n_dim)
         self.precision = np.array(precision) * np.ones(self.n_dim)  # works when precision is int, float, list or array
@@ -199,11 +226,32 @@ class GA(GeneticAlgorithmBase):
             X = self.lb + (self.ub - self.lb) * X
         return X
 
+    def x2chrom(self, X):
+        # real value to Gray Code, the inverse of chrom2x. X is rounded to the nearest value the chromosome can hold.
+        ub = self.ub_extend if self.int_mode else self.ub
+        V = np.clip((np.asarray(X) - self.lb) / (ub - self.lb), 0, 1)
+        Chrom = np.zeros((len(V), self.len_chrom), dtype=int)
+        start = 0
+        for i, len_gray_code in enumerate(self.Lind):
+            k = np.round(V[:, i] * (2 ** float(len_gray_code) - 1)).astype(np.int64)
+            b = (k[:, None] >> np.arange(len_gray_code - 1, -1, -1)) & 1  # binary, most significant bit first
+            Chrom[:, start:start + len_gray_code] = np.concatenate([b[:, :1], b[:, 1:] ^ b[:, :-1]], axis=1)
+            start += len_gray_code
+        return Chrom
+
     ranking = ranking.ranking
     selection = selection.selection_tournament_faster
     crossover = crossover.crossover_2point_bit
     mutation = mutation.mutation
 
+    def vectorize(self):
+        '''
+        use the array-native operators (sko.operators.vectorized), for large populations
+        '''
+        self.register('selection', vectorized.selection_tournament_faster). \
+            register('crossover', vectorized.crossover_2point_bit)
+        return self
+
     def to(self, device):
         '''
         use pytorch to get parallel performance
@@ -240,9 +288,13 @@ class GA(GeneticAlgorithmBase):
                 X = self.lb + (self.ub - self.lb) * X
             return X
 
+        def x2chrom(self, X):
+            return torch.tensor(GA.x2chrom(self, X), device=self.device, dtype=torch.int8)
+
         self.register('mutation', mutation_gpu.mutation). \
             register('crossover', crossover_gpu.crossover_2point_bit). \
-            register('chrom2x', chrom2x)
+            register('chrom2x', chrom2x). \
+            register('x2chrom', x2chrom)
 
         return self
     
@@ -359,6 +411,15 @@ class RCGA(GeneticAlgorithmBase):
     crossover = crossover_SBX
     mutation = mutation
 
+    def vectorize(self):
+        '''
+        use the array-native operators (sko.operators.vectorized), for large populations
+        '''
+        self.register('selection', vectorized.selection_tournament_faster). \
+            register('crossover', vectorized.crossover_SBX). \
+            register('mutation', vectorized.mutation_polynomial)
+        return self
+
 class GA_TSP(GeneticAlgorithmBase):
     """
     Do genetic algorithm to solve the TSP (Travelling Salesman Problem)
@@ -421,9 +482,19 @@ class GA_TSP(GeneticAlgorithmBase):
     crossover = crossover.crossover_pmx
     mutation = mutation.mutation_reverse
 
+    def vectorize(self):
+        '''
+        use the array-native operators (sko.operators.vectorized), for large populations
+        '''
+        self.register('selection', vectorized.selection_tournament_faster). \
+            register('crossover', vectorized.crossover_pmx). \
+            register('mutation', vectorized.mutation_reverse)
+        return self
+
     def run(self, max_iter=None):
         self.max_iter = max_iter or self.max_iter
-        for i in range(self.max_iter):
+        start_iter, _ = self.pop_resume_point()
+        for i in range(start_iter, self.max_iter):
             print(i)
             Chrom_old = self.Chrom.copy()
             self.X = self.chrom2x(self.Chrom)
@@ -445,10 +516,12 @@ class GA_TSP(GeneticAlgorithmBase):
             generation_best_index = self.FitV.argmax()
             self.generation_best_X.append(self.X[generation_best_index, :].copy())
             self.generation_best_Y.append(self.Y[generation_best_index])
+            self.generation_best_CV.append(self.CV[generation_best_index])
             self.all_history_Y.append(self.Y.copy())
             self.all_history_FitV.append(self.FitV.copy())
+            self.checkpoint(i + 1)
 
-        global_best_index = np.array(self.generation_best_Y).argmin()
+        global_best_index = self.global_best_index()
         self.best_x = self.generation_best_X[global_best_index]
         self.best_y = self.func(np.array([self.best_x]))
         return self.best_x, self.best_y
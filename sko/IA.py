@@ -24,17 +24,21 @@ def immune_ranking(self, T=0.7, alpha=0.95):
     A = 1 / self.Y
 
     # part2：抗体浓度（抗体与抗体之间的亲和度）
-    dist_matrix1 = spatial.distance.cdist(self.Chrom, self.Chrom, metric='hamming')  # 抗体之间的hamming距离矩阵
-    similiar_matrix1 = dist_matrix1 < 1 - T  # 是否与其他抗体的相似度多于T
-    similiar_matrix2 = similiar_matrix1.sum(axis=1)  # 每个抗体与其他抗体相似，计数
-    S = (similiar_matrix2 - 1) / (self.size_pop - 1)  # 抗体浓度。减一是因为自己与自己一定相似，应当排除
+    # 分块计算hamming距离矩阵，内存只需 block_size * size_pop
+    block_size = getattr(self, 'block_size', 1024)
+    similiar_count = np.empty(len(self.Chrom))
+    for start in range(0, len(self.Chrom), block_size):
+        dist_block = spatial.distance.cdist(self.Chrom[start:start + block_size], self.Chrom, metric='hamming')
+        similiar_count[start:start + block_size] = (dist_block < 1 - T).sum(axis=1)  # 与其他抗体相似的计数
+    S = (similiar_count - 1) / (self.size_pop - 1)  # 抗体浓度。减一是因为自己与自己一定相似，应当排除
     self.FitV = alpha * A / A.sum() + (1 - alpha) * S / (S.sum() + 1e-5)
     return self.FitV
 
 
 class IA_TSP(GA_TSP):
-    def __init__(self, func, n_dim, size_pop=50, max_iter=200, prob_mut=0.001, T=0.7, alpha=0.95):
+    def __init__(self, func, n_dim, size_pop=50, max_iter=200, prob_mut=0.001, T=0.7, alpha=0.95, block_size=1024):
         super().__init__(func, n_dim, size_pop, max_iter, prob_mut)
         self.T, self.alpha = T, alpha
+        self.block_size = block_size
 
     ranking = immune_ranking
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+Multi-objective evolutionary optimization: NSGA-II and NSGA-III.
+
+func returns the vector of objectives (all minimized) of a point; it goes
+through func_transformer like the other optimizers, so a vectorized func
+evaluates a whole generation in one call. Constraints use the GA forms,
+constraint_eq (c(x) = 0) and constraint_ueq (c(x) <= 0), or a
+sko.constraints.Constraints, and are handled by constraint domination: a
+feasible point dominates an infeasible one and of two infeasible points the
+one with the smaller total violation wins. Infeasible points are repaired
+or not evaluated, like in the single objective optimizers.
+
+    nsga = NSGA2(lambda x: [x[0], (1 + x[1]) / x[0]], n_dim=2, n_obj=2, lb=[0.1, 0], ub=[1, 5])
+    pareto_x, pareto_y = nsga.run()
+    nsga.hypervolume_history   # one value per generation
+
+Real coded: simulated binary crossover and polynomial mutation, values are
+rounded to precision (e.g. 1 for integer encoded archgym parameters).
+'''
+
+import numpy as np
+
+from .base import SkoBase
+from sko.checkpoint import CheckpointMixin
+from sko.constraints import make_constraints
+from sko.tools import func_transformer
+
+
+def dominance_matrix(F, CV=None):
+    '''D[i, j] is True when point i (constraint-)dominates point j'''
+    n, n_obj = F.shape
+    le = np.ones((n, n), dtype=bool)
+    lt = np.zeros((n, n), dtype=bool)
+    for k in range(n_obj):
+        le &= F[:, None, k] <= F[None, :, k]
+        lt |= F[:, None, k] < F[None, :, k]
+    D = le & lt
+    if CV is not None:
+        feasible = CV <= 0
+        both_feasible = feasible[:, None] & feasible[None, :]
+        both_infeasible = ~feasible[:, None] & ~feasible[None, :]
+        D = (D & both_feasible) | (feasible[:, None] & ~feasible[None, :]) \
+            | (both_infeasible & (CV[:, None] < CV[None, :]))
+    return D
+
+
+def fast_non_dominated_sort(F, CV=None):
+    '''front of every point, 0 is the non-dominated front'''
+    D = dominance_matrix(np.asarray(F, dtype=float), CV)
+    n_dominators = D.sum(axis=0)
+    rank = np.full(len(D), -1)
+    current = np.flatnonzero(n_dominators == 0)
+    front = 0
+    while len(current) > 0:
+        rank[current] = front
+        n_dominators -= D[current].sum(axis=0)
+        n_dominators[current] = -1
+        current = np.flatnonzero(n_dominators == 0)
+        front += 1
+    return rank
+
+
+def crowding_distance(F):
+    '''crowding distance of the points of one front, boundary points get inf'''
+    n, n_obj = F.shape
+    distance = np.zeros(n)
+    if n <= 2:
+        distance[:] = np.inf
+        return distance
+    for k in range(n_obj):
+        order = np.argsort(F[:, k], kind='stable')
+        f = F[order, k]
+        span = f[-1] - f[0]
+        distance[order[0]] = distance[order[-1]] = np.inf
+        if span > 0:
+            distance[order[1:-1]] += (f[2:] - f[:-2]) / span
+    return distance
+
+
+def hypervolume(F, ref_point):
+    '''
+    exact hypervolume dominated by the points F (minimization) up to ref_point,
+    by slicing along the last objective
+    '''
+    F = np.asarray(F, dtype=float)
+    ref_point = np.asarray(ref_point, dtype=float)
+    F = F[(F < ref_point).all(axis=1)] if len(F) else F
+    if len(F) == 0:
+        return 0.0
+    F = np.unique(F, axis=0)
+    F = F[fast_non_dominated_sort(F) == 0]
+    return _hypervolume(F, ref_point)
+
+
+def _hypervolume(F, ref_point):
+    if F.shape[1] == 1:
+        return float(ref_point[0] - F[:, 0].min())
+    if F.shape[1] == 2:
+        F = F[np.argsort(F[:, 0], kind='stable')]
+        best_f1 = np.minimum.accumulate(F[:, 1])
+        widths = np.append(F[1:, 0], ref_point[0]) - F[:, 0]
+        return float((widths * (ref_point[1] - best_f1)).sum())
+    F = F[np.argsort(F[:, -1], kind='stable')]
+    bounds = np.append(F[1:, -1], ref_point[-1])
+    volume = 0.0
+    for i in range(len(F)):
+        height = bounds[i] - F[i, -1]
+        if height > 0:
+            volume += height * _hypervolume(F[:i + 1, :-1], ref_point[:-1])
+    return volume
+
+
+def das_dennis(n_partitions, n_obj):
+    '''structured reference directions on the unit simplex (Das and Dennis)'''
+    def compositions(total, parts):
+        if parts == 1:
+            yield (total,)
+            return
+        for first in range(total, -1, -1):
+            for rest in compositions(total - first, parts - 1):
+                yield (first,) + rest
+
+    return np.array(list(compositions(n_partitions, n_obj)), dtype=float) / n_partitions
+
+
+class NSGA2(SkoBase, CheckpointMixin):
+    """
+    NSGA-II, fast non-dominated sorting with crowding distance [Deb2002]_.
+
+    Parameters
+    ----------------
+    func : function
+        func(x) -> n_obj objectives to minimize
+    n_dim : int
+        number of variables of func
+    n_obj : int
+        number of objectives
+    size_pop : int
+        Size of population
+    max_iter : int
+        Max of iter
+    lb, ub : array_like
+        The lower/upper bound of every variables of func
+    constraint_eq : tuple
+        equal constraint
+    constraint_ueq : tuple
+        unequal constraint
+    constraints : sko.constraints.Constraints
+        vectorized constraints, repair... instead of constraint_eq/constraint_ueq, handling is ignored
+    precision : array_like
+        values are rounded to multiples of precision above lb, None keeps them continuous
+    prob_cross, eta_cross : float
+        probability and distribution index of the simulated binary crossover
+    prob_mut, eta_mut : float
+        per variable probability (default 1 / n_dim) and distribution index of the polynomial mutation
+    hv_ref_point : array_like
+        reference point of the hypervolume, default is the worst value of every objective in
+        the first generation plus 10% of its range
+
+    Attributes
+    ----------------------
+    pareto_x, pareto_y : array_like
+        non-dominated (feasible when possible) points of the current population
+    pareto_front_history : list
+        pareto_y of every generation
+    hypervolume_history : list
+        hypervolume of pareto_y of every generation
+
+    .. [Deb2002] K. Deb, A. Pratap, S. Agarwal and T. Meyarivan, "A fast and elitist multiobjective
+       genetic algorithm: NSGA-II", IEEE TEC, 2002.
+    """
+    checkpoint_attrs = ('X', 'Y', 'CV', 'evaluated', 'rank', 'crowding', 'hv_ref_point', 'pareto_x', 'pareto_y',
+                        'pareto_front_history', 'hypervolume_history')
+
+    def __init__(self, func, n_dim, n_obj, size_pop=100, max_iter=200, lb=0, ub=1,
+                 constraint_eq=tuple(), constraint_ueq=tuple(), precision=None,
+                 prob_cross=0.9, eta_cross=15, prob_mut=None, eta_mut=20, hv_ref_point=None, constraints=None):
+        self.func = func_transformer(func)
+        self.n_dim, self.n_obj = n_dim, n_obj
+        assert size_pop % 2 == 0, 'size_pop must be even integer'
+        self.size_pop = size_pop
+        self.max_iter = max_iter
+        self.lb, self.ub = np.array(lb) * np.ones(self.n_dim), np.array(ub) * np.ones(self.n_dim)
+        self.precision = None if precision is None else np.array(precision) * np.ones(self.n_dim)
+        self.prob_cross, self.eta_cross = prob_cross, eta_cross
+        self.prob_mut = 1 / n_dim if prob_mut is None else prob_mut
+        self.eta_mut = eta_mut
+
+        # constraint domination rather than a penalty, infeasible points are not evaluated
+        self.constraints = make_constraints(constraint_eq, constraint_ueq, constraints, handling='feasibility')
+        self.has_constraint = bool(self.constraints)
+
+        self.hv_ref_point = None if hv_ref_point is None else np.array(hv_ref_point, dtype=float)
+        self.X = None  # shape = (size_pop, n_dim)
+        self.Y = None  # shape = (size_pop, n_obj)
+        self.CV = None  # shape = (size_pop,), total constraint violation
+        self.evaluated = None  # shape = (size_pop,), False where Y is imputed
+        self.rank, self.crowding = None, None
+        self.pareto_x, self.pareto_y = None, None
+        self.pareto_front_history = []
+        self.hypervolume_history = []
+
+    def repair(self, X):
+        X = np.clip(X, self.lb, self.ub)
+        if self.precision is not None:
+            X = np.clip(self.lb + np.round((X - self.lb) / self.precision) * self.precision, self.lb, self.ub)
+        return X
+
+    def evaluate(self, X):
+        '''
+        (points, objectives (n, n_obj), constraint violation (n,), evaluated (n,)) of the points X
+        points not evaluated get the worst objectives of the evaluated points (of X and the population)
+        plus their violation; imputed objectives are never used as the worst, so the penalty doesn't compound
+        '''
+        if not self.has_constraint:
+            Y = np.asarray(self.func(X), dtype=float).reshape(len(X), self.n_obj)
+            return X, Y, np.zeros(len(X)), np.ones(len(X), dtype=bool)
+        X, CV, to_evaluate = self.constraints.check(X)
+        Y = np.full((len(X), self.n_obj), np.nan)
+        if to_evaluate.any():
+            Y[to_evaluate] = np.asarray(self.func(X[to_evaluate]), dtype=float).reshape(-1, self.n_obj)
+        if not to_evaluate.all():
+            known = Y[to_evaluate]
+            if self.Y is not None:
+                known = np.concatenate([known, self.Y[self.evaluated]])
+            worst = np.nanmax(known, axis=0) if len(known) else np.zeros(self.n_obj)
+            Y[~to_evaluate] = worst + CV[~to_evaluate, None]
+        return X, Y, CV, to_evaluate
+
+    def init_population(self):
+        X = self.lb + np.random.rand(self.size_pop, self.n_dim) * (self.ub - self.lb)
+        self.X, self.Y, self.CV, self.evaluated = self.evaluate(self.repair(X))
+        if self.hv_ref_point is None:
+            feasible = self.CV <= 0
+            Y = self.Y[feasible] if feasible.any() else self.Y
+            span = Y.max(axis=0) - Y.min(axis=0)
+            self.hv_ref_point = Y.max(axis=0) + np.where(span > 0, 0.1 * span, 1.0)
+        self.survival(self.X, self.Y, self.CV, self.evaluated)
+
+    def selection(self):
+        '''binary tournament on rank, then crowding distance; returns the indexes of the parents'''
+        a, b = np.random.randint(0, self.size_pop, size=(2, self.size_pop))
+        a_wins = (self.rank[a] < self.rank[b]) | ((self.rank[a] == self.rank[b]) & (self.crowding[a] > self.crowding[b]))
+        return np.where(a_wins, a, b)
+
+    def crossover(self, P1, P2):
+        '''simulated binary crossover of the pairs (P1[i], P2[i]), two children per pair'''
+        n = len(P1)
+        u = np.random.rand(n, self.n_dim)
+        beta = np.where(u <= 0.5, (2 * u) ** (1 / (self.eta_cross + 1)),
+                        (1 / (2 * (1 - u) + 1e-14)) ** (1 / (self.eta_cross + 1)))
+        C1 = 0.5 * ((1 + beta) * P1 + (1 - beta) * P2)
+        C2 = 0.5 * ((1 - beta) * P1 + (1 + beta) * P2)
+        mask = (np.random.rand(n, self.n_dim) < 0.5) & (np.random.rand(n, 1) < self.prob_cross)
+        return np.concatenate([np.where(mask, C1, P1), np.where(mask, C2, P2)])
+
+    def mutation(self, X):
+        '''polynomial mutation'''
+        u = np.random.rand(*X.shape)
+        delta = np.where(u < 0.5, (2 * u) ** (1 / (self.eta_mut + 1)) - 1,
+                         1 - (2 * (1 - u)) ** (1 / (self.eta_mut + 1)))
+        mask = np.random.rand(*X.shape) < self.prob_mut
+        return X + mask * delta * (self.ub - self.lb)
+
+    def select_last_front(self, F, CV, chosen, last_front, n_remaining):
+        '''NSGA-II keeps the most isolated points (largest crowding distance) of the last front'''
+        distance = crowding_distance(F[last_front])
+        return last_front[np.argsort(-distance, kind='stable')[:n_remaining]]
+
+    def survival(self, X, Y, CV, evaluated):
+        '''keeps size_pop points of (X, Y, CV, evaluated): whole fronts, then part of the next one'''
+        rank = fast_non_dominated_sort(Y, CV if self.has_constraint else None)
+        chosen = np.empty(0, dtype=int)
+        for front in range(rank.max() + 1):
+            members = np.flatnonzero(rank == front)
+            if len(chosen) + len(members) <= self.size_pop:
+                chosen = np.concatenate([chosen, members])
+            else:
+                picked = self.select_last_front(Y, CV, chosen, members, self.size_pop - len(chosen))
+                chosen = np.concatenate([chosen, picked])
+            if len(chosen) == self.size_pop:
+                break
+        self.X, self.Y, self.CV, self.rank = X[chosen], Y[chosen], CV[chosen], rank[chosen]
+        self.evaluated = evaluated[chosen]
+        self.crowding = np.zeros(self.size_pop)
+        for front in np.unique(self.rank):
+            members = np.flatnonzero(self.rank == front)
+            self.crowding[members] = crowding_distance(self.Y[members])
+
+    def record(self):
+        front = self.rank == 0
+        self.pareto_x, self.pareto_y = self.X[front].copy(), self.Y[front].copy()
+        self.pareto_front_history.append(self.pareto_y)
+        feasible = self.CV[front] <= 0
+        self.hypervolume_history.append(hypervolume(self.pareto_y[feasible], self.hv_ref_point))
+
+    def run(self, max_iter=None):
+        self.max_iter = max_iter or self.max_iter
+        start_iter, _ = self.pop_resume_point()
+        if self.X is None:
+            self.init_population()
+        for i in range(start_iter, self.max_iter):
+            parents = self.X[self.selection()]
+            X_child = self.repair(self.mutation(self.crossover(parents[0::2], parents[1::2])))
+            X_child, Y_child, CV_child, evaluated_child = self.evaluate(X_child)
+            self.survival(np.concatenate([self.X, X_child]), np.concatenate([self.Y, Y_child]),
+                          np.concatenate([self.CV, CV_child]), np.concatenate([self.evaluated, evaluated_child]))
+            self.record()
+            self.checkpoint(i + 1)
+        return self.pareto_x, self.pareto_y
+
+
+class NSGA3(NSGA2):
+    """
+    NSGA-III, the last front is filled by niching around reference directions
+    [Deb2014]_, which keeps the front spread for many (> 3) objectives.
+
+    Parameters
+    ----------------
+    ref_dirs : array_like
+        reference directions (n_ref, n_obj) on the unit simplex, default das_dennis(n_partitions, n_obj)
+    n_partitions : int
+        partitions per objective of the default reference directions
+    see NSGA2 for the other parameters, size_pop is rounded up to an even number >= n_ref by default
+
+    .. [Deb2014] K. Deb and H. Jain, "An evolutionary many-objective optimization algorithm using
+       reference-point-based nondominated sorting approach", IEEE TEC, 2014.
+    """
+    checkpoint_attrs = NSGA2.checkpoint_attrs + ('ideal_point',)
+
+    def __init__(self, func, n_dim, n_obj, size_pop=None, max_iter=200, lb=0, ub=1, ref_dirs=None, n_partitions=12,
+                 **kwargs):
+        self.ref_dirs = das_dennis(n_partitions, n_obj) if ref_dirs is None else np.asarray(ref_dirs, dtype=float)
+        if size_pop is None:
+            size_pop = len(self.ref_dirs) + len(self.ref_dirs) % 2
+        super().__init__(func, n_dim, n_obj, size_pop=size_pop, max_iter=max_iter, lb=lb, ub=ub, **kwargs)
+        self.ideal_point = np.full(n_obj, np.inf)
+
+    def selection(self):
+        '''NSGA-III has no crowding distance, the tournament is on rank only'''
+        a, b = np.random.randint(0, self.size_pop, size=(2, self.size_pop))
+        tie = self.rank[a] == self.rank[b]
+        a_wins = (self.rank[a] < self.rank[b]) | (tie & (np.random.rand(self.size_pop) < 0.5))
+        return np.where(a_wins, a, b)
+
+    def normalize(self, F):
+        '''objectives translated by the ideal point and divided by the hyperplane intercepts'''
+        self.ideal_point = np.minimum(self.ideal_point, F.min(axis=0))
+        Fn = F - self.ideal_point
+        weights = np.eye(self.n_obj) + 1e-6
+        asf = (Fn[:, None, :] / weights[None, :, :]).max(axis=2)
+        extreme = Fn[asf.argmin(axis=0)]
+        nadir = Fn.max(axis=0)
+        try:
+            b = np.linalg.solve(extreme, np.ones(self.n_obj))
+            intercepts = 1 / b
+            if not np.all(np.isfinite(intercepts)) or np.any(intercepts <= 1e-6):
+                raise np.linalg.LinAlgError
+        except np.linalg.LinAlgError:
+            intercepts = nadir
+        intercepts = np.where(intercepts > 1e-10, intercepts, 1.0)
+        return Fn / intercepts
+
+    def associate(self, Fn):
+        '''nearest reference direction (perpendicular distance) of every point'''
+        dirs = self.ref_dirs / np.linalg.norm(self.ref_dirs, axis=1, keepdims=True)
+        projection = Fn @ dirs.T
+        perpendicular = np.sqrt(np.maximum((Fn ** 2).sum(axis=1, keepdims=True) - projection ** 2, 0))
+        return perpendicular.argmin(axis=1), perpendicular.min(axis=1)
+
+    def select_last_front(self, F, CV, chosen, last_front, n_remaining):
+        considered = np.concatenate([chosen, last_front])
+        niche, distance = self.associate(self.normalize(F[considered]))
+        niche_count = np.bincount(niche[:len(chosen)], minlength=len(self.ref_dirs))
+        candidate_niche, candidate_distance = niche[len(chosen):], distance[len(chosen):]
+        available = np.ones(len(last_front), dtype=bool)
+        open_niche = np.zeros(len(self.ref_dirs), dtype=bool)
+        open_niche[candidate_niche] = True
+        picked = []
+        while len(picked) < n_remaining:
+            open_idx = np.flatnonzero(open_niche)
+            counts = niche_count[open_idx]
+            j = np.random.choice(open_idx[counts == counts.min()])
+            members = np.flatnonzero(available & (candidate_niche == j))
+            if len(members) == 0:
+                open_niche[j] = False
+                continue
+            if niche_count[j] == 0:
+                member = members[candidate_distance[members].argmin()]
+            else:
+                member = np.random.choice(members)
+            picked.append(member)
+            available[member] = False
+            niche_count[j] += 1
+        return last_front[np.array(picked, dtype=int)]
@@ -6,9 +6,11 @@
 import numpy as np
 from sko.tools import func_transformer
 from .base import SkoBase
+from .checkpoint import CheckpointMixin
+from .constraints import make_constraints
 
 
-class PSO(SkoBase):
+class PSO(SkoBase, CheckpointMixin):
     """
     Do PSO (Particle swarm optimization) algorithm.
 
@@ -59,6 +61,8 @@ class PSO(SkoBase):
         equal constraint. Note: not available yet.
     constraint_ueq : tuple
         unequal constraint
+    constraints : sko.constraints.Constraints
+        constraint handling (vectorized, repair, penalty...) instead of constraint_eq/constraint_ueq
     Attributes
     ----------------------
     pbest_x : array_like, shape is (pop,dim)
@@ -77,10 +81,11 @@ class PSO(SkoBase):
     -----------------------------
     see https://scikit-opt.github.io/scikit-opt/#/en/README?id=_3-psoparticle-swarm-optimization
     """
+    checkpoint_attrs = ('X', 'V', 'Y', 'pbest_x', 'pbest_y', 'gbest_x', 'gbest_y', 'gbest_y_hist', 'record_value')
 
     def __init__(self, func, n_dim=None, pop=40, max_iter=150, lb=-1e5, ub=1e5, w=0.8, c1=0.5, c2=0.5,
                  constraint_eq=tuple(), constraint_ueq=tuple(), verbose=False
-                 , dim=None):
+                 , dim=None, constraints=None):
 
         n_dim = n_dim or dim  # support the earlier version
 
@@ -96,8 +101,9 @@ class PSO(SkoBase):
         assert self.n_dim == len(self.lb) == len(self.ub), 'dim == len(lb) == len(ub) is not True'
         assert np.all(self.ub > self.lb), 'upper-bound must be greater than lower-bound'
 
-        self.has_constraint = bool(constraint_ueq)
-        self.constraint_ueq = constraint_ueq
+        self.constraints = make_constraints(constraint_eq, constraint_ueq, constraints)
+        self.has_constraint = bool(self.constraints)
+        self.constraint_ueq = self.constraints.constraint_ueq
         self.is_feasible = np.array([True] * pop)
 
         self.X = np.random.uniform(low=self.lb, high=self.ub, size=(self.pop, self.n_dim))
@@ -117,11 +123,7 @@ class PSO(SkoBase):
         self.best_x, self.best_y = self.gbest_x, self.gbest_y  # history reasons, will be deprecated
 
     def check_constraint(self, x):
-        # gather all unequal constraint functions
-        for constraint_func in self.constraint_ueq:
-            if constraint_func(x) > 0:
-                return False
-        return True
+        return self.constraints.violation([x])[0] <= 0
 
     def update_V(self):
         r1 = np.random.rand(self.pop, self.n_dim)
@@ -136,7 +138,13 @@ class PSO(SkoBase):
 
     def cal_y(self):
         # calculate y for every x in X
-        self.Y = self.func(self.X).reshape(-1, 1)
+        if not self.has_constraint:
+            self.Y = self.func(self.X).reshape(-1, 1)
+            return self.Y
+        # infeasible particles are repaired (they move to the repaired point) or not evaluated
+        self.X, _, Y, CV = self.constraints.evaluate(self.func, self.X)
+        self.is_feasible = CV <= 0
+        self.Y = Y.reshape(-1, 1)
         return self.Y
 
     def update_pbest(self):
@@ -144,10 +152,7 @@ class PSO(SkoBase):
         personal best
         :return:
         '''
-        self.need_update = self.pbest_y > self.Y
-        for idx, x in enumerate(self.X):
-            if self.need_update[idx]:
-                self.need_update[idx] = self.check_constraint(x)
+        self.need_update = (self.pbest_y > self.Y) & self.is_feasible.reshape(-1, 1)
 
         self.pbest_x = np.where(self.need_update, self.X, self.pbest_x)
         self.pbest_y = np.where(self.need_update, self.Y, self.pbest_y)
@@ -177,8 +182,9 @@ class PSO(SkoBase):
         N: int
         '''
         self.max_iter = max_iter or self.max_iter
-        c = 0
-        for iter_num in range(self.max_iter):
+        start_iter, run_state = self.pop_resume_point()
+        c = run_state.get('c', 0)
+        for iter_num in range(start_iter, self.max_iter):
             self.update_V()
             self.recorder()
             self.update_X()
@@ -197,6 +203,7 @@ class PSO(SkoBase):
                 print('Iter: {}, Best fit: {} at {}'.format(iter_num, self.gbest_y, self.gbest_x))
 
             self.gbest_y_hist.append(self.gbest_y)
+            self.checkpoint(iter_num + 1, c=c)
         self.best_x, self.best_y = self.gbest_x, self.gbest_y
         return self.best_x, self.best_y
 
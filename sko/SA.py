@@ -5,6 +5,7 @@
 
 import numpy as np
 from .base import SkoBase
+from sko.tools import func_transformer
 from sko.operators import mutation
 
 
@@ -26,10 +27,21 @@ class SimulatedAnnealingBase(SkoBase):
         end temperature
     L : int
         num of iteration under every temperature（Long of Chain）
+    n_chains : int
+        number of chains. If n_chains > 1, run parallel tempering: the chains move in lockstep,
+        the n_chains proposals of every step are evaluated as one batch through func_transformer,
+        and adjacent chains try to exchange their states after every temperature.
+    T_ratio : float
+        ratio between the temperatures of adjacent chains, chain k runs at T * T_ratio ** k
 
     Attributes
     ----------------------
-
+    generation_best_X, generation_best_Y : list
+        best over all chains after every temperature
+    chain_generation_best_X, chain_generation_best_Y : list
+        per-chain best after every temperature, shape (n_chains, n_dim) and (n_chains,) (multi-chain only)
+    swap_attempts, swap_accepts : array, shape is n_chains - 1
+        replica exchange attempts/accepts between chain k and k+1 (multi-chain only)
 
     Examples
     -------------
@@ -38,6 +50,10 @@ class SimulatedAnnealingBase(SkoBase):
 
     def __init__(self, func, x0, T_max=100, T_min=1e-7, L=300, max_stay_counter=150, **kwargs):
         assert T_max > T_min > 0, 'T_max > T_min > 0'
+        self.n_chains = int(kwargs.get('n_chains', 1))
+        self.T_ratio = kwargs.get('T_ratio', 2.0)
+        assert self.n_chains >= 1, 'n_chains >= 1'
+        assert self.T_ratio >= 1, 'T_ratio >= 1'
 
         self.func = func
         self.T_max = T_max  # initial temperature
@@ -49,16 +65,29 @@ class SimulatedAnnealingBase(SkoBase):
         self.n_dim = len(x0)
 
         self.best_x = np.array(x0)  # initial solution
-        self.best_y = self.func(self.best_x)
+        if self.n_chains > 1:
+            # func may be vectorized (see func_transformer), so x0 goes through it as a batch of one
+            self.func_batch = func_transformer(func)
+            self.best_y = self.func_batch(self.best_x.reshape(1, -1)).reshape(-1)[0]
+        else:
+            self.best_y = self.func(self.best_x)
         self.T = self.T_max
         self.iter_cycle = 0
         self.generation_best_X, self.generation_best_Y = [self.best_x], [self.best_y]
         # history reasons, will be deprecated
         self.best_x_history, self.best_y_history = self.generation_best_X, self.generation_best_Y
 
-    def get_new_x(self, x):
-        u = np.random.uniform(-1, 1, size=self.n_dim)
-        x_new = x + 20 * np.sign(u) * self.T * ((1 + 1.0 / self.T) ** np.abs(u) - 1.0)
+        if self.n_chains > 1:
+            # chain k runs at T * T_ratio ** k, chain 0 follows the cooling schedule of T
+            self.T_ladder = self.T_ratio ** np.arange(self.n_chains)
+            self.chain_generation_best_X, self.chain_generation_best_Y = [], []
+            self.swap_attempts = np.zeros(self.n_chains - 1, dtype=int)
+            self.swap_accepts = np.zeros(self.n_chains - 1, dtype=int)
+
+    def get_new_x(self, x, T=None):
+        T = self.T if T is None else T
+        u = np.random.uniform(-1, 1, size=np.shape(x))
+        x_new = x + 20 * np.sign(u) * T * ((1 + 1.0 / T) ** np.abs(u) - 1.0)
         return x_new
 
     def cool_down(self):
@@ -68,6 +97,8 @@ class SimulatedAnnealingBase(SkoBase):
         return abs(a - b) <= max(rel_tol * max(abs(a), abs(b)), abs_tol)
 
     def run(self):
+        if self.n_chains > 1:
+            return self.run_multi_chain()
         x_current, y_current = self.best_x, self.best_y
         stay_counter = 0
         while True:
@@ -102,6 +133,68 @@ class SimulatedAnnealingBase(SkoBase):
 
         return self.best_x, self.best_y
 
+    def replica_exchange(self, X, Y, T):
+        '''
+        try to swap the states of adjacent chains, even pairs and odd pairs take turns
+        accept with probability min(1, exp((1/T_k - 1/T_k+1) * (Y_k - Y_k+1)))
+        '''
+        for k in range(self.iter_cycle % 2, self.n_chains - 1, 2):
+            self.swap_attempts[k] += 1
+            delta = (1.0 / T[k] - 1.0 / T[k + 1]) * (Y[k] - Y[k + 1])
+            if delta >= 0 or np.exp(delta) > np.random.rand():
+                X[[k, k + 1]], Y[[k, k + 1]] = X[[k + 1, k]], Y[[k + 1, k]]
+                self.swap_accepts[k] += 1
+        return X, Y
+
+    def run_multi_chain(self):
+        X = np.tile(self.best_x, (self.n_chains, 1))
+        Y = np.full(self.n_chains, self.best_y, dtype=float)
+        chain_best_X, chain_best_Y = X.copy(), Y.copy()
+        stay_counter = 0
+        while True:
+            T = self.T * self.T_ladder
+            for i in range(self.L):
+                X_new = self.get_new_x(X, T.reshape(-1, 1))
+                Y_new = self.func_batch(X_new).reshape(-1)
+
+                # Metropolis, for all the chains at once
+                df = Y_new - Y
+                with np.errstate(over='ignore'):
+                    accept = (df < 0) | (np.exp(-df / T) > np.random.rand(self.n_chains))
+                # np.where rather than masked assignment, so an int x0 does not truncate float proposals
+                X, Y = np.where(accept[:, None], X_new, X), np.where(accept, Y_new, Y)
+
+                improved = Y < chain_best_Y
+                chain_best_X = np.where(improved[:, None], X, chain_best_X)
+                chain_best_Y = np.where(improved, Y, chain_best_Y)
+
+            X, Y = self.replica_exchange(X, Y, T)
+
+            best_idx = chain_best_Y.argmin()
+            if chain_best_Y[best_idx] < self.best_y:
+                self.best_x, self.best_y = chain_best_X[best_idx].copy(), chain_best_Y[best_idx]
+
+            self.iter_cycle += 1
+            self.cool_down()
+            self.generation_best_Y.append(self.best_y)
+            self.generation_best_X.append(self.best_x)
+            self.chain_generation_best_Y.append(chain_best_Y.copy())
+            self.chain_generation_best_X.append(chain_best_X.copy())
+
+            if self.isclose(self.best_y_history[-1], self.best_y_history[-2]):
+                stay_counter += 1
+            else:
+                stay_counter = 0
+
+            if self.T < self.T_min:
+                stop_code = 'Cooled to final temperature'
+                break
+            if stay_counter > self.max_stay_counter:
+                stop_code = 'Stay unchanged in the last {stay_counter} iterations'.format(stay_counter=stay_counter)
+                break
+
+        return self.best_x, self.best_y
+
     fit = run
 
 
@@ -145,9 +238,10 @@ class SAFast(SimulatedAnnealingValue):
         self.m, self.n, self.quench = kwargs.get('m', 1), kwargs.get('n', 1), kwargs.get('quench', 1)
         self.c = self.m * np.exp(-self.n * self.quench)
 
-    def get_new_x(self, x):
-        r = np.random.uniform(-1, 1, size=self.n_dim)
-        xc = np.sign(r) * self.T * ((1 + 1.0 / self.T) ** np.abs(r) - 1.0)
+    def get_new_x(self, x, T=None):
+        T = self.T if T is None else T
+        r = np.random.uniform(-1, 1, size=np.shape(x))
+        xc = np.sign(r) * T * ((1 + 1.0 / T) ** np.abs(r) - 1.0)
         x_new = x + xc * self.hop
         if self.has_bounds:
             return np.clip(x_new, self.lb, self.ub)
@@ -170,10 +264,11 @@ class SABoltzmann(SimulatedAnnealingValue):
         super().__init__(func, x0, T_max, T_min, L, max_stay_counter, **kwargs)
         self.learn_rate = kwargs.get('learn_rate', 0.5)
 
-    def get_new_x(self, x):
-        a, b = np.sqrt(self.T), self.hop / 3.0 / self.learn_rate
+    def get_new_x(self, x, T=None):
+        T = self.T if T is None else T
+        a, b = np.sqrt(T), self.hop / 3.0 / self.learn_rate
         std = np.where(a < b, a, b)
-        xc = np.random.normal(0, 1.0, size=self.n_dim)
+        xc = np.random.normal(0, 1.0, size=np.shape(x))
         x_new = x + xc * std * self.learn_rate
         if self.has_bounds:
             return np.clip(x_new, self.lb, self.ub)
@@ -196,9 +291,10 @@ class SACauchy(SimulatedAnnealingValue):
         super().__init__(func, x0, T_max, T_min, L, max_stay_counter, **kwargs)
         self.learn_rate = kwargs.get('learn_rate', 0.5)
 
-    def get_new_x(self, x):
-        u = np.random.uniform(-np.pi / 2, np.pi / 2, size=self.n_dim)
-        xc = self.learn_rate * self.T * np.tan(u)
+    def get_new_x(self, x, T=None):
+        T = self.T if T is None else T
+        u = np.random.uniform(-np.pi / 2, np.pi / 2, size=np.shape(x))
+        xc = self.learn_rate * T * np.tan(u)
         x_new = x + xc
         if self.has_bounds:
             return np.clip(x_new, self.lb, self.ub)
@@ -216,7 +312,10 @@ class SA_TSP(SimulatedAnnealingBase):
     def cool_down(self):
         self.T = self.T_max / (1 + np.log(1 + self.iter_cycle))
 
-    def get_new_x(self, x):
+    def get_new_x(self, x, T=None):
+        if np.ndim(x) == 2:
+            # multi-chain, one tour per row
+            return np.array([self.get_new_x(x_i) for x_i in x])
         x_new = x.copy()
         new_x_strategy = np.random.randint(3)
         if new_x_strategy == 0:
@@ -1,6 +1,6 @@
 __version__ = '0.6.5'
 
-from . import DE, GA, PSO, SA, ACA, AFSA, IA, tools
+from . import DE, GA, PSO, SA, ACA, AFSA, IA, NSGA, tools
 
 
 def start():
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+checkpoint/resume for the optimizers
+
+the state is pickled to a temp file in the same directory and renamed over the
+previous checkpoint, so a run killed at any point leaves a complete checkpoint behind.
+'''
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+
+def save_state(path, state):
+    dir_path = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def load_state(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class CheckpointMixin:
+    '''
+    Subclasses list the attributes that make up their state in checkpoint_attrs
+    and call self.checkpoint(iter_num) at the end of every iteration.
+
+    Example
+    -------------
+    ga = GA(func, n_dim=3).set_checkpoint('ga.ckpt', every=10)
+    ga.run()
+    # after a crash
+    ga = GA(func, n_dim=3).resume('ga.ckpt')
+    ga.run()
+    '''
+    checkpoint_attrs = ()
+    checkpoint_path = None
+    checkpoint_every = 1
+
+    def set_checkpoint(self, path, every=1):
+        self.checkpoint_path = path
+        self.checkpoint_every = every
+        return self
+
+    def get_state(self):
+        state = {attr: getattr(self, attr) for attr in self.checkpoint_attrs}
+        # the constraint handling (sko.constraints) keeps state across iterations as well
+        if getattr(self, 'constraints', None) is not None:
+            state['constraints'] = self.constraints.get_state()
+        return state
+
+    def set_state(self, state):
+        for attr in self.checkpoint_attrs:
+            setattr(self, attr, state[attr])
+        if 'constraints' in state:
+            self.constraints.set_state(state['constraints'])
+
+    def checkpoint(self, iter_num, **run_state):
+        '''
+        :param iter_num: number of finished iterations of the current run
+        :param run_state: local variables of run() needed to continue it
+        '''
+        if self.checkpoint_path is None:
+            return
+        if iter_num % self.checkpoint_every != 0 and iter_num != self.max_iter:
+            return
+        save_state(self.checkpoint_path, {'state': self.get_state(),
+                                          'iter_num': iter_num,
+                                          'max_iter': self.max_iter,
+                                          'run_state': run_state,
+                                          'rng_state': np.random.get_state()})
+
+    def resume(self, path=None):
+        '''load the latest checkpoint, the next run() continues from there'''
+        path = path or self.checkpoint_path
+        ckpt = load_state(path)
+        self.set_state(ckpt['state'])
+        self.max_iter = ckpt['max_iter']
+        np.random.set_state(ckpt['rng_state'])
+        self.resume_point = (ckpt['iter_num'], ckpt['run_state'])
+        if self.checkpoint_path is None:
+            self.checkpoint_path = path
+        return self
+
+    def pop_resume_point(self):
+        '''(first iteration, run_state) for run(), (0, {}) unless resume() was called'''
+        resume_point = getattr(self, 'resume_point', (0, {}))
+        self.resume_point = (0, {})
+        return resume_point
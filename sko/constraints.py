@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+'''
+constraint handling shared by GA, DE, PSO and NSGA
+
+Constraints are the usual forms: constraint_eq, c(x) = 0, and constraint_ueq,
+c(x) <= 0. The total violation of a point is
+sum(max(0, |c_eq(x)| - eq_tol)) + sum(max(0, c_ueq(x))).
+
+Before anything is evaluated the violation of the whole population is
+computed (vectorized=True: every c takes the population (n, n_dim) and
+returns (n,)), infeasible points go through the repair operator if there is
+one and the points still infeasible are not evaluated (unless
+evaluate_infeasible=True), so they never reach the simulator. The repair is
+Lamarckian: the optimizers continue from the repaired points (GA encodes
+them back into its chromosomes).
+
+handling decides the value the optimizer sees:
+    'feasibility'  Deb's feasibility rules as a scalar: a feasible point gets f(x), an
+                   infeasible one the worst feasible f seen so far plus its violation,
+                   so feasible < infeasible and infeasible points compare by violation
+    'penalty'      f(x) + penalty * violation, infeasible points must be evaluated for
+                   this, without evaluate_infeasible their f is the worst feasible f seen
+
+The optimizers given constraint_eq/constraint_ueq (rather than a Constraints)
+keep their original handling: 'penalty' with every point evaluated. Whatever
+the handling, GA and DE return the best point by (violation, f): an
+infeasible point's value depends on the feasible points seen before it, so
+it doesn't compare across generations.
+
+    ga = GA(func, n_dim=2, lb=[0, 0], ub=[10, 10],
+            constraints=Constraints(constraint_ueq=[lambda X: X[:, 0] + X[:, 1] - 10], vectorized=True,
+                                    repair=lambda X: X * 10 / X.sum(axis=1, keepdims=True)))
+    ga.run()
+    ga.constraints.counts   # {'evaluated': ..., 'repaired': ..., 'rejected': ...}
+'''
+
+import numpy as np
+
+
+class Constraints():
+    '''
+    Parameters
+    ----------------
+    constraint_eq, constraint_ueq : list of functions
+        c(x) = 0 and c(x) <= 0
+    vectorized : bool
+        the constraint functions take the population and return one value per point
+    handling : str
+        'feasibility' (Deb's rules) or 'penalty'
+    repair : function
+        repair(X) -> X, called with the infeasible points (n, n_dim), returns points of the same shape
+    evaluate_infeasible : bool
+        evaluate infeasible points too (needed for the exact penalty)
+    penalty : float
+        penalty factor of handling='penalty'
+    eq_tol : float
+        tolerance of the equality constraints
+    '''
+    def __init__(self, constraint_eq=tuple(), constraint_ueq=tuple(), vectorized=False, handling='feasibility',
+                 repair=None, evaluate_infeasible=False, penalty=1e5, eq_tol=0.0):
+        assert handling in ('feasibility', 'penalty'), 'handling should be feasibility or penalty'
+        self.constraint_eq = list(constraint_eq)
+        self.constraint_ueq = list(constraint_ueq)
+        self.vectorized = vectorized
+        self.handling = handling
+        self.repair = repair
+        self.evaluate_infeasible = evaluate_infeasible
+        self.penalty = penalty
+        self.eq_tol = eq_tol
+        self.worst_feasible = None
+        self.counts = {'evaluated': 0, 'repaired': 0, 'rejected': 0}
+
+    def get_state(self):
+        '''the state that changes during a run (see sko.checkpoint)'''
+        return {'worst_feasible': self.worst_feasible, 'counts': dict(self.counts)}
+
+    def set_state(self, state):
+        self.worst_feasible = state['worst_feasible']
+        self.counts = dict(state['counts'])
+
+    def __bool__(self):
+        return len(self.constraint_eq) > 0 or len(self.constraint_ueq) > 0 or self.repair is not None
+
+    def _values(self, c, X):
+        if self.vectorized:
+            return np.asarray(c(X), dtype=float).reshape(len(X))
+        return np.array([c(x) for x in X], dtype=float).reshape(len(X))
+
+    def violation(self, X):
+        '''total constraint violation of every point of X, 0 for feasible points'''
+        X = np.asarray(X)
+        CV = np.zeros(len(X))
+        for c in self.constraint_eq:
+            CV += np.maximum(np.abs(self._values(c, X)) - self.eq_tol, 0)
+        for c in self.constraint_ueq:
+            CV += np.maximum(self._values(c, X), 0)
+        return CV
+
+    def check(self, X):
+        '''
+        repairs the infeasible points of X
+        returns X (with the repaired points), their violation and the mask of the points to evaluate
+        '''
+        X = np.array(X, dtype=float)
+        CV = self.violation(X)
+        infeasible = CV > 0
+        if self.repair is not None and infeasible.any():
+            X[infeasible] = self.repair(X[infeasible].copy())
+            CV[infeasible] = self.violation(X[infeasible])
+            self.counts['repaired'] += int((CV[infeasible] <= 0).sum())
+        to_evaluate = np.ones(len(X), dtype=bool) if self.evaluate_infeasible else CV <= 0
+        self.counts['rejected'] += int((~to_evaluate).sum())
+        self.counts['evaluated'] += int(to_evaluate.sum())
+        return X, CV, to_evaluate
+
+    def evaluate(self, func, X):
+        '''
+        func is a population function (func_transformer)
+        returns X (repaired), f(X) (nan where not evaluated), the value for the optimizer and the violation
+        '''
+        X, CV, to_evaluate = self.check(X)
+        Y_raw = np.full(len(X), np.nan)
+        if to_evaluate.any():
+            Y_raw[to_evaluate] = np.asarray(func(X[to_evaluate]), dtype=float).reshape(-1)
+        feasible = CV <= 0
+        if feasible.any():
+            worst = Y_raw[feasible].max()
+            self.worst_feasible = worst if self.worst_feasible is None else max(self.worst_feasible, worst)
+        worst_feasible = 0.0 if self.worst_feasible is None else self.worst_feasible
+        if self.handling == 'penalty':
+            Y = np.where(to_evaluate, Y_raw, worst_feasible) + self.penalty * CV
+        else:
+            Y = np.where(feasible, Y_raw, worst_feasible + CV)
+        return X, Y_raw, Y, CV
+
+
+def make_constraints(constraint_eq=tuple(), constraint_ueq=tuple(), constraints=None, handling='penalty'):
+    '''
+    the Constraints of an optimizer, from its constraint_eq/constraint_ueq arguments unless given.
+    Those keep the handling the optimizers had before sko.constraints by default: every point is evaluated and
+    penalized by 1e5 * violation
+    '''
+    if constraints is not None:
+        assert not constraint_eq and not constraint_ueq, 'pass either constraints or constraint_eq/constraint_ueq'
+        return constraints
+    return Constraints(constraint_eq, constraint_ueq, handling=handling, evaluate_infeasible=handling == 'penalty')
@@ -44,13 +44,7 @@ def crossover_2point_bit(self):
         if n1 > n2:
             n1, n2 = n2, n1
         mask[i, n1:n2] = 1
-    print("[DEBUG][crossover_2point_bit] mask: ", mask.shape)
-    print("[DEBUG][crossover_2point_bit] Chrom1: ", Chrom1.shape)
-    print("[DEBUG][crossover_2point_bit] Chrom2: ", Chrom2.shape)
     mask2 = (Chrom1 ^ Chrom2) & mask
-    
-    print("[DEBUG][crossover_2point_bit] mask2: ", mask2.shape)
-
     Chrom1 ^= mask2
     Chrom2 ^= mask2
     return self.Chrom
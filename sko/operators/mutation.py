@@ -25,7 +25,7 @@ def mutation_TSP_1(self):
     for i in range(self.size_pop):
         for j in range(self.n_dim):
             if np.random.rand() < self.prob_mut:
-                n = np.random.randint(0, self.len_chrom, 1)
+                n = np.random.randint(0, self.len_chrom)
                 self.Chrom[i, j], self.Chrom[i, n] = self.Chrom[i, n], self.Chrom[i, j]
     return self.Chrom
 
@@ -0,0 +1,215 @@
+'''
+Array-native versions of the GA operators, for large populations.
+Every operator works on the whole population at once, instead of pair by pair (or individual by individual),
+and is distributionally equivalent to the operator of the same name in crossover.py, mutation.py, selection.py
+(or GA.RCGA). Register them one by one, e.g. `ga.register('crossover', vectorized.crossover_pmx)`,
+or all at once with `ga.vectorize()`.
+'''
+import numpy as np
+
+
+def segment_mask(n1, n2, len_chrom):
+    '''
+    mask[i, j] is True for n1[i] <= j < n2[i]
+    '''
+    idx = np.arange(len_chrom)
+    return (idx >= n1[:, None]) & (idx < n2[:, None])
+
+
+def swap_pairs(Chrom, mask):
+    '''
+    swap the masked genes of the pairs (0, 1), (2, 3), ... in place
+    '''
+    Chrom1, Chrom2 = Chrom[0::2], Chrom[1::2]
+    seg1 = Chrom1[mask]
+    Chrom1[mask] = Chrom2[mask]
+    Chrom2[mask] = seg1
+    return Chrom
+
+
+def cx_points(size, len_chrom):
+    '''
+    n1 < n2 drawn like `swap` and `crossover_pmx` do
+    '''
+    n = np.random.randint(0, len_chrom - 1, (size, 2))
+    n1, n2 = n.min(axis=1), n.max(axis=1)
+    n2 = n2 + (n[:, 0] >= n[:, 1])
+    return n1, n2
+
+
+# %% crossover
+def crossover_1point(self):
+    n = np.random.randint(0, self.len_chrom, self.size_pop // 2)
+    return swap_pairs(self.Chrom, segment_mask(n, np.full_like(n, self.len_chrom), self.len_chrom))
+
+
+def crossover_2point(self):
+    n = np.sort(np.random.randint(0, self.len_chrom, (self.size_pop // 2, 2)), axis=1)
+    return swap_pairs(self.Chrom, segment_mask(n[:, 0], n[:, 1], self.len_chrom))
+
+
+def crossover_2point_bit(self):
+    '''
+    only for 0/1 type of Chrom. Pairs the first half of the population with the second half
+    '''
+    half_size_pop = self.size_pop // 2
+    self.Chrom = self.Chrom.reshape(self.size_pop, self.len_chrom)
+    Chrom1, Chrom2 = self.Chrom[:half_size_pop], self.Chrom[half_size_pop:]
+    n = np.sort(np.random.randint(0, self.len_chrom, (half_size_pop, 2)), axis=1)
+    mask2 = (Chrom1 ^ Chrom2) & segment_mask(n[:, 0], n[:, 1], self.len_chrom)
+    Chrom1 ^= mask2
+    Chrom2 ^= mask2
+    return self.Chrom
+
+
+def crossover_2point_prob(self, crossover_prob):
+    half_size_pop = self.size_pop // 2
+    n = np.sort(np.random.randint(0, self.len_chrom, (half_size_pop, 2)), axis=1)
+    mask = segment_mask(n[:, 0], n[:, 1], self.len_chrom) & (np.random.rand(half_size_pop) < crossover_prob)[:, None]
+    return swap_pairs(self.Chrom, mask)
+
+
+def crossover_pmx(self):
+    '''
+    partially matched crossover (PMX), with the same swap based repair as crossover.crossover_pmx, done for all the
+    pairs at once (only the genes are looped over). Chrom's rows need to be permutations of the same values
+    '''
+    Chrom, half_size_pop, len_chrom = self.Chrom, self.size_pop // 2, self.len_chrom
+    values = np.sort(Chrom[0])
+    ranks = np.searchsorted(values, Chrom)
+    Chrom1, Chrom2 = ranks[0::2], ranks[1::2]
+    # pos[i, v]: position of the value v in chromosome i
+    pos1, pos2 = np.empty_like(Chrom1), np.empty_like(Chrom2)
+    np.put_along_axis(pos1, Chrom1, np.arange(len_chrom)[None, :], axis=1)
+    np.put_along_axis(pos2, Chrom2, np.arange(len_chrom)[None, :], axis=1)
+    cxpoint1, cxpoint2 = cx_points(half_size_pop, len_chrom)
+    for j in range(len_chrom):
+        rows = np.flatnonzero((cxpoint1 <= j) & (j < cxpoint2))
+        value1, value2 = Chrom1[rows, j], Chrom2[rows, j]
+        p1, p2 = pos1[rows, value2], pos2[rows, value1]
+        Chrom1[rows, j], Chrom1[rows, p1] = value2, value1
+        Chrom2[rows, j], Chrom2[rows, p2] = value1, value2
+        pos1[rows, value1], pos1[rows, value2] = p1, j
+        pos2[rows, value1], pos2[rows, value2] = j, p2
+    Chrom[0::2], Chrom[1::2] = values[Chrom1], values[Chrom2]
+    return Chrom
+
+
+def crossover_SBX(self):
+    '''
+    simulated binary crossover, same as RCGA.crossover_SBX
+    '''
+    Chrom = self.Chrom
+    y1, y2 = Chrom[0::2], Chrom[1::2]
+    r = np.random.random(y1.shape)
+    betaq = np.where(r <= 0.5, (2 * r) ** 0.5, (0.5 / (1.0 - r)) ** 0.5)
+    crossed = (np.random.random(y1.shape[0]) <= self.prob_cros)[:, None]
+    child1 = np.clip(0.5 * ((1 + betaq) * y1 + (1 - betaq) * y2), 0, 1)
+    child2 = np.clip(0.5 * ((1 - betaq) * y1 + (1 + betaq) * y2), 0, 1)
+    Chrom[0::2], Chrom[1::2] = np.where(crossed, child1, y1), np.where(crossed, child2, y2)
+    return Chrom
+
+
+# %% mutation
+def mutation_swap(self):
+    rows = np.flatnonzero(np.random.rand(self.size_pop) < self.prob_mut)
+    n1, n2 = cx_points(len(rows), self.len_chrom)
+    Chrom = self.Chrom
+    Chrom[rows, n1], Chrom[rows, n2] = Chrom[rows, n2], Chrom[rows, n1]
+    return Chrom
+
+
+def mutation_reverse(self):
+    rows = np.flatnonzero(np.random.rand(self.size_pop) < self.prob_mut)
+    n1, n2 = cx_points(len(rows), self.len_chrom)
+    idx = np.arange(self.len_chrom)
+    # position j of the reversed segment takes the gene at n1 + n2 - 1 - j
+    idx = np.where(segment_mask(n1, n2, self.len_chrom), (n1 + n2 - 1)[:, None] - idx, idx)
+    self.Chrom[rows] = np.take_along_axis(self.Chrom[rows], idx, axis=1)
+    return self.Chrom
+
+
+def mutation_TSP_1(self):
+    '''
+    every gene in every chromosome mutate. The swaps of a chromosome happen in gene order (like mutation.mutation_TSP_1),
+    so only the genes are looped over
+    '''
+    Chrom = self.Chrom
+    for j in range(self.n_dim):
+        rows = np.flatnonzero(np.random.rand(self.size_pop) < self.prob_mut)
+        n = np.random.randint(0, self.len_chrom, len(rows))
+        Chrom[rows, j], Chrom[rows, n] = Chrom[rows, n], Chrom[rows, j]
+    return Chrom
+
+
+def mutation_polynomial(self):
+    '''
+    real polynomial mutation, same as RCGA.mutation
+    '''
+    Chrom = self.Chrom
+    mask = np.random.random(Chrom.shape) <= self.prob_mut
+    y = Chrom[mask]
+    r = np.random.random(y.shape)
+    val_low = 2.0 * r + (1.0 - 2.0 * r) * (1.0 - y) ** 2
+    val_up = 2.0 * (1.0 - r) + 2.0 * (r - 0.5) * y ** 2
+    deltaq = np.where(r <= 0.5, val_low ** 0.5 - 1.0, 1.0 - val_up ** 0.5)
+    Chrom[mask] = np.clip(y + deltaq, 0, 1)
+    return Chrom
+
+
+# %% selection
+def selection_tournament_faster(self, tourn_size=3):
+    aspirants_idx = np.random.randint(self.size_pop, size=(self.size_pop, tourn_size))
+    winner = self.FitV[aspirants_idx].argmax(axis=1)  # winner index in every team
+    self.Chrom = self.Chrom[aspirants_idx[np.arange(self.size_pop), winner], :]
+    return self.Chrom
+
+
+def alias_table(sel_prob):
+    '''
+    Vose's alias table, built in rounds: every round, all the (remaining) small cells are filled from the large ones
+    at once. A large cell is assigned the small cells whose cumulative deficit ends within its cumulative excess,
+    which never takes more than it has, and joins the small ones when it has less than 1 left.
+    :return: prob, alias. Index i is drawn with probability (prob[i] + sum(1 - prob[alias == i])) / n
+    '''
+    n = len(sel_prob)
+    prob = np.asarray(sel_prob, dtype=float) * n
+    alias = np.arange(n)
+    pending = np.ones(n, dtype=bool)
+    while True:
+        small = np.flatnonzero(pending & (prob < 1))
+        large = np.flatnonzero(pending & (prob >= 1))
+        if len(small) == 0 or len(large) == 0:
+            break
+        deficit = 1 - prob[small]
+        owner = np.searchsorted(np.cumsum(prob[large] - 1), np.cumsum(deficit), side='left')
+        owner = np.minimum(owner, len(large) - 1)
+        alias[small] = large[owner]
+        pending[small] = False
+        prob[large] -= np.bincount(owner, weights=deficit, minlength=len(large))
+    # what is left is 1 up to rounding errors
+    prob[pending] = 1
+    return np.clip(prob, 0, 1), alias
+
+
+def alias_sample(prob, alias, size):
+    idx = np.random.randint(len(prob), size=size)
+    return np.where(np.random.rand(size) < prob[idx], idx, alias[idx])
+
+
+def selection_roulette_1(self):
+    FitV = self.FitV
+    FitV = FitV - FitV.min() + 1e-10
+    # the worst one should still has a chance to be selected
+    sel_prob = FitV / FitV.sum()
+    self.Chrom = self.Chrom[alias_sample(*alias_table(sel_prob), self.size_pop), :]
+    return self.Chrom
+
+
+def selection_roulette_2(self):
+    FitV = self.FitV
+    FitV = (FitV - FitV.min()) / (FitV.max() - FitV.min() + 1e-10) + 0.2
+    # the worst one should still has a chance to be selected
+    sel_prob = FitV / FitV.sum()
+    self.Chrom = self.Chrom[alias_sample(*alias_table(sel_prob), self.size_pop), :]
+    return self.Chrom
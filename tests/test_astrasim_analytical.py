@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+proj_root_path = os.path.abspath(tests_dir_path + '/../')
+os.sys.path.insert(0, proj_root_path)
+
+from sims.AstraSim.analytical_model import (AnalyticalAstraSim, calibrate, collective_terms, load_records,
+                                            load_system, main)
+
+ASTRASIM_DIR = os.path.join(proj_root_path, 'sims', 'AstraSim')
+
+
+def ring_network(units, bandwidth=25, latency=1):
+    return {'topologies-per-dim': ['Ring'], 'dimensions-count': 1, 'units-count': [units], 'links-count': [1],
+            'link-latency': [latency], 'link-bandwidth': [bandwidth]}
+
+
+class TestAnalyticalModel(unittest.TestCase):
+
+    def test_ring_all_reduce(self):
+        system = {'all-reduce-implementation': 'ring', 'preferred-dataset-splits': 1, 'endpoint-delay': 0}
+        size = 8 * 2 ** 20
+        latency, bandwidth = collective_terms(ring_network(8), system, 'all-reduce', size)
+        # 2 (n - 1) steps of m / n
+        self.assertAlmostEqual(latency, 2 * 7 * 1)
+        self.assertAlmostEqual(bandwidth, 2 * 7 * size / 8 / 25)
+        # twice the bandwidth halves the bandwidth term
+        self.assertAlmostEqual(collective_terms(ring_network(8, bandwidth=50), system, 'all-reduce', size)[1],
+                               bandwidth / 2)
+        self.assertEqual(collective_terms(ring_network(1), system, 'all-reduce', size), (0.0, 0.0))
+
+    def test_hierarchical_config(self):
+        network = os.path.join(ASTRASIM_DIR, 'general_network.json')
+        system = load_system(os.path.join(ASTRASIM_DIR, 'general_system.txt'))
+        self.assertEqual(system['all-reduce-implementation'], 'direct_ring_halvingDoubling')
+        model = AnalyticalAstraSim()
+        times = [model.collective_time(network, system, 'all-reduce', 2 ** size) for size in (20, 24, 28)]
+        self.assertTrue(all(a < b for a, b in zip(times, times[1:])))
+        self.assertAlmostEqual(model.collective_time(network, system, 'all-reduce', 2 ** 24),
+                               2 * model.collective_time(network, system, 'reduce-scatter', 2 ** 24))
+        with open(network) as f:
+            bigger = json.load(f)
+        bigger['units-count'][1] *= 2
+        self.assertGreater(model.collective_time(bigger, system, 'all-reduce', 2 ** 24), times[1])
+
+    def test_calibration_recovers_factors(self):
+        rng = np.random.RandomState(0)
+        truth = AnalyticalAstraSim({'alpha': 3.0, 'beta': 0.7, 'overhead': 50.0})
+        records = []
+        for _ in range(12):
+            network = ring_network(int(rng.choice([2, 4, 8, 16])), bandwidth=int(rng.randint(10, 200)),
+                                   latency=int(rng.randint(1, 500)))
+            system = {'all-reduce-implementation': str(rng.choice(['ring', 'direct', 'halvingDoubling'])),
+                      'preferred-dataset-splits': int(rng.randint(1, 32))}
+            size = int(2 ** rng.randint(10, 26))
+            records.append({'network': network, 'system': system, 'collective': 'all-reduce', 'size': size,
+                            'time': truth.collective_time(network, system, 'all-reduce', size)})
+        factors, report = calibrate(records)
+        self.assertAlmostEqual(factors['alpha'], 3.0, places=4)
+        self.assertAlmostEqual(factors['beta'], 0.7, places=4)
+        self.assertLess(report['mean_relative_error'], 1e-6)
+        self.assertLess(report['loo_mean_relative_error'], 1e-6)
+        self.assertGreater(report['uncalibrated_mean_relative_error'], 0.1)
+
+    def test_workload_and_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            workload = os.path.join(tmp, 'workload.txt')
+            with open(workload, 'w') as f:
+                f.write('DATA\n2\n'
+                        'conv1 -1 100 NONE 0 200 NONE 0 300 ALLREDUCE 1048576 10\n'
+                        'fc1 -1 50 NONE 0 60 ALLGATHER 4096 70 ALLREDUCE 65536 10\n')
+            network = os.path.join(ASTRASIM_DIR, 'general_network.json')
+            system = os.path.join(ASTRASIM_DIR, 'general_system.txt')
+            model = AnalyticalAstraSim()
+            result = model.evaluate(network, system, workload)
+            self.assertEqual(result['ComputeTime'], 780)
+            self.assertAlmostEqual(result['CommsTime'],
+                                   model.collective_time(network, system, 'all-reduce', 1048576)
+                                   + model.collective_time(network, system, 'all-gather', 4096)
+                                   + model.collective_time(network, system, 'all-reduce', 65536))
+
+            # recorded runs with paths relative to the records file
+            with open(os.path.join(tmp, 'runs.jsonl'), 'w') as f:
+                for scale, time in ((1, 4e4), (4, 1.5e5), (16, 6.5e5), (64, 2.4e6)):
+                    f.write(json.dumps({'network': network, 'system': system, 'workload': 'workload.txt',
+                                        'comm_scale': scale, 'time': time}) + '\n')
+            records = load_records(os.path.join(tmp, 'runs.jsonl'))
+            self.assertEqual(records[0]['workload'], workload)
+            out = os.path.join(tmp, 'factors.json')
+            self.assertEqual(main(['calibrate', os.path.join(tmp, 'runs.jsonl'), '--out', out]), 0)
+            with open(out) as f:
+                fit = json.load(f)
+            self.assertLess(fit['report']['mean_relative_error'], 0.2)
+            calibrated = AnalyticalAstraSim(out)
+            self.assertEqual(calibrated.factors, fit['factors'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import ast
+import configparser
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+import sims.config_renderer as config_renderer
+from sims.config_renderer import DRAMSysConfigRenderer, SniperConfigRenderer, TimeloopArchRenderer
+
+DRAMSYS_BASE = os.path.join(tests_dir_path, '../sims/DRAM/DRAMSys/library/resources/configs/mcconfigs/policy.json')
+SNIPER_BASE = os.path.join(tests_dir_path, '../sims/Sniper/arch_gym_x86.cfg')
+TIMELOOP_BASE = os.path.join(tests_dir_path, '../sims/Timeloop/arch/eyeriss_like.yaml')
+
+
+def load_helper(method_name):
+    '''helpers needs arch_gym_configs to import, only its config writers are used here'''
+    path = os.path.join(tests_dir_path, '../arch_gym/envs/envHelpers.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == 'helpers')
+    method = next(n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name == method_name)
+    namespace = dict(vars(config_renderer), os=os, print=lambda *args, **kwargs: None)
+    exec(compile(ast.Module(body=[method], type_ignores=[]), path, 'exec'), namespace)
+    return namespace[method_name]
+
+
+class FakeHelpers():
+    def __init__(self):
+        self.sniper_renderers = {}
+
+
+class TestConfigRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.run_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.run_dir)
+
+    def test_dramsys_overlay(self):
+        renderer = DRAMSysConfigRenderer(DRAMSYS_BASE)
+        path = renderer.write({'PagePolicy': 'Closed', 'MaxActiveTransactions': 16}, self.run_dir)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data['mcconfig']['PagePolicy'], 'Closed')
+        self.assertEqual(data['mcconfig']['MaxActiveTransactions'], 16)
+        self.assertEqual(data['mcconfig']['CmdMux'], 'Oldest')
+        # only the rendered file is left behind, no temp files
+        self.assertEqual(os.listdir(self.run_dir), ['policy.json'])
+
+    def test_byte_stable(self):
+        renderer = SniperConfigRenderer(SNIPER_BASE)
+        params = {'core_dispatch_width': 4, 'l2_cache_size': 512, 'perf_model/new_section/key': 1}
+        reordered = dict(reversed(list(params.items())))
+        self.assertEqual(renderer.render(params), renderer.render(reordered))
+        self.assertEqual(renderer.digest(params), SniperConfigRenderer(SNIPER_BASE).digest(reordered))
+        self.assertNotEqual(renderer.digest(params), renderer.digest(dict(params, core_dispatch_width=8)))
+
+    def test_sniper_keeps_includes(self):
+        renderer = SniperConfigRenderer(SNIPER_BASE)
+        path = renderer.write({'core_window_size': 64, 'l3_cache_size': 4096}, self.run_dir)
+        with open(path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[:2], ['#include rob', '#include nehalem'])
+        parser = configparser.ConfigParser()
+        parser.read(path)
+        self.assertEqual(parser.get('perf_model/core/interval_timer', 'window_size'), '64')
+        self.assertEqual(parser.get('perf_model/l3_cache', 'cache_size'), '4096')
+        # rendering from the rendered file does not duplicate the includes
+        self.assertEqual(SniperConfigRenderer(path).render({}), renderer.render({'core_window_size': 64,
+                                                                                 'l3_cache_size': 4096}))
+
+    def test_timeloop_meshx(self):
+        renderer = TimeloopArchRenderer(TIMELOOP_BASE)
+        params = {'MAC_MESH_X': 7, 'IFMAP_SPAD_CLASS': 'regfile',
+                  'IFMAP_SPAD_ATRIBUTES': {'memory_depth': 16, 'block-size': 1}}
+        data = yaml.safe_load(renderer.render(params))
+        pe = data['architecture']['subtree'][0]['subtree'][0]['subtree'][0]
+        self.assertEqual(pe['local'][0]['class'], 'regfile')
+        self.assertEqual(pe['local'][0]['attributes']['meshX'], 7)
+        self.assertEqual(pe['local'][3]['attributes']['meshX'], 7)
+        # the caller's dict is not modified
+        self.assertNotIn('meshX', params['IFMAP_SPAD_ATRIBUTES'])
+        with self.assertRaises(Exception):
+            renderer.render({'UNKNOWN': 1})
+
+    def test_sniper_envs_render_into_own_run_dirs(self):
+        with open(SNIPER_BASE) as f:
+            base = f.read()
+        write = load_helper('read_modify_write_sniper_config')
+        action = {k: 2 for k in config_renderer.SNIPER_PARAM_KEYS}
+        env_dirs = [os.path.join(self.run_dir, str(i)) for i in range(2)]
+        envs = [FakeHelpers(), FakeHelpers()]
+        for width, (env, env_dir) in enumerate(zip(envs, env_dirs)):
+            for step in range(2):
+                action = dict(action, core_dispatch_width=10 * width + step)
+                self.assertTrue(write(env, action, SNIPER_BASE, env_dir, 'agent.cfg'))
+        # the base is parsed once per env and never written
+        renderers = [env.sniper_renderers[SNIPER_BASE] for env in envs]
+        self.assertIsNot(renderers[0], renderers[1])
+        with open(SNIPER_BASE) as f:
+            self.assertEqual(f.read(), base)
+        for width, env_dir in enumerate(env_dirs):
+            parser = configparser.ConfigParser()
+            parser.read(os.path.join(env_dir, 'agent.cfg'))
+            self.assertEqual(parser.get('perf_model/core/interval_timer', 'dispatch_width'), str(10 * width + 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import ast
+import hashlib
+import math
+import operator
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import os
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+DEEPSWARM_DIR = os.path.join(tests_dir_path, '../aco/DeepSwarm/deepswarm')
+
+CFG = {'metrics': 'loss', 'reuse_patience': 1, 'aco': {'workers': 1}}
+
+
+def load_classes(file_name, names, namespace):
+    '''the deepswarm package needs its settings file to import, only the classes are used here'''
+    path = os.path.join(DEEPSWARM_DIR, file_name)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    body = [n for n in tree.body if isinstance(n, ast.ClassDef) and n.name in names]
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+namespace = {'cfg': CFG, 'math': math, 'ThreadPoolExecutor': ThreadPoolExecutor,
+             'hashlib': hashlib, 'pickle': pickle, 'datetime': datetime,
+             'left_cost_is_better': operator.le}
+load_classes('aco.py', ('GenerationEvaluator', 'Ant'), namespace)
+load_classes('storage.py', ('Storage',), namespace)
+GenerationEvaluator = namespace['GenerationEvaluator']
+Ant = namespace['Ant']
+Storage = namespace['Storage']
+
+
+class PathNode(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class Backend(object):
+    '''evaluation of a path takes a random time, so workers finish out of order'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.evaluated = []
+        self.batches = []
+
+    def generate_model(self, path):
+        return [str(node) for node in path]
+
+    def evaluate_model(self, model):
+        value = sum(ord(c) for c in ''.join(model)) % 97 / 10.0
+        time.sleep((hash(tuple(model)) % 5) / 1000.0)
+        with self.lock:
+            self.evaluated.append(tuple(model))
+        return (value, 1.0 / (1.0 + value))
+
+    def generate_model_parallel(self, paths):
+        return [self.generate_model(path) for path in paths]
+
+    def evaluate_model_parallel(self, models):
+        self.batches.append(len(models))
+        losses, accuracies = zip(*[self.evaluate_model(model) for model in models])
+        return list(losses), list(accuracies)
+
+    def save_model(self, model, path):
+        return
+
+    def load_model(self, path):
+        return
+
+
+def make_storage(path):
+    storage = Storage.__new__(Storage)
+    storage.path_lookup = {}
+    storage.models = {}
+    storage.current_path = Path(path)
+    return storage
+
+
+def make_ants(names):
+    return [Ant([PathNode('Input')] + [PathNode(n) for n in name.split()]) for name in names]
+
+
+class TestGenerationEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_generations(self, workers, generations, batch=False):
+        backend = Backend()
+        storage = make_storage(self.tmp.name)
+        evaluator = GenerationEvaluator(workers, batch)
+        results = []
+        for names in generations:
+            ants = make_ants(names)
+            evaluator.evaluate(ants, backend, storage)
+            results.append([(a.path_hash, a.loss, a.accuracy) for a in ants])
+        return results, backend, storage, evaluator
+
+    def test_deduplication(self):
+        generations = [['A B', 'A C', 'A B', 'D'], ['A C', 'E', 'E', 'A B']]
+        results, backend, storage, evaluator = self.run_generations(1, generations)
+        # every distinct path is evaluated once, within and across generations
+        self.assertEqual(sorted(backend.evaluated),
+                         sorted({tuple(['Input'] + n.split()) for g in generations for n in g}))
+        self.assertEqual(evaluator.evaluated_count, 4)
+        self.assertEqual(evaluator.reused_count, 4)
+        self.assertEqual(results[0][0], results[0][2])
+        self.assertEqual(results[1][3], results[0][0])
+        # the reuses are recorded as repeated evaluations without improvement
+        ab_hash = results[0][0][0]
+        self.assertEqual(storage.models[storage.path_lookup[ab_hash]][1], 2)
+        self.assertEqual(storage.models[storage.path_lookup[results[1][1][0]]][1], 1)
+
+    def test_independent_of_workers(self):
+        generations = [['A B', 'A C', 'D E', 'A B', 'F', 'G H', 'A C', 'I'],
+                       ['J', 'D E', 'K L', 'M', 'J', 'N O', 'P', 'A B']]
+        reference = self.run_generations(1, generations)
+        for workers in (2, 4, 8):
+            results, _, storage, _ = self.run_generations(workers, generations)
+            self.assertEqual(results, reference[0])
+            self.assertEqual(storage.path_lookup, reference[2].path_lookup)
+            self.assertEqual(storage.models, reference[2].models)
+
+    def test_batch(self):
+        generations = [['A B', 'A C', 'A B', 'D'], ['A C', 'E', 'E', 'A B'], ['D', 'A C']]
+        reference = self.run_generations(1, generations)
+        results, backend, storage, evaluator = self.run_generations(1, generations, batch=True)
+        self.assertEqual(results, reference[0])
+        self.assertEqual(storage.models, reference[2].models)
+        # one batch of the distinct new paths per generation, none when there are no new paths
+        self.assertEqual(backend.batches, [3, 1])
+        self.assertEqual((evaluator.evaluated_count, evaluator.reused_count), (4, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../sims/DRAM')
+
+from trace_gen import (Mixture, PointerChase, Random, Replay, Stream, Strided, build_generator, main, parse_line,
+                       subsample_trace, write_trace)
+
+TRACES_DIR = os.path.join(tests_dir_path, '..', 'sims', 'DRAM', 'DRAMSys', 'library', 'resources', 'traces')
+
+
+def read_trace(path):
+    with open(path) as f:
+        return [parse_line(line) for line in f if line.strip()]
+
+
+class TestTraceGen(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_stream_and_strided(self):
+        _, addresses = Stream(start=0x100, end=0x100 + 4 * 64).chunk(6)
+        self.assertEqual(addresses.tolist(), [0x100, 0x140, 0x180, 0x1C0, 0x100, 0x140])
+        gen = Strided(start=0, end=1000, stride=300)
+        self.assertEqual(gen.chunk(3)[1].tolist() + gen.chunk(2)[1].tolist(), [0, 300, 600, 900, 200])
+
+    def test_random_range_and_write_ratio(self):
+        writes, addresses = Random(start=1 << 20, end=1 << 21, write_ratio=0.25, seed=3).chunk(20000)
+        self.assertTrue(np.all(addresses >= 1 << 20) and np.all(addresses < 1 << 21))
+        self.assertTrue(np.all(addresses % 64 == 0))
+        self.assertAlmostEqual(writes.mean(), 0.25, delta=0.02)
+
+    def test_pointer_chase_visits_every_line(self):
+        gen = PointerChase(start=0, end=100 * 64, seed=5)
+        first = gen.chunk(100)[1]
+        self.assertEqual(sorted(first.tolist()), [64 * i for i in range(100)])
+        # the next round repeats the chain
+        np.testing.assert_array_equal(gen.chunk(100)[1], first)
+
+    def test_mixture_phases(self):
+        mix = Mixture([Stream(start=0, end=1 << 20), Stream(start=1 << 30, end=(1 << 30) + (1 << 20))],
+                      weights=[1, 1], phase_length=10, seed=2)
+        addresses = np.concatenate([mix.chunk(7)[1] for _ in range(20)])
+        components = (addresses >= 1 << 30).reshape(-1, 10)
+        # each phase comes from one component, both components are used
+        self.assertTrue(np.all(components == components[:, :1]))
+        self.assertEqual(set(components[:, 0].tolist()), {False, True})
+        # the components continue where they stopped
+        low = addresses[addresses < 1 << 30]
+        np.testing.assert_array_equal(low, np.arange(len(low)) * 64)
+
+    def test_deterministic(self):
+        spec = {'type': 'mixture', 'phase_length': 100, 'components': [
+            {'type': 'random', 'weight': 2, 'write_ratio': 0.5},
+            {'type': 'pointer_chase', 'end': 1 << 16},
+            {'type': 'strided', 'stride': 256, 'write_ratio': 1.0}]}
+        write_trace(self.path('a.stl'), build_generator(spec, seed=1), 5000, chunk_size=333)
+        write_trace(self.path('b.stl'), build_generator(spec, seed=1), 5000, chunk_size=4096)
+        write_trace(self.path('c.stl'), build_generator(spec, seed=2), 5000)
+        with open(self.path('a.stl')) as a, open(self.path('b.stl')) as b, open(self.path('c.stl')) as c:
+            a, b, c = a.read(), b.read(), c.read()
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        with self.assertRaises(ValueError):
+            build_generator({'type': 'zipf'})
+
+    def test_write_format(self):
+        write_trace(self.path('t.stl'), Stream(write_ratio=1.0), 3, interval=4)
+        with open(self.path('t.stl')) as f:
+            self.assertEqual(f.read(), '0:\twrite\t0x0\n4:\twrite\t0x40\n8:\twrite\t0x80\n')
+        self.assertEqual(os.stat(self.path('t.stl')).st_mode & 0o777, 0o644)
+        self.assertEqual(os.listdir(self.tmp.name), ['t.stl'])
+
+    def test_replay_matches_cloud_trace(self):
+        # gen_cloud_load.py builds cloud-1.stl from phases of the random and stream traces
+        cloud = Mixture([Replay(os.path.join(TRACES_DIR, 'random.stl')), Replay(os.path.join(TRACES_DIR, 'stream.stl'))],
+                        phase_length=50, seed=0)
+        write_trace(self.path('cloud.stl'), cloud, 10000, chunk_size=777)
+        with open(self.path('cloud.stl')) as a, open(os.path.join(TRACES_DIR, 'cloud-1.stl')) as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_subsample(self):
+        write_trace(self.path('long.stl'), Stream(), 1000, interval=2)
+        kept = subsample_trace(self.path('long.stl'), self.path('short.stl'), window=10, period=100, offset=5,
+                               chunk_size=64)
+        self.assertEqual(kept, 100)
+        lines = read_trace(self.path('short.stl'))
+        self.assertEqual([l[2] for l in lines[:12]], [64 * i for i in list(range(5, 15)) + [105, 106]])
+        # the skipped lines take no time
+        self.assertEqual([l[0] for l in lines], list(range(0, 200, 2)))
+        self.assertTrue(all(l[1] == 'read' for l in lines))
+
+        self.assertEqual(subsample_trace(self.path('long.stl'), self.path('head.stl'), 10, 100, max_lines=25), 25)
+
+    def test_cli(self):
+        main(['generate', '{"type": "random", "write_ratio": 0.5}', self.path('r.stl'), '--length', '50'])
+        main(['subsample', self.path('r.stl'), self.path('s.stl'), '--window', '5', '--period', '10'])
+        self.assertEqual(len(read_trace(self.path('r.stl'))), 50)
+        self.assertEqual(len(read_trace(self.path('s.stl'))), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+import ast
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import unittest
+
+import numpy as np
+import pandas as pd
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+proj_root_path = os.path.join(tests_dir_path, '..')
+os.sys.path.insert(0, proj_root_path)
+
+from sims.maestro_batch import MAESTRO_FAILED, MaestroBatchRunner
+from sims.Timeloop.timeloop_wrapper import TimeloopWrapper
+
+FAKE_DIR = os.path.join(proj_root_path, 'sims', 'fake_sims')
+ENVS_DIR = os.path.join(proj_root_path, 'arch_gym', 'envs')
+sys.path.insert(0, FAKE_DIR)
+
+from common import LATENCY_ENV
+from fake_maestro import HEADER as MAESTRO_HEADER
+
+
+def load_method(file_name, class_name, method_name, namespace):
+    '''the envs need gym and arch_gym_configs to import, only the output parsers are used here'''
+    path = os.path.join(ENVS_DIR, file_name)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == class_name)
+    method = next(n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name == method_name)
+    method.decorator_list = []
+    exec(compile(ast.Module(body=[method], type_ignores=[]), path, 'exec'), namespace)
+    return namespace[method_name]
+
+
+get_observation = load_method('DRAMEnv.py', 'DRAMEnv', 'get_observation', {'re': re, 'np': np})
+# the DRAMSys workdir of a worker: a resources dir with the configs copied and the traces linked
+dramsys_configs = types.SimpleNamespace()
+dramsys_helpers = type('helpers', (), {
+    name: load_method('envHelpers.py', 'helpers', name,
+                      {'os': os, 'json': json, 'shutil': shutil, 'arch_gym_configs': dramsys_configs})
+    for name in ('dramsys_resources_dir', 'create_dramsys_workdir')})
+parse_result = load_method('AstraSimEnv.py', 'AstraSimEnv', 'parse_result', {'csv': csv})
+
+
+def run_fake(fake, args, cwd=None, latency=None):
+    env = dict(os.environ)
+    env.pop(LATENCY_ENV, None)
+    if latency is not None:
+        env[LATENCY_ENV] = str(latency)
+    return subprocess.run([sys.executable, os.path.join(FAKE_DIR, fake)] + args, cwd=cwd, env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+class TestFakeSims(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_dramsys_config(self, **mcconfig):
+        '''returns the DRAMSys arguments: the simulation json and the resources dir its sub-configs are found in'''
+        resources = os.path.join(self.tmp.name, 'resources', '')
+        os.makedirs(os.path.join(resources, 'configs', 'mcconfigs'), exist_ok=True)
+        os.makedirs(os.path.join(resources, 'traces'), exist_ok=True)
+        with open(os.path.join(resources, 'configs', 'mcconfigs', 'policy.json'), 'w') as f:
+            json.dump({'mcconfig': dict({'PagePolicy': 'Open', 'RequestBufferSize': 8}, **mcconfig)}, f)
+        open(os.path.join(resources, 'traces', 'ddr4.stl'), 'w').close()
+        sim = os.path.join(self.tmp.name, 'sim.json')
+        with open(sim, 'w') as f:
+            json.dump({'simulation': {'mcconfig': 'policy.json', 'tracesetup': [{'name': 'ddr4.stl'}]}}, f)
+        return [sim, resources]
+
+    def test_dramsys(self):
+        args = self.write_dramsys_config()
+        out = run_fake('fake_dramsys.py', args)
+        self.assertEqual(out.stderr, '')
+        obs = get_observation(None, out.stdout)
+        self.assertEqual(obs.shape, (3,))
+        self.assertTrue(np.all(obs > 0))
+
+        # same config, same numbers; another config, other numbers
+        np.testing.assert_array_equal(get_observation(None, run_fake('fake_dramsys.py', args).stdout), obs)
+        args = self.write_dramsys_config(PagePolicy='Closed')
+        self.assertFalse(np.array_equal(get_observation(None, run_fake('fake_dramsys.py', args).stdout), obs))
+
+    def test_dramsys_resources(self):
+        # the simulations of the repo resolve in its resources dir
+        library = os.path.join(proj_root_path, 'sims', 'DRAM', 'DRAMSys', 'library')
+        run_fake('fake_dramsys.py', [os.path.join(library, 'simulations', 'ddr3-example.json'),
+                                     os.path.join(library, 'resources', '')])
+
+        # like DRAMSys, the resources dir defaults to <exe dir>/../../DRAMSys/library/resources/
+        sim, resources = self.write_dramsys_config()
+        installed = os.path.join(self.tmp.name, 'DRAMSys', 'library')
+        os.makedirs(installed)
+        shutil.move(resources, os.path.join(installed, 'resources'))
+        exe = os.path.join(self.tmp.name, 'binary', 'DRAMSys', 'DRAMSys')
+        os.makedirs(os.path.dirname(exe))
+        os.symlink(os.path.join(FAKE_DIR, 'fake_dramsys.py'), exe)
+        run_fake(exe, [sim])
+
+        # and never finds the sub-configs next to the simulation json, nor in a resources dir without its slash
+        shutil.copy(os.path.join(installed, 'resources', 'configs', 'mcconfigs', 'policy.json'), self.tmp.name)
+        for args in ([sim], [sim, self.tmp.name + os.sep], [sim, os.path.join(installed, 'resources')]):
+            with self.assertRaises(subprocess.CalledProcessError) as e:
+                run_fake('fake_dramsys.py', args)
+            self.assertIn('not found', e.exception.stderr)
+
+    def test_timeloop(self):
+        timeloop_dir = os.path.join(proj_root_path, 'sims', 'Timeloop')
+        out = run_fake('fake_timeloop_mapper.py',
+                       [os.path.join(timeloop_dir, 'arch', 'eyeriss_like.yaml'),
+                        os.path.join(timeloop_dir, 'mapper', 'mapper.yaml'),
+                        os.path.join(timeloop_dir, 'layer_shapes', 'AlexNet', 'AlexNet_layer1.yaml')],
+                       cwd=self.tmp.name)
+        with open(os.path.join(self.tmp.name, 'timeloop_simulation_output.txt'), 'w') as f:
+            f.write(out.stdout)
+        wrapper = TimeloopWrapper(output_dir=self.tmp.name)
+        self.assertTrue(wrapper.valid_mapping())
+        energy, area, cycles = wrapper.obtain_metrics()
+        self.assertGreater(energy, 0)
+        self.assertGreater(area, 0)
+        self.assertGreater(cycles, 0)
+
+    def test_sniper(self):
+        cfg = os.path.join(self.tmp.name, 'arch_gym_x86.cfg')
+        shutil.copy(os.path.join(proj_root_path, 'sims', 'Sniper', 'arch_gym_x86.cfg'), cfg)
+        logdir = os.path.join(self.tmp.name, 'logs')
+        run_fake('fake_sniper.py', ['600.perlbench_s', '-c', cfg, '-d', logdir, '-n', '1'])
+        with open(os.path.join(logdir, 'stats.json')) as f:
+            data = json.load(f)
+        # the keys SniperEnv.runSniper reads
+        values = [data['Time'], data['Branch Prediction']['MPKI'], data['Branch Prediction']['misprediction rate'],
+                  data['Power']['Processor']['Runtime Dynamic'], data['Power']['Processor']['Peak Power'],
+                  data['Power']['Processor']['Area']]
+        for cache in ('Cache L1-D', 'Cache L1-I', 'Cache L2', 'Cache L3'):
+            values += [data['Cache'][cache]['MPKI'], data['Cache'][cache]['miss rate']]
+        self.assertTrue(all(v > 0 for v in values))
+
+    def test_astrasim(self):
+        system = os.path.join(self.tmp.name, 'general_system.txt')
+        with open(system, 'w') as f:
+            f.write('scheduling-policy: LIFO\nendpoint-delay: 10\n')
+        run_fake('fake_astrasim.py', [os.path.join(self.tmp.name, 'missing_network.json'), system, 'workload.txt'])
+        results = os.path.join(self.tmp.name, 'results', 'run_general')
+        for name in ('backend_dim_info', 'detailed', 'sample_all_reduce_dimension_utilization'):
+            self.assertNotEqual(parse_result(None, os.path.join(results, name + '.csv')), {})
+        backend_end_to_end = parse_result(None, os.path.join(results, 'backend_end_to_end.csv'))
+        end_to_end = parse_result(None, os.path.join(results, 'EndToEnd.csv'))
+        observations = [backend_end_to_end['CommsTime'][0], end_to_end['fwd compute'][0],
+                        end_to_end['wg compute'][0], end_to_end['ig compute'][0],
+                        end_to_end['total exposed comm'][0]]
+        self.assertTrue(all(float(v) > 0 for v in observations))
+
+    def test_maestro(self):
+        runner = MaestroBatchRunner(os.path.join(FAKE_DIR, 'fake_maestro.py'), max_workers=2,
+                                    scratch_root=os.path.join(self.tmp.name, 'scratch'), keep_scratch=True)
+        mapping = [['K', 8], ['K', 8], ['C', 3], ['Y', 3], ['X', 3], ['R', 3], ['S', 3]]
+        arch_configs = {"NocBW": 64, "offchipBW": 64, "l1_size": 64, "l2_size": 32768, "num_pe": 4}
+        metrics = runner.run([mapping] * 2, [64, 3, 224, 224, 3, 3, 1], arch_configs)
+        self.assertNotEqual(tuple(metrics[0]), MAESTRO_FAILED)
+        self.assertEqual(tuple(metrics[0]), tuple(metrics[1]))
+
+        # helpers.run_maestro reads the columns by their exact (space padded) names
+        scratch = os.path.join(self.tmp.name, 'scratch')
+        df = pd.read_csv(os.path.join(scratch, os.listdir(scratch)[0], 'mapping.csv'))
+        self.assertEqual(list(df.columns), MAESTRO_HEADER)
+
+    def test_latency(self):
+        args = self.write_dramsys_config()
+        start = time.time()
+        run_fake('fake_dramsys.py', args, latency=0.3)
+        self.assertGreaterEqual(time.time() - start, 0.3)
+
+
+class TestDRAMSysWorkdir(unittest.TestCase):
+    library = os.path.join(proj_root_path, 'sims', 'DRAM', 'DRAMSys', 'library')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        dramsys_configs.sim_config = os.path.join(self.library, 'simulations', 'ddr3-example.json')
+        dramsys_configs.dram_mem_controller_config_file = os.path.join(self.library, 'resources', 'configs',
+                                                                       'mcconfigs', 'policy.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def create_workdirs(self, page_policies):
+        '''one workdir per page policy (rendered into its memory controller config), returns the DRAMSys arguments'''
+        base = (dramsys_configs.sim_config, dramsys_configs.dram_mem_controller_config_file)
+        workers = []
+        for idx, page_policy in enumerate(page_policies):
+            dramsys_configs.sim_config, dramsys_configs.dram_mem_controller_config_file = base
+            workdir = os.path.join(self.tmp.name, 'env_{}'.format(idx))
+            os.makedirs(workdir)
+            sim_config, mem_ctrl_file = dramsys_helpers().create_dramsys_workdir(workdir)
+            self.assertEqual((dramsys_configs.sim_config, dramsys_configs.dram_mem_controller_config_file),
+                             (sim_config, mem_ctrl_file))
+            with open(mem_ctrl_file) as f:
+                mcconfig = json.load(f)
+            mcconfig['mcconfig']['PagePolicy'] = page_policy
+            with open(mem_ctrl_file, 'w') as f:
+                json.dump(mcconfig, f)
+            workers.append((workdir, [sim_config, dramsys_helpers().dramsys_resources_dir(mem_ctrl_file)]))
+        return workers
+
+    def test_resources_dir(self):
+        (workdir, (sim_config, resources_dir)), = self.create_workdirs(['Open'])
+        self.assertEqual(resources_dir, os.path.join(workdir, 'resources', ''))
+        self.assertTrue(os.path.islink(os.path.join(resources_dir, 'traces')))
+        self.assertEqual(os.listdir(os.path.join(resources_dir, 'configs')),
+                         os.listdir(os.path.join(self.library, 'resources', 'configs')))
+        with self.assertRaises(ValueError):
+            dramsys_helpers().dramsys_resources_dir(sim_config)
+
+    def check_isolated(self, run):
+        '''run(workdir, args) -> observation, the workers simulate their own memory controller configs'''
+        with open(dramsys_configs.dram_mem_controller_config_file) as f:
+            base_mcconfig = f.read()
+        obs = [run(workdir, args) for workdir, args in self.create_workdirs(['Open', 'Closed', 'Open'])]
+        np.testing.assert_array_equal(obs[0], obs[2])
+        self.assertFalse(np.array_equal(obs[0], obs[1]))
+        with open(os.path.join(self.library, 'resources', 'configs', 'mcconfigs', 'policy.json')) as f:
+            self.assertEqual(f.read(), base_mcconfig)
+
+    def test_fake(self):
+        self.check_isolated(lambda workdir, args: get_observation(None, run_fake('fake_dramsys.py', args).stdout))
+
+    def test_dramsys(self):
+        # the binary in the repo is not executable, a copy of it is
+        exe = os.path.join(self.tmp.name, 'DRAMSys')
+        shutil.copy(os.path.join(proj_root_path, 'sims', 'DRAM', 'binary', 'DRAMSys', 'DRAMSys'), exe)
+        os.chmod(exe, 0o755)
+        try:
+            subprocess.run([exe], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+        except OSError as e:
+            self.skipTest('DRAMSys does not run here: {}'.format(e))
+
+        def run(workdir, args):
+            out = subprocess.run([exe] + args, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                 universal_newlines=True, check=True, timeout=600)
+            self.assertEqual(out.stderr, '')
+            return get_observation(None, out.stdout)
+        self.check_isolated(run)
+
+
+if __name__ == '__main__':
+    unittest.main()
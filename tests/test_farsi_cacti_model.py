@@ -0,0 +1,155 @@
+import importlib.util
+import json
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+MODEL_PATH = os.path.join(tests_dir_path, '../Project_FARSI/misc/cacti_hndlr/cacti_model.py')
+
+# loaded by path, FARSI itself needs its settings to import
+_spec = importlib.util.spec_from_file_location('cacti_model', MODEL_PATH)
+cacti_model = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(cacti_model)
+
+# stands in for the CACTI binary: needs tech_params in its working directory, reads the
+# appended size and writes a csv whose values are power laws of the size
+FAKE_CACTI = textwrap.dedent('''\
+    #!%s
+    import os, sys
+    assert os.path.isdir("tech_params")
+    infile = sys.argv[sys.argv.index("-infile") + 1]
+    size = None
+    for line in open(infile):
+        if line.startswith("-size (bytes)"):
+            size = int(line.split()[-1])
+    with open("runs.log", "a") as f:
+        f.write("%%d %%s\\n" %% (size, os.path.dirname(infile)))
+    if size == 13:
+        sys.exit(1)
+    with open(infile + ".out", "w") as f:
+        f.write("Tech node (nm), Dynamic read energy (nJ), Dynamic write energy (nJ), Area (mm2)\\n")
+        f.write("22, %%r, %%r, %%r\\n" %% (0.01 * size ** 0.5, 0.02 * size ** 0.5, 1e-6 * size))
+    ''' % sys.executable)
+
+
+class TestPchip(unittest.TestCase):
+
+    def test_monotone_and_exact(self):
+        xs = [0.0, 1.0, 2.0, 3.0, 4.0]
+        ys = [0.0, 0.1, 5.0, 5.1, 9.0]
+        self.assertEqual([cacti_model.pchip_interpolate(xs, ys, x) for x in xs], ys)
+        dense = [cacti_model.pchip_interpolate(xs, ys, x) for x in np.linspace(0, 4, 401)]
+        self.assertTrue(all(b >= a - 1e-12 for a, b in zip(dense, dense[1:])))
+        self.assertGreaterEqual(min(dense), 0.0)
+        self.assertLessEqual(max(dense), 9.0)
+
+    def test_flat_segment(self):
+        xs = [0.0, 1.0, 2.0, 3.0]
+        ys = [1.0, 2.0, 2.0, 3.0]
+        for x in np.linspace(1, 2, 11):
+            self.assertAlmostEqual(cacti_model.pchip_interpolate(xs, ys, x), 2.0)
+
+
+class TestCactiModel(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.bin_dir = os.path.join(self.dir, 'cacti')
+        os.makedirs(os.path.join(self.bin_dir, 'tech_params'))
+        self.bin_addr = os.path.join(self.bin_dir, 'cacti')
+        with open(self.bin_addr, 'w') as f:
+            f.write(FAKE_CACTI)
+        os.chmod(self.bin_addr, os.stat(self.bin_addr).st_mode | stat.S_IEXEC)
+        self.param_file = os.path.join(self.bin_dir, 'farsi_gen.cfg')
+        with open(self.param_file, 'w') as f:
+            f.write('-technology (u) 0.022\n')
+        self.store_file = os.path.join(self.dir, 'data_log.jsonl')
+        self.grid_dir = os.path.join(self.dir, 'grid')
+        self.sizes = [1024 * 4 ** i for i in range(5)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def model(self, **kwargs):
+        return cacti_model.CactiModel(self.bin_addr, self.param_file, self.store_file, self.grid_dir,
+                                      self.sizes, workers=2, **kwargs)
+
+    def runs(self):
+        with open(os.path.join(self.bin_dir, 'runs.log')) as f:
+            return [line.split() for line in f]
+
+    def test_grid_interpolation(self):
+        cwd = os.getcwd()
+        model = self.model()
+        exact = model.query('ram', 'itrs-lop', 4096)
+        self.assertAlmostEqual(exact['Area (mm2)'], 1e-6 * 4096)
+        # power laws are exact under log-log interpolation
+        res = model.query('ram', 'itrs-lop', 10000)
+        self.assertAlmostEqual(res['Dynamic read energy (nJ)'], 0.01 * 10000 ** 0.5)
+        self.assertAlmostEqual(res['Area (mm2)'], 1e-6 * 10000)
+        self.assertEqual(len(self.runs()), len(self.sizes))
+        self.assertEqual(model.stats['cacti_runs'], len(self.sizes))
+        self.assertEqual(os.getcwd(), cwd)
+        # every run had its own scratch directory, all removed afterwards
+        scratch_dirs = set(d for _, d in self.runs())
+        self.assertEqual(len(scratch_dirs), len(self.sizes))
+        self.assertFalse(any(os.path.exists(d) for d in scratch_dirs))
+        self.assertEqual(sorted(os.listdir(self.bin_dir)), ['cacti', 'farsi_gen.cfg', 'runs.log', 'tech_params'])
+
+        # a new model (process) reuses the table
+        model = self.model()
+        model.query('ram', 'itrs-lop', 50000)
+        self.assertEqual(model.stats['cacti_runs'], 0)
+        self.assertEqual(model.stats['interpolated'], 1)
+
+    def test_outside_grid(self):
+        model = self.model()
+        res = model.query('main memory', 'comm-dram', 1024 * 4 ** 6)
+        self.assertAlmostEqual(res['Area (mm2)'], 1e-6 * 1024 * 4 ** 6)
+        self.assertEqual(model.stats['cacti_runs'], len(self.sizes) + 1)
+        # the exact result is in the store for the next process
+        model = self.model()
+        self.assertEqual(model.query('main memory', 'comm-dram', 1024 * 4 ** 6), res)
+        self.assertEqual(model.stats, {'store_hits': 1, 'interpolated': 0, 'cacti_runs': 0})
+
+    def test_failed_run(self):
+        model = self.model()
+        with self.assertRaises(Exception):
+            model.query('ram', 'itrs-lop', 13)
+
+    def test_version(self):
+        self.model().query('ram', 'itrs-lop', 10000)
+        with open(self.param_file, 'a') as f:
+            f.write('-Output/Input bus width 64\n')
+        model = self.model()
+        model.query('ram', 'itrs-lop', 10000)
+        # a changed param file invalidates the tables and the stored results
+        self.assertEqual(model.stats['cacti_runs'], len(self.sizes))
+        self.assertEqual(len(os.listdir(self.grid_dir)), 2)
+
+    def test_store_append(self):
+        results = {k: 1.0 for k in cacti_model.cacti_output_keys}
+        writer = cacti_model.CactiStore(self.store_file, 'v1')
+        reader = cacti_model.CactiStore(self.store_file, 'v1')
+        writer.insert('ram', 'itrs-lop', 2048, results)
+        cacti_model.CactiStore(self.store_file, 'v0').insert('ram', 'itrs-lop', 4096, results)
+        # a torn record (killed writer) is skipped
+        with open(self.store_file, 'a') as f:
+            f.write('{"version": "v1", "mem_ty')
+        self.assertEqual(reader.find('ram', 'itrs-lop', 2048), results)
+        self.assertIsNone(reader.find('ram', 'itrs-lop', 4096))
+        self.assertEqual(cacti_model.CactiStore(self.store_file, 'v1').results,
+                         {('ram', 'itrs-lop', 2048): results})
+        with open(self.store_file) as f:
+            self.assertEqual(json.loads(f.readline())['mem_size'], 2048)
+
+
+if __name__ == '__main__':
+    unittest.main()
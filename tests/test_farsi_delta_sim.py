@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import unittest
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+FARSI_PATH = os.path.abspath(os.path.join(tests_dir_path, '../Project_FARSI'))
+
+# runs a short explore_ds with delta simulation in its own process (FARSI finds its home directory through the working
+# directory). With the cross check, every resumed neighbour is also simulated from the beginning and the run fails on
+# the first difference. DEBUG_FIX draws the same (mostly invalid) move every time, so the moves are random here.
+EXPLORE = textwrap.dedent('''\
+    import copy, json, os, sys, tempfile
+    farsi = sys.argv[1]
+    sys.path[:0] = [farsi, os.path.join(farsi, "data_collection/collection_utils")]
+    sys.argv = sys.argv[:1]
+    import home_settings
+    from top.main_FARSI import run_FARSI
+    from settings import config
+    from specs.database_input import database_input_class
+    from DSE_utils.design_space_exploration_handler import DSEHandler
+    from DSE_utils.hill_climbing import HillClimbing
+
+    config.DEBUG_FIX = False
+    config.use_cacti = False
+    config.VIS_GR_PER_ITR = config.VIS_PROFILE = config.VIS_MOVE_TRAIL = False
+    config.SA_depth = 3
+    config.TOTAL_RUN_THRESHOLD = 50
+    config.delta_simulation = True
+    config.delta_simulation_cross_check = True
+
+    # the explorer skips the neighbours that raise, so the differences (and errors) are collected here
+    sims, errors = [], []
+    sim_one_design = HillClimbing.sim_one_design
+    def counted_sim_one_design(self, ex_dp, database, parent_sim_dp=None):
+        try:
+            sim_dp = sim_one_design(self, ex_dp, database, parent_sim_dp)
+        except Exception as e:
+            errors.append(repr(e))
+            raise
+        sims.append(sim_dp.simulation_steps_skipped)
+        return sim_dp
+    HillClimbing.sim_one_design = counted_sim_one_design
+
+    population = {"db_mode": "parse", "hw_graph_mode": "generated_from_scratch", "workloads": {"audio_decoder", "edge_detection"},
+                  "misc_knobs": {}}
+    accuracy = {"latency": 1, "energy": 1, "area": 1, "one_over_area": 1}
+    hw_sampling = {"mode": "exact", "population_size": 1, "reduction": "most_likely",
+                   "accuracy_percentage": {block: accuracy for block in ("sram", "dram", "ic", "gpp", "ip")}}
+    dse_handler = DSEHandler(tempfile.mkdtemp())
+    dse_handler.setup_an_explorer(database_input_class(population), hw_sampling)
+    dse_handler.prepare_for_exploration(False, "generated_from_scratch")
+    dse_handler.explore()
+    best_sim_dp = dse_handler.dse.so_far_best_sim_dp.get_dp_rep()
+    print("RESULT " + json.dumps({
+        "sims": len(sims),
+        "resumed": sum(skipped > 0 for skipped in sims),
+        "errors": errors,
+        "best_has_checkpoints": best_sim_dp.simulation_checkpoints is not None,
+        "copy_has_checkpoints": copy.deepcopy(best_sim_dp).simulation_checkpoints is not None}))
+    ''')
+
+
+class TestDeltaSimulation(unittest.TestCase):
+
+    def explore(self):
+        proc = subprocess.run([sys.executable, '-c', EXPLORE, FARSI_PATH],
+                              cwd=os.path.join(FARSI_PATH, 'data_collection'),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        result = [line for line in proc.stdout.splitlines() if line.startswith('RESULT ')]
+        self.assertEqual(proc.returncode, 0, proc.stdout[-2000:])
+        return json.loads(result[-1][len('RESULT '):])
+
+    def test_cross_check(self):
+        # most moves change a kernel launched early on, a few explorations are needed to see neighbours resume
+        for _ in range(3):
+            result = self.explore()
+            self.assertEqual(result['errors'], [])
+            self.assertGreater(result['sims'], 10)
+            # the selected design keeps its checkpoints for its neighbours, copies of it don't
+            self.assertTrue(result['best_has_checkpoints'])
+            self.assertFalse(result['copy_has_checkpoints'])
+            if result['resumed']:
+                break
+        self.assertGreater(result['resumed'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
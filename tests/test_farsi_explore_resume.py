@@ -0,0 +1,102 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+FARSI_PATH = os.path.abspath(os.path.join(tests_dir_path, '../Project_FARSI'))
+
+# runs a short (deterministic) explore_ds on audio_decoder in its own process, FARSI finds its home directory
+# through the working directory. With a kill iteration, the process SIGKILLs itself in the middle of that
+# iteration; otherwise it resumes from the state file if there is one and prints the result.
+EXPLORE = textwrap.dedent('''\
+    import json, os, signal, sys, tempfile
+    farsi, state_file, kill_at = sys.argv[1], sys.argv[2], int(sys.argv[3])
+    sys.path[:0] = [farsi, os.path.join(farsi, "data_collection/collection_utils")]
+    sys.argv = sys.argv[:1]
+    import home_settings
+    from top.main_FARSI import run_FARSI
+    from settings import config
+    from specs.database_input import database_input_class
+    from DSE_utils.design_space_exploration_handler import DSEHandler
+    from DSE_utils.hill_climbing import HillClimbing
+
+    config.DEBUG_FIX = True
+    config.use_cacti = False
+    config.VIS_GR_PER_ITR = config.VIS_PROFILE = config.VIS_MOVE_TRAIL = False
+    config.SA_depth = 3
+    config.TOTAL_RUN_THRESHOLD = 50
+    config.explore_ds_state_file = state_file
+    config.resume_explore_ds = True
+
+    if kill_at:
+        simple_SA = HillClimbing.simple_SA
+        def killed_SA(self):
+            if self.population_generation_cnt == kill_at:
+                os.kill(os.getpid(), signal.SIGKILL)
+            return simple_SA(self)
+        HillClimbing.simple_SA = killed_SA
+
+    population = {"db_mode": "parse", "hw_graph_mode": "generated_from_scratch", "workloads": {"audio_decoder"},
+                  "misc_knobs": {}}
+    accuracy = {"latency": 1, "energy": 1, "area": 1, "one_over_area": 1}
+    hw_sampling = {"mode": "exact", "population_size": 1, "reduction": "most_likely",
+                   "accuracy_percentage": {block: accuracy for block in ("sram", "dram", "ic", "gpp", "ip")}}
+    dse_handler = DSEHandler(tempfile.mkdtemp())
+    dse_handler.setup_an_explorer(database_input_class(population), hw_sampling)
+    dse_handler.prepare_for_exploration(False, "generated_from_scratch")
+    dse_handler.explore()
+    dse = dse_handler.dse
+    stats = dse.so_far_best_sim_dp.dp_stats
+    print("RESULT " + json.dumps({
+        "latency": stats.get_system_complex_metric("latency"),
+        "power": stats.get_system_complex_metric("power"),
+        "area": stats.get_system_complex_area_stacked_dram(),
+        "population_generation_cnt": dse.population_generation_cnt,
+        "total_iteration_ctr": dse.total_iteration_ctr,
+        "seen_SOC_design_codes": dse.seen_SOC_design_codes,
+        "reason_to_terminate": dse.reason_to_terminate}, default=float))
+    ''')
+
+
+class TestExploreDsResume(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.script = os.path.join(self.tmp.name, 'explore.py')
+        with open(self.script, 'w') as f:
+            f.write(EXPLORE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def explore(self, state_file='', kill_at=0):
+        proc = subprocess.run([sys.executable, self.script, FARSI_PATH, state_file, str(kill_at)],
+                              cwd=os.path.join(FARSI_PATH, 'data_collection'),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+        result = [line for line in proc.stdout.splitlines() if line.startswith('RESULT ')]
+        return proc.returncode, json.loads(result[-1][len('RESULT '):]) if result else proc.stdout[-2000:]
+
+    def test_kill_and_resume(self):
+        returncode, uninterrupted = self.explore()
+        self.assertEqual(returncode, 0, uninterrupted)
+        self.assertGreater(uninterrupted['population_generation_cnt'], 4)
+
+        state_file = os.path.join(self.tmp.name, 'explore_ds.state')
+        returncode, _ = self.explore(state_file, kill_at=3)
+        self.assertEqual(returncode, -signal.SIGKILL)
+        self.assertTrue(os.path.exists(state_file))
+        # no partial snapshot is left behind
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['explore.py', 'explore_ds.state'])
+
+        returncode, resumed = self.explore(state_file)
+        self.assertEqual(returncode, 0, resumed)
+        self.assertEqual(resumed, uninterrupted)
+
+
+if __name__ == '__main__':
+    unittest.main()
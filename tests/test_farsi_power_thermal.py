@@ -0,0 +1,200 @@
+import ast
+import math
+import os
+import types
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+FARSI_PATH = os.path.join(tests_dir_path, '../Project_FARSI')
+
+# the power/thermal knobs of settings/config.py
+CONFIG = types.SimpleNamespace(dram_stacked=True, peak_power_budget=None, thermal_budget=None, ambient_temperature=45,
+                               thermal_initial_state='steady_state', die_thickness=.0005,
+                               silicon_thermal_conductivity=130, silicon_volumetric_heat_capacity=1.63e6,
+                               package_thermal_resistance=20, package_thermal_capacitance=1,
+                               thermal_min_block_area=1e-8)
+
+
+def load_class(file_name, class_name, namespace, methods=None):
+    '''FARSI needs its settings (and home directory) to import, only the class (or some of its methods) is used here'''
+    path = os.path.join(FARSI_PATH, file_name)
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == class_name)
+    if methods is not None:
+        cls.body = [n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name in methods]
+    exec(compile(ast.Module(body=[cls], type_ignores=[]), path, 'exec'), namespace)
+    return namespace[class_name]
+
+
+PowerSimulator = load_class('SIM_utils/components/pow_sim.py', 'PowerSimulator', {'np': np, 'config': CONFIG})
+DPStatsContainer = load_class('design_utils/design.py', 'DPStatsContainer', {'config': CONFIG, 'math': math},
+                              ('dist_to_goal', 'power_thermal_normalized_distance'))
+
+
+class Block():
+    def __init__(self, name, type, subtype='', area=1e-6, leakage_power=0.):
+        self.instance_name = name
+        self.type = type
+        self.subtype = subtype
+        self.area = area
+        self.leakage_power = leakage_power
+
+    def get_area(self):
+        return self.area
+
+    def get_leakage_power(self):
+        return self.leakage_power
+
+
+class Kernel():
+    def __init__(self, block_phase_energy_dict):
+        self.block_phase_energy_dict = block_phase_energy_dict
+
+
+class Design():
+    def __init__(self, phase_latency_dict, blocks, kernels):
+        self.phase_latency_dict = phase_latency_dict
+        self.blocks = blocks
+        self.kernels = kernels
+
+    def get_blocks(self):
+        return self.blocks
+
+    def get_kernels(self):
+        return self.kernels
+
+
+def make_design(phase_latency_dict=None):
+    pe = Block('pe', 'pe', area=2e-6, leakage_power=.1)
+    mem = Block('mem', 'mem', 'sram', area=1e-6, leakage_power=.05)
+    dram = Block('dram', 'mem', 'dram', area=1e-4, leakage_power=.2)
+    ic = Block('ic', 'ic', area=0., leakage_power=.01)
+    # phase 1 takes no time, its energy is dropped
+    kernels = [Kernel({pe: {0: 2e-3, 1: 5., 2: 1e-3}, mem: {0: 1e-3}, ic: {2: 1e-4}}),
+               Kernel({pe: {2: 1e-3}, dram: {2: 4e-3}})]
+    if phase_latency_dict is None:
+        phase_latency_dict = {0: 1e-3, 1: 0., 2: 2e-3}
+    return Design(phase_latency_dict, [pe, mem, dram, ic], kernels), (pe, mem, dram, ic)
+
+
+class TestPowerSimulator(unittest.TestCase):
+
+    def setUp(self):
+        self.config = dict(vars(CONFIG))
+
+    def tearDown(self):
+        vars(CONFIG).update(self.config)
+
+    def test_power_model(self):
+        design, (pe, mem, dram, ic) = make_design()
+        sim = PowerSimulator(design)
+        trace = sim.power_model()
+        np.testing.assert_allclose(sim.phase_durations, [1e-3, 2e-3])
+        np.testing.assert_allclose(sim.phase_start_times, [0., 1e-3])
+        # PEs/ICs only leak while active, memories leak throughout
+        np.testing.assert_allclose(trace[pe], [2. + .1, 1. + .1])
+        np.testing.assert_allclose(trace[mem], [1. + .05, .05])
+        np.testing.assert_allclose(trace[dram], [.2, 2. + .2])
+        np.testing.assert_allclose(trace[ic], [0., .05 + .01])
+
+    def test_thermal_network(self):
+        design, (pe, mem, dram, ic) = make_design()
+        sim = PowerSimulator(design)
+        sim.power_model()
+        conductance, capacitance = sim.thermal_network()
+        self.assertEqual(sim.thermal_blocks, [pe, mem, dram, ic])
+        np.testing.assert_allclose(conductance, conductance.T)
+        # heat only leaves through the package
+        np.testing.assert_allclose(conductance.sum(axis=1), [0.] * 4 + [1 / CONFIG.package_thermal_resistance],
+                                   atol=1e-12)
+        self.assertAlmostEqual(conductance[0, 0], 130 * 2e-6 / .0005)
+        # the bus spreads its heat over the minimum area
+        self.assertAlmostEqual(capacitance[3], 1.63e6 * 1e-8 * .0005)
+        self.assertEqual(capacitance[-1], CONFIG.package_thermal_capacitance)
+
+        # an off chip DRAM doesn't heat the die up
+        CONFIG.dram_stacked = False
+        conductance, capacitance = sim.thermal_network()
+        self.assertEqual(sim.thermal_blocks, [pe, mem, ic])
+        self.assertEqual(conductance.shape, (4, 4))
+
+    def test_thermal_model(self):
+        # a single node (the package): T(t) = P R (1 - exp(-t/(R C))) from the ambient
+        sim = PowerSimulator(None)
+        sim.phase_durations = np.array([10., 30.])
+        conductance, capacitance = np.array([[1 / 20.]]), np.array([1.])
+        power_trace = np.array([[2.], [0.]])
+        CONFIG.thermal_initial_state = 'ambient'
+        initial, steady_state, transient = sim.thermal_model(power_trace, conductance, capacitance)
+        np.testing.assert_allclose(initial, [0.])
+        np.testing.assert_allclose(steady_state, [20 * 2 * 10 / 40.])
+        after_heating = 2 * 20 * (1 - math.exp(-10 / 20.))
+        np.testing.assert_allclose(transient[:, 0], [after_heating, after_heating * math.exp(-30 / 20.)])
+
+        # a constant power stays at its steady state
+        CONFIG.thermal_initial_state = 'steady_state'
+        initial, steady_state, transient = sim.thermal_model(np.array([[2.], [2.]]), conductance, capacitance)
+        np.testing.assert_allclose(transient[:, 0], [40., 40.])
+
+        CONFIG.thermal_initial_state = 'hot'
+        with self.assertRaises(Exception):
+            sim.thermal_model(power_trace, conductance, capacitance)
+
+    def test_simulate(self):
+        design, (pe, mem, dram, ic) = make_design()
+        stats = PowerSimulator(design).simulate()
+        np.testing.assert_allclose(stats['total_power_trace'], [2.1 + 1.05 + .2, 1.1 + .05 + 2.2 + .06])
+        self.assertAlmostEqual(stats['peak_power'], 3.41)
+        self.assertAlmostEqual(stats['avg_power'], (3.35 * 1e-3 + 3.41 * 2e-3) / 3e-3)
+        self.assertAlmostEqual(stats['block_avg_power'][dram], (.2 * 1e-3 + 2.2 * 2e-3) / 3e-3)
+        self.assertAlmostEqual(stats['block_peak_power'][pe], 2.1)
+        # the workload runs back to back: the temperatures oscillate around the steady state (above the ambient)
+        self.assertGreater(stats['steady_state_temperature'], CONFIG.ambient_temperature)
+        self.assertEqual(len(stats['block_temperature_trace'][pe]), 2)
+        self.assertGreaterEqual(stats['peak_temperature'], stats['block_steady_state_temperature'][pe])
+        self.assertEqual(stats['peak_temperature'], max(stats['block_peak_temperature'].values()))
+
+    def test_simulate_no_time(self):
+        design, (pe, mem, dram, ic) = make_design({0: 0., 1: 0.})
+        stats = PowerSimulator(design).simulate()
+        self.assertEqual((stats['peak_power'], stats['avg_power']), (0., 0.))
+        self.assertEqual(stats['block_avg_power'][pe], 0.)
+        self.assertEqual(stats['peak_temperature'], CONFIG.ambient_temperature)
+        self.assertEqual(stats['block_peak_temperature'][pe], CONFIG.ambient_temperature)
+
+
+class Stats(DPStatsContainer):
+    def __init__(self, peak_power, peak_temperature):
+        self.peak_power = peak_power
+        self.peak_temperature = peak_temperature
+
+    def dist_to_goal_per_metric(self, metric_name, mode):
+        return 1.
+
+
+class TestPowerThermalBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.config = dict(vars(CONFIG))
+
+    def tearDown(self):
+        vars(CONFIG).update(self.config)
+
+    def test_violations_count_for_any_metric(self):
+        stats = Stats(peak_power=3., peak_temperature=95.)
+        self.assertEqual(stats.dist_to_goal(['latency'], 'dampen'), 1.)
+
+        CONFIG.peak_power_budget, CONFIG.thermal_budget = 2., 85.
+        for metrics in (['latency'], ['power'], ['latency', 'area']):
+            self.assertAlmostEqual(stats.dist_to_goal(metrics, 'dampen'), len(metrics) + .5 + .25)
+        # met budgets don't count
+        self.assertEqual(Stats(peak_power=1., peak_temperature=50.).dist_to_goal(['latency'], 'dampen'), 1.)
+        # nor do designs that were not power/thermal simulated
+        self.assertEqual(Stats(None, None).dist_to_goal(['latency'], 'dampen'), 1.)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import stat
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sims.maestro_batch import MAESTRO_FAILED, MaestroBatchRunner, compute_area_maestro, read_maestro_csv
+
+HEADER = " Neuron ID, Runtime (Cycles), Throughput (MACs/Cycle), Activity count-based Energy (nJ), " \
+         "L1 SRAM Size Req (Bytes), L2 SRAM Size Req (Bytes)\n"
+
+# stand-in for the maestro binary: writes a result csv next to the mapping file
+FAKE_MAESTRO = """#!/bin/sh
+for arg in "$@"; do
+  case $arg in --Mapping_file=*) m="${arg#--Mapping_file=}";; esac
+done
+printf '%s' '""" + HEADER + """' > "${m%.m}.csv"
+echo "1, 100, 2.5, 30, 64, 32768" >> "${m%.m}.csv"
+"""
+
+ARCH_CONFIGS = {"NocBW": 64, "offchipBW": 64, "l1_size": 64, "l2_size": 32768, "num_pe": 4}
+DIMENSION = [64, 3, 224, 224, 3, 3, 1]
+MAPPING = [['K', 8], ['K', 8], ['C', 3], ['Y', 3], ['X', 3], ['R', 3], ['S', 3]]
+
+
+class TestMaestroBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.scratch = os.path.join(self.tmp.name, 'scratch')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_csv(self):
+        path = os.path.join(self.tmp.name, 'out.csv')
+        with open(path, 'w') as f:
+            f.write(HEADER + "1, 10, 1.5, 3, 64, 100\n2, 20, 2.5, 5, 128, 200\n")
+        metrics = read_maestro_csv(path)
+        np.testing.assert_array_equal(metrics['runtime'], [10, 20])
+        np.testing.assert_array_equal(metrics['l2_size'], [100, 200])
+
+    def test_run(self):
+        exe = os.path.join(self.tmp.name, 'maestro')
+        with open(exe, 'w') as f:
+            f.write(FAKE_MAESTRO)
+        os.chmod(exe, os.stat(exe).st_mode | stat.S_IEXEC)
+        runner = MaestroBatchRunner(exe, max_workers=2, scratch_root=self.scratch)
+        metrics = runner.run([MAPPING] * 3, DIMENSION, ARCH_CONFIGS)
+        self.assertEqual(metrics.shape, (3,))
+        np.testing.assert_array_equal(metrics['runtime'], [100] * 3)
+        self.assertEqual(metrics['area'][0], compute_area_maestro(4, 64, 32768))
+        self.assertEqual(os.listdir(self.scratch), [])
+
+    def test_missing_exe(self):
+        runner = MaestroBatchRunner(os.path.join(self.tmp.name, 'missing'), scratch_root=self.scratch)
+        metrics = runner.run([MAPPING], DIMENSION, ARCH_CONFIGS)
+        self.assertEqual(metrics[0].tolist(), MAESTRO_FAILED)
+        self.assertEqual(os.listdir(self.scratch), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
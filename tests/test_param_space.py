@@ -0,0 +1,135 @@
+import ast
+import os
+import types
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+os.sys.path.insert(0, tests_dir_path + '/../arch_gym/envs')
+
+from param_space import (Param, ParamSpace, dramsys_param_space, sniper_param_space, timeloop_param_space,
+                         maestro_param_space, astrasim_param_space, flatten, unflatten)
+
+
+def load_helper(method_name):
+    '''helpers needs arch_gym_configs to import, only its decoders are used here'''
+    path = os.path.join(tests_dir_path, '../arch_gym/envs/envHelpers.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    cls = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == 'helpers')
+    method = next(n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name == method_name)
+    namespace = {'print': lambda *args, **kwargs: None}
+    exec(compile(ast.Module(body=[method], type_ignores=[]), path, 'exec'), namespace)
+    return namespace[method_name]
+
+
+def all_spaces():
+    from sims.Timeloop.process_params import TimeloopConfigParams
+    timeloop_params = TimeloopConfigParams(os.path.join(tests_dir_path, '../sims/Timeloop/parameters.ini'))
+    dimensions = {'K': 64, 'C': 3, 'Y': 224, 'X': 224, 'R': 7, 'S': 7}
+    return {
+        'dramsys': dramsys_param_space(),
+        'sniper': sniper_param_space(),
+        'timeloop': timeloop_param_space(timeloop_params),
+        'maestro': maestro_param_space(dimensions),
+        'astrasim': astrasim_param_space(),
+    }
+
+
+class TestParamSpaceRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.spaces = all_spaces()
+
+    def test_decode_encode_round_trip(self):
+        # Sampled populations are on the grid, so encode(decode(X)) must give X back
+        for name, space in self.spaces.items():
+            X = space.sample(200, seed=0)
+            configs = space.decode(X)
+            self.assertEqual(len(configs), 200, name)
+            np.testing.assert_array_equal(space.encode(configs), X, err_msg=name)
+
+    def test_off_grid_population_is_snapped(self):
+        # Arbitrary points inside lb/ub decode to valid configs and decoding is idempotent
+        for name, space in self.spaces.items():
+            rng = np.random.RandomState(1)
+            X = rng.uniform(space.lb, space.ub, size=(200, space.n_dim))
+            configs = space.decode(X)
+            self.assertEqual(space.decode(space.encode(configs)), configs, name)
+            self.assertTrue(np.all(space.encode(configs) >= space.lb), name)
+            self.assertTrue(np.all(space.encode(configs) <= space.ub), name)
+
+    def test_unit_round_trip(self):
+        for name, space in self.spaces.items():
+            configs = space.decode(space.sample(200, seed=2))
+            U = space.encode_unit(configs)
+            self.assertTrue(np.all((U >= 0) & (U <= 1)), name)
+            self.assertEqual(space.decode_unit(U), configs, name)
+
+    def test_nested_round_trip(self):
+        space = self.spaces['astrasim']
+        configs = space.decode(space.sample(10, seed=3), nested=True)
+        self.assertEqual(len(configs[0]['network']['units-count']), 3)
+        self.assertIsInstance(configs[0]['system']['scheduling-policy'], str)
+        self.assertEqual(space.decode(space.encode(configs), nested=True), configs)
+
+
+class TestParam(unittest.TestCase):
+
+    def test_cardinality(self):
+        self.assertEqual(Param('a', choices=['x', 'y', 'z']).cardinality, 3)
+        self.assertEqual(Param('b', 'int', low=1, high=8).cardinality, 8)
+        self.assertEqual(Param('c', 'int', low=24, high=64, log=True).cardinality, 2)
+        self.assertIsNone(Param('d', 'float', low=0.0, high=1.0).cardinality)
+
+    def test_log_int_snaps_to_powers(self):
+        p = Param('l2', 'int', low=128, high=2048, log=True)
+        np.testing.assert_array_equal(p.decode([128, 200, 300, 2048, 5000]), [128, 256, 256, 2048, 2048])
+
+    def test_dramsys_matches_action_decoder_ga(self):
+        space = dramsys_param_space()
+        config = space.decode([3, 1, 2, 4, 1, 0, 2, 8, 1, 64])[0]
+        self.assertEqual(config, {'PagePolicy': 'ClosedAdaptive', 'Scheduler': 'FrFcfsGrp',
+                                  'SchedulerBuffer': 'Shared', 'RequestBufferSize': 4, 'RespQueue': 'Reorder',
+                                  'RefreshPolicy': 'NoRefresh', 'RefreshMaxPostponed': 2,
+                                  'RefreshMaxPulledin': 8, 'Arbiter': 'Fifo', 'MaxActiveTransactions': 64})
+
+    def test_same_as_env_decoders(self):
+        # the spaces decode to exactly the action dicts of the helpers decoders the envs and agents used
+        from sims.Timeloop.process_params import TimeloopConfigParams
+        timeloop_params = TimeloopConfigParams(os.path.join(tests_dir_path, '../sims/Timeloop/parameters.ini'))
+        helper = types.SimpleNamespace(timeloop_param_obj=timeloop_params)
+        decoders = {'dramsys': load_helper('action_decoder_ga'),
+                    'timeloop': load_helper('decode_timeloop_action'),
+                    'astrasim': load_helper('action_decoder_ga_astraSim')}
+        spaces = all_spaces()
+        for name, decoder in decoders.items():
+            space = spaces[name]
+            X = space.sample(100, seed=4)
+            for x, config in zip(X, space.decode(X)):
+                expected = decoder(helper, x)
+                if name == 'astrasim':
+                    # the helper misnames the reduce-scatter key and leaves out the workload AstraSimEnv.step reads
+                    expected['system']['reduce-scatter-implementation'] = \
+                        expected['system'].pop('reduce-scatter-implementation1')
+                    expected['workload'] = {}
+                self.assertEqual(config, expected, name)
+
+    def test_float_log_unit(self):
+        space = ParamSpace([Param('f', 'float', low=1e-3, high=1e3, log=True)])
+        np.testing.assert_allclose(space.from_unit([[0.5]]), [[1.0]])
+
+    def test_invalid_choice(self):
+        with self.assertRaises(ValueError):
+            dramsys_param_space().encode([dict(dramsys_param_space().decode([0] * 10)[0], Arbiter='Nope')])
+
+    def test_flatten(self):
+        config = {'a': {'b': 1, 'c': [2, 3]}, 'd': 'x'}
+        self.assertEqual(flatten(config), {'a.b': 1, 'a.c.0': 2, 'a.c.1': 3, 'd': 'x'})
+        self.assertEqual(unflatten(flatten(config)), config)
+
+
+if __name__ == '__main__':
+    unittest.main()
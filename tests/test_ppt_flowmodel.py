@@ -0,0 +1,199 @@
+import ast
+import heapq
+import importlib.util
+import os
+import pickle
+import sys
+import types
+import unittest
+from unittest import mock
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+INTERCON_DIR = os.path.join(tests_dir_path, '../sims/PPT/cpu/hardware/interconnect')
+
+# loaded by path, like test_ppt_routing_table.py
+_spec = importlib.util.spec_from_file_location('flowmodel', os.path.join(INTERCON_DIR, 'flowmodel.py'))
+flowmodel = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(flowmodel)
+
+
+def intercon_packet_module():
+    '''intercon.py needs the (python 2) simian engine, only its Packet class is used here'''
+    with open(os.path.join(INTERCON_DIR, 'intercon.py')) as f:
+        tree = ast.parse(f.read())
+    cls = [n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == 'Packet']
+    module = types.ModuleType('intercon')
+    exec(compile(ast.Module(body=cls, type_ignores=[]), 'intercon.py', 'exec'), module.__dict__)
+    return module
+
+
+class Engine(object):
+    '''sequential event loop with the parts of the simian interface the flow model uses'''
+    size = 1
+
+    def __init__(self, min_delay):
+        self.now = 0.0
+        self.minDelay = min_delay
+        self.entities = {}
+        self.queue = []
+        self.seq = 0
+
+    def getEntity(self, name, num):
+        return self.entities[name][num]
+
+    def push(self, time, entity, service, data):
+        heapq.heappush(self.queue, (time, self.seq, entity, service, data))
+        self.seq += 1
+
+    def run(self):
+        while self.queue:
+            self.now, _, entity, service, data = heapq.heappop(self.queue)
+            getattr(entity, service)(data)
+
+
+class Port(object):
+    def __init__(self, peer_node_name, peer_node_id, peer_iface_name, peer_iface_port, bdw, link_delay):
+        self.peer_node_name = peer_node_name
+        self.peer_node_id = peer_node_id
+        self.peer_iface_name = peer_iface_name
+        self.peer_iface_port = peer_iface_port
+        self.bdw = bdw
+        self.link_delay = link_delay
+        self.stats = {'sent_bytes': 0, 'sent_pkts': 0}
+
+
+class Iface(object):
+    def __init__(self, outports):
+        self.outports = outports
+
+    def get_num_ports(self):
+        return len(self.outports)
+
+
+class Entity(object):
+    def __init__(self, engine, name, num):
+        self.engine = engine
+        self.name = name
+        self.num = num
+        self.interfaces = {}
+        self.hpcsim_dict = {'debug_options': set()}
+        engine.entities.setdefault(name, {})[num] = self
+
+    def reqService(self, offset, service, data, rx=None, rx_id=None):
+        if rx is not None:
+            assert offset >= self.engine.minDelay
+        target = self if rx is None else self.engine.getEntity(rx, rx_id)
+        self.engine.push(self.engine.now + offset, target, service, data)
+
+
+class StarSwitch(Entity):
+    '''one switch, host h on port h of interface "h"'''
+    proc_delay = 0
+
+    def calc_route(self, pkt):
+        return 'h', pkt.dsthost
+
+
+class Host(Entity):
+    def __init__(self, engine, num, network):
+        super(Host, self).__init__(engine, 'Host', num)
+        self.network = network
+        self.arrivals = []
+
+    def handle_packet_arrival(self, data):
+        pkt = pickle.loads(data)
+        self.arrivals.append((self.engine.now, pkt.seqno, pkt.get_nexthop()))
+
+    def flow_timer(self, version):
+        self.network.handle_timer(version)
+
+
+class TestMaxMinFairRates(unittest.TestCase):
+
+    def test_bottlenecks(self):
+        rates = flowmodel.max_min_fair_rates({1: ['a'], 2: ['a', 'b'], 3: ['b']}, {'a': 10.0, 'b': 4.0})
+        self.assertEqual(rates, {1: 8.0, 2: 2.0, 3: 2.0})
+
+    def test_equal_share(self):
+        rates = flowmodel.max_min_fair_rates({1: ['a', 'b'], 2: ['a'], 3: ['a', 'c']},
+                                             {'a': 9.0, 'b': 100.0, 'c': 1.0})
+        self.assertEqual(rates, {1: 4.0, 2: 4.0, 3: 1.0})
+
+
+class TestFlowNetwork(unittest.TestCase):
+
+    BDW = 8e9  # 1 GB/s
+    HOST_DELAY = 1e-6
+    SWITCH_DELAY = 2e-6
+
+    def setUp(self):
+        self.modules = mock.patch.dict(sys.modules, {'intercon': intercon_packet_module()})
+        self.modules.start()
+        self.Packet = sys.modules['intercon'].Packet
+        self.engine = Engine(min_delay=self.HOST_DELAY)
+        intercon = types.SimpleNamespace(network_diameter=lambda: 2)
+        self.network = flowmodel.FlowNetwork(intercon, {'simian': self.engine})
+        switch = StarSwitch(self.engine, 'Switch', 0)
+        nhosts = 4
+        switch.interfaces['h'] = Iface([Port('Host', h, 'r', 0, self.BDW, self.SWITCH_DELAY)
+                                        for h in range(nhosts)])
+        self.hosts = []
+        for h in range(nhosts):
+            host = Host(self.engine, h, self.network)
+            host.interfaces['r'] = Iface([Port('Switch', 0, 'h', h, self.BDW, self.HOST_DELAY)])
+            self.hosts.append(host)
+
+    def tearDown(self):
+        self.modules.stop()
+
+    def send_at(self, t, src, dst, nbytes, seqno=0):
+        pkt = self.Packet(src, dst, 'data', seqno, nbytes, blaze_trail=False)
+        self.engine.push(t, self, 'do_send', (self.hosts[src], pkt))
+
+    def do_send(self, args):
+        self.network.send(*args)
+
+    def test_single_flow(self):
+        self.send_at(0.0, 0, 1, 1000)
+        self.engine.run()
+        t, seqno, nexthop = self.hosts[1].arrivals[0]
+        self.assertAlmostEqual(t, 1000 * 8 / self.BDW + self.HOST_DELAY + self.SWITCH_DELAY, places=15)
+        self.assertEqual(nexthop, ('r', 0))
+        self.assertEqual(self.network.stats['completed_flows'], 1)
+        self.assertEqual(self.hosts[0].interfaces['r'].outports[0].stats['sent_bytes'], 1000)
+
+    def test_shared_destination_link(self):
+        latency = self.HOST_DELAY + self.SWITCH_DELAY
+        self.send_at(0.0, 0, 2, 1000, seqno=0)
+        self.send_at(0.0, 1, 2, 1000, seqno=1)
+        self.send_at(0.0, 3, 1, 1000, seqno=2)  # disjoint, full rate
+        self.engine.run()
+        arrivals = sorted(self.hosts[2].arrivals)
+        self.assertEqual(len(arrivals), 2)
+        for t, _, _ in arrivals:
+            self.assertAlmostEqual(t, 2 * 1000 * 8 / self.BDW + latency, places=15)
+        self.assertAlmostEqual(self.hosts[1].arrivals[0][0], 1000 * 8 / self.BDW + latency, places=15)
+
+    def test_staggered_flows(self):
+        # the second flow starts halfway through the first one, both then
+        # run at half rate until the first one completes
+        xmit = 1000 * 8 / self.BDW
+        latency = self.HOST_DELAY + self.SWITCH_DELAY
+        self.send_at(0.0, 0, 2, 1000, seqno=0)
+        self.send_at(xmit / 2, 1, 2, 1000, seqno=1)
+        self.engine.run()
+        arrivals = dict((seqno, t) for t, seqno, _ in self.hosts[2].arrivals)
+        self.assertAlmostEqual(arrivals[0], 1.5 * xmit + latency, places=15)
+        self.assertAlmostEqual(arrivals[1], 2.0 * xmit + latency, places=15)
+        # no per-packet events: one timer per completion and stale ones are skipped
+        self.assertEqual(self.network.stats['timer_events'], 2)
+
+    def test_zero_size_message(self):
+        self.send_at(0.0, 3, 0, 0)
+        self.engine.run()
+        self.assertAlmostEqual(self.hosts[0].arrivals[0][0], self.HOST_DELAY + self.SWITCH_DELAY, places=15)
+        self.assertEqual(self.network.stats['timer_events'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+import ast
+import copy
+import math
+import os
+import threading
+import unittest
+import warnings
+from collections import deque
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+MPI_PATH = os.path.join(tests_dir_path, '../sims/PPT/cpu/middleware/mpi/mpi.py')
+
+
+class Py2Division(ast.NodeTransformer):
+    '''PPT is python 2 code: "/" on ints is floor division'''
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            node.op = ast.FloorDiv()
+        return node
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            node.op = ast.FloorDiv()
+        return node
+
+
+class Fabric(object):
+    '''in-memory point-to-point layer standing in for the simulated network'''
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.log = []
+
+    def send(self, src, dst, type, data, sz):
+        with self.cond:
+            self.pending.setdefault(dst, deque()).append((src, type, copy.deepcopy(data), sz))
+            self.log.append((src, dst, type, sz))
+            self.cond.notify_all()
+        return True
+
+    def recv(self, dst, from_rank, type):
+        with self.cond:
+            while True:
+                queue = self.pending.setdefault(dst, deque())
+                for item in queue:
+                    src, t, data, sz = item
+                    if (from_rank is None or src == from_rank) and (type is None or t == type):
+                        queue.remove(item)
+                        return {'from_rank': src, 'type': t, 'data': data, 'data_size': sz}
+                if not self.cond.wait(timeout=5):
+                    raise RuntimeError('rank %d deadlocked waiting for %r from %r' % (dst, type, from_rank))
+
+
+def fake_mpi_send(to_rank, data, sz, mpi_comm, type='default'):
+    return mpi_comm['fabric'].send(mpi_comm['rank'], to_rank, type, data, sz)
+
+
+def fake_mpi_recv(mpi_comm, from_rank=None, type=None):
+    return mpi_comm['fabric'].recv(mpi_comm['rank'], from_rank, type)
+
+
+def load_mpi():
+    '''the collectives of mpi.py, running on top of Fabric'''
+    with open(MPI_PATH) as f:
+        tree = ast.parse(f.read().expandtabs(8))  # python 2 tab stops
+    body = [n for n in tree.body
+            if (isinstance(n, ast.FunctionDef) and n.name not in ('mpi_send', 'mpi_recv')) or
+            (isinstance(n, ast.Assign) and n.targets[0].id.startswith('mpi_coll'))]
+    mod = ast.fix_missing_locations(Py2Division().visit(ast.Module(body=body, type_ignores=[])))
+    namespace = {'math': math, 'copy': copy, 'deque': deque,
+                 'mpi_send': fake_mpi_send, 'mpi_recv': fake_mpi_recv}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', SyntaxWarning)
+        exec(compile(mod, MPI_PATH, 'exec'), namespace)
+    return namespace
+
+
+mpi = load_mpi()
+
+
+def run_ranks(n, fn):
+    '''runs fn(mpi_comm) on n ranks, returns the results and the message log'''
+    fabric = Fabric()
+    comms = [{'rank': p, 'hostmap': list(range(n)), 'commid': 2, 'fabric': fabric} for p in range(n)]
+    results = [None] * n
+    errors = []
+
+    def main(p):
+        try:
+            results[p] = fn(comms[p])
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=main, args=(p,)) for p in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results, fabric.log
+
+
+def pof2_rem(n):
+    pof2 = 2 ** int(math.log(n, 2))
+    return pof2, n - pof2
+
+
+SIZES = (1, 2, 3, 4, 5, 6, 7, 8, 12)
+
+
+class TestCollectiveAlgorithms(unittest.TestCase):
+
+    def check_allreduce(self, algo, expected_msgs):
+        for n in SIZES:
+            for length in (1, 3, 10):
+                data = [[p * 100 + i for i in range(length)] for p in range(n)]
+                res, log = run_ranks(n, lambda c: algo(data[c['rank']], c, 800, 'sum'))
+                total = [sum(d[i] for d in data) for i in range(length)]
+                self.assertEqual(res, [total] * n, (algo.__name__, n, length))
+                self.assertEqual(len(log), expected_msgs(n), (algo.__name__, n))
+            # scalars and other operators
+            res, _ = run_ranks(n, lambda c: algo(c['rank'] + 1, c, 8, 'max'))
+            self.assertEqual(res, [n] * n)
+
+    def test_allreduce_ring(self):
+        self.check_allreduce(mpi['mpi_allreduce_ring'], lambda n: 2 * n * (n - 1))
+        # each phase moves the whole data around the ring n-1 times
+        _, log = run_ranks(6, lambda c: mpi['mpi_allreduce_ring'](list(range(6)), c, 6000))
+        self.assertEqual(sum(sz for _, _, _, sz in log), 2 * 5 * 6000)
+
+    def test_allreduce_recursive_doubling(self):
+        def msgs(n):
+            pof2, rem = pof2_rem(n)
+            return 2 * rem + pof2 * int(math.log(pof2, 2))
+        self.check_allreduce(mpi['mpi_allreduce_recursive_doubling'], msgs)
+
+    def test_allreduce_rabenseifner(self):
+        def msgs(n):
+            pof2, rem = pof2_rem(n)
+            return 2 * rem + 2 * pof2 * int(math.log(pof2, 2))
+        self.check_allreduce(mpi['mpi_allreduce_rabenseifner'], msgs)
+        _, log = run_ranks(8, lambda c: mpi['mpi_allreduce_rabenseifner'](list(range(8)), c, 8000))
+        self.assertEqual(sum(sz for _, _, _, sz in log), 2 * 7 * 8000)
+
+    def test_reduce_rabenseifner(self):
+        algo = mpi['mpi_reduce_rabenseifner']
+        for n in SIZES:
+            pof2, rem = pof2_rem(n)
+            for root in range(n):
+                data = [[p, 2 * p, 3 * p, 4 * p, 5 * p] for p in range(n)]
+                res, log = run_ranks(n, lambda c: algo(root, data[c['rank']], c, 40, 'sum'))
+                self.assertEqual(res[root], [sum(d[i] for d in data) for i in range(5)], (n, root))
+                expected = 0 if n == 1 else \
+                    rem + pof2 * int(math.log(pof2, 2)) + pof2 - 1 + (root < 2 * rem and root % 2 == 0)
+                self.assertEqual(len(log), expected, (n, root))
+
+    def test_allgather(self):
+        for name, msgs in (('mpi_allgather_ring', lambda n: n * (n - 1)),
+                           ('mpi_allgather_recursive_doubling',
+                            lambda n: n * int(math.log(n, 2)) if n & (n - 1) == 0 else n * (n - 1))):
+            for n in SIZES:
+                res, log = run_ranks(n, lambda c: mpi[name]('r%d' % c['rank'], c, 16))
+                self.assertEqual(res, [['r%d' % p for p in range(n)]] * n)
+                self.assertEqual(len(log), msgs(n), (name, n))
+
+    def test_alltoall_pairwise(self):
+        for n in SIZES:
+            res, log = run_ranks(n, lambda c: mpi['mpi_alltoall_pairwise'](
+                [(c['rank'], q) for q in range(n)], c, 64))
+            for p in range(n):
+                self.assertEqual(res[p], [(q, p) for q in range(n)])
+            self.assertEqual(len(log), n * (n - 1))
+
+    def test_bcast_scatter_allgather(self):
+        algo = mpi['mpi_bcast_scatter_allgather']
+        for n in SIZES:
+            for root in (0, n - 1):
+                for data in (list(range(20)), 3.5, []):
+                    res, log = run_ranks(n, lambda c: algo(root, data if c['rank'] == root else None, c, 160))
+                    self.assertEqual(res, [data] * n, (n, root, data))
+                    self.assertEqual(len(log), (n - 1) + n * (n - 1))
+
+    def test_legacy_algorithms(self):
+        # the default table keeps the original binomial/tree algorithms
+        for n in (2, 5, 8):
+            res, _ = run_ranks(n, lambda c: mpi['mpi_allreduce'](c['rank'], c, 4, 'sum'))
+            self.assertEqual(res, [n * (n - 1) // 2] * n)
+            res, log = run_ranks(n, lambda c: mpi['mpi_bcast'](0, 'x' if c['rank'] == 0 else None, c))
+            self.assertEqual(res, ['x'] * n)
+            self.assertEqual(len(log), n - 1)
+
+
+class TestCollectiveSelection(unittest.TestCase):
+
+    def test_size_table(self):
+        comm = {'rank': 0, 'hostmap': [0, 1]}
+        mpi['mpi_comm_set_collectives'](comm, mpi['mpi_collectives_mpich'])
+        select = mpi['mpi_coll_select']
+        self.assertIs(select(comm, 'allreduce', 8), mpi['mpi_allreduce_recursive_doubling'])
+        self.assertIs(select(comm, 'allreduce', 2048), mpi['mpi_allreduce_recursive_doubling'])
+        self.assertIs(select(comm, 'allreduce', 2049), mpi['mpi_allreduce_rabenseifner'])
+        self.assertIs(select(comm, 'alltoall', 1 << 20), mpi['mpi_alltoall_pairwise'])
+
+    def test_per_communicator(self):
+        world = {'rank': 0, 'hostmap': [0, 1, 2, 3]}
+        mpi['mpi_comm_set_collectives'](world, {})
+        sub = {'rank': 0, 'hostmap': [0, 1], 'parent_comm': world}
+        select = mpi['mpi_coll_select']
+        self.assertIs(select(sub, 'allreduce', 1 << 20), mpi['mpi_allreduce_reduce_bcast'])
+        mpi['mpi_comm_set_collectives'](world, {'allreduce': 'ring'})
+        self.assertIs(select(sub, 'allreduce', 1 << 20), mpi['mpi_allreduce_ring'])
+        mpi['mpi_comm_set_collectives'](sub, {'allreduce': [(64, 'recursive_doubling'), (None, 'rabenseifner')]})
+        self.assertIs(select(sub, 'allreduce', 1 << 20), mpi['mpi_allreduce_rabenseifner'])
+        self.assertIs(select(world, 'allreduce', 1 << 20), mpi['mpi_allreduce_ring'])
+        self.assertIs(select(sub, 'bcast', 1 << 20), mpi['mpi_bcast_binomial'])
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(Exception):
+            mpi['mpi_comm_set_collectives']({}, {'allreduce': 'butterfly'})
+        with self.assertRaises(Exception):
+            mpi['mpi_coll_select']({'collectives': {'reduce': [(8, 'binomial')]}}, 'reduce', 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
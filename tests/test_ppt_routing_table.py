@@ -0,0 +1,143 @@
+import ast
+import importlib.util
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+INTERCON_DIR = os.path.join(tests_dir_path, '../sims/PPT/cpu/hardware/interconnect')
+
+# loaded by path: the interconnect directory has its own "configs" package,
+# which must not shadow the repo one on sys.path
+_spec = importlib.util.spec_from_file_location('routing_table', os.path.join(INTERCON_DIR, 'routing_table.py'))
+routing_table = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(routing_table)
+
+
+class Py2Division(ast.NodeTransformer):
+    '''PPT is python 2 code: "/" on ints is floor division'''
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Div):
+            node.op = ast.FloorDiv()
+        return node
+
+
+def reference_methods(module, class_name, names):
+    '''the original routing methods, taken from the PPT sources'''
+    with open(os.path.join(INTERCON_DIR, module)) as f:
+        tree = ast.parse(f.read())
+    cls = [n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == class_name][0]
+    funcs = [n for n in cls.body if isinstance(n, ast.FunctionDef) and n.name in names]
+    mod = ast.fix_missing_locations(Py2Division().visit(ast.Module(body=funcs, type_ignores=[])))
+    namespace = {'xrange': range, 'math': __import__('math'), 'os': os, 'itertools': itertools}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', SyntaxWarning)  # "is" with str literals in the PPT sources
+        exec(compile(mod, module, 'exec'), namespace)
+    return type(class_name, (object,), dict((name, namespace[name]) for name in names))
+
+
+class Stub(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TestPPTRoutingTable(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.hpcsim_dict = {'default_configs': {'routing_table_cache': self.cache_dir}}
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_dragonfly(self):
+        Ref = reference_methods('dragonfly.py', 'DragonflySwitch', ('min_forward', 'non_min_forward'))
+        for G, P, k in ((9, 4, 2), (5, 3, 3), (4, 2, 2)):
+            ref = Ref()
+            ref.dragonfly = Stub(num_groups=G, num_switches_per_group=P, num_inter_links_per_switch=k)
+            table = routing_table.DragonflyRoutingTable(ref.dragonfly, self.hpcsim_dict)
+            for sg, ss, dg, ds in itertools.product(range(G), range(P), range(G), range(P)):
+                if (sg, ss) == (dg, ds):
+                    continue
+                self.assertEqual(table.min_forward(sg, ss, dg, ds), ref.min_forward(sg, ss, dg, ds))
+                for ig in range(G):
+                    if ig in (sg, dg):
+                        continue
+                    self.assertEqual(table.non_min_forward(sg, ss, ig, dg, ds),
+                                     ref.non_min_forward(sg, ss, ig, dg, ds))
+
+    def test_torus(self):
+        RefSwitch = reference_methods('torus.py', 'TorusSwitch', ('calc_route',))
+        RefTorus = reference_methods('torus.py', 'Torus', ('hid_to_coords', 'swid_to_coords', 'coords_to_swid'))
+        for dims, dimh in (((4, 3, 5), 2), ((2, 6), 1)):
+            torus = RefTorus()
+            torus.dims, torus.dimh = dims, dimh
+            torus.cm = [1] + list(np.cumprod(dims)[:-1])
+            torus.nswitches = int(np.prod(dims))
+            torus.nhosts = torus.nswitches * dimh
+            torus.hostmap_h2sw = None
+            table = routing_table.TorusRoutingTable(torus, self.hpcsim_dict)
+            torus.routing_table = None  # reference: hop by hop routing
+            for s in range(torus.nswitches):
+                switch = RefSwitch()
+                switch.torus, switch.coords = torus, torus.swid_to_coords(s)
+                switch.route_method = 'adaptive_dimension_order'
+                for h in range(torus.nhosts):
+                    md, port = switch.calc_route(Stub(dsthost=h))
+                    iface, host_port = table.next_hop(s, h)
+                    if md == 'h':
+                        self.assertEqual((iface, host_port), (None, port))
+                    else:
+                        self.assertEqual(iface, md)
+
+    def test_fattree(self):
+        Ref = reference_methods('fattree.py', 'InfinibandSwitch', ('path_selection',))
+        RefTree = reference_methods('fattree.py', 'Fattree', ('find_gcpg_members',))
+        for m, n in ((4, 3), (8, 2), (4, 4)):
+            tree = RefTree()
+            tree.num_ports_per_switch, tree.num_levels = m, n
+            hosts = [list(p) for p in itertools.product(range(m), *[range(m // 2)] * (n - 1))]
+            tree.grp_members_dict = {}
+            for host in hosts:
+                for i in range(n - 1):
+                    x = ':'.join(str(e) for e in host[:i + 1])
+                    if x not in tree.grp_members_dict:
+                        tree.grp_members_dict[x] = tree.find_gcpg_members(host[:i + 1], i + 1)
+            ref = Ref()
+            ref.fattree = tree
+            table = routing_table.FattreeRoutingTable(tree, self.hpcsim_dict)
+            for src, dst in itertools.permutations(range(len(hosts)), 2):
+                if hosts[src][:n - 1] == hosts[dst][:n - 1]:
+                    continue  # same leaf switch, delivered without path_selection
+                self.assertEqual(table.path_selection(src, dst), ref.path_selection(hosts[src], hosts[dst]))
+
+    def test_disk_cache(self):
+        params = {'num_groups': 5, 'num_switches_per_group': 3, 'num_inter_links_per_switch': 2}
+        built = []
+
+        def load(params):
+            def build():
+                built.append(1)
+                return routing_table.build_dragonfly_tables(**params)
+            return routing_table.load_or_build_tables(self.hpcsim_dict, 'dragonfly', params, build)
+
+        first = load(params)
+        second = load(params)
+        self.assertEqual(len(built), 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        for k in first:
+            np.testing.assert_array_equal(first[k], second[k])
+            self.assertEqual(first[k].dtype, np.int8)
+        other = load(dict(params, num_groups=6))
+        self.assertEqual(len(built), 2)
+        self.assertEqual(other['min'].shape, (18, 18))
+
+
+if __name__ == '__main__':
+    unittest.main()
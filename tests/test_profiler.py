@@ -0,0 +1,135 @@
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../arch_gym/envs')
+
+import profiler as profiler_module
+from profiler import Profiler, PhaseStats
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler()
+        self.profiler.enable()
+
+    def test_disabled(self):
+        p = Profiler()
+        with p.span('simulate'):
+            pass
+
+        @p.profiled('reward')
+        def reward(x):
+            return x + 1
+        self.assertEqual(reward(1), 2)
+        self.assertEqual(p.histograms(), {})
+        self.assertEqual(p.chrome_trace()['traceEvents'], [])
+
+    def test_nested_spans(self):
+        p = self.profiler
+
+        @p.profiled('parse_output')
+        def parse():
+            time.sleep(0.002)
+            return 'obs'
+
+        for _ in range(3):
+            with p.span('step', env='DRAMEnv'):
+                with p.span('simulate'):
+                    time.sleep(0.005)
+                self.assertEqual(parse(), 'obs')
+        h = p.histograms()
+        self.assertEqual(sorted(h), ['parse_output', 'simulate', 'step'])
+        self.assertEqual(h['step']['count'], 3)
+        # self time of the step excludes the nested phases
+        self.assertEqual(h['step']['self_ns'],
+                         h['step']['total_ns'] - h['simulate']['total_ns'] - h['parse_output']['total_ns'])
+        self.assertGreaterEqual(h['simulate']['min_ns'], 5000000)
+        self.assertEqual(sum(h['simulate']['histogram'].values()), 3)
+        self.assertTrue(h['simulate']['min_ns'] <= h['simulate']['p50_ns'] <= h['simulate']['max_ns'])
+
+        events = p.chrome_trace()['traceEvents']
+        self.assertEqual(len(events), 9)
+        steps = [e for e in events if e['name'] == 'step']
+        self.assertEqual(steps[0]['args'], {'env': 'DRAMEnv', 'depth': 0})
+        # nested events lie inside their parent
+        sim = [e for e in events if e['name'] == 'simulate'][0]
+        self.assertEqual(sim['args']['depth'], 1)
+        self.assertTrue(steps[0]['ts'] <= sim['ts'] and
+                        sim['ts'] + sim['dur'] <= steps[0]['ts'] + steps[0]['dur'])
+
+    def test_exception_closes_span(self):
+        p = self.profiler
+        with self.assertRaises(ValueError):
+            with p.span('step'):
+                with p.span('write_config'):
+                    raise ValueError('bad action')
+        with p.span('reset'):
+            pass
+        depths = {e['name']: e['args']['depth'] for e in p.chrome_trace()['traceEvents']}
+        self.assertEqual(depths, {'write_config': 1, 'step': 0, 'reset': 0})
+
+    def test_threads(self):
+        p = self.profiler
+        # all agents alive at once, thread ids are not reused
+        barrier = threading.Barrier(4)
+
+        def agent():
+            barrier.wait()
+            for _ in range(50):
+                with p.span('step'):
+                    with p.span('simulate'):
+                        pass
+            barrier.wait()
+        threads = [threading.Thread(target=agent) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        h = p.histograms()
+        self.assertEqual(h['step']['count'], 200)
+        self.assertEqual(h['simulate']['count'], 200)
+        events = p.chrome_trace()['traceEvents']
+        self.assertEqual(len({e['tid'] for e in events}), 4)
+        self.assertTrue(all(e['args']['depth'] == (e['name'] == 'simulate') for e in events))
+
+    def test_export(self):
+        p = self.profiler
+        p.max_trace_events = 2
+        for _ in range(3):
+            with p.span('simulate'):
+                pass
+        with tempfile.TemporaryDirectory() as tmp:
+            phases, trace = p.export(os.path.join(tmp, 'profile'))
+            with open(phases) as f:
+                self.assertEqual(json.load(f)['simulate']['count'], 3)
+            with open(trace) as f:
+                trace = json.load(f)
+        self.assertEqual(len(trace['traceEvents']), 2)
+        self.assertEqual(trace['otherData']['dropped_events'], 1)
+        self.assertEqual(trace['traceEvents'][0]['ph'], 'X')
+
+    def test_percentiles(self):
+        stats = PhaseStats()
+        for dur in [1000] * 90 + [1000000] * 10:
+            stats.add(dur, dur)
+        self.assertLess(abs(stats.percentile(50) - 1000) / 1000, 0.5)
+        self.assertLess(abs(stats.percentile(99) - 1000000) / 1000000, 0.5)
+        self.assertEqual(stats.percentile(100), 1000000)
+
+    def test_shared_between_import_names(self):
+        # the agents import the module through the package, the envs by its file name
+        spec = importlib.util.spec_from_file_location('arch_gym.envs.profiler', profiler_module.__file__)
+        other = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(other)
+        self.assertIs(other.profiler, profiler_module.profiler)
+
+
+if __name__ == '__main__':
+    unittest.main()
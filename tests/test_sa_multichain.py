@@ -0,0 +1,72 @@
+import os
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.SA import SAFast, SABoltzmann, SACauchy, SA_TSP
+from sko.tools import set_run_mode
+
+
+def sphere(x):
+    return x[0] ** 2 + (x[1] - 0.05) ** 2 + x[2] ** 2
+
+
+class TestSAMultiChain(unittest.TestCase):
+
+    def test_variants(self):
+        for sa_class in (SAFast, SABoltzmann, SACauchy):
+            np.random.seed(0)
+            sa = sa_class(sphere, [1, 1, 1], T_max=1, T_min=1e-5, L=50, lb=[-1] * 3, ub=[1] * 3, n_chains=4)
+            best_x, best_y = sa.run()
+            self.assertLess(best_y, 1e-2)
+            self.assertEqual(len(sa.chain_generation_best_Y), sa.iter_cycle)
+            self.assertEqual(sa.chain_generation_best_X[-1].shape, (4, 3))
+            # the combined best is the best over all chains
+            self.assertEqual(best_y, min(sa.chain_generation_best_Y[-1].min(), sa.generation_best_Y[0]))
+            self.assertTrue(np.all(sa.swap_accepts <= sa.swap_attempts))
+
+    def test_batch_evaluation(self):
+        # a vectorized func is called once per step with the proposals of all the chains
+        batch_sizes = []
+
+        def func(X):
+            batch_sizes.append(len(X))
+            return (X ** 2).sum(axis=1)
+
+        set_run_mode(func, 'vectorization')
+        sa = SAFast(func, [1.0, 1.0], T_max=1, T_min=1e-3, L=10, n_chains=5)
+        self.assertEqual(sa.best_y, 2.0)
+        sa.run()
+        self.assertEqual(batch_sizes, [1] + [5] * (sa.iter_cycle * sa.L))
+
+        # any other func is called once per proposal
+        calls = []
+
+        def func(x):
+            calls.append(len(x))
+            return (np.asarray(x) ** 2).sum()
+
+        sa = SAFast(func, [1.0, 1.0], T_max=1, T_min=1e-3, L=10, n_chains=5)
+        sa.run()
+        self.assertEqual(len(calls), 1 + 5 * sa.iter_cycle * sa.L)
+
+    def test_tsp(self):
+        np.random.seed(1)
+        num_points = 10
+        points = np.random.rand(num_points, 2)
+        distance = np.linalg.norm(points[:, None] - points[None], axis=-1)
+
+        def total_distance(routine):
+            return sum(distance[routine[i], routine[(i + 1) % num_points]] for i in range(num_points))
+
+        sa = SA_TSP(total_distance, np.arange(num_points), T_max=100, T_min=1, L=20, n_chains=3)
+        best_x, best_y = sa.run()
+        self.assertEqual(sorted(best_x), list(range(num_points)))
+        self.assertAlmostEqual(total_distance(best_x), best_y)
+
+
+if __name__ == '__main__':
+    unittest.main()
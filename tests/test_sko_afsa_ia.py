@@ -0,0 +1,109 @@
+import os
+import unittest
+
+import numpy as np
+from scipy import spatial
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.AFSA import AFSA
+from sko.IA import IA_TSP
+from sko.tools import set_run_mode
+
+
+def sphere(x):
+    return (x[0] - 0.5) ** 2 + (x[1] - 0.05) ** 2 + x[2] ** 2
+
+
+def rastrigin(x):
+    x = np.asarray(x) * 4 - 2
+    return 10 * len(x) + np.sum(x ** 2 - 10 * np.cos(2 * np.pi * x))
+
+
+class TestAFSA(unittest.TestCase):
+
+    def test_converges(self):
+        np.random.seed(0)
+        afsa = AFSA(sphere, n_dim=3, size_pop=50, max_iter=30, max_try_num=20, step=0.5, visual=0.3, q=0.98,
+                    delta=0.5)
+        best_x, best_y = afsa.run()
+        self.assertLess(best_y, 1e-3)
+        self.assertAlmostEqual(sphere(best_x), best_y)
+        self.assertEqual(best_y, afsa.best_Y)
+        # the tracked best is at least as good as every fish
+        self.assertLessEqual(best_y, afsa.Y.min())
+        np.testing.assert_allclose(afsa.Y, [sphere(x) for x in afsa.X])
+
+    def test_search_quality(self):
+        # median and worst best_y over seeds 0-9 of the previous fish by fish implementation (same settings)
+        references = {sphere: (2.8e-3, 8.7e-3), rastrigin: (6.63, 9.33)}
+        for func, (median, worst) in references.items():
+            best_ys = []
+            for seed in range(10):
+                np.random.seed(seed)
+                afsa = AFSA(func, n_dim=3, size_pop=30, max_iter=20, max_try_num=10, step=0.5, visual=0.3, q=0.98,
+                            delta=0.5)
+                best_ys.append(afsa.run()[1])
+            self.assertLessEqual(np.median(best_ys), median, func.__name__)
+            self.assertLessEqual(np.max(best_ys), worst, func.__name__)
+
+    def test_vectorized_func_and_blocks(self):
+        calls = []
+
+        def func(X):
+            calls.append(len(X))
+            return (X - 0.5) ** 2 @ np.ones(X.shape[1])
+
+        set_run_mode(func, 'vectorization')
+        results = []
+        for block_size in (7, 1024):
+            np.random.seed(1)
+            afsa = AFSA(func, n_dim=4, size_pop=40, max_iter=5, max_try_num=5, block_size=block_size)
+            results.append(afsa.run())
+        np.testing.assert_array_equal(results[0][0], results[1][0])
+        self.assertEqual(results[0][1], results[1][1])
+        # candidates are evaluated in batches
+        self.assertGreater(max(calls), 1)
+
+    def test_vision(self):
+        np.random.seed(2)
+        afsa = AFSA(sphere, n_dim=3, size_pop=30, visual=0.5, block_size=4)
+        afsa.X[1] = afsa.X[0]
+        num_in_vision, center, best_in_vision = afsa.find_individual_in_vision()
+        distances = spatial.distance.cdist(afsa.X, afsa.X)
+        for i in range(afsa.size_pop):
+            in_vision = np.flatnonzero((distances[i] > 0) & (distances[i] < afsa.visual))
+            self.assertEqual(num_in_vision[i], len(in_vision))
+            if len(in_vision):
+                np.testing.assert_allclose(center[i], afsa.X[in_vision].mean(axis=0))
+                self.assertEqual(best_in_vision[i], in_vision[afsa.Y[in_vision].argmin()])
+            else:
+                self.assertEqual(best_in_vision[i], -1)
+
+
+class TestIA(unittest.TestCase):
+
+    def test_ranking_blocks(self):
+        points = np.random.RandomState(0).rand(12, 2)
+        distance_matrix = spatial.distance.cdist(points, points)
+
+        def tour_length(routine):
+            return distance_matrix[routine, np.roll(routine, -1)].sum()
+
+        np.random.seed(3)
+        ia = IA_TSP(tour_length, n_dim=12, size_pop=30, max_iter=2, T=0.7, alpha=0.95, block_size=4)
+        ia.run()
+        ia.Chrom[1] = ia.Chrom[0]
+        ia.X = ia.chrom2x(ia.Chrom)
+        ia.Y = ia.x2y()
+        fit_v = ia.ranking().copy()
+
+        dist = spatial.distance.cdist(ia.Chrom, ia.Chrom, metric='hamming')
+        S = ((dist < 1 - 0.7).sum(axis=1) - 1) / (ia.size_pop - 1)
+        A = 1 / ia.Y
+        np.testing.assert_allclose(fit_v, 0.95 * A / A.sum() + 0.05 * S / (S.sum() + 1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.ACA import ACA_TSP
+from sko.constraints import Constraints
+from sko.DE import DE
+from sko.GA import GA, GA_TSP
+from sko.PSO import PSO
+
+
+class Killed(Exception):
+    pass
+
+
+def sphere(x):
+    return x[0] ** 2 + (x[1] - 0.05) ** 2 + x[2] ** 2
+
+
+def killing(func, after):
+    '''func that dies after `after` calls, like a preempted job'''
+    calls = [0]
+
+    def wrapped(x):
+        calls[0] += 1
+        if calls[0] > after:
+            raise Killed()
+        return func(x)
+
+    return wrapped
+
+
+num_points = 8
+points = np.random.RandomState(0).rand(num_points, 2)
+distance_matrix = np.linalg.norm(points[:, None] - points[None], axis=-1)
+
+
+def total_distance(routine):
+    return sum(distance_matrix[routine[i], routine[(i + 1) % num_points]] for i in range(num_points))
+
+
+class TestSkoCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'run.ckpt')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def check_resume(self, make, func, kill_after, every=1):
+        np.random.seed(0)
+        expected_x, expected_y = make(func).run()
+
+        np.random.seed(0)
+        opt = make(killing(func, kill_after)).set_checkpoint(self.path, every=every)
+        with self.assertRaises(Killed):
+            opt.run()
+        # only the latest checkpoint is left behind
+        self.assertEqual(os.listdir(self.tmp_dir), ['run.ckpt'])
+
+        np.random.seed(123)  # resume restores the RNG state
+        resumed = make(func).resume(self.path)
+        best_x, best_y = resumed.run()
+        np.testing.assert_array_equal(best_x, expected_x)
+        np.testing.assert_array_equal(best_y, expected_y)
+        return resumed
+
+    def test_ga(self):
+        make = lambda f: GA(f, n_dim=3, size_pop=20, max_iter=30, lb=[-1] * 3, ub=[1] * 3, precision=1e-5)
+        ga = self.check_resume(make, sphere, kill_after=20 * 17 + 5, every=4)
+        self.assertEqual(len(ga.generation_best_Y), 30)
+
+    def test_ga_constraints(self):
+        # the worst feasible value seen and the counts of the constraint handling are restored too
+        make = lambda f: GA(f, n_dim=3, size_pop=20, max_iter=30, lb=[-1] * 3, ub=[1] * 3, precision=1e-5,
+                            constraints=Constraints(constraint_ueq=[lambda x: 0.5 - x[0] - x[1]]))
+        np.random.seed(0)
+        expected = make(sphere)
+        expected.run()
+        ga = self.check_resume(make, sphere, kill_after=200)
+        self.assertEqual(ga.constraints.counts, expected.constraints.counts)
+        self.assertEqual(ga.constraints.worst_feasible, expected.constraints.worst_feasible)
+
+    def test_ga_tsp(self):
+        make = lambda f: GA_TSP(f, n_dim=num_points, size_pop=20, max_iter=30, prob_mut=0.2)
+        self.check_resume(make, total_distance, kill_after=20 * 11 + 3)
+
+    def test_de(self):
+        make = lambda f: DE(f, n_dim=3, size_pop=20, max_iter=30, lb=[-1] * 3, ub=[1] * 3)
+        self.check_resume(make, sphere, kill_after=40 * 13 + 7)
+
+    def test_pso(self):
+        make = lambda f: PSO(f, n_dim=3, pop=20, max_iter=30, lb=[-1] * 3, ub=[1] * 3)
+        pso = self.check_resume(make, sphere, kill_after=20 * 19 + 2, every=5)
+        self.assertEqual(len(pso.gbest_y_hist), 30)
+
+    def test_aca(self):
+        make = lambda f: ACA_TSP(f, n_dim=num_points, size_pop=10, max_iter=20, distance_matrix=distance_matrix)
+        aca = self.check_resume(make, total_distance, kill_after=10 * 7 + 4)
+        self.assertIs(aca.y_best_history, aca.generation_best_Y)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.constraints import Constraints
+from sko.DE import DE
+from sko.GA import GA
+from sko.NSGA import NSGA2
+from sko.PSO import PSO
+from sko.tools import set_run_mode
+
+
+def ueq_row(x):
+    return 1 - x[0] - x[1]
+
+
+def ueq_vec(X):
+    return 1 - X[:, 0] - X[:, 1]
+
+
+def project(X):
+    # move to the x0 + x1 = 1 line
+    X = X.copy()
+    shift = np.maximum(1 - X[:, 0] - X[:, 1], 0) / 2
+    return X + shift[:, None] + 1e-9
+
+
+class Simulator():
+    '''objective that fails on infeasible points, x0 + x1 >= 1'''
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, X):
+        assert np.all(X[:, 0] + X[:, 1] >= 1 - 1e-12), 'infeasible point reached the simulator'
+        self.calls += len(X)
+        return (X ** 2).sum(axis=1)
+
+
+def simulator():
+    func = Simulator()
+    set_run_mode(func, 'vectorization')
+    return func
+
+
+class TestConstraints(unittest.TestCase):
+
+    def test_violation(self):
+        X = np.random.RandomState(0).rand(20, 2)
+        row = Constraints(constraint_eq=[lambda x: x[0] - 0.5], constraint_ueq=[ueq_row])
+        vec = Constraints(constraint_eq=[lambda X: X[:, 0] - 0.5], constraint_ueq=[ueq_vec], vectorized=True)
+        expected = np.abs(X[:, 0] - 0.5) + np.maximum(1 - X.sum(axis=1), 0)
+        np.testing.assert_allclose(row.violation(X), expected)
+        np.testing.assert_allclose(vec.violation(X), expected)
+        self.assertTrue(np.all(Constraints(constraint_eq=[lambda x: x[0] - 0.5], eq_tol=0.6).violation(X) == 0))
+
+    def test_feasibility_rules_and_penalty(self):
+        X = np.array([[0.9, 0.9], [0.2, 0.2], [0.5, 0.5], [0.1, 0.1]])
+        func = simulator()
+        constraints = Constraints(constraint_ueq=[ueq_vec], vectorized=True)
+        _, Y_raw, Y, CV = constraints.evaluate(func, X)
+        np.testing.assert_allclose(Y_raw[[0, 2]], [1.62, 0.5])
+        self.assertTrue(np.isnan(Y_raw[[1, 3]]).all())
+        # feasible < infeasible, infeasible ordered by violation
+        self.assertEqual(list(np.argsort(Y)), [2, 0, 1, 3])
+        np.testing.assert_allclose(Y[[1, 3]], 1.62 + CV[[1, 3]])
+        self.assertEqual(constraints.counts, {'evaluated': 2, 'repaired': 0, 'rejected': 2})
+
+        legacy = Constraints(constraint_ueq=[ueq_row], handling='penalty', evaluate_infeasible=True)
+        _, Y_raw, Y, CV = legacy.evaluate(lambda X: (X ** 2).sum(axis=1), X)
+        np.testing.assert_allclose(Y, (X ** 2).sum(axis=1) + 1e5 * np.maximum(1 - X.sum(axis=1), 0))
+
+    def test_repair(self):
+        constraints = Constraints(constraint_ueq=[ueq_vec], vectorized=True, repair=project)
+        X, _, Y, CV = constraints.evaluate(simulator(), np.array([[0.2, 0.2], [0.7, 0.7]]))
+        self.assertTrue(np.all(CV == 0))
+        self.assertAlmostEqual(X[0].sum(), 1, places=6)
+        self.assertEqual(constraints.counts, {'evaluated': 2, 'repaired': 1, 'rejected': 0})
+
+    def test_optimizers_never_evaluate_infeasible(self):
+        np.random.seed(0)
+        cases = [
+            lambda c: GA(simulator(), n_dim=2, size_pop=40, max_iter=30, lb=[0, 0], ub=[1, 1], constraints=c),
+            lambda c: DE(simulator(), n_dim=2, size_pop=40, max_iter=30, lb=[0, 0], ub=[1, 1], constraints=c),
+            lambda c: PSO(simulator(), n_dim=2, pop=40, max_iter=30, lb=[0, 0], ub=[1, 1], constraints=c),
+        ]
+        for make in cases:
+            for repair in (None, project):
+                constraints = Constraints(constraint_ueq=[ueq_vec], vectorized=True, repair=repair)
+                optimizer = make(constraints)
+                best_x, best_y = optimizer.run()
+                best_x = np.asarray(best_x).reshape(-1)
+                self.assertGreaterEqual(best_x.sum(), 1 - 1e-9)
+                # optimum at (0.5, 0.5)
+                self.assertLess(float(np.asarray(best_y).reshape(-1)[0]), 0.56)
+                counts = constraints.counts
+                # GA and DE evaluate best_x once more at the end of run()
+                self.assertIn(optimizer.func.calls - counts['evaluated'], (0, 1))
+                if repair is None:
+                    self.assertGreater(counts['rejected'], 0)
+                else:
+                    self.assertEqual(counts['rejected'], 0)
+                    self.assertGreater(counts['repaired'], 0)
+
+    def test_infeasible_before_feasible(self):
+        # the first generations have no feasible point, their (constrained) Y is the violation alone
+        def func(x):
+            return 1000 + x[0] + x[1]
+
+        def ueq(x):
+            return 1.9 - x[0] - x[1]
+
+        cases = [
+            lambda c: GA(func, n_dim=2, size_pop=50, max_iter=100, lb=[0, 0], ub=[1, 1], constraints=c),
+            lambda c: DE(func, n_dim=2, size_pop=50, max_iter=100, lb=[0, 0], ub=[1, 1], constraints=c),
+        ]
+        for make in cases:
+            np.random.seed(0)
+            optimizer = make(Constraints(constraint_ueq=[ueq]))
+            best_x, best_y = optimizer.run()
+            self.assertGreater(optimizer.generation_best_CV[0], 0)
+            self.assertLessEqual(ueq(best_x), 0)
+            # f of the best point, not its constrained value
+            self.assertAlmostEqual(float(np.asarray(best_y).reshape(-1)[0]), func(best_x))
+            self.assertLess(func(best_x), 1002)
+
+    def test_legacy_arguments_keep_the_penalty(self):
+        for optimizer in (GA(ueq_row, n_dim=2, lb=[0, 0], ub=[1, 1], constraint_ueq=[ueq_row]),
+                          DE(ueq_row, n_dim=2, lb=[0, 0], ub=[1, 1], constraint_ueq=[ueq_row]),
+                          PSO(ueq_row, n_dim=2, lb=[0, 0], ub=[1, 1], constraint_ueq=[ueq_row])):
+            self.assertEqual(optimizer.constraints.handling, 'penalty')
+            self.assertTrue(optimizer.constraints.evaluate_infeasible)
+
+    def test_ga_repair_is_encoded(self):
+        np.random.seed(2)
+        ga = GA(simulator(), n_dim=2, size_pop=20, max_iter=1, lb=[0, 0], ub=[1, 1], precision=1e-6,
+                constraints=Constraints(constraint_ueq=[ueq_vec], vectorized=True, repair=project))
+        # x2chrom inverts chrom2x
+        np.testing.assert_array_equal(ga.x2chrom(ga.chrom2x(ga.Chrom)), ga.Chrom)
+        ga.X = ga.chrom2x(ga.Chrom)
+        infeasible = ueq_vec(ga.X) > 0
+        self.assertTrue(infeasible.any())
+        ga.x2y()
+        # the repaired points are in the chromosomes, up to the precision
+        np.testing.assert_allclose(ga.chrom2x(ga.Chrom), ga.X, atol=1e-6)
+        self.assertTrue(np.all(ueq_vec(ga.chrom2x(ga.Chrom)[infeasible]) <= 1e-6))
+
+    def test_nsga(self):
+        def func(X):
+            assert np.all(X[:, 0] + X[:, 1] >= 1 - 1e-12)
+            return np.stack([X[:, 0], X[:, 1]], axis=1)
+
+        set_run_mode(func, 'vectorization')
+        np.random.seed(1)
+        constraints = Constraints(constraint_ueq=[ueq_vec], vectorized=True)
+        nsga = NSGA2(func, n_dim=2, n_obj=2, size_pop=20, max_iter=20, constraints=constraints)
+        _, pareto_y = nsga.run()
+        self.assertTrue(np.all(pareto_y.sum(axis=1) >= 1 - 1e-12))
+        self.assertGreater(constraints.counts['rejected'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
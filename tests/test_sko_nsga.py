@@ -0,0 +1,135 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.NSGA import NSGA2, NSGA3, crowding_distance, das_dennis, fast_non_dominated_sort, hypervolume
+from sko.tools import set_run_mode
+
+
+def zdt1(X):
+    f1 = X[:, 0]
+    g = 1 + 9 * X[:, 1:].mean(axis=1)
+    return np.stack([f1, g * (1 - np.sqrt(f1 / g))], axis=1)
+
+
+def dtlz2(X):
+    n_obj = 3
+    g = ((X[:, n_obj - 1:] - 0.5) ** 2).sum(axis=1)
+    theta = X[:, :n_obj - 1] * np.pi / 2
+    F = np.ones((len(X), n_obj)) * (1 + g)[:, None]
+    for k in range(n_obj):
+        F[:, k] *= np.prod(np.cos(theta[:, :n_obj - 1 - k]), axis=1)
+        if k > 0:
+            F[:, k] *= np.sin(theta[:, n_obj - 1 - k])
+    return F
+
+
+set_run_mode(zdt1, 'vectorization')
+set_run_mode(dtlz2, 'vectorization')
+
+
+class TestParetoTools(unittest.TestCase):
+
+    def test_sort_and_crowding(self):
+        F = np.array([[1, 5], [2, 3], [3, 1], [2, 5], [4, 4], [5, 5]])
+        np.testing.assert_array_equal(fast_non_dominated_sort(F), [0, 0, 0, 1, 1, 2])
+        # infeasible points come after all feasible ones, ordered by violation
+        CV = np.array([0, 0, 2, 0, 1, 0])
+        np.testing.assert_array_equal(fast_non_dominated_sort(F, CV), [0, 0, 4, 1, 3, 2])
+        np.testing.assert_allclose(crowding_distance(F[:3].astype(float)), [np.inf, 2, np.inf])
+
+    def test_hypervolume(self):
+        self.assertAlmostEqual(hypervolume([[1, 2], [2, 1]], [3, 3]), 3)
+        # dominated and outside points do not count
+        self.assertAlmostEqual(hypervolume([[1, 2], [2, 1], [2, 2], [4, 0]], [3, 3]), 3)
+        F = np.random.RandomState(0).rand(15, 3)
+        samples = np.random.RandomState(1).rand(200000, 3)
+        dominated = np.zeros(len(samples), dtype=bool)
+        for f in F:
+            dominated |= (samples >= f).all(axis=1)
+        self.assertAlmostEqual(hypervolume(F, [1, 1, 1]), dominated.mean(), delta=0.01)
+
+    def test_das_dennis(self):
+        dirs = das_dennis(4, 3)
+        self.assertEqual(len(dirs), 15)
+        np.testing.assert_allclose(dirs.sum(axis=1), 1)
+
+
+class TestNSGA(unittest.TestCase):
+
+    def test_nsga2_zdt1(self):
+        np.random.seed(0)
+        nsga = NSGA2(zdt1, n_dim=10, n_obj=2, size_pop=60, max_iter=120, hv_ref_point=[1.1, 1.1])
+        pareto_x, pareto_y = nsga.run()
+        self.assertEqual(len(nsga.hypervolume_history), 120)
+        self.assertEqual(len(nsga.pareto_front_history), 120)
+        self.assertGreater(nsga.hypervolume_history[-1], nsga.hypervolume_history[0])
+        # the true front has a hypervolume of 1.1 ** 2 - 1 / 3 = 0.877
+        self.assertGreater(nsga.hypervolume_history[-1], 0.8)
+        np.testing.assert_allclose(zdt1(pareto_x), pareto_y)
+        self.assertTrue(np.all(fast_non_dominated_sort(pareto_y) == 0))
+
+    def test_constraints_and_precision(self):
+        def func(x):
+            return [x[0], 10 - x[0] + x[1]]
+
+        np.random.seed(1)
+        nsga = NSGA2(func, n_dim=2, n_obj=2, size_pop=20, max_iter=20, lb=0, ub=10, precision=1,
+                     constraint_ueq=[lambda x: 3 - x[0]], constraint_eq=[lambda x: x[1] - 2])
+        pareto_x, pareto_y = nsga.run()
+        np.testing.assert_array_equal(pareto_x, np.round(pareto_x))
+        self.assertTrue(np.all(pareto_x[:, 0] >= 3))
+        self.assertTrue(np.all(pareto_x[:, 1] == 2))
+        self.assertTrue(np.all(nsga.CV[nsga.rank == 0] == 0))
+
+    def test_imputed_penalty_does_not_compound(self):
+        calls = []
+
+        def func(x):
+            calls.append(x[0])
+            return [x[0], 1 - x[0]]
+
+        np.random.seed(4)
+        # almost every point is infeasible, so imputed points survive and are imputed again
+        nsga = NSGA2(func, n_dim=2, n_obj=2, size_pop=20, max_iter=5, lb=0, ub=1,
+                     constraint_ueq=[lambda x: 0.97 - x[0], lambda x: 0.97 - x[1]])
+        nsga.run()
+        self.assertGreater((~nsga.evaluated).sum(), 10)
+        self.assertTrue(nsga.evaluated.any())
+        self.assertTrue(np.all(np.asarray(calls) >= 0.97))
+        # the worst objectives come from evaluated points (in [0, 1]), never from imputed ones
+        self.assertTrue(np.all(nsga.Y[~nsga.evaluated] <= 1 + nsga.CV[~nsga.evaluated, None]))
+
+    def test_nsga3_dtlz2(self):
+        np.random.seed(2)
+        nsga = NSGA3(dtlz2, n_dim=7, n_obj=3, n_partitions=6, max_iter=100)
+        self.assertEqual(nsga.size_pop, 28)
+        _, pareto_y = nsga.run()
+        # the front is the unit sphere, spread over the reference directions
+        radius = np.linalg.norm(pareto_y, axis=1)
+        self.assertLess(np.median(radius), 1.05)
+        niche, _ = nsga.associate(nsga.normalize(pareto_y))
+        self.assertGreater(len(np.unique(niche)), 20)
+
+    def test_checkpoint_resume(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'nsga.ckpt')
+            np.random.seed(3)
+            full = NSGA2(zdt1, n_dim=5, n_obj=2, size_pop=20, max_iter=10)
+            full.run()
+
+            np.random.seed(3)
+            NSGA2(zdt1, n_dim=5, n_obj=2, size_pop=20, max_iter=10).set_checkpoint(path, every=1).run(max_iter=4)
+            resumed = NSGA2(zdt1, n_dim=5, n_obj=2, size_pop=20, max_iter=10).resume(path)
+            resumed.run(max_iter=10)
+            np.testing.assert_array_equal(resumed.pareto_y, full.pareto_y)
+            self.assertEqual(resumed.hypervolume_history, full.hypervolume_history)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import types
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../')
+
+from sko.GA import GA, GA_TSP, RCGA
+from sko.operators import crossover, mutation, selection, vectorized
+
+
+def population(Chrom, **kwargs):
+    return types.SimpleNamespace(Chrom=Chrom, size_pop=Chrom.shape[0], len_chrom=Chrom.shape[1],
+                                 n_dim=Chrom.shape[1], **kwargs)
+
+
+def permutations(size_pop, len_chrom, seed=0):
+    return np.random.RandomState(seed).rand(size_pop, len_chrom).argsort(axis=1)
+
+
+def position_frequency(Chrom):
+    # frequency of every gene at every position
+    len_chrom = Chrom.shape[1]
+    return np.array([(Chrom == gene).mean(axis=0) for gene in range(len_chrom)])
+
+
+class TestCrossover(unittest.TestCase):
+
+    def test_same_draws_as_loops(self):
+        # the cut points are drawn in the same order, so the offspring are identical
+        bits = np.random.RandomState(0).randint(2, size=(60, 30))
+        for loop, vec, Chrom in ((crossover.crossover_1point, vectorized.crossover_1point, bits),
+                                 (crossover.crossover_2point, vectorized.crossover_2point, bits),
+                                 (crossover.crossover_2point_bit, vectorized.crossover_2point_bit, bits),
+                                 (crossover.crossover_pmx, vectorized.crossover_pmx, permutations(60, 30)),
+                                 (crossover.crossover_pmx, vectorized.crossover_pmx, permutations(60, 2))):
+            results = []
+            for operator in (loop, vec):
+                np.random.seed(1)
+                results.append(operator(population(Chrom.copy())))
+            np.testing.assert_array_equal(results[0], results[1])
+
+    def test_pmx_values(self):
+        Chrom = 10 * permutations(40, 12) + 3
+        np.random.seed(2)
+        offspring = vectorized.crossover_pmx(population(Chrom.copy()))
+        np.testing.assert_array_equal(np.sort(offspring, axis=1), np.sort(Chrom, axis=1))
+
+    def test_prob_and_sbx(self):
+        np.random.seed(3)
+        Chrom = np.tile(np.arange(10), (20000, 1))
+        Chrom[1::2] += 100
+        offspring = vectorized.crossover_2point_prob(population(Chrom.copy()), 0.3)
+        crossed = (offspring != Chrom).any(axis=1)[0::2]
+        # pairs with n1 == n2 stay as they are
+        self.assertAlmostEqual(crossed.mean(), 0.3 * 0.9, delta=0.02)
+
+        pair = np.tile([[0.2, 0.7], [0.6, 0.1]], (10000, 1))
+        results = []
+        for operator in (RCGA.crossover_SBX, vectorized.crossover_SBX):
+            results.append(operator(population(pair.copy(), prob_cros=0.8, FitV=None)))
+        np.testing.assert_allclose(results[0].mean(axis=0), results[1].mean(axis=0), atol=0.01)
+        np.testing.assert_allclose(results[0].std(axis=0), results[1].std(axis=0), atol=0.01)
+        self.assertTrue(((results[1] >= 0) & (results[1] <= 1)).all())
+
+
+class TestMutation(unittest.TestCase):
+
+    def test_permutation_mutations(self):
+        np.random.seed(4)
+        Chrom = np.tile(np.arange(8), (20000, 1))
+        for loop, vec, prob_mut in ((mutation.mutation_swap, vectorized.mutation_swap, 0.5),
+                                    (mutation.mutation_reverse, vectorized.mutation_reverse, 0.5),
+                                    (mutation.mutation_TSP_1, vectorized.mutation_TSP_1, 0.1)):
+            results = [operator(population(Chrom.copy(), prob_mut=prob_mut)) for operator in (loop, vec)]
+            np.testing.assert_array_equal(np.sort(results[1], axis=1), Chrom)
+            np.testing.assert_allclose(position_frequency(results[0]), position_frequency(results[1]), atol=0.015)
+
+    def test_polynomial(self):
+        np.random.seed(5)
+        Chrom = np.tile([0.05, 0.5, 0.95], (30000, 1))
+        results = [operator(population(Chrom.copy(), prob_mut=0.5))
+                   for operator in (RCGA.mutation, vectorized.mutation_polynomial)]
+        np.testing.assert_allclose(results[0].mean(axis=0), results[1].mean(axis=0), atol=0.005)
+        np.testing.assert_allclose(results[0].std(axis=0), results[1].std(axis=0), atol=0.005)
+        self.assertAlmostEqual((results[1] != Chrom).mean(), 0.5, delta=0.01)
+
+
+class TestSelection(unittest.TestCase):
+
+    def test_alias_table(self):
+        rng = np.random.RandomState(6)
+        for sel_prob in (rng.rand(1000), rng.rand(50) ** 8, np.r_[1000., np.ones(99)], np.ones(7)):
+            sel_prob = sel_prob / sel_prob.sum()
+            prob, alias = vectorized.alias_table(sel_prob)
+            n = len(sel_prob)
+            reconstructed = (prob + np.bincount(alias, weights=1 - prob, minlength=n)) / n
+            np.testing.assert_allclose(reconstructed, sel_prob, atol=1e-12)
+
+    def test_roulette(self):
+        np.random.seed(7)
+        FitV = np.array([-3., -1., 0., 2., 5.])
+        Chrom = np.arange(5)[:, None]
+        for loop, vec in ((selection.selection_roulette_1, vectorized.selection_roulette_1),
+                          (selection.selection_roulette_2, vectorized.selection_roulette_2)):
+            counts = []
+            for operator in (loop, vec):
+                pop = population(np.tile(Chrom, (20000, 1)), FitV=np.tile(FitV, 20000))
+                counts.append(np.bincount(operator(pop)[:, 0], minlength=5) / pop.size_pop)
+            np.testing.assert_allclose(counts[0], counts[1], atol=0.01)
+
+    def test_tournament(self):
+        FitV = np.random.RandomState(8).rand(50)
+        results = []
+        for operator in (selection.selection_tournament_faster, vectorized.selection_tournament_faster):
+            np.random.seed(9)
+            results.append(operator(population(np.arange(50)[:, None], FitV=FitV)))
+        np.testing.assert_array_equal(results[0], results[1])
+
+
+class TestVectorize(unittest.TestCase):
+
+    def test_register(self):
+        np.random.seed(10)
+        points = np.random.rand(12, 2)
+        distance = np.linalg.norm(points[:, None] - points[None], axis=2)
+
+        def total_distance(routine):
+            return distance[routine, np.roll(routine, -1)].sum()
+
+        ga_tsp = GA_TSP(total_distance, n_dim=12, size_pop=100, max_iter=30, prob_mut=0.5).vectorize()
+        best_x, best_y = ga_tsp.run()
+        np.testing.assert_array_equal(np.sort(best_x), np.arange(12))
+        self.assertAlmostEqual(total_distance(best_x), best_y[0])
+
+        sphere = lambda x: ((x - 0.3) ** 2).sum()
+        ga = GA(sphere, n_dim=3, size_pop=100, max_iter=60, lb=-1, ub=1, precision=1e-4).vectorize()
+        self.assertLess(ga.run()[1][0], 1e-2)
+        rcga = RCGA(sphere, n_dim=3, size_pop=100, max_iter=60, prob_mut=0.05, lb=-1, ub=1).vectorize()
+        self.assertLess(rcga.run()[1][0], 1e-2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,243 @@
+import ast
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import types
+import unittest
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+proj_root_path = os.path.abspath(tests_dir_path + '/../')
+os.sys.path.insert(0, proj_root_path)
+
+from sims.Sniper.region_cache import RegionCache, parse_size, region_key
+
+PINBALL = 'gcc.try_33001_t0r{0}_warmup101500_prolog0_region100000000_epilog0_00{0}_0-00092.0'
+
+
+def load_simulate_benchmark():
+    '''simulate_benchmark imports arch_gym_configs, which the launcher doesn't use'''
+    path = os.path.join(proj_root_path, 'sims/Sniper/simulate_benchmark.py')
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    tree.body = [n for n in tree.body if not (isinstance(n, ast.ImportFrom) and n.module == 'configs')]
+    module = types.ModuleType('simulate_benchmark')
+    module.__file__ = path
+    exec(compile(tree, path, 'exec'), module.__dict__)
+    return module
+
+
+simulate_benchmark = load_simulate_benchmark()
+
+
+def make_pinball(pinpoint_dir, region, content='0x400000'):
+    pinpoint_path = os.path.join(pinpoint_dir, PINBALL.format(region))
+    for suffix, data in (('.address', content), ('.global.log', 'log'), ('.text', 'text')):
+        with open(pinpoint_path + suffix, 'w') as f:
+            f.write(data)
+    return pinpoint_path
+
+
+class Recorder():
+    '''stands in for record-trace: writes a trace of the given size into the staging dir'''
+    def __init__(self, size=1000, seconds=0.0, ok=True):
+        self.size = size
+        self.seconds = seconds
+        self.ok = ok
+        self.calls = 0
+
+    def __call__(self, staging_dir):
+        self.calls += 1
+        time.sleep(self.seconds)
+        with open(os.path.join(staging_dir, 'trace.sift'), 'w') as f:
+            f.write('x' * self.size)
+        return self.ok
+
+
+class TestRegionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_region(self, cache, key, recorder, region='001'):
+        with cache.acquire(key, recorder, benchmark='gcc', region=region) as lease:
+            if lease.path is not None:
+                self.assertTrue(os.path.exists(os.path.join(lease.path, 'trace.sift')))
+            return lease.hit, lease.path
+
+    def test_region_key(self):
+        first = make_pinball(self.tmp.name, 1)
+        second = make_pinball(self.tmp.name, 2)
+        key = region_key(first)
+        self.assertEqual(key, region_key(first))
+        self.assertNotEqual(key, region_key(second))
+        make_pinball(self.tmp.name, 1, content='0x400001')
+        self.assertNotEqual(key, region_key(first))
+        self.assertEqual(parse_size('1.5K'), 1536)
+        self.assertEqual(parse_size('2G'), 2 * 2 ** 30)
+        self.assertEqual(parse_size(10), 10)
+
+    def test_hit_after_miss(self):
+        cache = RegionCache(self.cache_dir, sweep='sweep-1')
+        recorder = Recorder(seconds=0.05)
+        self.assertEqual(self.run_region(cache, 'a', recorder)[0], False)
+        for _ in range(3):
+            hit, path = self.run_region(RegionCache(self.cache_dir, sweep='sweep-1'), 'a', recorder)
+            self.assertTrue(hit)
+            self.assertEqual(path, cache.entry_dir('a'))
+        self.assertEqual(recorder.calls, 1)
+
+        report = cache.report()
+        self.assertEqual((report['entries'], report['bytes']), (1, 1000))
+        stats = report['sweeps']['sweep-1']
+        self.assertEqual((stats['runs'], stats['hit'], stats['miss']), (4, 3, 1))
+        # every hit is credited with the time the region took to record
+        self.assertAlmostEqual(stats['estimated_saved_seconds'], 3 * stats['record_seconds'])
+        self.assertAlmostEqual(stats['estimated_uncached_seconds'],
+                               4 * stats['record_seconds'] + stats['simulate_seconds'])
+        self.assertGreater(stats['estimated_saved_fraction'], 0.5)
+
+    def test_failed_record(self):
+        cache = RegionCache(self.cache_dir)
+        self.assertEqual(self.run_region(cache, 'a', Recorder(ok=False)), (False, None))
+        self.assertEqual(cache.entries(), {})
+        self.assertFalse(os.path.exists(cache.staging_dir('a')))
+        self.assertEqual(cache.report()['sweeps']['default']['bypass'], 1)
+        # recorded on the next try
+        self.assertEqual(self.run_region(cache, 'a', Recorder()), (False, cache.entry_dir('a')))
+        self.assertEqual(self.run_region(cache, 'a', Recorder())[0], True)
+
+    def test_lru_eviction(self):
+        cache = RegionCache(self.cache_dir, quota_bytes=2500)
+        recorder = Recorder()
+        for key in ('a', 'b'):
+            self.run_region(cache, key, recorder)
+        self.run_region(cache, 'a', recorder)
+        self.run_region(cache, 'c', recorder)
+        # b is the least recently used
+        self.assertEqual(sorted(cache.entries()), ['a', 'c'])
+        self.assertFalse(os.path.exists(cache.entry_dir('b')))
+
+        # an entry in use is not evicted, even when it is the least recently used
+        with cache.acquire('a', recorder) as lease:
+            self.run_region(cache, 'd', recorder)
+            self.assertTrue(os.path.exists(os.path.join(lease.path, 'trace.sift')))
+        self.assertEqual(sorted(cache.entries()), ['a', 'd'])
+        self.assertEqual(cache.report()['sweeps']['default']['evict'], 2)
+
+        # an entry larger than the quota is used once and evicted
+        self.assertEqual(self.run_region(cache, 'e', Recorder(size=5000))[1], cache.entry_dir('e'))
+        self.assertNotIn('e', cache.entries())
+        self.assertLessEqual(cache.report()['bytes'], 2500)
+
+    def test_max_entries(self):
+        cache = RegionCache(self.cache_dir, quota_bytes=None, max_entries=2)
+        for key in ('a', 'b', 'c'):
+            self.run_region(cache, key, Recorder())
+        self.assertEqual(sorted(cache.entries()), ['b', 'c'])
+
+    def test_concurrent_record_once(self):
+        recorder = Recorder(seconds=0.2)
+        results = []
+
+        def worker():
+            results.append(self.run_region(RegionCache(self.cache_dir), 'a', recorder)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(recorder.calls, 1)
+        self.assertEqual(sorted(results), [False, True, True, True])
+
+
+class FakeDocker():
+    '''stands in for subprocess in simulate_benchmark: logs the commands, record-trace writes the trace'''
+    PIPE = subprocess.PIPE
+
+    def __init__(self):
+        self.cmds = []
+
+    def run(self, cmd, **kwargs):
+        self.cmds.append(cmd)
+        if 'record-trace' in cmd:
+            region_mount = next(arg for arg in cmd if arg.endswith(':/root/region'))
+            with open(os.path.join(region_mount.split(':')[0], 'trace.sift'), 'w') as f:
+                f.write('trace')
+        return subprocess.CompletedProcess(cmd, 0, b'out', b'err')
+
+
+class TestCachedLauncher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pinpoint_dir = os.path.join(self.tmp.name, 'pinpoints')
+        os.makedirs(self.pinpoint_dir)
+        self.pinpoint = make_pinball(self.pinpoint_dir, 5)
+        self.config = os.path.join(self.tmp.name, 'configs', 'gainestown.cfg')
+        self.cache = RegionCache(os.path.join(self.tmp.name, 'cache'))
+        self.launcher = simulate_benchmark.SniperLauncher(1, self.cache)
+        self.docker = FakeDocker()
+        simulate_benchmark.subprocess = self.docker
+
+    def tearDown(self):
+        simulate_benchmark.subprocess = subprocess
+        self.launcher.pool.terminate()
+        self.tmp.cleanup()
+
+    def prepare_job(self, run):
+        output_path = os.path.join(self.tmp.name, run)
+        os.makedirs(output_path)
+        return self.launcher.prepare_cached_job(self.pinpoint, output_path, self.config)
+
+    def test_commands(self):
+        job = self.prepare_job('run')
+        output_dir = os.path.join(self.tmp.name, 'run', '005')
+        key = region_key(self.pinpoint)
+        pinball = os.path.basename(self.pinpoint)
+        self.assertEqual((job['key'], job['benchmark'], job['region'], job['output_dir']),
+                         (key, 'gcc', '005', output_dir))
+        self.assertTrue(os.path.exists(os.path.join(output_dir, 'weight')))
+        self.assertEqual(job['cmd'], [
+            'docker', 'run', '--rm',
+            '-v', self.pinpoint_dir + ':/root/pinpoints',
+            '-v', output_dir + ':/root/output',
+            '-v', os.path.dirname(self.config) + ':/root/configs',
+            'sniper', 'run-sniper', '--power', '-d', '/root/output', '-c', '/root/configs/gainestown.cfg',
+            '--pinballs', '/root/pinpoints/' + pinball])
+        self.assertEqual(job['record_cmd'], [
+            'docker', 'run', '--rm',
+            '-v', self.pinpoint_dir + ':/root/pinpoints',
+            '-v', self.cache.staging_dir(key) + ':/root/region',
+            'sniper', 'record-trace', '-o', '/root/region/trace', '--pinball=/root/pinpoints/' + pinball])
+        # the same run, from the recorded region rather than the pinball
+        self.assertEqual(job['restore_cmd'], [
+            'docker', 'run', '--rm',
+            '-v', self.cache.entry_dir(key) + ':/root/region:ro',
+            '-v', output_dir + ':/root/output',
+            '-v', os.path.dirname(self.config) + ':/root/configs',
+            'sniper', 'run-sniper', '--power', '-d', '/root/output', '-c', '/root/configs/gainestown.cfg',
+            '--traces=/root/region/trace.sift'])
+
+    def test_record_then_restore(self):
+        first = self.prepare_job('first')
+        simulate_benchmark.launch_cached_benchmark(first)
+        self.assertEqual(self.docker.cmds, [first['record_cmd'], first['restore_cmd']])
+        self.assertEqual(sorted(os.listdir(first['output_dir'])),
+                         ['record.stderr', 'record.stdout', 'stderr', 'stdout', 'weight'])
+
+        # the next configuration restores without recording
+        second = self.prepare_job('second')
+        simulate_benchmark.launch_cached_benchmark(second)
+        self.assertEqual(self.docker.cmds[2:], [second['restore_cmd']])
+        self.assertTrue(os.path.exists(os.path.join(second['output_dir'], 'stdout')))
+        stats = self.cache.report()['sweeps']['default']
+        self.assertEqual((stats['hit'], stats['miss']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import itertools
+import os
+import tempfile
+import unittest
+from multiprocessing import util
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../arch_gym/envs')
+
+from param_space import Param, ParamSpace, dramsys_param_space
+from sweep import Sweep, SweepLedger, completed_indices, load_results, run_sweep
+
+
+def small_space():
+    return ParamSpace([
+        Param('policy', choices=['Open', 'Closed']),
+        Param('buffer', 'int', low=1, high=3),
+        Param('ways', 'int', low=2, high=8, log=True),
+    ])
+
+
+def cost(config):
+    return {'latency': config['buffer'] * config['ways'] + (config['policy'] == 'Closed'), 'energy': 1.0}
+
+
+class Interrupt(Exception):
+    pass
+
+
+class WorkerLog():
+    '''evaluate that keeps a log per worker process, written out by a finalizer like an env logger'''
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.configs = None
+
+    def write(self):
+        with open(os.path.join(self.log_dir, str(os.getpid())), 'w') as f:
+            f.write(''.join('{buffer}\n'.format(**c) for c in self.configs))
+
+    def __call__(self, config):
+        if self.configs is None:
+            self.configs = []
+            util.Finalize(None, self.write, exitpriority=10)
+        self.configs.append(config)
+        return cost(config)
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.out = os.path.join(self.tmp.name, 'out')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_enumeration_matches_nested_loops(self):
+        sweep = Sweep(small_space())
+        expected = [dict(zip(sweep.names, values)) for values in itertools.product(['Open', 'Closed'], [1, 2, 3],
+                                                                                  [2, 4, 8])]
+        self.assertEqual(len(sweep), 18)
+        self.assertEqual(sweep.configs(range(18)), expected)
+        self.assertEqual(sweep[17], expected[17])
+        with self.assertRaises(IndexError):
+            sweep.configs([18])
+
+    def test_values_and_floats(self):
+        space = ParamSpace([Param('policy', choices=['Open', 'Closed']), Param('f', 'float', low=1, high=100, log=True)])
+        with self.assertRaises(ValueError):
+            Sweep(space)
+        sweep = Sweep(space, values={'policy': ['Closed']}, float_levels=3)
+        self.assertEqual([c['f'] for c in sweep.configs(range(3))], [1.0, 10.0, 100.0])
+        with self.assertRaises(ValueError):
+            Sweep(space, values={'policy': ['Adaptive']}, float_levels=3)
+        # the DRAMSys space has 2.8e7 points, nothing is built for them
+        self.assertEqual(len(Sweep(dramsys_param_space())), 4 * 3 * 3 * 8 * 2 * 2 * 8 * 8 * 3 * 128)
+
+    def test_shards_partition(self):
+        sweep = Sweep(small_space())
+        shards = [list(sweep.shard(k, 3, block_size=2)) for k in range(3)]
+        self.assertEqual(shards[0], [0, 1, 6, 7, 12, 13])
+        self.assertEqual(sorted(sum(shards, [])), list(range(18)))
+
+    def test_run_and_load(self):
+        sweep = Sweep(small_space())
+        for shard in range(2):
+            run_sweep(sweep, cost, self.out, shard=shard, num_shards=2, block_size=4, flush_every=5, verbose=False)
+        df = load_results(self.out)
+        self.assertEqual(list(df.index), list(range(18)))
+        self.assertEqual(list(df.columns), ['policy', 'buffer', 'ways', 'energy', 'latency'])
+        self.assertEqual(df.loc[17, 'latency'], 25)
+        self.assertEqual(df.loc[0, 'policy'], 'Open')
+        # everything is done, a rerun evaluates nothing
+        self.assertEqual(run_sweep(sweep, cost, self.out, verbose=False), 0)
+
+    def test_resume(self):
+        sweep = Sweep(small_space())
+        calls = []
+
+        def flaky(config):
+            if len(calls) == 7:
+                raise Interrupt()
+            calls.append(config)
+            return cost(config)['latency']
+
+        with self.assertRaises(Interrupt):
+            run_sweep(sweep, flaky, self.out, flush_every=3, verbose=False)
+        # points evaluated before the interrupt are kept
+        self.assertEqual(completed_indices(self.out), set(range(7)))
+        calls.append(None)
+        # resuming with another shard layout only evaluates the rest
+        self.assertEqual(run_sweep(sweep, flaky, self.out, shard=0, num_shards=2, block_size=4, flush_every=4,
+                                   verbose=False), 6)
+        self.assertEqual(run_sweep(sweep, flaky, self.out, shard=1, num_shards=2, block_size=4, flush_every=4,
+                                   verbose=False), 5)
+        self.assertEqual(len(calls), 19)
+        df = load_results(self.out)
+        self.assertEqual(list(df.index), list(range(18)))
+        self.assertEqual(list(df.columns), ['policy', 'buffer', 'ways', 'reward'])
+
+        with self.assertRaises(ValueError):
+            run_sweep(Sweep(small_space(), values={'buffer': [1]}), cost, self.out, verbose=False)
+
+    def test_max_points_and_workers(self):
+        sweep = Sweep(small_space())
+        self.assertEqual(run_sweep(sweep, cost, self.out, max_points=4, verbose=False), 4)
+        self.assertEqual(run_sweep(sweep, cost, self.out, workers=3, flush_every=4, verbose=False), 14)
+        np.testing.assert_array_equal(load_results(self.out)['latency'],
+                                      [cost(c)['latency'] for c in sweep.configs(range(18))])
+
+    def test_on_result_and_worker_exit(self):
+        sweep = Sweep(small_space())
+        log_dir = os.path.join(self.tmp.name, 'logs')
+        os.makedirs(log_dir)
+        results = []
+        run_sweep(sweep, WorkerLog(log_dir), self.out, workers=3, flush_every=4, verbose=False,
+                  on_result=lambda index, config, metrics: results.append((index, config, metrics)))
+        self.assertEqual(results, [(i, c, cost(c)) for i, c in enumerate(sweep.configs(range(18)))])
+        # the workers exited normally, so their finalizers wrote their logs
+        logs = []
+        for name in os.listdir(log_dir):
+            with open(os.path.join(log_dir, name)) as f:
+                logs += f.read().split()
+        self.assertEqual(sorted(logs), sorted(str(c['buffer']) for c in sweep.configs(range(18))))
+
+    def test_torn_ledger(self):
+        path = os.path.join(self.tmp.name, 'ledger.txt')
+        ledger = SweepLedger(path)
+        ledger.record([1, 2])
+        with open(path, 'a') as f:
+            f.write('3 4')
+        SweepLedger(path).record([5])
+        self.assertEqual(SweepLedger.read(path), {1, 2, 5})
+
+
+if __name__ == '__main__':
+    unittest.main()
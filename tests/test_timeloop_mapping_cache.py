@@ -0,0 +1,186 @@
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import yaml
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+proj_root_path = os.path.abspath(tests_dir_path + '/../')
+os.sys.path.insert(0, proj_root_path)
+
+from sims.Timeloop.mapping_cache import (MappingStore, arch_features, layer_instance, layer_key, legalize,
+                                         load_yaml, storage_levels, violations)
+from sims.Timeloop.timeloop_wrapper import TimeloopWrapper
+
+TIMELOOP_DIR = os.path.join(proj_root_path, 'sims', 'Timeloop')
+FAKE_MAPPER = os.path.join(proj_root_path, 'sims', 'fake_sims', 'fake_timeloop_mapper.py')
+sys.path.insert(0, os.path.dirname(FAKE_MAPPER))
+from fake_timeloop_mapper import find_mapping
+
+
+def shrink(arch, level, **attributes):
+    arch = copy.deepcopy(arch)
+
+    def walk(node):
+        for local in node.get('local', []):
+            if local['name'].split('[')[0] == level:
+                local['attributes'].update(attributes)
+        for subtree in node.get('subtree', []):
+            walk(subtree)
+
+    walk(arch['architecture'])
+    return arch
+
+
+class TestLegalize(unittest.TestCase):
+
+    def setUp(self):
+        self.arch = load_yaml(os.path.join(TIMELOOP_DIR, 'arch', 'eyeriss_like.yaml'))
+        self.instance = layer_instance(os.path.join(TIMELOOP_DIR, 'layer_shapes', 'AlexNet', 'AlexNet_layer2.yaml'))
+
+    def test_levels(self):
+        levels = storage_levels(self.arch)
+        self.assertEqual([level['name'] for level in levels],
+                         ['DRAM', 'shared_glb', 'DummyBuffer', 'ifmap_spad', 'weights_spad', 'psum_spad', 'mac'])
+        self.assertEqual([level['instances'] for level in levels], [1, 1, 14, 168, 168, 168, 168])
+        self.assertEqual(levels[1]['capacity'], 16384 * 64 // 16)
+        self.assertEqual(arch_features(self.arch)['ifmap_spad.memory_depth'], 12)
+
+    def test_legalize_smaller_arch(self):
+        mapping = find_mapping(self.arch, self.instance)
+        self.assertIsNone(violations(mapping, self.instance, self.arch))
+        # an already legal mapping is kept as it is
+        self.assertEqual(legalize(mapping, self.instance, self.arch), mapping)
+
+        small = shrink(self.arch, 'psum_spad', memory_depth=4)
+        small = shrink(small, 'shared_glb', memory_depth=256)
+        self.assertEqual(violations(mapping, self.instance, small)[:2], ('capacity', 'shared_glb'))
+        legal = legalize(mapping, self.instance, small)
+        self.assertIsNotNone(legal)
+        self.assertIsNone(violations(legal, self.instance, small))
+
+        # fewer PEs: the spatial factors move to temporal loops
+        few_pes = copy.deepcopy(self.arch)
+        few_pes['architecture']['subtree'][0]['subtree'][0]['subtree'][0]['name'] = 'PE[0..27]'
+        self.assertEqual(violations(mapping, self.instance, few_pes)[:2], ('fanout', 'DummyBuffer'))
+        self.assertIsNone(violations(legalize(mapping, self.instance, few_pes), self.instance, few_pes))
+
+    def test_unknown_level(self):
+        mapping = find_mapping(self.arch, self.instance)
+        mapping[0]['target'] = 'HBM'
+        self.assertIsNone(legalize(mapping, self.instance, self.arch))
+
+
+class TestMappingStore(unittest.TestCase):
+
+    def test_nearest_and_torn_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'mappings.jsonl')
+            store = MappingStore(path)
+            store.insert('L', {'glb': 1024}, [{'a': 1}], 2.0, 100, 1.0, 'cold')
+            store.insert('L', {'glb': 1024}, [{'a': 2}], 1.0, 90, 1.0, 'cold')
+            store.insert('L', {'glb': 64}, [{'a': 3}], 1.0, 50, 1.0, 'cold')
+            store.insert('other', {'glb': 1000}, [{'a': 4}], 1.0, 10, 1.0, 'cold')
+            with open(path, 'a') as f:
+                f.write('{"layer": "L", "feat')
+
+            reopened = MappingStore(path)
+            nearest = reopened.nearest('L', {'glb': 1000}, k=2)
+            # the best mapping of the closest architecture first
+            self.assertEqual([r['mapping'] for r in nearest], [[{'a': 2}], [{'a': 3}]])
+            self.assertEqual(len(reopened.records), 4)
+
+
+class TestWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.arch_dir = os.path.join(root, 'arch')
+        shutil.copytree(os.path.join(TIMELOOP_DIR, 'arch'), self.arch_dir)
+        self.workload_dir = os.path.join(root, 'AlexNet')
+        os.makedirs(self.workload_dir)
+        for layer in ('AlexNet_layer2.yaml', 'AlexNet_layer3.yaml'):
+            shutil.copy(os.path.join(TIMELOOP_DIR, 'layer_shapes', 'AlexNet', layer), self.workload_dir)
+        self.output_dir = os.path.join(root, 'output')
+        self.script_dir = os.path.join(root, 'script')
+        os.makedirs(self.output_dir)
+        os.makedirs(self.script_dir)
+        # same structure as the scripts in sims/Timeloop/script
+        with open(os.path.join(self.script_dir, 'run_timeloop.sh'), 'w') as f:
+            f.write('OUTPUT_DIR="{output}"\n'
+                    'LAYER_SHAPE="AlexNet/AlexNet_layer1.yaml"\n'
+                    'MAPPER="{mapper}/mapper.yaml"\n'
+                    'cd "$OUTPUT_DIR"\n'
+                    '"{python}" "{fake}" {arch}/eyeriss_like.yaml $MAPPER {root}/$LAYER_SHAPE '
+                    '>$OUTPUT_DIR/timeloop_simulation_output.txt\n'.format(
+                        output=self.output_dir, mapper=os.path.join(TIMELOOP_DIR, 'mapper'), python=sys.executable,
+                        fake=FAKE_MAPPER, arch=self.arch_dir, root=root))
+        with open(os.path.join(self.script_dir, 'run_timeloop_model.sh'), 'w') as f:
+            f.write('OUTPUT_DIR="{output}"\n'
+                    'LAYER_SHAPE="AlexNet/AlexNet_layer1.yaml"\n'
+                    'cd "$OUTPUT_DIR"\n'
+                    '"{python}" "{fake}" {arch}/eyeriss_like.yaml $OUTPUT_DIR/seed_mapping.yaml {root}/$LAYER_SHAPE '
+                    '>$OUTPUT_DIR/timeloop_model_output.txt\n'.format(
+                        output=self.output_dir, python=sys.executable, fake=FAKE_MAPPER, arch=self.arch_dir,
+                        root=root))
+        self.store_file = os.path.join(root, 'mappings.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def wrapper(self, **kwargs):
+        return TimeloopWrapper(self.script_dir, self.output_dir, self.arch_dir, os.path.join(TIMELOOP_DIR, 'mapper'),
+                               self.workload_dir, mapping_store=self.store_file, **kwargs)
+
+    def test_cold_then_warm(self):
+        cold = self.wrapper()
+        cold.update_arch(cold.get_arch_param_template())
+        energy, area, cycles = cold.launch_timeloop()
+        self.assertGreater(cycles, 0)
+        self.assertEqual([s['source'] for s in cold.mapping_stats], ['cold', 'cold'])
+
+        # a nearby architecture starts from the stored mappings
+        warm = self.wrapper(compare_cold_every=1)
+        params = warm.get_arch_param_template()
+        params['PSUM_SPAD_ATRIBUTES']['memory_depth'] = 4
+        params['SHARED_GLB_ATTRIBUTES']['memory_depth'] = 512
+        warm.update_arch(params)
+        energy, area, cycles = warm.launch_timeloop()
+        self.assertGreater(cycles, 0)
+        self.assertEqual([s['source'] for s in warm.mapping_stats], ['warm', 'cold-reference'] * 2)
+        # the last run was the full cold reference
+        with open(os.path.join(self.output_dir, 'mapper.yaml')) as f:
+            self.assertEqual(yaml.safe_load(f)['mapper']['victory-condition'], 10)
+
+        arch = load_yaml(os.path.join(self.arch_dir, 'eyeriss_like.yaml'))
+        store = MappingStore(self.store_file)
+        for record in store.records:
+            if record['features'] == arch_features(arch):
+                instance = layer_instance(os.path.join(self.workload_dir, 'AlexNet_layer2.yaml'))
+                if record['layer'] == layer_key(instance):
+                    self.assertIsNone(violations(record['mapping'], instance, arch))
+
+        report = store.report()
+        self.assertEqual(report['cold']['count'], 2)
+        self.assertEqual(report['warm']['count'], 2)
+        self.assertEqual(report['paired']['count'], 2)
+        # the warm start keeps the better of the seeds and the short mapper run
+        self.assertLessEqual(report['paired']['warm_over_cold']['cycles'], 1.0)
+
+    def test_no_legal_seed_falls_back_to_cold(self):
+        wrapper = self.wrapper()
+        wrapper.update_arch(wrapper.get_arch_param_template())
+        instance = layer_instance(os.path.join(self.workload_dir, 'AlexNet_layer2.yaml'))
+        # a mapping for an architecture with other levels can not be legalized
+        MappingStore(self.store_file).insert(layer_key(instance), {'x': 1}, [{'target': 'HBM', 'type': 'temporal'}],
+                                             1.0, 1.0, 1.0, 'cold')
+        self.assertGreater(wrapper.launch_timeloop()[2], 0)
+        self.assertEqual([s['source'] for s in wrapper.mapping_stats], ['cold', 'cold'])
+
+
+if __name__ == '__main__':
+    unittest.main()
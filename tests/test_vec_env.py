@@ -0,0 +1,123 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+os.sys.path.insert(0, tests_dir_path + '/../arch_gym/envs')
+
+from vec_env import DmVecEnv, VecEnv, VecEnvError, dm_env
+
+
+class CountingEnv():
+    '''episode of max_steps steps, observation is [step, last action], writes a file in its cwd'''
+    def __init__(self, workdir, max_steps=3, crash_on=None):
+        self.workdir = workdir
+        self.max_steps = max_steps
+        self.crash_on = crash_on
+        self.steps = 0
+
+    def reset(self):
+        self.steps = 0
+        return np.array([0.0, 0.0])
+
+    def step(self, action):
+        if self.crash_on is not None and action == self.crash_on:
+            if action < 0:
+                # worker dies without reporting back
+                os._exit(1)
+            # the envs sys.exit() when the simulator writes to stderr
+            sys.exit(1)
+        self.steps += 1
+        with open('config.txt', 'w') as f:
+            f.write(str(action))
+        return np.array([float(self.steps), float(action)]), float(action), self.steps == self.max_steps, {}
+
+
+class TestVecEnv(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make(self, num_envs=3, **kwargs):
+        envs = VecEnv([lambda workdir: CountingEnv(workdir, **kwargs)] * num_envs,
+                      workdir_root=self.tmp.name, max_restarts=2)
+        self.addCleanup(envs.close)
+        return envs
+
+    def test_step_and_isolation(self):
+        envs = self.make()
+        np.testing.assert_array_equal(envs.reset(), np.zeros((3, 2)))
+        obs, rewards, dones, infos = envs.step([1, 2, 3])
+        np.testing.assert_array_equal(obs, [[1, 1], [1, 2], [1, 3]])
+        np.testing.assert_array_equal(rewards, [1, 2, 3])
+        self.assertFalse(dones.any())
+        for idx, action in enumerate([1, 2, 3]):
+            with open(os.path.join(envs.workdir(idx), 'config.txt')) as f:
+                self.assertEqual(f.read(), str(action))
+        self.assertEqual(envs.get_attr('workdir'), [envs.workdir(i) for i in range(3)])
+
+    def test_auto_reset(self):
+        envs = self.make(num_envs=2)
+        envs.reset()
+        for _ in range(2):
+            envs.step([5, 6])
+        obs, _, dones, infos = envs.step([7, 8])
+        self.assertTrue(dones.all())
+        np.testing.assert_array_equal(obs, np.zeros((2, 2)))
+        np.testing.assert_array_equal(infos[0]['terminal_observation'], [3, 7])
+
+    def test_subset(self):
+        envs = self.make()
+        envs.reset()
+        obs, _, _, _ = envs.step([4], indices=[1])
+        np.testing.assert_array_equal(obs, [[1, 4]])
+        self.assertEqual(envs.get_attr('steps'), [0, 1, 0])
+
+    def test_crash_restarts_worker(self):
+        envs = self.make(crash_on=9)
+        envs.reset()
+        envs.step([1, 1, 1])
+        obs, rewards, dones, infos = envs.step([1, 9, 1])
+        self.assertEqual(list(dones), [False, True, False])
+        self.assertEqual(rewards[1], 0.0)
+        self.assertIn('SystemExit', infos[1]['worker_error'])
+        np.testing.assert_array_equal(obs[1], [0, 0])
+        # the other envs keep their episode, the restarted one starts over
+        self.assertEqual(envs.get_attr('steps'), [2, 0, 2])
+        self.assertEqual(envs.restarts, [0, 1, 0])
+
+    def test_dead_worker_and_max_restarts(self):
+        envs = self.make(num_envs=1, crash_on=-1)
+        envs.reset()
+        _, _, dones, infos = envs.step([-1])
+        self.assertTrue(dones[0])
+        self.assertIn('exited', infos[0]['worker_error'])
+        envs.step([-1])
+        with self.assertRaises(VecEnvError):
+            envs.step([-1])
+
+    def test_failed_start(self):
+        def broken(workdir):
+            raise RuntimeError('no simulator')
+        with self.assertRaises(VecEnvError):
+            VecEnv([broken], workdir_root=self.tmp.name)
+
+    @unittest.skipIf(dm_env is None, 'dm_env is not installed')
+    def test_dm_env(self):
+        envs = DmVecEnv(self.make(num_envs=2, max_steps=1))
+        timestep = envs.reset()
+        self.assertTrue(all(t == dm_env.StepType.FIRST for t in timestep.step_type))
+        timestep = envs.step([1, 2])
+        self.assertTrue(all(t == dm_env.StepType.LAST for t in timestep.step_type))
+        np.testing.assert_array_equal(timestep.observation, [[1, 1], [1, 2]])
+        timestep = envs.step([3, 4])
+        self.assertTrue(all(t == dm_env.StepType.FIRST for t in timestep.step_type))
+
+
+if __name__ == '__main__':
+    unittest.main()
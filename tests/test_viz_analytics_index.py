@@ -0,0 +1,172 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+tests_dir_path = os.path.dirname(os.path.realpath(__file__))
+INDEX_PATH = os.path.join(tests_dir_path, '../viz/analytics_index.py')
+
+# loaded by path, the viz scripts are run from their own directory
+_spec = importlib.util.spec_from_file_location('analytics_index', INDEX_PATH)
+analytics_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(analytics_index)
+AnalyticsIndex = analytics_index.AnalyticsIndex
+
+
+def fake_step(obs, reward, action):
+    return SimpleNamespace(timestep=SimpleNamespace(observation=np.asarray(obs), reward=reward), action=action)
+
+
+class FakeReader(object):
+    '''stands in for envlogger: a trajectory directory holds an `episodes.npy` of
+    [episode][step][energy, power, latency], the first step of each episode is a reset'''
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, data_dir):
+        self.calls += 1
+        for episode in np.load(os.path.join(data_dir, 'episodes.npy')):
+            steps = [fake_step(episode[0], None, None)]
+            for obs in episode[1:]:
+                steps.append(fake_step([obs], -obs[0], {'RequestBufferSize': np.int64(obs[0] * 10)}))
+            yield steps
+
+
+class TestAnalyticsIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results = self.tmp.name
+        self.arch = os.path.join(self.results, 'DRAMSys')
+        self.reader = FakeReader()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel, text):
+        path = os.path.join(self.arch, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(text)
+        return path
+
+    def index(self):
+        return AnalyticsIndex(self.results, 'DRAMSys', episode_reader=self.reader).refresh()
+
+    def make_tree(self):
+        self.write('aco/aco_logs/cloud-1.stl_ant_count_2/cloud-1.stl_ant_count_2_rewards.csv',
+                   'reward\n5.0\n3.0\n4.0\n1.0\n')
+        self.write('aco/aco_logs/cloud-1.stl_ant_count_4/cloud-1.stl_ant_count_4_rewards.csv',
+                   'reward\n2.0\n2.5\n')
+        self.write('ga/ga_logs/cloud-1.stl_num_agents_8/Y_history.csv', ',0\n0,6.0\n1,0.5\n2,7.0\n')
+        self.write('rw/stream/run_rewards.csv', '9.0,8.0\nnan,7.5\n10.0,11.0\n')
+        self.write('aco/cloud-1/run_rewards.csv', '-3.0\n-0.5\n')
+
+    def test_fitness(self):
+        self.make_tree()
+        index = self.index()
+        best, exps = index.best_fitness(mode='min')
+        self.assertEqual(best, {'aco': {'cloud-1': 1.0}, 'ga': {'cloud-1': 0.5}})
+        self.assertEqual(exps['aco']['cloud-1'], ['cloud-1.stl_ant_count_2', 'cloud-1.stl_ant_count_4'])
+        best, exps = index.best_fitness(['aco'], mode='max')
+        self.assertEqual(best, {'aco': {'cloud-1': 5.0}})
+        self.assertEqual(index.evaluations_to_target('aco', 'cloud-1', 2.0),
+                         {'cloud-1.stl_ant_count_2': 4, 'cloud-1.stl_ant_count_4': 1})
+        self.assertEqual(index.evaluations_to_target('ga', 'cloud-1', 0.1), {'cloud-1.stl_num_agents_8': None})
+        # exact for a single run, merged runs are covered by test_percentiles_of_large_runs
+        self.assertTrue(np.allclose(index.reward_percentiles('ga', 'cloud-1', (0, 25, 50, 100)),
+                                    np.percentile([6.0, 0.5, 7.0], (0, 25, 50, 100))))
+        self.assertEqual(index.reward_percentiles('aco', 'cloud-1', (0, 100)), [1.0, 5.0])
+
+    def test_rewards(self):
+        # the <agent>/<workload> run files are rewards (higher is better, first column), not mixed with the fitness
+        self.make_tree()
+        index = self.index()
+        best, exps = index.best_fitness(mode='max', kind='reward')
+        self.assertEqual(best, {'aco': {'cloud-1': -0.5}, 'rw': {'stream': 10.0}})
+        self.assertEqual(exps['rw']['stream'], ['run_rewards'])
+        self.assertEqual(index.reward_percentiles('rw', 'stream', (0, 100), kind='reward'), [9.0, 10.0])
+        self.assertEqual(index.best_fitness(['aco'], mode='max')[0], {'aco': {'cloud-1': 5.0}})
+
+    def test_percentiles_of_large_runs(self):
+        rng = np.random.default_rng(0)
+        a = rng.normal(size=5000)
+        b = rng.normal(3, 1, size=20000)
+        self.write('bo/bo_logs/x/x_rewards.csv', '\n'.join(map(str, a)) + '\n')
+        self.write('bo/bo_logs/y/y_rewards.csv', '\n'.join(map(str, b)) + '\n')
+        got = self.index().reward_percentiles('bo', percentiles=(5, 50, 95))
+        self.assertTrue(np.allclose(got, np.percentile(np.concatenate([a, b]), (5, 50, 95)), atol=0.05))
+
+    def test_incremental_refresh(self):
+        self.make_tree()
+        index = self.index()
+        self.assertEqual(index.processed, 5)
+        self.assertTrue(os.path.exists(os.path.join(self.arch, analytics_index.INDEX_FILE)))
+        self.assertEqual(self.index().processed, 0)
+
+        path = self.write('aco/aco_logs/cloud-1.stl_ant_count_2/cloud-1.stl_ant_count_2_rewards.csv', '0.25\n')
+        os.utime(path, ns=(0, 1))
+        index = self.index()
+        self.assertEqual(index.processed, 1)
+        self.assertEqual(index.best_fitness()[0]['aco']['cloud-1'], 0.25)
+
+        os.remove(os.path.join(self.arch, 'rw/stream/run_rewards.csv'))
+        index = self.index()
+        self.assertEqual(index.processed, 1)
+        self.assertNotIn('rw', index.best_fitness(mode='max', kind='reward')[0])
+
+    def test_time_to_complete(self):
+        self.write('time_to_complete.txt', 'aco_cloud-1 10\nga_cloud-1 4\naco_cloud-1 14\n')
+        self.write('aco/time_to_complete_aco.txt', 'aco_cloud-1 100\n')
+        index = self.index()
+        times = index.time_to_complete(['aco', 'ga'], ['cloud-1'], files=['time_to_complete.txt'])
+        self.assertEqual(times['aco']['cloud-1'], (12.0, float(np.std([10, 14], ddof=1))))
+        self.assertEqual(times['ga']['cloud-1'][0], 4.0)
+        self.assertEqual(index.time_to_complete(['aco'], ['cloud-1'])['aco']['cloud-1'][0], 124 / 3)
+
+        # appended lines are read from the last offset, a partial line waits for the next refresh
+        self.write('time_to_complete.txt', 'ga_cloud-1 6\nga_clo')
+        index = self.index()
+        self.assertEqual(index.sources['time_to_complete.txt']['entries'][-1], ['ga_cloud-1', 6.0])
+        self.write('time_to_complete.txt', 'ud-1 8\n')
+        times = self.index().time_to_complete(['ga'], ['cloud-1'], files=['time_to_complete.txt'])
+        self.assertEqual(times['ga']['cloud-1'][0], 6.0)
+
+    def test_trajectory(self):
+        exp = 'cloud-1.stl_ant_count_2'
+        data_dir = os.path.join(self.arch, 'aco', 'aco_trajectories', exp)
+        os.makedirs(data_dir)
+        episodes = np.array([[[0, 0, 0], [5, 1, 2], [3, 1, 1]],
+                             [[0, 0, 0], [4, 2, 2], [6, 1, 3]]], dtype=float)
+        np.save(os.path.join(data_dir, 'episodes.npy'), episodes)
+        index = self.index()
+        summary = index.trajectory_summary('aco', exp)
+        self.assertEqual(summary['episodes'], 2)
+        self.assertEqual(summary['steps'], 6)
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['min_obs'], [3.0, 1.0, 1.0])
+        self.assertEqual(summary['min_obs_action'], {'RequestBufferSize': 30})
+        self.assertEqual(summary['best_reward_action'], {'RequestBufferSize': 30})
+        traj = index.trajectory('aco', exp)
+        self.assertEqual(len(traj), 2)
+        self.assertTrue(np.array_equal(traj[1][2], [6, 1, 3]))
+
+        # reopening (or replotting) does not read the trajectory again
+        self.index().trajectory('aco', exp)
+        self.assertEqual(self.reader.calls, 1)
+        with self.assertRaises(KeyError):
+            index.trajectory('aco', 'missing')
+
+        series_file = os.path.join(self.arch, summary['series_file'])
+        os.remove(os.path.join(data_dir, 'episodes.npy'))
+        os.rmdir(data_dir)
+        self.index()
+        self.assertFalse(os.path.exists(series_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
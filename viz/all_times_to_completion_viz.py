@@ -23,9 +23,8 @@ import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import collections
-import pandas as pd
-import json
-import os
+
+from analytics_index import AnalyticsIndex
 
 flags.DEFINE_string('results_dir', '../results', 'Path to the results folder.')
 flags.DEFINE_string('architecture', 'DRAMSys', 'Architecture for which the time to completion should be plotted.')
@@ -95,20 +94,15 @@ def plot_bar_charts(data):
 
 
 def main(_):
-    # Load the "time to completion" file
-    ttc_path = os.path.join(FLAGS.results_dir, FLAGS.architecture, 'time_to_complete.txt')
-
-    with open(ttc_path, 'r') as ttc_file:
-        df = pd.read_csv(ttc_file, header=None, sep=' ')
+    # Time to completion of every agent and workload, from the incremental summary index
+    index = AnalyticsIndex(FLAGS.results_dir, FLAGS.architecture).refresh()
+    times = index.time_to_complete(FLAGS.agents, FLAGS.workloads, files=['time_to_complete.txt'])
 
     # Match the experiment name with the time to completion
     value_dict = collections.defaultdict(lambda: collections.defaultdict(list))
     for agent in FLAGS.agents:
-        agent_df = df.where(df[0].str.contains(agent)).dropna()
-        print(f'{len(agent_df)} exps in {agent}')
         for workload in FLAGS.workloads:
-            wl_df = agent_df.where(agent_df[0].str.contains(workload)).dropna()
-            value_dict[agent][workload].append((wl_df[1].mean(), wl_df[1].std()))
+            value_dict[agent][workload].append(times[agent][workload])
 
     #
     # for algo in algo_df_dict:
@@ -0,0 +1,425 @@
+"""Incremental summary index of an ArchGym results tree, shared by the viz scripts.
+
+The fitness/reward CSVs, the envlogger trajectories and the time_to_complete
+files of one architecture are streamed once and summarized into
+`<results_dir>/<architecture>/analytics_index.json`. Refreshing the index only
+reads the sources that are new or changed since the last refresh (and only the
+appended lines of the time_to_complete files), so rerunning a plot after new
+runs does not walk the whole tree again.
+
+Expected directory structure (any of the layouts used by the viz scripts):
+
+├── DRAMSys
+│     ├── time_to_complete.txt
+│     ├── aco
+│     │     ├── aco_logs/<exp>/<exp>_rewards.csv
+│     │     ├── aco_trajectories/<exp>/...      (envlogger)
+│     │     ├── <workload>/<run>_rewards.csv
+│     │     └── time_to_complete_aco.txt
+│     ├── ga
+│     │     ├── ga_logs/<exp>/Y_history.csv
+│     ...
+
+The two CSV layouts log opposite metrics and are indexed as different kinds:
+the `<agent>_logs/<exp>/` files (`*_rewards.csv`, `*fitness*.csv`,
+`Y_history.csv`) are 'fitness' sources, lower is better (best_fitness.py); the
+`<agent>/<workload>/` run files are 'reward' sources, higher is better, of
+which only the first column is read (max_rewards_viz.py).
+
+Usage: python analytics_index.py --results_dir ../results --architecture DRAMSys
+"""
+import collections
+import csv
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+INDEX_VERSION = 2
+INDEX_FILE = 'analytics_index.json'
+SERIES_DIR = 'analytics_series'
+
+# files holding fitness/reward values, by name
+FITNESS_FILE_KEYS = ('rewards', 'fitness', 'Y_history')
+# values kept per source to merge percentiles; sources with more values keep this many quantiles
+SKETCH_SIZE = 101
+
+
+def parse_workload(architecture, exp):
+    """Returns the workload of an experiment directory name."""
+    if 'Timeloop' in architecture and '=' in exp:
+        workload = exp.split('=')[1].split('_')[0]
+        return workload + ('_v2' if workload == 'mobilenet' else '')
+    return exp.split('.')[0]
+
+
+def summarize_values(values):
+    """Mergeable summary of a series of values in evaluation order.
+
+    `improvements_min`/`improvements_max` are the (index, value) points where
+    the running min/max improves; they give the number of evaluations needed
+    to reach any target.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    summary = {'count': int(len(values))}
+    if not len(values):
+        return summary
+    if len(values) <= SKETCH_SIZE:
+        sketch = np.sort(values)
+    else:
+        sketch = np.quantile(values, np.linspace(0, 1, SKETCH_SIZE))
+    summary.update({
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'mean': float(values.mean()),
+        'sketch': sketch.tolist(),
+        'improvements_min': improvement_points(values, np.less),
+        'improvements_max': improvement_points(values, np.greater),
+    })
+    return summary
+
+
+def improvement_points(values, better):
+    points = []
+    for i, v in enumerate(values):
+        if not points or better(v, points[-1][1]):
+            points.append((i, float(v)))
+    return points
+
+
+def weighted_percentiles(summaries, percentiles):
+    """Percentiles of the union of the values summarized in `summaries`.
+
+    Each sketch is a piecewise linear quantile function of its source; the
+    sources are mixed by their number of values and the mixture is inverted.
+    """
+    summaries = [s for s in summaries if s.get('count')]
+    if not summaries:
+        return [float('nan')] * len(percentiles)
+    points = np.unique(np.concatenate([s['sketch'] for s in summaries]))
+    cdf = np.zeros(len(points))
+    for s in summaries:
+        sketch = np.asarray(s['sketch'])
+        cdf += s['count'] * np.interp(points, sketch, np.linspace(0, 1, len(sketch)))
+    cdf /= sum(s['count'] for s in summaries)
+    return [float(np.interp(q / 100.0, cdf, points)) for q in percentiles]
+
+
+def jsonable(obj):
+    """Converts actions (dicts of numpy values, arrays) for the json index."""
+    if isinstance(obj, dict):
+        return {str(k): jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [jsonable(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def envlogger_episodes(data_dir):
+    """Streams the episodes (lists of steps) of an envlogger directory."""
+    from envlogger import reader
+    with reader.Reader(data_directory=data_dir) as r:
+        for episode in r.episodes:
+            yield list(episode)
+
+
+class AnalyticsIndex:
+    """Summary index of the runs of one architecture, see module docstring."""
+
+    def __init__(self, results_dir, architecture, index_file=None, episode_reader=envlogger_episodes):
+        self.arch_dir = os.path.join(results_dir, architecture)
+        self.architecture = architecture
+        self.index_file = index_file or os.path.join(self.arch_dir, INDEX_FILE)
+        self.episode_reader = episode_reader
+        self.sources = {}
+        self.processed = 0
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                self.sources = index['sources']
+
+    # ---------------------------------------------------------------- refresh
+
+    def refresh(self):
+        """Processes new/changed sources, drops removed ones and saves the index."""
+        self.processed = 0
+        seen = set()
+        for rel, kind, meta in self.find_sources():
+            seen.add(rel)
+            path = os.path.join(self.arch_dir, rel)
+            signature = self.signature(path, kind)
+            entry = self.sources.get(rel)
+            if entry is not None and entry['signature'] == signature:
+                continue
+            if kind in ('fitness', 'reward'):
+                entry = dict(meta, kind=kind, summary=self.process_fitness(path, kind))
+            elif kind == 'trajectory':
+                entry = dict(meta, kind=kind, summary=self.process_trajectory(path, rel))
+            else:
+                entry = self.process_time_to_complete(path, entry)
+            entry['signature'] = signature
+            self.sources[rel] = entry
+            self.processed += 1
+        for rel in list(self.sources):
+            if rel not in seen:
+                series_file = self.sources.pop(rel).get('summary', {}).get('series_file')
+                if series_file and os.path.exists(os.path.join(self.arch_dir, series_file)):
+                    os.remove(os.path.join(self.arch_dir, series_file))
+                self.processed += 1
+        if self.processed:
+            self.save()
+        return self
+
+    def find_sources(self):
+        """Yields (relative path, kind, metadata) of every source in the tree."""
+        if not os.path.isdir(self.arch_dir):
+            return
+        for name in sorted(os.listdir(self.arch_dir)):
+            path = os.path.join(self.arch_dir, name)
+            if os.path.isfile(path) and name.startswith('time_to_complete'):
+                yield name, 'time_to_complete', {}
+            elif os.path.isdir(path) and name != SERIES_DIR:
+                yield from self.find_agent_sources(name)
+
+    def find_agent_sources(self, agent):
+        agent_dir = os.path.join(self.arch_dir, agent)
+        for name in sorted(os.listdir(agent_dir)):
+            path = os.path.join(agent_dir, name)
+            rel = os.path.join(agent, name)
+            if os.path.isfile(path):
+                if name.startswith('time_to_complete'):
+                    yield rel, 'time_to_complete', {}
+            elif name.endswith('_trajectories'):
+                for exp in sorted(os.listdir(path)):
+                    if os.path.isdir(os.path.join(path, exp)):
+                        yield os.path.join(rel, exp), 'trajectory', self.run_meta(agent, exp)
+            elif name.endswith('_logs'):
+                for exp in sorted(os.listdir(path)):
+                    for f in self.fitness_files(os.path.join(path, exp)):
+                        yield os.path.join(rel, exp, f), 'fitness', self.run_meta(agent, exp)
+            else:
+                # <agent>/<workload>/<run files>
+                for f in self.fitness_files(path):
+                    meta = {'agent': agent, 'workload': name, 'exp': os.path.splitext(f)[0]}
+                    yield os.path.join(rel, f), 'reward', meta
+
+    def run_meta(self, agent, exp):
+        return {'agent': agent, 'workload': parse_workload(self.architecture, exp), 'exp': exp}
+
+    def fitness_files(self, directory):
+        if not os.path.isdir(directory):
+            return []
+        return [f for f in sorted(os.listdir(directory))
+                if f.endswith('.csv') and any(k in f for k in FITNESS_FILE_KEYS)]
+
+    def signature(self, path, kind):
+        if kind != 'trajectory':
+            st = os.stat(path)
+            return [st.st_size, st.st_mtime_ns]
+        size = 0
+        mtime = 0
+        for root, _, files in os.walk(path):
+            for f in files:
+                st = os.stat(os.path.join(root, f))
+                size += st.st_size
+                mtime = max(mtime, st.st_mtime_ns)
+        return [size, mtime]
+
+    def process_fitness(self, path, kind):
+        values = []
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                # GA histories are pandas dumps: an index column and a header row without a label
+                if 'Y_history' in path:
+                    if not row or not row[0]:
+                        continue
+                    row = row[1:]
+                # the reward of a run is its first column
+                if kind == 'reward':
+                    row = row[:1]
+                for cell in row:
+                    try:
+                        values.append(float(cell))
+                    except ValueError:
+                        pass  # header
+        return summarize_values(values)
+
+    def process_trajectory(self, path, rel):
+        """Streams the episodes once: reward summary, best observation/action and
+        the per-step observations (in a sidecar file, for trajectory plots)."""
+        rewards = []
+        obs_rows = []
+        episode_ids = []
+        best_obs = None
+        best_obs_action = None
+        best_reward = None
+        best_reward_action = None
+        for ep, steps in enumerate(self.episode_reader(path)):
+            for step in steps:
+                obs = np.asarray(step.timestep.observation, dtype=float).flatten()
+                obs_rows.append(obs)
+                episode_ids.append(ep)
+                if step.timestep.reward is None:
+                    continue  # reset step
+                reward = float(np.asarray(step.timestep.reward, dtype=float).flatten()[0])
+                rewards.append(reward)
+                if best_reward is None or reward > best_reward:
+                    best_reward, best_reward_action = reward, jsonable(step.action)
+                if len(obs) and (best_obs is None or obs[0] < best_obs[0]):
+                    best_obs, best_obs_action = obs.tolist(), jsonable(step.action)
+        summary = summarize_values(rewards)
+        summary.update({'episodes': int(episode_ids[-1] + 1) if episode_ids else 0,
+                        'steps': len(obs_rows),
+                        'best_reward_action': best_reward_action,
+                        'min_obs': best_obs, 'min_obs_action': best_obs_action})
+        if obs_rows:
+            width = max(len(o) for o in obs_rows)
+            obs = np.full((len(obs_rows), width), np.nan)
+            for i, o in enumerate(obs_rows):
+                obs[i, :len(o)] = o
+            series_file = os.path.join(SERIES_DIR, hashlib.sha1(rel.encode('utf-8')).hexdigest()[:16] + '.npz')
+            self.write_atomically(os.path.join(self.arch_dir, series_file),
+                                  lambda f: np.savez(f, obs=obs, episode=np.asarray(episode_ids)))
+            summary['series_file'] = series_file
+        return summary
+
+    def process_time_to_complete(self, path, entry):
+        """Reads the lines appended since the last refresh ("<exp> <seconds>")."""
+        if entry is None or os.path.getsize(path) < entry['offset']:
+            entry = {'kind': 'time_to_complete', 'offset': 0, 'entries': []}
+        with open(path, 'rb') as f:
+            f.seek(entry['offset'])
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # a line being written is read next time
+        for line in data[:end].decode('utf-8').splitlines():
+            parts = line.split()
+            if len(parts) >= 2:
+                try:
+                    entry['entries'].append([parts[0], float(parts[1])])
+                except ValueError:
+                    pass
+        entry['offset'] += end
+        return entry
+
+    def save(self):
+        index = {'version': INDEX_VERSION, 'architecture': self.architecture, 'sources': self.sources}
+        self.write_atomically(self.index_file, lambda f: f.write(json.dumps(index).encode('utf-8')))
+
+    def write_atomically(self, path, write):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    # ---------------------------------------------------------------- queries
+
+    def runs(self, kind='fitness', agent=None, workload=None):
+        """Yields the entries of one kind, optionally for one agent/workload."""
+        for rel in sorted(self.sources):
+            entry = self.sources[rel]
+            if entry['kind'] != kind:
+                continue
+            if agent is not None and entry['agent'] != agent:
+                continue
+            if workload is not None and entry['workload'] != workload:
+                continue
+            yield rel, entry
+
+    def best_fitness(self, agents=None, mode='min', kind='fitness'):
+        """Returns {agent: {workload: best value}} and {agent: {workload: [exps, best first]}}."""
+        values = collections.defaultdict(lambda: collections.defaultdict(list))
+        for _, entry in self.runs(kind):
+            if agents is not None and entry['agent'] not in agents:
+                continue
+            if entry['summary']['count']:
+                values[entry['agent']][entry['workload']].append((entry['summary'][mode], entry['exp']))
+        best = collections.defaultdict(dict)
+        exps = collections.defaultdict(dict)
+        for agent, workloads in values.items():
+            for workload, runs in workloads.items():
+                runs.sort(reverse=(mode == 'max'))
+                best[agent][workload] = runs[0][0]
+                exps[agent][workload] = [exp for _, exp in runs]
+        return best, exps
+
+    def reward_percentiles(self, agent, workload=None, percentiles=(5, 25, 50, 75, 95), kind='fitness'):
+        """Percentiles of all the values logged by an agent (for a workload)."""
+        return weighted_percentiles([e['summary'] for _, e in self.runs(kind, agent, workload)], percentiles)
+
+    def evaluations_to_target(self, agent, workload, target, mode='min', kind='fitness'):
+        """Returns {exp: number of evaluations until the target was reached (None if never)}."""
+        result = {}
+        for _, entry in self.runs(kind, agent, workload):
+            reached = None
+            for i, v in entry['summary'].get('improvements_' + mode, []):
+                if (v <= target) if mode == 'min' else (v >= target):
+                    reached = i + 1
+                    break
+            result[entry['exp']] = reached
+        return result
+
+    def time_to_complete(self, agents, workloads, files=None):
+        """Returns {agent: {workload: (mean, std)}} of the time_to_complete entries whose
+        experiment name contains the agent and the workload (from the given files only,
+        relative to the architecture directory, if any)."""
+        entries = [e for rel, entry in self.runs('time_to_complete') if files is None or rel in files
+                   for e in entry['entries']]
+        result = collections.defaultdict(dict)
+        for agent in agents:
+            for workload in workloads:
+                secs = [s for name, s in entries if agent in name and workload in name]
+                result[agent][workload] = (float(np.mean(secs)) if secs else float('nan'),
+                                           float(np.std(secs, ddof=1)) if len(secs) > 1 else float('nan'))
+        return result
+
+    def trajectory_summary(self, agent, exp):
+        """Returns the summary of a trajectory run (rewards, best observation/action)."""
+        for _, entry in self.runs('trajectory', agent):
+            if entry['exp'] == exp:
+                return entry['summary']
+        raise KeyError(f'No trajectory {exp} for {agent}')
+
+    def trajectory(self, agent, exp):
+        """Returns the observations of a run as a list of episodes (lists of arrays)."""
+        summary = self.trajectory_summary(agent, exp)
+        if 'series_file' not in summary:
+            return []
+        data = np.load(os.path.join(self.arch_dir, summary['series_file']))
+        episodes = collections.defaultdict(list)
+        for ep, obs in zip(data['episode'], data['obs']):
+            episodes[int(ep)].append(obs[~np.isnan(obs)])
+        return [episodes[ep] for ep in sorted(episodes)]
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Builds/refreshes the analytics index of a results tree.')
+    parser.add_argument('--results_dir', default='../results')
+    parser.add_argument('--architecture', default='DRAMSys')
+    args = parser.parse_args()
+    index = AnalyticsIndex(args.results_dir, args.architecture).refresh()
+    print(f'{index.processed} sources processed, {len(index.sources)} in {index.index_file}')
+    for kind, mode in (('fitness', 'min'), ('reward', 'max')):
+        best, _ = index.best_fitness(mode=mode, kind=kind)
+        for agent in sorted(best):
+            for workload in sorted(best[agent]):
+                p5, p50, p95 = index.reward_percentiles(agent, workload, (5, 50, 95), kind=kind)
+                print(f'{kind:>8} {agent:>12} {workload:>12} best {best[agent][workload]:.6g} '
+                      f'p5 {p5:.6g} p50 {p50:.6g} p95 {p95:.6g}')
+
+
+if __name__ == '__main__':
+    main()
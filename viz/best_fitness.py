@@ -4,15 +4,15 @@ import collections
 import os
 import numpy as np
 import matplotlib.pyplot as plt
-import pandas as pd
 import json
 
 from absl import app
 from absl import flags
 
+from analytics_index import AnalyticsIndex
+
 # https://www.google.com
 flags.DEFINE_string('results_dir', '../results', 'Path to the results folder.')
-flags.DEFINE_string('fitness_vals_file', 'fitness.csv', 'Filename where the runtimes are logged.')
 flags.DEFINE_string('architecture', 'DRAMSys', 'Architecture for which the time to completion should be plotted.')
 flags.DEFINE_list('agents', ['aco', 'bo', 'rw', 'ga'], 'Agents to find the best fitness for.')
 
@@ -36,42 +36,17 @@ FLAGS = flags.FLAGS
 
 
 def main(_):
+    # Best (min) fitness of every agent and workload (the <agent>_logs files), from the incremental summary index
+    index = AnalyticsIndex(FLAGS.results_dir, FLAGS.architecture).refresh()
+    print(f'{index.processed} new/changed sources indexed')
+    best, exps = index.best_fitness(FLAGS.agents, mode='min', kind='fitness')
     best_fitness_vals = collections.defaultdict(lambda: collections.defaultdict(lambda: np.Inf))
     best_config = collections.defaultdict(lambda: collections.defaultdict(list))
-
-    # Iterate through all agents and workloads and find min fitness values
-    for agent in FLAGS.agents:
-        log_dir = os.path.join(FLAGS.results_dir, FLAGS.architecture, agent, f'{agent}_logs')
-        experiments = os.listdir(log_dir)
-        for exp in experiments:
-            if 'DRAMSys' in FLAGS.architecture:
-                workload = exp.split('.')[0]
-            elif 'Timeloop' in FLAGS.architecture:
-                hparam_str = exp.split('=')[1]
-                workload = hparam_str.split('_')[0]
-                workload += '_v2' if workload == 'mobilenet' else ''
-
-            if agent == 'aco':
-                fitness_vals_path = os.path.join(log_dir, exp, f'{exp}_rewards.csv')
-            elif agent == 'ga':
-                fitness_vals_path = os.path.join(log_dir, exp, 'Y_history.csv')
-            else:
-                fitness_vals_path = os.path.join(log_dir, exp, FLAGS.fitness_vals_file)
-
-            if os.path.exists(fitness_vals_path):
-                fitness_df = pd.read_csv(fitness_vals_path)
-                if agent == "ga":  # GA dataframe contains row numbers as first col so remove it
-                    fitness_df = fitness_df.iloc[:, 1:]
-                min = fitness_df.dropna().to_numpy().min()
-                # print(config)
-                # print(fitness_df)
-                # print(min)
-                # print(fitness_df.idxmin())
-                if min <= best_fitness_vals[agent][workload]:
-                    best_fitness_vals[agent][workload] = min
-                    best_config[agent][workload].append(exp)
-            else:
-                raise FileNotFoundError(f'Fitness file not found for workload:{workload}, experiment:{exp}')
+    for agent in best:
+        for workload in best[agent]:
+            best_fitness_vals[agent][workload] = best[agent][workload]
+            # experiments of the workload, best first
+            best_config[agent][workload] = exps[agent][workload]
 
     # Log the best fitness vals and the configs that obtained those vals to the screen for future
     print(best_fitness_vals)
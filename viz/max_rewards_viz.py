@@ -23,9 +23,8 @@ import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import collections
-import pandas as pd
-import json
-import os
+
+from analytics_index import AnalyticsIndex
 
 flags.DEFINE_string('results_dir', '../results', 'Path to the results folder.')
 flags.DEFINE_string('architecture', 'DRAMSys', 'Architecture for which the time to completion should be plotted.')
@@ -99,30 +98,14 @@ def plot_bar_charts(data):
 
 
 def main(_):
-    # Load the "time to completion" file
-    ttc_path = os.path.join(FLAGS.results_dir, FLAGS.architecture, 'time_to_complete.txt')
-
-    with open(ttc_path, 'r') as ttc_file:
-        df = pd.read_csv(ttc_file, header=None, sep=' ')
-
-    rewards_list = []
+    # Max reward of every agent and workload (the <agent>/<workload> run files), from the incremental summary index
+    index = AnalyticsIndex(FLAGS.results_dir, FLAGS.architecture).refresh()
+    best, _ = index.best_fitness(FLAGS.agents, mode='max', kind='reward')
 
-    # Match the experiment name with the time to completion
     value_dict = collections.defaultdict(lambda: collections.defaultdict(list))
     for agent in FLAGS.agents:
         for workload in FLAGS.workloads:
-            max_wl_reward = -np.inf
-            # go through every file in the workload
-            reward_paths = os.listdir(os.path.join(FLAGS.results_dir, FLAGS.architecture, agent, workload))
-            reward_paths = list(filter(lambda x: any(('rewards' in x, 'fitness' in x, 'Y_history' in x)), reward_paths))
-            for r in reward_paths:
-                with open(os.path.join(FLAGS.results_dir, FLAGS.architecture, agent, workload, r)) as f:
-                    df = pd.read_csv(f, header=None, )
-
-                    max_exp_reward = df[0].max()
-                max_wl_reward = max(max_exp_reward, max_wl_reward)
-
-            # wl_df = agent_df.where(agent_df[0].str.contains(workload)).dropna()
+            max_wl_reward = best.get(agent, {}).get(workload, -np.inf)
             value_dict[agent][workload].append((max_wl_reward,))
 
     #